@@ -36,7 +36,7 @@ QUIET_MODE=""
 BACKUP_DIR=""
 BACKUP_FILE=""
 #TODO update it with the last database version
-LAST_DB_VERSION=37
+LAST_DB_VERSION=38
 
 # Detect paths
 MYSQL=$(which mysql)
@@ -195,6 +195,7 @@ fi
 #[ $OPENMANO_VER_NUM -ge 6001 ] && DB_VERSION=35  #0.6.01 =>  35
 #[ $OPENMANO_VER_NUM -ge 6003 ] && DB_VERSION=36  #0.6.03 =>  36
 #[ $OPENMANO_VER_NUM -ge 6009 ] && DB_VERSION=37  #0.6.09 =>  37
+#[ $OPENMANO_VER_NUM -ge 6010 ] && DB_VERSION=38  #0.6.10 =>  38
 #TODO ... put next versions here
 
 function upgrade_to_1(){
@@ -1362,6 +1363,27 @@ function downgrade_from_37(){
     # It doesn't make sense to reverse to a bug state.
     sql "DELETE FROM schema_version WHERE version_int='37';"
 }
+function upgrade_to_38(){
+    echo "      Create table 'account_leases' for sharing VIM/WIM accounts among several RO replicas"
+    sql "CREATE TABLE IF NOT EXISTS account_leases (" \
+        "account_type ENUM('vim','wim','replica') NOT NULL, " \
+        "account_id VARCHAR(64) NOT NULL COMMENT 'datacenter_tenant_id, wim_account_id or replica id', " \
+        "owner VARCHAR(64) NULL DEFAULT NULL COMMENT 'id of the RO replica owning the account', " \
+        "expires_at DOUBLE NOT NULL DEFAULT 0, " \
+        "notifications INT(11) UNSIGNED NOT NULL DEFAULT 0 COMMENT 'incremented when new tasks are available', " \
+        "created_at DOUBLE NOT NULL, " \
+        "modified_at DOUBLE NULL DEFAULT NULL, " \
+        "PRIMARY KEY (account_type, account_id), " \
+        "INDEX owner (owner)) " \
+        "COLLATE='utf8_general_ci' ENGINE=InnoDB;"
+    sql "INSERT INTO schema_version (version_int, version, openmano_ver, comments, date) " \
+         "VALUES (38, '0.38', '0.6.10', 'Add account_leases for multi-replica RO', '2019-03-01');"
+}
+function downgrade_from_38(){
+    echo "      Drop table 'account_leases'"
+    sql "DROP TABLE IF EXISTS account_leases;"
+    sql "DELETE FROM schema_version WHERE version_int='38';"
+}
 
 #TODO ... put functions here
 
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""Circuit breaker for the calls of the VIM and WIM threads to their connectors.
+
+When a VIM (or WIM) is unreachable, every call to its connector waits for the
+socket timeouts before failing. A thread that keeps processing its tasks
+spends most of its time blocked, and writes an error at database for each of
+them. A breaker counts the consecutive connection failures of a connector:
+
+- CLOSED: calls are done. After ``failure_threshold`` consecutive failures the
+  breaker opens.
+- OPEN: calls are not done until ``retry_at``. The thread defers its tasks, or
+  fails them without calling the VIM.
+- HALF_OPEN: when ``retry_at`` is reached, next call is done as a trial. A
+  success closes the breaker. A failure opens it again, doubling the time open
+  up to ``max_reset_timeout``.
+
+Breakers are registered by name, and their state is returned by
+``get_metrics``.
+"""
+
+import logging
+import threading
+import weakref
+from functools import partial
+from time import time
+
+CLOSED = "CLOSED"
+OPEN = "OPEN"
+HALF_OPEN = "HALF_OPEN"
+
+FAILURE_THRESHOLD = 3  # consecutive failures
+RESET_TIMEOUT = 5  # seconds open the first time
+MAX_RESET_TIMEOUT = 300  # seconds
+
+breakers = weakref.WeakValueDictionary()  # name -> CircuitBreaker, of the running threads
+breakers_lock = threading.Lock()
+
+
+class CircuitBreaker(object):
+    """Breaker of the calls to a connector.
+
+    Arguments:
+        name (str): identifier at the metrics, e.g. 'vim.<thread name>'
+        is_failure (callable): receives an exception raised by the connector,
+            and returns True if it means that the VIM is unreachable. Other
+            exceptions (e.g. not found) count as a success
+        failure_threshold (int): consecutive failures that open the breaker
+        reset_timeout (float): seconds open the first time
+        max_reset_timeout (float): limit of the exponential backoff
+    """
+
+    def __init__(self, name, is_failure, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT,
+                 max_reset_timeout=MAX_RESET_TIMEOUT, logger=None):
+        self.name = name
+        self.is_failure = is_failure
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.logger = logger or logging.getLogger('openmano.circuit_breaker')
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0  # consecutive
+        self.open_timeout = reset_timeout
+        self.retry_at = None
+        self.last_error = None
+        self.opened = 0  # number of times the breaker has opened
+        self.rejected = 0  # calls not done because the breaker was open
+        with breakers_lock:
+            breakers[name] = self
+
+    def allow(self, now=None):
+        """Return True if a call can be done. An open breaker becomes half-open when its retry time is reached"""
+        with self.lock:
+            if self.state == OPEN:
+                if (now or time()) < self.retry_at:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self.logger.info("circuit breaker {}: half-open, trying again".format(self.name))
+            return True
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                self.logger.info("circuit breaker {}: closed".format(self.name))
+            self.state = CLOSED
+            self.failures = 0
+            self.open_timeout = self.reset_timeout
+            self.retry_at = None
+
+    def record_failure(self, error, now=None):
+        with self.lock:
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == HALF_OPEN:
+                self.open_timeout = min(self.open_timeout * 2, self.max_reset_timeout)
+            elif self.state == OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.retry_at = (now or time()) + self.open_timeout
+            self.opened += 1
+            self.logger.warning("circuit breaker {}: open for {}s after {} consecutive failures: {}".format(
+                self.name, self.open_timeout, self.failures, self.last_error))
+
+    def call(self, function, *args, **kwargs):
+        """Call function, recording its outcome. Exceptions are propagated"""
+        try:
+            result = function(*args, **kwargs)
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure(e)
+            else:
+                self.record_success()
+            raise
+        self.record_success()
+        return result
+
+    def guard(self, connector):
+        """Return a proxy of connector that records the outcome of its methods at this breaker"""
+        return GuardedConnector(connector, self)
+
+    def metrics(self, now=None):
+        with self.lock:
+            return {"state": self.state, "failures": self.failures, "opened": self.opened,
+                    "rejected": self.rejected, "last_error": self.last_error,
+                    "retry_in": max(0, self.retry_at - (now or time())) if self.state == OPEN else None}
+
+
+class GuardedConnector(object):
+    """Proxy of a VIM/WIM connector whose method calls are done through guard.call, e.g. recorded at a
+    CircuitBreaker or limited by a VimGovernor"""
+
+    def __init__(self, connector, guard):
+        self.connector = connector
+        self.guard = guard
+
+    def __getattr__(self, name):
+        if name.startswith("__"):  # e.g. looked up by copy or pickle before __init__
+            raise AttributeError(name)
+        attr = getattr(self.connector, name)
+        if not callable(attr):
+            return attr
+        return partial(self.guard.call, attr)
+
+    def __getitem__(self, key):
+        return self.connector[key]
+
+
+def get_metrics():
+    """State of the breakers of the running threads, by name"""
+    with breakers_lock:
+        running = list(breakers.items())
+    return {name: breaker.metrics() for name, breaker in running}
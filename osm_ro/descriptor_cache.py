@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""Cache of the OSM IM descriptors already parsed with pyangbind.
+
+Loading a vnfd/nsd catalog into its pyangbind tree validates it against the
+YANG model, and takes seconds of CPU for big descriptors. As the same
+descriptors are onboarded again and again (e.g. by the LCM, for every
+instantiation), the result of the parsing (the list of descriptors, as the
+dicts returned by the ``get`` method of the pyangbind objects) is kept in a
+bounded LRU, keyed by a hash of the descriptor content. A descriptor whose hash
+is known is known to be valid, so it is not parsed again.
+
+The leaves returned by ``get`` are still pyangbind objects, that reference
+their parents and the whole tree. ``plain`` converts them to the JSON types
+(unicode, int, float, bool). Entries are kept pickled, which is compact and
+gives every caller its own copy, that it can modify, at a fraction of the cost
+of a deepcopy.
+"""
+
+import cPickle
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    from pyangbind.lib.serialise import pybindJSONEncoder
+    json_encoder = pybindJSONEncoder()
+except ImportError:  # only needed by plain, for pyangbind values
+    json_encoder = None
+
+DEFAULT_MAXSIZE = 64  # descriptors
+PLAIN_TYPES = (type(None), bool, int, long, float, str, unicode)
+
+
+def plain(value):
+    """Copy of the output of the ``get`` method of a pyangbind object, with its leaves converted to plain JSON
+    types, as done by pybindJSON.dumps. Unlike a round trip through JSON, the order of the YANG lists is kept"""
+    if isinstance(value, dict):
+        return type(value)((key, plain(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [plain(item) for item in value]
+    if type(value) in PLAIN_TYPES:
+        return value
+    return plain(json_encoder.default(value))
+
+
+class DescriptorCache(object):
+    """Bounded LRU of parsed descriptors.
+
+    Arguments:
+        maxsize (int): number of descriptors kept. 0 disables the cache
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(kind, descriptor):
+        """Hash of the descriptor content, independent of the order of the keys of its dicts"""
+        content = json.dumps(descriptor, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(kind.encode('utf-8') + b':' + content.encode('utf-8')).hexdigest()
+
+    def get(self, kind, descriptor, parse):
+        """Return the parsed descriptor, calling parse(descriptor) if it is not at the cache.
+        Exceptions of parse (invalid descriptors) are propagated and not cached. The result of parse must be plain
+        data, that can be pickled"""
+        if not self.maxsize:
+            return parse(descriptor)
+        key = self.key(kind, descriptor)
+        with self.lock:
+            parsed = self.entries.pop(key, None)
+            if parsed is not None:
+                self.entries[key] = parsed  # most recently used
+                self.hits += 1
+            else:
+                self.misses += 1
+        if parsed is None:
+            parsed = cPickle.dumps(parse(descriptor), cPickle.HIGHEST_PROTOCOL)
+            with self.lock:
+                self.entries[key] = parsed
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return cPickle.loads(parsed)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
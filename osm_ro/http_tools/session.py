@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""Shared, pooled HTTP sessions for the REST based connectors.
+
+Instead of calling ``requests.get/post/...`` directly (which opens a new
+TCP/TLS connection for every single call), connectors should obtain a
+:class:`requests.Session` from :func:`get_session`. Sessions are shared
+among all the callers that target the same endpoint (scheme + host + port)
+with the same options, so connections are kept alive and reused.
+
+The options can be tuned per VIM/WIM account, using the ``http_session``
+key of the ``config`` dict, e.g.::
+
+    config:
+        http_session:
+            pool_maxsize: 50
+            max_retries: 5
+            backoff_factor: 1
+"""
+
+import logging
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from six.moves.urllib.parse import urlsplit
+
+logger = logging.getLogger('openmano.http.session')
+
+CONFIG_KEY = 'http_session'
+
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 20
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_STATUS_FORCELIST = (502, 503, 504)
+
+_OPTIONS = ('pool_connections', 'pool_maxsize', 'max_retries',
+            'backoff_factor', 'status_forcelist', 'keep_alive')
+
+_sessions = {}
+_sessions_lock = Lock()
+
+
+def endpoint_of(url):
+    """Return the ``scheme://host:port`` portion of an URL"""
+    parts = urlsplit(url or '')
+    return '{}://{}'.format(parts.scheme or 'http', parts.netloc).lower()
+
+
+def session_options(config):
+    """Extract the session options from a connector ``config`` dict.
+
+    Unknown keys are ignored, so the resulting dict can be directly passed
+    to :func:`get_session` or :func:`create_session`.
+    """
+    options = (config or {}).get(CONFIG_KEY) or {}
+    return {k: v for k, v in options.items() if k in _OPTIONS}
+
+
+def create_session(pool_connections=DEFAULT_POOL_CONNECTIONS,
+                   pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                   max_retries=DEFAULT_MAX_RETRIES,
+                   backoff_factor=DEFAULT_BACKOFF_FACTOR,
+                   status_forcelist=DEFAULT_STATUS_FORCELIST,
+                   keep_alive=True):
+    """Create a new :class:`requests.Session` with a pooled adapter and
+    retry/backoff policy mounted for both HTTP and HTTPS.
+
+    Arguments:
+        pool_connections (int): number of per-host connection pools to cache
+        pool_maxsize (int): maximum number of connections kept in each pool
+        max_retries (int): number of retries for failed connections and for
+            idempotent requests answered with a status in ``status_forcelist``
+        backoff_factor (float): exponential backoff between retries,
+            ``backoff_factor * (2 ** (retry - 1))`` seconds
+        status_forcelist (list): HTTP status codes that trigger a retry
+        keep_alive (bool): if False, connections are closed after each request
+
+    Non-idempotent requests (e.g. POST) are only retried when the connection
+    could not be established in the first place.
+    """
+    retry = Retry(total=max_retries, connect=max_retries, read=max_retries,
+                  status=max_retries, backoff_factor=backoff_factor,
+                  status_forcelist=tuple(status_forcelist or ()),
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_connections,
+                          pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+
+    return session
+
+
+def get_session(url, **options):
+    """Return a session shared by every caller targeting the same endpoint
+    with the same options (see :func:`create_session` for the options).
+    """
+    key = (endpoint_of(url), tuple(sorted(
+        (k, tuple(v) if isinstance(v, list) else v)
+        for k, v in options.items())))
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            logger.debug('Creating HTTP session for %s', key[0])
+            session = _sessions[key] = create_session(**options)
+
+    return session
+
+
+def close_sessions():
+    """Close all the shared sessions, releasing the pooled connections"""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from .. import session as httpsession
+
+
+class TestHttpSession(unittest.TestCase):
+    def tearDown(self):
+        httpsession.close_sessions()
+
+    def test_get_session_should_share_sessions_per_endpoint(self):
+        # Given two URLs in the same endpoint
+        url1 = 'http://localhost:9080/openvim/tenants'
+        url2 = 'HTTP://LOCALHOST:9080/openvim/networks'
+        # when sessions are retrieved for both of them
+        session1 = httpsession.get_session(url1)
+        session2 = httpsession.get_session(url2)
+        # then the same session object should be used
+        self.assertIs(session1, session2)
+
+    def test_get_session_should_separate_endpoints_and_options(self):
+        # Given a session was created for an URL
+        url = 'http://localhost:9080/openvim'
+        session = httpsession.get_session(url)
+        # when a different endpoint or different options are used
+        other_endpoint = httpsession.get_session('https://localhost:9080/')
+        other_options = httpsession.get_session(url, pool_maxsize=5)
+        # then different sessions should be created
+        self.assertIsNot(session, other_endpoint)
+        self.assertIsNot(session, other_options)
+
+    def test_create_session_should_mount_pooled_adapters(self):
+        # When a session is created with some specific options
+        session = httpsession.create_session(
+            pool_maxsize=7, max_retries=2, keep_alive=False)
+        # then both http and https should use the configured adapter
+        for prefix in ('http://', 'https://'):
+            adapter = session.get_adapter(prefix + 'example.com')
+            self.assertEqual(adapter._pool_maxsize, 7)
+            self.assertEqual(adapter.max_retries.total, 2)
+        # and connections should not be kept alive
+        self.assertEqual(session.headers['Connection'], 'close')
+
+    def test_session_options_should_filter_unknown_keys(self):
+        # Given a connector configuration
+        config = {'http_session': {'pool_maxsize': 3, 'foo': 'bar'},
+                  'other': 1}
+        # when the options are extracted, only the known ones should be kept
+        self.assertEqual(httpsession.session_options(config),
+                         {'pool_maxsize': 3})
+        # and missing configurations should be tolerated
+        self.assertEqual(httpsession.session_options(None), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -136,6 +136,16 @@ def enable_cors():
 @bottle.route(url_base + '/version', method='GET')
 def http_get_version():
     return nfvo.get_version()
+
+@bottle.route(url_base + '/health', method='GET')
+def http_get_health():
+    """Readiness of the service. 503 until the threads of all the VIM and WIM accounts have been started.
+    It also contains the state of the circuit breaker of each VIM and WIM thread, and the rate limits of each VIM"""
+    status = nfvo.get_startup_status()
+    status.update(nfvo.get_thread_metrics())
+    if not status["ready"]:
+        bottle.response.status = httperrors.Service_Unavailable
+    return format_out({"health": status})
 #
 # VNFs
 #
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""Cache of the Keystone tokens and service catalogs used by the openstack connectors.
+
+Every connector used to authenticate on its own when its clients were
+(re)created, so a RO with hundreds of OpenStack accounts sent hundreds of
+authentication requests at start up. The authentication state of keystoneauth
+(token plus catalog) is kept here, keyed by the auth plugin identity (auth
+url, project, user and a digest of the password, see
+``BaseIdentityPlugin.get_cache_id``) and the region, so it is shared by all
+the connectors targeting the same cloud with the same credentials.
+
+If a ``path`` is configured (``vim_token_cache_file`` at openmanod.cfg), the
+entries are also stored at that file, readable only by the owner, so they
+survive restarts and are shared with the worker processes. Expired entries
+are discarded when reading. A token revoked before its expiration is
+rejected by the VIM with 401 and keystoneauth authenticates again; the
+connector stores the new token at its next operation, or discards the entry
+if the VIM keeps rejecting it.
+"""
+
+import calendar
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+EXPIRATION_MARGIN = 300  # seconds. Tokens closer to expire than this are not reused
+
+
+class TokenCache(object):
+    """Authentication states indexed by key, with their expiration time.
+
+    Arguments:
+        path (str): file where the entries are persisted. By default they are only kept in memory
+    """
+
+    def __init__(self, path=None, logger_name='openmano.vim.openstack'):
+        self.path = path
+        self.entries = {}  # key -> {'auth_state':, 'expires_at':, ...}
+        self.mtime = None  # of the file when it was last read
+        self.lock = threading.Lock()
+        self.logger = logging.getLogger(logger_name)
+
+    def configure(self, path):
+        with self.lock:
+            self.path = path
+            self.mtime = None
+
+    def get(self, key, now=None):
+        """Return the entry of key, or None if not present or about to expire"""
+        now = now or time.time()
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key)
+            if entry and entry['expires_at'] - EXPIRATION_MARGIN > now:
+                return entry
+            return None
+
+    def set(self, key, auth_state, expires_at, **extra):
+        """Store an authentication state (as returned by ``get_auth_state``) plus any extra value of the VIM"""
+        entry = dict(extra, auth_state=auth_state, expires_at=expires_at)
+        with self.lock:
+            self._load()
+            if self.entries.get(key) == entry:
+                return
+            self.entries[key] = entry
+            self._save()
+
+    def invalidate(self, key):
+        with self.lock:
+            self._load()
+            if self.entries.pop(key, None):
+                self._save()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._save()
+
+    def _load(self):
+        """Merge the entries of the file if it has been modified by other process"""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self.mtime:
+                return
+            with open(self.path) as f:
+                entries = json.load(f)
+            self.mtime = mtime
+        except (IOError, OSError):
+            return  # not created yet
+        except ValueError as e:
+            self.logger.warning("Ignoring token cache file '{}': {}".format(self.path, e))
+            return
+        self.entries.update(entries)
+
+    def _save(self):
+        if not self.path:
+            return
+        now = time.time()
+        for key in [k for k, entry in self.entries.items() if entry['expires_at'] <= now]:
+            del self.entries[key]
+        try:
+            # written at a temporal file and renamed, so that readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                            prefix='.token_cache')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.entries, f)
+            os.rename(tmp_path, self.path)
+            self.mtime = os.stat(self.path).st_mtime
+        except (IOError, OSError) as e:
+            self.logger.warning("Cannot write token cache file '{}': {}".format(self.path, e))
+
+
+def cache_key(auth, region_name=None):
+    """Key of a keystoneauth identity plugin at the cache, or None if the plugin does not support caching"""
+    cache_id = auth.get_cache_id()
+    if not cache_id:
+        return None
+    return "{}:{}".format(cache_id, region_name or "")
+
+
+def expiration(auth):
+    """Expiration time of the token of a keystoneauth identity plugin, in seconds since the epoch"""
+    return calendar.timegm(auth.auth_ref.expires.utctimetuple())
+
+
+token_cache = TokenCache()
@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+
+"""Sharing of the VIM/WIM accounts among several openmanod replicas.
+
+Every VIM account (``datacenter_tenant_id``) and WIM account has a lease row
+at the ``account_leases`` table, with the id of the replica that owns it and
+an expiration time. Only the owner runs the thread that processes the
+``vim_wim_actions`` of the account, and it keeps the lease alive with a
+periodic heartbeat. Each replica also keeps a lease of type ``replica`` with
+its own id, so all of them know which replicas are alive.
+
+Accounts are split among the alive replicas using consistent hashing. When a
+replica dies, its leases expire and are acquired by the others, that start
+the corresponding threads (reloading the pending actions from the database).
+
+Tasks inserted at a replica that does not own the account are already
+persisted at the database, so they are routed to the owner by increasing the
+``notifications`` counter of the lease. The owner detects it at the next
+heartbeat and reloads the thread.
+
+Expiration times are compared with the clock of each replica, so the clocks
+of the hosts must be synchronized (e.g. with NTP).
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+
+from .db_base import db_base_Exception
+from .http_tools import errors as httperrors
+from .workers import HashRing
+
+TABLE = 'account_leases'
+DEFAULT_LEASE_TIME = 30  # seconds
+REPLICA = 'replica'
+
+
+class LeaseManager(object):
+    """Atomic operations over the ``account_leases`` table.
+
+    Arguments:
+        db: database object (``db_base`` instance)
+        owner (str): id of this replica. By default ``<hostname>:<pid>``
+        lease_time (float): seconds a lease is valid without being renewed
+    """
+
+    def __init__(self, db, owner=None, lease_time=DEFAULT_LEASE_TIME, logger_name='openmano.leases'):
+        self.db = db
+        self.owner = owner or "{}:{}".format(socket.gethostname(), os.getpid())
+        self.lease_time = lease_time
+        self.logger = logging.getLogger(logger_name)
+
+    def acquire(self, kind, account_id, now=None):
+        """Get the lease of an account if it is free, expired or already owned. Return True if acquired"""
+        now = now or time.time()
+        updated = self.db.update_rows(TABLE, UPDATE={"owner": self.owner, "expires_at": now + self.lease_time},
+                                      WHERE={"account_type": kind, "account_id": account_id,
+                                             "OR": {"owner": self.owner, "expires_at<": now}})
+        if updated:
+            return True
+        try:
+            self.db.new_row(TABLE, {"account_type": kind, "account_id": account_id, "owner": self.owner,
+                                    "expires_at": now + self.lease_time})
+            return True
+        except db_base_Exception as e:
+            if e.http_code == httperrors.Conflict:  # already leased by other replica
+                return False
+            raise
+
+    def renew(self, now=None):
+        """Extend all the leases owned by this replica. Return the number of renewed leases"""
+        now = now or time.time()
+        return self.db.update_rows(TABLE, UPDATE={"expires_at": now + self.lease_time},
+                                   WHERE={"owner": self.owner})
+
+    def release(self, kind, account_id):
+        """Free a lease owned by this replica, so that other replica can acquire it"""
+        return self.db.update_rows(TABLE, UPDATE={"owner": None, "expires_at": 0},
+                                   WHERE={"account_type": kind, "account_id": account_id, "owner": self.owner})
+
+    def release_all(self):
+        return self.db.update_rows(TABLE, UPDATE={"owner": None, "expires_at": 0}, WHERE={"owner": self.owner})
+
+    def delete(self, kind, account_id):
+        """Remove the lease of an account that does not exist anymore"""
+        return self.db.delete_row(FROM=TABLE, WHERE={"account_type": kind, "account_id": account_id})
+
+    def notify(self, kind, account_id):
+        """Tell the owner of the account that there are new tasks at database"""
+        return self.db.update_rows(TABLE, UPDATE={"notifications": {"INCREMENT": 1}},
+                                   WHERE={"account_type": kind, "account_id": account_id})
+
+    def get_leases(self):
+        return self.db.get_rows(FROM=TABLE, SELECT=("account_type", "account_id", "owner", "expires_at",
+                                                    "notifications"))
+
+
+class LeasedThread(object):
+    """Proxy used instead of the VIM/WIM thread of an account when leases are enabled. The real thread only exists
+    while this replica owns the lease.
+
+    Arguments:
+        keeper: :class:`LeaseKeeper` instance
+        kind (str): 'vim' or 'wim'
+        account_id (str): datacenter_tenant_id or wim_account_id
+        spawn (callable): function without arguments that creates and starts the real thread
+    """
+
+    def __init__(self, keeper, kind, account_id, spawn, name=None):
+        self.keeper = keeper
+        self.kind = kind
+        self.account_id = account_id
+        self.spawn = spawn
+        self.name = name or account_id
+        self.thread = None
+        self.notifications = None
+
+    def insert_task(self, task):
+        if task == 'exit':
+            self.keeper.remove(self)
+            return
+        thread = self.thread
+        if thread:
+            thread.insert_task(task)
+        else:
+            # tasks are already stored at database. Just tell the owner to reload them
+            self.keeper.manager.notify(self.kind, self.account_id)
+
+    def reload(self):
+        self.insert_task('reload')
+
+    def exit(self):
+        self.insert_task('exit')
+
+    def is_alive(self):
+        return bool(self.thread)
+
+    def start_local(self):
+        self.thread = self.spawn()
+
+    def stop_local(self):
+        thread, self.thread = self.thread, None
+        if thread:
+            thread.insert_task('exit')
+
+
+class LeaseKeeper(threading.Thread):
+    """Thread that periodically renews the leases of this replica, acquires the accounts assigned to it and
+    releases the ones that belong to other replicas, starting/stopping the local threads accordingly.
+
+    Local threads are stopped when the leases could expire before the next heartbeat renews them (because the
+    heartbeats fail, or are late), so that an account is never run at the same time by other replica.
+
+    Arguments:
+        manager: :class:`LeaseManager` instance
+        interval (float): seconds between heartbeats. By default a third of the lease time
+        margin (float): seconds kept, besides the interval, between stopping the local threads and the expiration of
+            their leases, for slow database calls and clock differences. By default half the interval
+    """
+
+    def __init__(self, manager, interval=None, margin=None, logger_name='openmano.leases'):
+        threading.Thread.__init__(self, name="lease-keeper")
+        self.daemon = True
+        self.manager = manager
+        self.interval = interval or manager.lease_time / 3.0
+        self.margin = self.interval / 2.0 if margin is None else margin
+        self.logger = logging.getLogger(logger_name)
+        self.accounts = {}  # (kind, account_id) -> LeasedThread
+        self.discover = {}  # kind -> callable(account_id) to add accounts created by other replicas
+        self.forget = {}  # kind -> callable(account_id) to remove accounts deleted by other replicas
+        self.lock = threading.RLock()
+        self.stopping = threading.Event()
+        self.last_heartbeat = 0
+
+    def register(self, kind, discover=None, forget=None):
+        if discover:
+            self.discover[kind] = discover
+        if forget:
+            self.forget[kind] = forget
+
+    def add(self, kind, account_id, spawn, name=None):
+        """Manage the account, starting its local thread if the lease is obtained. Return a LeasedThread"""
+        proxy = LeasedThread(self, kind, account_id, spawn, name=name)
+        with self.lock:
+            old_proxy = self.accounts.get((kind, account_id))
+            if old_proxy:
+                old_proxy.stop_local()
+            self.accounts[(kind, account_id)] = proxy
+            if self.manager.acquire(kind, account_id):
+                proxy.start_local()
+        return proxy
+
+    def remove(self, proxy):
+        """The account has been deleted. Stop its thread and delete its lease"""
+        with self.lock:
+            if self.stopping.is_set() or self.accounts.get((proxy.kind, proxy.account_id)) is not proxy:
+                return
+            del self.accounts[(proxy.kind, proxy.account_id)]
+            proxy.stop_local()
+            self.manager.delete(proxy.kind, proxy.account_id)
+
+    def heartbeat(self, now=None):
+        now = now or time.time()
+        manager = self.manager
+        with self.lock:
+            manager.renew(now)
+            self.last_heartbeat = now
+            manager.acquire(REPLICA, manager.owner, now)
+            leases = {}
+            alive = []
+            for lease in manager.get_leases():
+                if lease["account_type"] == REPLICA:
+                    if lease["expires_at"] >= now:
+                        alive.append(lease["account_id"])
+                else:
+                    leases[(lease["account_type"], lease["account_id"])] = lease
+            ring = HashRing(sorted(alive))
+
+            for key in leases:
+                if key not in self.accounts and key[0] in self.discover:
+                    self.logger.debug("Discovered {} account '{}'".format(*key))
+                    self.discover[key[0]](key[1])
+
+            for key, proxy in list(self.accounts.items()):
+                lease = leases.get(key)
+                if not lease:
+                    # deleted by other replica
+                    self.logger.debug("Forgetting {} account '{}'".format(*key))
+                    del self.accounts[key]
+                    proxy.stop_local()
+                    if key[0] in self.forget:
+                        self.forget[key[0]](key[1])
+                    continue
+                owned = lease["owner"] == manager.owner
+                assigned = ring.get(key[1]) == manager.owner
+                if owned and not assigned:
+                    self.logger.info("Handing over {} account '{}' to {}".format(key[0], key[1], ring.get(key[1])))
+                    proxy.stop_local()
+                    manager.release(*key)
+                elif owned:
+                    if not proxy.thread:
+                        proxy.start_local()
+                    elif proxy.notifications is not None and proxy.notifications != lease["notifications"]:
+                        proxy.thread.insert_task('reload')
+                    proxy.notifications = lease["notifications"]
+                else:
+                    if proxy.thread:
+                        self.logger.warning("Lease of {} account '{}' lost".format(*key))
+                        proxy.stop_local()
+                    if assigned and (not lease["owner"] or lease["expires_at"] < now) and \
+                            manager.acquire(key[0], key[1], now):
+                        self.logger.info("Lease of {} account '{}' acquired".format(*key))
+                        proxy.notifications = lease["notifications"]
+                        proxy.start_local()
+
+    def check_expiration(self, now=None):
+        """Stop the local threads if their leases, renewed at the last heartbeat, could expire before the next one.
+        Return True if stopped"""
+        now = now or time.time()
+        if now - self.last_heartbeat <= self.manager.lease_time - self.interval - self.margin:
+            return False
+        with self.lock:
+            running = [proxy for proxy in self.accounts.values() if proxy.thread]
+            if running:
+                self.logger.warning("Leases not renewed for {:.1f}s. Stopping {} threads, as other replicas can "
+                                    "acquire their accounts".format(now - self.last_heartbeat, len(running)))
+            for proxy in running:
+                proxy.stop_local()
+        return True
+
+    def run(self):
+        self.logger.debug("Starting as replica '{}'".format(self.manager.owner))
+        while not self.stopping.is_set():
+            try:
+                self.heartbeat()
+            except Exception as e:
+                self.logger.error("Cannot renew leases: {}".format(e), exc_info=True)
+            # also after a successful heartbeat, that could be late
+            self.check_expiration()
+            self.stopping.wait(self.interval)
+        self.logger.debug("Finishing")
+
+    def stop(self):
+        """Stop the local threads and release all the leases, so that other replicas take over immediately"""
+        with self.lock:
+            self.stopping.set()
+            for proxy in self.accounts.values():
+                proxy.stop_local()
+            self.accounts.clear()
+            try:
+                self.manager.release_all()
+            except Exception as e:
+                self.logger.error("Cannot release leases: {}".format(e))
@@ -42,6 +42,7 @@ from uuid import uuid4
 from db_base import db_base_Exception
 
 import nfvo_db
+import threading
 from threading import Lock
 import time as t
 from lib_osm_openvim import ovim as ovim_module
@@ -59,7 +60,15 @@ import wim.wimconn as wimconn
 import wim.wim_thread as wim_thread
 from .http_tools import errors as httperrors
 from .wim.engine import WimEngine
-from .wim.persistence import WimPersistence
+from .wim.persistence import WimPersistence, invalidate_cache as invalidate_wim_cache
+from .workers import WorkerPool
+from .leases import LeaseManager, LeaseKeeper
+from .keystone_cache import token_cache
+from .descriptor_cache import DescriptorCache, plain
+from .vim_governor import governed, get_metrics as get_vim_governors
+from .circuit_breaker import get_metrics as get_circuit_breakers
+from functools import partial
+from multiprocessing.pool import ThreadPool
 from copy import deepcopy
 from pprint import pformat
 #
@@ -74,8 +83,20 @@ global wimconn_imported
 global logger
 global default_volume_size
 default_volume_size = '5' #size in GB
+# VIMs where images and flavors are looked for/created at the same time, and seconds to wait for each one
+VIM_PROVISION_CONCURRENCY = 10
+VIM_PROVISION_TIMEOUT = 1800
+# VIM connectors created at the same time by start_service
+VIM_STARTUP_CONCURRENCY = 20
 global ovim
 ovim = None
+global worker_pool
+worker_pool = None  # pool of processes running the VIM/WIM threads, if 'vim_workers' is configured
+global lease_keeper
+lease_keeper = None  # shares VIM/WIM accounts among several RO replicas, if 'lease_time' is configured
+descriptor_cache = DescriptorCache()  # vnfd/nsd catalogs already parsed by new_vnfd_v3/new_nsd_v3
+# progress of start_service. 'ready' when all the VIM/WIM threads have been started
+startup_status = {"ready": False, "error": None, "vims": 0, "vims_started": 0}
 global_config = None
 
 vimconn_imported = {}   # dictionary with VIM type as key, loaded module as value
@@ -149,19 +170,11 @@ def get_non_used_wim_name(wim_name, wim_id, tenant_name, tenant_id):
     return name
 
 
-def start_service(mydb, persistence=None, wim=None):
-    global db, global_config
-    db = nfvo_db.nfvo_db(lock=db_lock)
-    mydb.lock = db_lock
-    db.connect(global_config['db_host'], global_config['db_user'], global_config['db_passwd'], global_config['db_name'])
-    global ovim
-
-    persistence = persistence or  WimPersistence(db)
-
+def _ovim_configuration():
     # Initialize openvim for SDN control
     # TODO: Avoid static configuration by adding new parameters to openmanod.cfg
     # TODO: review ovim.py to delete not needed configuration
-    ovim_configuration = {
+    return {
         'logger_name': 'openmano.ovim',
         'network_vlan_range_start': 1000,
         'network_vlan_range_end': 4096,
@@ -175,76 +188,238 @@ def start_service(mydb, persistence=None, wim=None):
         #TODO: log_level_of should not be needed. To be modified in ovim
         'log_level_of': 'DEBUG'
     }
+
+
+def _worker_bootstrap(parent):
+    """Called inside each worker process of the pool. It opens its own database connections, as they cannot be shared
+    with the parent process, and returns the constructors of the VIM and WIM threads. The ovim library, with its
+    openflow and DHCP threads, runs just at the parent process, that is called by the threads of the worker"""
+    global db, ovim, worker_pool
+    worker_pool = None
+    db = nfvo_db.nfvo_db(lock=db_lock)
+    db.connect(global_config['db_host'], global_config['db_user'], global_config['db_passwd'], global_config['db_name'])
+    ovim = parent.service("ovim")
+    # the cache is not used, as the changes done by the parent process (e.g. to the WIM accounts, before
+    # reloading their threads) do not invalidate the records cached at the worker
+    persistence = WimPersistence(db, cache_ttl=0)
+
+    def new_vim_thread(thread_name, datacenter_name, datacenter_tenant_id):
+        return vim_thread.vim_thread(task_lock, thread_name, datacenter_name, datacenter_tenant_id,
+                                     db=db, db_lock=db_lock, ovim=ovim)
+
+    def new_wim_thread(wim_account):
+        return wim_thread.WimThread(persistence, wim_account, ovim=ovim)
+
+    return {"vim": new_vim_thread, "wim": new_wim_thread}
+
+
+def _thread_metrics():
+    return {"circuit_breakers": get_circuit_breakers(), "vim_governors": get_vim_governors()}
+
+
+def get_thread_metrics():
+    """State of the circuit breakers and rate limits of the VIM and WIM threads, including the ones of the worker
+    processes, as last reported by them"""
+    metrics = _thread_metrics()
+    if worker_pool:
+        for index, worker_metrics in sorted(worker_pool.get_metrics().items()):
+            for section, values in worker_metrics.items():
+                for name, value in values.items():
+                    if name in metrics[section]:  # e.g. the governor of a VIM account, used also by the NBI
+                        name = "{} (worker {})".format(name, index)
+                    metrics[section][name] = value
+    return metrics
+
+
+def _start_vim_thread(thread_name, datacenter_name, datacenter_tenant_id):
+    """Starts the thread for a VIM account. If leases are enabled, it is only started while this RO replica owns the
+    account"""
+    if lease_keeper:
+        return lease_keeper.add("vim", datacenter_tenant_id,
+                                partial(_spawn_vim_thread, thread_name, datacenter_name, datacenter_tenant_id),
+                                name=thread_name)
+    return _spawn_vim_thread(thread_name, datacenter_name, datacenter_tenant_id)
+
+
+def _spawn_vim_thread(thread_name, datacenter_name, datacenter_tenant_id):
+    """Starts the thread for a VIM account, locally or at the corresponding worker process"""
+    if worker_pool:
+        return worker_pool.start_thread("vim", datacenter_tenant_id, thread_name, datacenter_name,
+                                        datacenter_tenant_id)
+    new_thread = vim_thread.vim_thread(task_lock, thread_name, datacenter_name, datacenter_tenant_id,
+                                       db=db, db_lock=db_lock, ovim=ovim)
+    new_thread.start()
+    return new_thread
+
+
+def _discover_vim_thread(datacenter_tenant_id):
+    """Add the thread of a VIM account created by other RO replica"""
+    vims = db.get_rows(FROM="datacenter_tenants as dt join datacenters as d on dt.datacenter_id=d.uuid",
+                       SELECT=("d.name as datacenter_name", "d.uuid as datacenter_id", "dt.vim_tenant_id",
+                               "dt.vim_tenant_name"),
+                       WHERE={"dt.uuid": datacenter_tenant_id})
+    if not vims:
+        return
+    vim = vims[0]
+    thread_name = get_non_used_vim_name(vim['datacenter_name'], vim['datacenter_id'], vim['vim_tenant_name'],
+                                        vim['vim_tenant_id'])
+    vim_threads["running"][datacenter_tenant_id] = _start_vim_thread(thread_name, vim['datacenter_name'],
+                                                                     datacenter_tenant_id)
+
+
+def _forget_vim_thread(datacenter_tenant_id):
+    """Remove the thread of a VIM account deleted by other RO replica"""
+    vim_threads["running"].pop(datacenter_tenant_id, None)
+
+
+def _check_vim_connector(vim):
+    """Create the connector of a VIM account at start up, to report configuration errors. Returns the error or
+    None"""
+    extra={'datacenter_tenant_id': vim.get('datacenter_tenant_id'),
+           'datacenter_id': vim.get('datacenter_id')}
+    try:
+        if vim["config"]:
+            extra.update(yaml.load(vim["config"]))
+        if vim.get('dt_config'):
+            extra.update(yaml.load(vim["dt_config"]))
+        vim_conn = vim_thread.get_vim_module(vim["type"])
+    except (IOError, ImportError) as e:
+        return "Unknown vim type '{}'. Cannot open file 'vimconn_{}.py'; {}: {}".format(
+            vim["type"], vim["type"], type(e).__name__, str(e))
+    except yaml.YAMLError as e:
+        return "Invalid config; {}: {}".format(type(e).__name__, e)
+    thread_id = vim['datacenter_tenant_id']
+    vim_persistent_info[thread_id] = {}
     try:
+        #if not tenant:
+        #    return -httperrors.Bad_Request, "You must provide a valid tenant name or uuid for VIM  %s" % ( vim["type"])
+        vim_conn.vimconnector(
+            uuid=vim['datacenter_id'], name=vim['datacenter_name'],
+            tenant_id=vim['vim_tenant_id'], tenant_name=vim['vim_tenant_name'],
+            url=vim['vim_url'], url_admin=vim['vim_url_admin'],
+            user=vim['user'], passwd=vim['passwd'],
+            config=extra, persistent_info=vim_persistent_info[thread_id]
+        )
+    except vimconn.vimconnException as e:
+        return str(e)
+    except Exception as e:
+        return "Error at VIM  {}; {}: {}".format(vim["type"], type(e).__name__, e)
+    return None
+
+
+def _start_vim_threads(mydb):
+    """Start the threads of all the VIM accounts. Connectors, that can authenticate against the VIM when created, are
+    checked concurrently (up to VIM_STARTUP_CONCURRENCY) and each thread is started as soon as its connector is
+    checked"""
+    from_= 'tenants_datacenters as td join datacenters as d on td.datacenter_id=d.uuid join '\
+            'datacenter_tenants as dt on td.datacenter_tenant_id=dt.uuid'
+    select_ = ('type', 'd.config as config', 'd.uuid as datacenter_id', 'vim_url', 'vim_url_admin',
+               'd.name as datacenter_name', 'dt.uuid as datacenter_tenant_id',
+               'dt.vim_tenant_name as vim_tenant_name', 'dt.vim_tenant_id as vim_tenant_id',
+               'user', 'passwd', 'dt.config as dt_config', 'nfvo_tenant_id')
+    vims = mydb.get_rows(FROM=from_, SELECT=select_)
+    startup_status["vims"] = len(vims)
+    if not vims:
+        return
+    pool = ThreadPool(min(VIM_STARTUP_CONCURRENCY, len(vims)))
+    try:
+        checked = pool.imap_unordered(lambda vim: (vim, _check_vim_connector(vim)), vims)
+        for vim, error in checked:
+            if error:
+                logger.error("Cannot launch thread for VIM {} '{}': {}".format(vim['datacenter_name'],
+                                                                               vim['datacenter_id'], error))
+            thread_name = get_non_used_vim_name(vim['datacenter_name'], vim['vim_tenant_id'],
+                                                vim['vim_tenant_name'], vim['vim_tenant_id'])
+            vim_threads["running"][vim['datacenter_tenant_id']] = _start_vim_thread(
+                thread_name, vim['datacenter_name'], vim['datacenter_tenant_id'])
+            startup_status["vims_started"] += 1
+    finally:
+        pool.close()
+
+
+def _complete_start_service(mydb):
+    """Second part of start_service, run at background: starts the VIM and WIM threads and cleans the database.
+    startup_status is updated with the progress"""
+    try:
+        _start_vim_threads(mydb)
+        wim_engine.start_threads()
+        if lease_keeper:
+            lease_keeper.start()
+        startup_status["ready"] = True
+        logger.info("Service ready. {} VIM threads started".format(startup_status["vims_started"]))
+
+        #delete old unneeded vim_wim_actions
+        clean_db(mydb)
+    except Exception as e:
+        startup_status["error"] = "{}: {}".format(type(e).__name__, e)
+        logger.critical("Error starting the service: {}".format(startup_status["error"]), exc_info=True)
+
+
+def get_startup_status():
+    return dict(startup_status)
+
+
+def _check_vim_threads_started(datacenter_tenant_ids):
+    """While the service is starting, raise 503 (Service Unavailable) if the thread of any of these VIM accounts is
+    not started yet, instead of reporting them as not found"""
+    if startup_status["ready"]:
+        return
+    pending = [thread_id for thread_id in datacenter_tenant_ids
+               if thread_id and thread_id not in vim_threads["running"]]
+    if pending:
+        raise NfvoException("Service starting up, the threads of VIM accounts {} are not started yet. Try again "
+                            "later".format(", ".join(sorted(pending))), httperrors.Service_Unavailable)
+
+
+def start_service(mydb, persistence=None, wim=None):
+    global db, global_config
+    db = nfvo_db.nfvo_db(lock=db_lock)
+    mydb.lock = db_lock
+    db.connect(global_config['db_host'], global_config['db_user'], global_config['db_passwd'], global_config['db_name'])
+    global ovim
+
+    persistence = persistence or  WimPersistence(db)
+
+    global worker_pool
+    try:
+        if global_config.get("vim_token_cache_file"):
+            token_cache.configure(global_config["vim_token_cache_file"])
+        vim_thread.vim_thread.configure_refresh(build=global_config.get("vim_refresh_build"),
+                                                active=global_config.get("vim_refresh_active"),
+                                                active_max=global_config.get("vim_refresh_active_max"),
+                                                backoff=global_config.get("vim_refresh_backoff"))
+
+        if global_config.get("vim_workers"):
+            # threads are spawned at worker processes. Fork them before starting any other thread
+            worker_pool = WorkerPool(int(global_config["vim_workers"]), _worker_bootstrap, metrics=_thread_metrics)
+            worker_pool.start()
+
         # starts ovim library
-        ovim = ovim_module.ovim(ovim_configuration)
+        ovim = ovim_module.ovim(_ovim_configuration())
+        if worker_pool:
+            worker_pool.serve("ovim", ovim)
 
         global wim_engine
         wim_engine = wim or WimEngine(persistence)
         wim_engine.ovim = ovim
+        wim_engine.worker_pool = worker_pool
 
-        ovim.start_service()
-
-        #delete old unneeded vim_wim_actions
-        clean_db(mydb)
-
-        # starts vim_threads
-        from_= 'tenants_datacenters as td join datacenters as d on td.datacenter_id=d.uuid join '\
-                'datacenter_tenants as dt on td.datacenter_tenant_id=dt.uuid'
-        select_ = ('type', 'd.config as config', 'd.uuid as datacenter_id', 'vim_url', 'vim_url_admin',
-                   'd.name as datacenter_name', 'dt.uuid as datacenter_tenant_id',
-                   'dt.vim_tenant_name as vim_tenant_name', 'dt.vim_tenant_id as vim_tenant_id',
-                   'user', 'passwd', 'dt.config as dt_config', 'nfvo_tenant_id')
-        vims = mydb.get_rows(FROM=from_, SELECT=select_)
-        for vim in vims:
-            extra={'datacenter_tenant_id': vim.get('datacenter_tenant_id'),
-                   'datacenter_id': vim.get('datacenter_id')}
-            if vim["config"]:
-                extra.update(yaml.load(vim["config"]))
-            if vim.get('dt_config'):
-                extra.update(yaml.load(vim["dt_config"]))
-            if vim["type"] not in vimconn_imported:
-                module_info=None
-                try:
-                    module = "vimconn_" + vim["type"]
-                    pkg = __import__("osm_ro." + module)
-                    vim_conn = getattr(pkg, module)
-                    # module_info = imp.find_module(module, [__file__[:__file__.rfind("/")]])
-                    # vim_conn = imp.load_module(vim["type"], *module_info)
-                    vimconn_imported[vim["type"]] = vim_conn
-                except (IOError, ImportError) as e:
-                    # if module_info and module_info[0]:
-                    #    file.close(module_info[0])
-                    raise NfvoException("Unknown vim type '{}'. Cannot open file '{}.py'; {}: {}".format(
-                        vim["type"], module, type(e).__name__, str(e)), httperrors.Bad_Request)
+        global lease_keeper
+        if global_config.get("lease_time"):
+            lease_manager = LeaseManager(db, owner=global_config.get("replica_id"),
+                                         lease_time=float(global_config["lease_time"]))
+            lease_keeper = LeaseKeeper(lease_manager)
+            lease_keeper.register("vim", _discover_vim_thread, _forget_vim_thread)
+            lease_keeper.register("wim", wim_engine.discover_thread, wim_engine.forget_thread)
+            wim_engine.lease_keeper = lease_keeper
 
-            thread_id = vim['datacenter_tenant_id']
-            vim_persistent_info[thread_id] = {}
-            try:
-                #if not tenant:
-                #    return -httperrors.Bad_Request, "You must provide a valid tenant name or uuid for VIM  %s" % ( vim["type"])
-                myvim = vimconn_imported[ vim["type"] ].vimconnector(
-                    uuid=vim['datacenter_id'], name=vim['datacenter_name'],
-                    tenant_id=vim['vim_tenant_id'], tenant_name=vim['vim_tenant_name'],
-                    url=vim['vim_url'], url_admin=vim['vim_url_admin'],
-                    user=vim['user'], passwd=vim['passwd'],
-                    config=extra, persistent_info=vim_persistent_info[thread_id]
-                )
-            except vimconn.vimconnException as e:
-                myvim = e
-                logger.error("Cannot launch thread for VIM {} '{}': {}".format(vim['datacenter_name'],
-                                                                               vim['datacenter_id'], e))
-            except Exception as e:
-                raise NfvoException("Error at VIM  {}; {}: {}".format(vim["type"], type(e).__name__, e),
-                                    httperrors.Internal_Server_Error)
-            thread_name = get_non_used_vim_name(vim['datacenter_name'], vim['vim_tenant_id'], vim['vim_tenant_name'],
-                                                vim['vim_tenant_id'])
-            new_thread = vim_thread.vim_thread(task_lock, thread_name, vim['datacenter_name'],
-                                               vim['datacenter_tenant_id'], db=db, db_lock=db_lock, ovim=ovim)
-            new_thread.start()
-            vim_threads["running"][thread_id] = new_thread
+        ovim.start_service()
 
-        wim_engine.start_threads()
+        # VIM and WIM threads are started at background, so that the NBI is available meanwhile
+        startup_status.update(ready=False, error=None, vims=0, vims_started=0)
+        startup_thread = threading.Thread(target=_complete_start_service, args=(mydb,), name="startup")
+        startup_thread.daemon = True
+        startup_thread.start()
     except db_base_Exception as e:
         raise NfvoException(str(e) + " at nfvo.get_vim", e.http_code)
     except ovim_module.ovimException as e:
@@ -259,9 +434,13 @@ def start_service(mydb, persistence=None, wim=None):
 
 
 def stop_service():
-    global ovim, global_config
+    global ovim, global_config, lease_keeper
     if ovim:
         ovim.stop_service()
+    if lease_keeper:
+        # release the accounts, so that other RO replicas take them over
+        lease_keeper.stop()
+        lease_keeper = None
     for thread_id, thread in vim_threads["running"].items():
         thread.insert_task("exit")
         vim_threads["deleting"][thread_id] = thread
@@ -270,6 +449,11 @@ def stop_service():
     if wim_engine:
         wim_engine.stop_threads()
 
+    global worker_pool
+    if worker_pool:
+        worker_pool.stop()
+        worker_pool = None
+
     if global_config and global_config.get("console_thread"):
         for thread in global_config["console_thread"]:
             thread.terminate = True
@@ -389,8 +573,7 @@ def get_vim(mydb, nfvo_tenant=None, datacenter_id=None, datacenter_name=None, da
                 module_info=None
                 try:
                     module = "vimconn_" + vim["type"]
-                    pkg = __import__("osm_ro." + module)
-                    vim_conn = getattr(pkg, module)
+                    vim_conn = vim_thread.get_vim_module(vim["type"])
                     # module_info = imp.find_module(module, [__file__[:__file__.rfind("/")]])
                     # vim_conn = imp.load_module(vim["type"], *module_info)
                     vimconn_imported[vim["type"]] = vim_conn
@@ -414,7 +597,7 @@ def get_vim(mydb, nfvo_tenant=None, datacenter_id=None, datacenter_name=None, da
                     persistent_info = {}
                 #if not tenant:
                 #    return -httperrors.Bad_Request, "You must provide a valid tenant name or uuid for VIM  %s" % ( vim["type"])
-                vim_dict[ vim['datacenter_id'] ] = vimconn_imported[ vim["type"] ].vimconnector(
+                vim_connector = vimconn_imported[ vim["type"] ].vimconnector(
                                 uuid=vim['datacenter_id'], name=vim['datacenter_name'],
                                 tenant_id=vim.get('vim_tenant_id',vim_tenant),
                                 tenant_name=vim.get('vim_tenant_name',vim_tenant_name),
@@ -422,6 +605,9 @@ def get_vim(mydb, nfvo_tenant=None, datacenter_id=None, datacenter_name=None, da
                                 user=vim.get('user',vim_user), passwd=vim.get('passwd',vim_passwd),
                                 config=extra, persistent_info=persistent_info
                         )
+                # rate limits shared with the vim_thread of the VIM account
+                vim_dict[ vim['datacenter_id'] ] = governed(vim_connector, vim.get('datacenter_tenant_id') or
+                                                            vim['datacenter_id'], extra)
             except Exception as e:
                 if ignore_errors:
                     logger.error("Error at VIM  {}; {}: {}".format(vim["type"], type(e).__name__, str(e)))
@@ -592,6 +778,88 @@ def check_vnf_descriptor(vnf_descriptor, vnf_descriptor_version=1):
                     httperrors.Bad_Request)
 
 
+class _VimTask(object):
+    """Call of _run_at_vims to a VIM, run by a thread of the pool"""
+
+    def __init__(self, vim_id, vim):
+        self.vim_id = vim_id
+        self.vim = vim
+        self.started = None  # time the call started, the timeout is counted from then
+        self.done = threading.Event()
+        self.abandoned = False  # the caller stopped waiting for it
+        self.lock = Lock()
+        self.result = None
+        self.error = None
+
+    def run(self, function, undo):
+        self.started = t.time()
+        try:
+            result, error = function(self.vim_id, self.vim), None
+        except Exception as e:
+            result, error = None, e
+        with self.lock:
+            self.result, self.error = result, error
+            self.done.set()
+            late = self.abandoned
+        if late and not error and undo:
+            # the VIM was already reported as failed, so what it did after the timeout is undone here
+            try:
+                undo(self.vim_id, self.vim, result)
+            except Exception as e:
+                logger.error("Cannot undo the late result %s at VIM '%s': %s", result, self.vim["name"], str(e))
+
+    def wait(self):
+        """Wait for the call, at most VIM_PROVISION_TIMEOUT seconds since it started.
+        Returns False on timeout, and the call is abandoned"""
+        while not self.done.is_set():
+            if self.started is None:  # still queued at the pool
+                self.done.wait(0.1)
+                continue
+            remaining = self.started + VIM_PROVISION_TIMEOUT - t.time()
+            if remaining <= 0:
+                break
+            self.done.wait(remaining)
+        with self.lock:
+            self.abandoned = not self.done.is_set()
+            return not self.abandoned
+
+
+def _run_at_vims(vims, function, undo=None):
+    """Call function(vim_id, vim) for every VIM, concurrently up to VIM_PROVISION_CONCURRENCY VIMs, waiting at most
+    VIM_PROVISION_TIMEOUT seconds since each call starts.
+    A call that times out is reported as failed, and if it succeeds afterwards its result is passed to
+    undo(vim_id, vim, result), e.g. to delete what was created at the VIM.
+    Returns a list of (vim_id, vim, result, exception) in the order of vims, so that errors are reported
+    deterministically whatever the VIM that fails first"""
+    tasks = [_VimTask(vim_id, vim) for vim_id, vim in vims.items()]
+    if not tasks:
+        return []
+    pool = ThreadPool(min(VIM_PROVISION_CONCURRENCY, len(tasks)))
+    try:
+        for task in tasks:
+            pool.apply_async(task.run, (function, undo))
+        results = []
+        for task in tasks:
+            if task.wait():
+                results.append((task.vim_id, task.vim, task.result, task.error))
+            else:
+                results.append((task.vim_id, task.vim, None, vimconn.vimconnException(
+                    "Timeout after {} seconds".format(VIM_PROVISION_TIMEOUT), http_code=vimconn.HTTP_Request_Timeout)))
+        return results
+    finally:
+        # the threads of abandoned calls end when their VIM answers
+        pool.close()
+
+
+def _raise_vim_errors(failed, what, return_on_error):
+    """Log the errors of _run_at_vims, raising the first one if return_on_error or if it is not a vimconn error"""
+    for vim, e in failed:
+        if return_on_error or not isinstance(e, vimconn.vimconnException):
+            logger.error("Error creating %s at VIM '%s': %s", what, vim["name"], str(e))
+            raise e
+        logger.warn("Error creating %s at VIM '%s': %s", what, vim["name"], str(e))
+
+
 def create_or_use_image(mydb, vims, image_dict, rollback_list, only_create_at_vim=False, return_on_error=None):
     #look if image exist
     if only_create_at_vim:
@@ -614,68 +882,68 @@ def create_or_use_image(mydb, vims, image_dict, rollback_list, only_create_at_vi
             #temp_image_dict['location'] = image_dict.get('new_location') if image_dict['location'] is None
             image_mano_id = mydb.new_row('images', temp_image_dict, add_uuid=True)
             rollback_list.append({"where":"mano", "what":"image","uuid":image_mano_id})
-    #create image at every vim
-    for vim_id,vim in vims.iteritems():
-        datacenter_vim_id = vim["config"]["datacenter_tenant_id"]
-        image_created="false"
-        #look at database
-        image_db = mydb.get_rows(FROM="datacenters_images",
-                                 WHERE={'datacenter_vim_id': datacenter_vim_id, 'image_id': image_mano_id})
-        #look at VIM if this image exist
+
+    def image_at_vim(vim_id, vim):
+        """Look for the image at the VIM, creating it if needed. Returns (image_vim_id, created)"""
         try:
             if image_dict['location'] is not None:
-                image_vim_id = vim.get_image_id_from_path(image_dict['location'])
-            else:
-                filter_dict = {}
-                filter_dict['name'] = image_dict['universal_name']
-                if image_dict.get('checksum') != None:
-                    filter_dict['checksum'] = image_dict['checksum']
-                #logger.debug('>>>>>>>> Filter dict: %s', str(filter_dict))
-                vim_images = vim.get_image_list(filter_dict)
-                #logger.debug('>>>>>>>> VIM images: %s', str(vim_images))
-                if len(vim_images) > 1:
-                    raise vimconn.vimconnException("More than one candidate VIM image found for filter: {}".format(str(filter_dict)), httperrors.Conflict)
-                elif len(vim_images) == 0:
-                    raise vimconn.vimconnNotFoundException("Image not found at VIM with filter: '{}'".format(str(filter_dict)))
-                else:
-                    #logger.debug('>>>>>>>> VIM image 0: %s', str(vim_images[0]))
-                    image_vim_id = vim_images[0]['id']
-
+                return vim.get_image_id_from_path(image_dict['location']), "false"
+            filter_dict = {}
+            filter_dict['name'] = image_dict['universal_name']
+            if image_dict.get('checksum') != None:
+                filter_dict['checksum'] = image_dict['checksum']
+            vim_images = vim.get_image_list(filter_dict)
+            if len(vim_images) > 1:
+                raise vimconn.vimconnException("More than one candidate VIM image found for filter: {}".format(str(filter_dict)), httperrors.Conflict)
+            elif len(vim_images) == 0:
+                raise vimconn.vimconnNotFoundException("Image not found at VIM with filter: '{}'".format(str(filter_dict)))
+            return vim_images[0]['id'], "false"
         except vimconn.vimconnNotFoundException as e:
             #Create the image in VIM only if image_dict['location'] or image_dict['new_location'] is not None
-            try:
-                #image_dict['location']=image_dict.get('new_location') if image_dict['location'] is None
-                if image_dict['location']:
-                    image_vim_id = vim.new_image(image_dict)
-                    rollback_list.append({"where":"vim", "vim_id": vim_id, "what":"image","uuid":image_vim_id})
-                    image_created="true"
-                else:
-                    #If we reach this point, then the image has image name, and optionally checksum, and could not be found
-                    raise vimconn.vimconnException(str(e))
-            except vimconn.vimconnException as e:
-                if return_on_error:
-                    logger.error("Error creating image at VIM '%s': %s", vim["name"], str(e))
-                    raise
-                image_vim_id = None
-                logger.warn("Error creating image at VIM '%s': %s", vim["name"], str(e))
-                continue
-        except vimconn.vimconnException as e:
-            if return_on_error:
-                logger.error("Error contacting VIM to know if the image exists at VIM: %s", str(e))
-                raise
-            logger.warn("Error contacting VIM to know if the image exists at VIM: %s", str(e))
+            if not image_dict['location']:
+                #If we reach this point, then the image has image name, and optionally checksum, and could not be found
+                raise vimconn.vimconnException(str(e))
+            return vim.new_image(deepcopy(image_dict)), "true"
+
+    #look at database, for all the vims at once
+    images_db = {}
+    if vims:
+        for image_db in mydb.get_rows(FROM="datacenters_images",
+                                      WHERE={'datacenter_vim_id': [vim["config"]["datacenter_tenant_id"]
+                                                                   for vim in vims.values()],
+                                             'image_id': image_mano_id}):
+            images_db.setdefault(image_db["datacenter_vim_id"], image_db)
+    #create image at every vim
+    image_vim_id = None
+    failed = []
+    def delete_late_image(vim_id, vim, result):
+        image_vim_id, image_created = result
+        if image_created == "true":
+            logger.warn("Deleting image %s created at VIM '%s' after the timeout", image_vim_id, vim["name"])
+            vim.delete_image(image_vim_id)
+
+    for vim_id, vim, result, error in _run_at_vims(vims, image_at_vim, delete_late_image):
+        if error:
             image_vim_id = None
+            failed.append((vim, error))
             continue
         #if we reach here, the image has been created or existed
-        if len(image_db)==0:
+        image_vim_id, image_created = result
+        if image_created == "true":
+            rollback_list.append({"where":"vim", "vim_id": vim_id, "what":"image","uuid":image_vim_id})
+        datacenter_vim_id = vim["config"]["datacenter_tenant_id"]
+        image_db = images_db.get(datacenter_vim_id)
+        if not image_db:
             #add new vim_id at datacenters_images
             mydb.new_row('datacenters_images', {'datacenter_vim_id': datacenter_vim_id,
                                                 'image_id':image_mano_id,
                                                 'vim_id': image_vim_id,
                                                 'created':image_created})
-        elif image_db[0]["vim_id"]!=image_vim_id:
+        elif image_db["vim_id"]!=image_vim_id:
             #modify existing vim_id at datacenters_images
-            mydb.update_rows('datacenters_images', UPDATE={'vim_id':image_vim_id}, WHERE={'datacenter_vim_id':vim_id, 'image_id':image_mano_id})
+            mydb.update_rows('datacenters_images', UPDATE={'vim_id':image_vim_id},
+                             WHERE={'datacenter_vim_id': datacenter_vim_id, 'image_id':image_mano_id})
+    _raise_vim_errors(failed, "image", return_on_error)
 
     return image_vim_id if only_create_at_vim else image_mano_id
 
@@ -732,95 +1000,101 @@ def create_or_use_flavor(mydb, vims, flavor_dict, rollback_list, only_create_at_
     #create flavor at every vim
     if 'uuid' in flavor_dict:
         del flavor_dict['uuid']
-    flavor_vim_id=None
-    for vim_id,vim in vims.items():
-        datacenter_vim_id = vim["config"]["datacenter_tenant_id"]
-        flavor_created="false"
-        #look at database
-        flavor_db = mydb.get_rows(FROM="datacenters_flavors",
-                                  WHERE={'datacenter_vim_id': datacenter_vim_id, 'flavor_id': flavor_mano_id})
-        #look at VIM if this flavor exist  SKIPPED
-        #res_vim, flavor_vim_id = vim.get_flavor_id_from_path(flavor_dict['location'])
-        #if res_vim < 0:
-        #    print "Error contacting VIM to know if the flavor %s existed previously." %flavor_vim_id
-        #    continue
-        #elif res_vim==0:
-
-        # Create the flavor in VIM
-        # Translate images at devices from MANO id to VIM id
-        disk_list = []
-        if 'extended' in flavor_dict and flavor_dict['extended']!=None and "devices" in flavor_dict['extended']:
-            # make a copy of original devices
-            devices_original=[]
-
-            for device in flavor_dict["extended"].get("devices",[]):
-                dev={}
-                dev.update(device)
-                devices_original.append(dev)
-                if 'image' in device:
-                    del device['image']
-                if 'image metadata' in device:
-                    del device['image metadata']
-                if 'image checksum' in device:
-                    del device['image checksum']
-            dev_nb = 0
-            for index in range(0,len(devices_original)) :
-                device=devices_original[index]
-                if "image" not in device and "image name" not in device:
-                    # if 'size' in device:
-                    disk_list.append({'size': device.get('size', default_volume_size), 'name': device.get('name')})
-                    continue
-                image_dict={}
-                image_dict['name']=device.get('image name',flavor_dict['name']+str(dev_nb)+"-img")
-                image_dict['universal_name']=device.get('image name')
-                image_dict['description']=flavor_dict['name']+str(dev_nb)+"-img"
-                image_dict['location']=device.get('image')
-                # image_dict['new_location']=device.get('image location')
-                image_dict['checksum']=device.get('image checksum')
-                image_metadata_dict = device.get('image metadata', None)
-                image_metadata_str = None
-                if image_metadata_dict != None:
-                    image_metadata_str = yaml.safe_dump(image_metadata_dict,default_flow_style=True,width=256)
-                image_dict['metadata']=image_metadata_str
-                image_mano_id=create_or_use_image(mydb, vims, image_dict, rollback_list, only_create_at_vim=False, return_on_error=return_on_error )
-                image_dict["uuid"]=image_mano_id
-                image_vim_id=create_or_use_image(mydb, vims, image_dict, rollback_list, only_create_at_vim=True, return_on_error=return_on_error)
-
-                #save disk information (image must be based on and size
-                disk_list.append({'image_id': image_vim_id, 'size': device.get('size', default_volume_size)})
-
-                flavor_dict["extended"]["devices"][index]['imageRef']=image_vim_id
-                dev_nb += 1
-        if len(flavor_db)>0:
+
+    # Translate images at devices from MANO id to VIM id. Images are created at all the vims at once
+    disk_list = []
+    if vims and 'extended' in flavor_dict and flavor_dict['extended']!=None and "devices" in flavor_dict['extended']:
+        # make a copy of original devices
+        devices_original=[]
+
+        for device in flavor_dict["extended"].get("devices",[]):
+            dev={}
+            dev.update(device)
+            devices_original.append(dev)
+            if 'image' in device:
+                del device['image']
+            if 'image metadata' in device:
+                del device['image metadata']
+            if 'image checksum' in device:
+                del device['image checksum']
+        dev_nb = 0
+        for index in range(0,len(devices_original)) :
+            device=devices_original[index]
+            if "image" not in device and "image name" not in device:
+                # if 'size' in device:
+                disk_list.append({'size': device.get('size', default_volume_size), 'name': device.get('name')})
+                continue
+            image_dict={}
+            image_dict['name']=device.get('image name',flavor_dict['name']+str(dev_nb)+"-img")
+            image_dict['universal_name']=device.get('image name')
+            image_dict['description']=flavor_dict['name']+str(dev_nb)+"-img"
+            image_dict['location']=device.get('image')
+            # image_dict['new_location']=device.get('image location')
+            image_dict['checksum']=device.get('image checksum')
+            image_metadata_dict = device.get('image metadata', None)
+            image_metadata_str = None
+            if image_metadata_dict != None:
+                image_metadata_str = yaml.safe_dump(image_metadata_dict,default_flow_style=True,width=256)
+            image_dict['metadata']=image_metadata_str
+            image_mano_id=create_or_use_image(mydb, vims, image_dict, rollback_list, only_create_at_vim=False, return_on_error=return_on_error )
+            image_dict["uuid"]=image_mano_id
+            image_vim_id=create_or_use_image(mydb, vims, image_dict, rollback_list, only_create_at_vim=True, return_on_error=return_on_error)
+
+            #save disk information (image must be based on and size
+            disk_list.append({'image_id': image_vim_id, 'size': device.get('size', default_volume_size)})
+
+            flavor_dict["extended"]["devices"][index]['imageRef']=image_vim_id
+            dev_nb += 1
+
+    #look at database, for all the vims at once
+    flavors_db = {}
+    if vims:
+        for flavor_db in mydb.get_rows(FROM="datacenters_flavors",
+                                       WHERE={'datacenter_vim_id': [vim["config"]["datacenter_tenant_id"]
+                                                                    for vim in vims.values()],
+                                              'flavor_id': flavor_mano_id}):
+            flavors_db.setdefault(flavor_db["datacenter_vim_id"], flavor_db)
+
+    def flavor_at_vim(vim_id, vim):
+        """Look for the flavor at the VIM, creating it if needed. Returns (flavor_vim_id, created)"""
+        flavor_db = flavors_db.get(vim["config"]["datacenter_tenant_id"])
+        if flavor_db:
             #check that this vim_id exist in VIM, if not create
-            flavor_vim_id=flavor_db[0]["vim_id"]
             try:
-                vim.get_flavor(flavor_vim_id)
-                continue #flavor exist
+                vim.get_flavor(flavor_db["vim_id"])
+                return flavor_db["vim_id"], "false"  #flavor exist
             except vimconn.vimconnException:
                 pass
         #create flavor at vim
         logger.debug("nfvo.create_or_use_flavor() adding flavor to VIM %s", vim["name"])
         try:
-            flavor_vim_id = None
-            flavor_vim_id=vim.get_flavor_id_from_data(flavor_dict)
-            flavor_create="false"
+            flavor_vim_id = vim.get_flavor_id_from_data(flavor_dict)
+            if flavor_vim_id:
+                return flavor_vim_id, "false"
         except vimconn.vimconnException as e:
             pass
-        try:
-            if not flavor_vim_id:
-                flavor_vim_id = vim.new_flavor(flavor_dict)
-                rollback_list.append({"where":"vim", "vim_id": vim_id, "what":"flavor","uuid":flavor_vim_id})
-                flavor_created="true"
-        except vimconn.vimconnException as e:
-            if return_on_error:
-                logger.error("Error creating flavor at VIM %s: %s.", vim["name"], str(e))
-                raise
-            logger.warn("Error creating flavor at VIM %s: %s.", vim["name"], str(e))
+        return vim.new_flavor(deepcopy(flavor_dict)), "true"
+
+    flavor_vim_id=None
+    failed = []
+    def delete_late_flavor(vim_id, vim, result):
+        flavor_vim_id, flavor_created = result
+        if flavor_created == "true":
+            logger.warn("Deleting flavor %s created at VIM '%s' after the timeout", flavor_vim_id, vim["name"])
+            vim.delete_flavor(flavor_vim_id)
+
+    for vim_id, vim, result, error in _run_at_vims(vims, flavor_at_vim, delete_late_flavor):
+        if error:
             flavor_vim_id = None
+            failed.append((vim, error))
             continue
         #if reach here the flavor has been create or exist
-        if len(flavor_db)==0:
+        flavor_vim_id, flavor_created = result
+        if flavor_created == "true":
+            rollback_list.append({"where":"vim", "vim_id": vim_id, "what":"flavor","uuid":flavor_vim_id})
+        datacenter_vim_id = vim["config"]["datacenter_tenant_id"]
+        flavor_db = flavors_db.get(datacenter_vim_id)
+        if not flavor_db:
             #add new vim_id at datacenters_flavors
             extended_devices_yaml = None
             if len(disk_list) > 0:
@@ -830,10 +1104,11 @@ def create_or_use_flavor(mydb, vims, flavor_dict, rollback_list, only_create_at_
             mydb.new_row('datacenters_flavors',
                         {'datacenter_vim_id': datacenter_vim_id, 'flavor_id': flavor_mano_id, 'vim_id': flavor_vim_id,
                         'created': flavor_created, 'extended': extended_devices_yaml})
-        elif flavor_db[0]["vim_id"]!=flavor_vim_id:
+        elif flavor_db["vim_id"]!=flavor_vim_id:
             #modify existing vim_id at datacenters_flavors
             mydb.update_rows('datacenters_flavors', UPDATE={'vim_id':flavor_vim_id},
                              WHERE={'datacenter_vim_id': datacenter_vim_id, 'flavor_id': flavor_mano_id})
+    _raise_vim_errors(failed, "flavor", return_on_error)
 
     return flavor_vim_id if only_create_at_vim else flavor_mano_id
 
@@ -877,6 +1152,20 @@ def _lookfor_or_create_image(db_image, mydb, descriptor):
         db_image["uuid"] = image_uuid
         return None
 
+def _parse_vnfd_catalog(vnf_descriptor):
+    """Load a vnfd catalog with pyangbind, returning the list of vnfd as plain dicts"""
+    myvnfd = vnfd_catalog.vnfd()
+    pybindJSONDecoder.load_ietf_json(vnf_descriptor, None, None, obj=myvnfd, path_helper=True)
+    return [plain(vnfd_yang.get()) for vnfd_yang in myvnfd.vnfd_catalog.vnfd.itervalues()]
+
+
+def _parse_nsd_catalog(nsd_descriptor):
+    """Load a nsd catalog with pyangbind, returning the list of nsd as plain dicts"""
+    mynsd = nsd_catalog.nsd()
+    pybindJSONDecoder.load_ietf_json(nsd_descriptor, None, None, obj=mynsd)
+    return [plain(nsd_yang.get()) for nsd_yang in mynsd.nsd_catalog.nsd.itervalues()]
+
+
 def new_vnfd_v3(mydb, tenant_id, vnf_descriptor):
     """
     Parses an OSM IM vnfd_catalog and insert at DB
@@ -886,9 +1175,8 @@ def new_vnfd_v3(mydb, tenant_id, vnf_descriptor):
     :return: The list of cretated vnf ids
     """
     try:
-        myvnfd = vnfd_catalog.vnfd()
         try:
-            pybindJSONDecoder.load_ietf_json(vnf_descriptor, None, None, obj=myvnfd, path_helper=True)
+            vnfds = descriptor_cache.get("vnfd", vnf_descriptor, _parse_vnfd_catalog)
         except Exception as e:
             raise NfvoException("Error. Invalid VNF descriptor format " + str(e), httperrors.Bad_Request)
         db_vnfs = []
@@ -908,8 +1196,7 @@ def new_vnfd_v3(mydb, tenant_id, vnf_descriptor):
         vnfd_descriptor_list = vnfd_catalog_descriptor.get("vnfd")
         if not vnfd_descriptor_list:
             vnfd_descriptor_list = vnfd_catalog_descriptor.get("vnfd:vnfd")
-        for vnfd_yang in myvnfd.vnfd_catalog.vnfd.itervalues():
-            vnfd = vnfd_yang.get()
+        for vnfd in vnfds:
 
             # table vnf
             vnf_uuid = str(uuid4())
@@ -2263,9 +2550,8 @@ def new_nsd_v3(mydb, tenant_id, nsd_descriptor):
     :return: The list of created NSD ids
     """
     try:
-        mynsd = nsd_catalog.nsd()
         try:
-            pybindJSONDecoder.load_ietf_json(nsd_descriptor, None, None, obj=mynsd)
+            nsds = descriptor_cache.get("nsd", nsd_descriptor, _parse_nsd_catalog)
         except Exception as e:
             raise NfvoException("Error. Invalid NS descriptor format: " + str(e), httperrors.Bad_Request)
         db_scenarios = []
@@ -2281,8 +2567,7 @@ def new_nsd_v3(mydb, tenant_id, nsd_descriptor):
         db_ip_profiles_index = 0
         uuid_list = []
         nsd_uuid_list = []
-        for nsd_yang in mynsd.nsd_catalog.nsd.itervalues():
-            nsd = nsd_yang.get()
+        for nsd in nsds:
 
             # table scenarios
             scenario_uuid = str(uuid4())
@@ -2910,6 +3195,8 @@ def get_vim_thread(mydb, tenant_id, datacenter_id_name=None, datacenter_tenant_i
         if datacenter_tenant_id:
             thread_id = datacenter_tenant_id
             thread = vim_threads["running"].get(datacenter_tenant_id)
+            if not thread:
+                _check_vim_threads_started([thread_id])
         else:
             where_={"td.nfvo_tenant_id": tenant_id}
             if datacenter_id_name:
@@ -2931,6 +3218,8 @@ def get_vim_thread(mydb, tenant_id, datacenter_id_name=None, datacenter_tenant_i
             elif datacenters:
                 thread_id = datacenters[0]["datacenter_tenant_id"]
                 thread = vim_threads["running"].get(thread_id)
+                if not thread:
+                    _check_vim_threads_started([thread_id])
         if not thread:
             raise NfvoException("datacenter '{}' not found".format(str(datacenter_id_name)), httperrors.Not_Found)
         return thread_id, thread
@@ -3969,6 +4258,10 @@ def delete_instance(mydb, tenant_id, instance_id):
     instanceDict = mydb.get_instance_scenario(instance_id, tenant_id)
     # print yaml.safe_dump(instanceDict, indent=4, default_flow_style=False)
     tenant_id = instanceDict["tenant_id"]
+    # before deleting anything, as the tasks could not be sent to the VIM threads
+    _check_vim_threads_started({item["datacenter_tenant_id"]
+                                for key in ("sfps", "classifications", "sfs", "sfis", "vnfs", "nets")
+                                for item in instanceDict.get(key, ())})
 
     # --> WIM
     # We need to retrieve the WIM Actions now, before the instance_scenario is
@@ -4666,6 +4959,7 @@ def instance_action(mydb,nfvo_tenant,instance_id, action_dict):
     input_vnfs = action_dict.pop("vnfs", [])
     input_vms = action_dict.pop("vms", [])
     action_over_all = True if not input_vnfs and not input_vms else False
+    vms_to_refresh = {}  # datacenter_tenant_id: VMs whose status is changed by the action
     for sce_vnf in instanceDict['vnfs']:
         for vm in sce_vnf['vms']:
             if not action_over_all and sce_vnf['uuid'] not in input_vnfs and sce_vnf['vnf_name'] not in input_vnfs and \
@@ -4736,10 +5030,20 @@ def instance_action(mydb,nfvo_tenant,instance_id, action_dict):
                     else:
                         vm_result[ vm['uuid'] ] = {"vim_result": 200, "description": "ok", "name":vm['name']}
                         vm_ok +=1
+                        vms_to_refresh.setdefault(sce_vnf["datacenter_tenant_id"], []).append(vm['uuid'])
             except vimconn.vimconnException as e:
                 vm_result[ vm['uuid'] ] = {"vim_result": e.http_code, "name":vm['name'], "description": str(e)}
                 vm_error+=1
 
+    # do not wait for the adaptive refresh interval of the vim_threads to show the new status
+    for datacenter_tenant_id, vm_uuids in vms_to_refresh.items():
+        thread = vim_threads["running"].get(datacenter_tenant_id)
+        if thread:
+            try:
+                thread.insert_task(("refresh", vm_uuids))
+            except Exception as e:
+                logger.warning("Cannot request the refresh of VMs {}: {}".format(vm_uuids, e))
+
     if vm_ok==0: #all goes wrong
         return vm_result
     else:
@@ -4814,6 +5118,7 @@ def delete_tenant(mydb, tenant):
 
     tenant_dict = mydb.get_table_by_uuid_name('nfvo_tenants', tenant, 'tenant')
     mydb.delete_row_by_id("nfvo_tenants", tenant_dict['uuid'])
+    invalidate_wim_cache('datacenters')  # its tenants_datacenters are deleted with it
     return tenant_dict['uuid'] + " " + tenant_dict["name"]
 
 
@@ -4828,7 +5133,7 @@ def new_datacenter(mydb, datacenter_descriptor):
     # module_info = None
     try:
         module = "vimconn_" + datacenter_type
-        pkg = __import__("osm_ro." + module)
+        vim_thread.get_vim_module(datacenter_type)
         # vim_conn = getattr(pkg, module)
         # module_info = imp.find_module(module, [__file__[:__file__.rfind("/")]])
     except (IOError, ImportError):
@@ -4839,11 +5144,13 @@ def new_datacenter(mydb, datacenter_descriptor):
                             httperrors.Bad_Request)
 
     datacenter_id = mydb.new_row("datacenters", datacenter_descriptor, add_uuid=True, confidential_data=True)
+    invalidate_wim_cache('datacenters')
     if sdn_port_mapping:
         try:
             datacenter_sdn_port_mapping_set(mydb, None, datacenter_id, sdn_port_mapping)
         except Exception as e:
             mydb.delete_row_by_id("datacenters", datacenter_id)   # Rollback
+            invalidate_wim_cache('datacenters')
             raise e
     return datacenter_id
 
@@ -4893,6 +5200,7 @@ def edit_datacenter(mydb, datacenter_id_name, datacenter_descriptor):
                 raise NfvoException("Error deleting datacenter-port-mapping " + str(e), httperrors.Conflict)
 
     mydb.update_rows('datacenters', datacenter_descriptor, where)
+    invalidate_wim_cache('datacenters')
     if new_sdn_port_mapping:
         try:
             datacenter_sdn_port_mapping_set(mydb, None, datacenter_id, new_sdn_port_mapping)
@@ -4907,6 +5215,7 @@ def delete_datacenter(mydb, datacenter):
     #get nfvo_tenant info
     datacenter_dict = mydb.get_table_by_uuid_name('datacenters', datacenter, 'datacenter')
     mydb.delete_row_by_id("datacenters", datacenter_dict['uuid'])
+    invalidate_wim_cache('datacenters')
     try:
         datacenter_sdn_port_mapping_delete(mydb, None, datacenter_dict['uuid'])
     except ovimException as e:
@@ -4985,14 +5294,12 @@ def create_vim_account(mydb, nfvo_tenant, datacenter_id, name=None, vim_id=None,
         datacenter_tenant_id = datacenter_tenants_dict["uuid"]
         tenants_datacenter_dict["datacenter_tenant_id"] = datacenter_tenant_id
         mydb.new_row('tenants_datacenters', tenants_datacenter_dict)
+        invalidate_wim_cache('datacenters')
 
         # create thread
         thread_name = get_non_used_vim_name(datacenter_name, datacenter_id, tenant_dict['name'], tenant_dict['uuid'])
-        new_thread = vim_thread.vim_thread(task_lock, thread_name, datacenter_name, datacenter_tenant_id,
-                                           db=db, db_lock=db_lock, ovim=ovim)
-        new_thread.start()
         thread_id = datacenter_tenants_dict["uuid"]
-        vim_threads["running"][thread_id] = new_thread
+        vim_threads["running"][thread_id] = _start_vim_thread(thread_name, datacenter_name, datacenter_tenant_id)
         return thread_id
     except vimconn.vimconnException as e:
         raise NfvoException(str(e), httperrors.Bad_Request)
@@ -5033,6 +5340,7 @@ def edit_vim_account(mydb, nfvo_tenant, datacenter_tenant_id, datacenter_id=None
         update_['passwd'] = vim_password
     if update_:
         mydb.update_rows("datacenter_tenants", UPDATE=update_, WHERE={"uuid": datacenter_tenant_id})
+        invalidate_wim_cache('datacenters')
 
     vim_threads["running"][datacenter_tenant_id].insert_task("reload")
     return datacenter_tenant_id
@@ -5060,6 +5368,7 @@ def delete_vim_account(mydb, tenant_id, vim_account_id, datacenter=None):
 
     #delete this association
     mydb.delete_row(FROM='tenants_datacenters', WHERE=tenants_datacenter_dict)
+    invalidate_wim_cache('datacenters')
 
     #get vim_tenant info and deletes
     warning=''
@@ -49,7 +49,7 @@ tables_with_createdat_field=["datacenters","instance_nets","instance_scenarios",
                            "sce_classifiers", "sce_classifier_matches", "instance_sfis", "instance_sfs",
                            "instance_classifications", "instance_sfps", "wims", "wim_accounts", "wim_nfvo_tenants",
                            "wim_port_mappings", "vim_wim_actions",
-                           "instance_wim_nets"]
+                           "instance_wim_nets", "account_leases"]
 
 
 class nfvo_db(db_base.db_base):
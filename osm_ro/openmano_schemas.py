@@ -128,6 +128,14 @@ config_schema = {
         "log_socket_host": nameshort_schema,
         "log_socket_port": port_schema,
         "log_file": path_schema,
+        "vim_workers": integer0_schema,
+        "lease_time": integer0_schema,
+        "replica_id": nameshort_schema,
+        "vim_token_cache_file": path_schema,
+        "vim_refresh_build": integer1_schema,
+        "vim_refresh_active": integer1_schema,
+        "vim_refresh_active_max": integer1_schema,
+        "vim_refresh_backoff": {"type": "number", "minimum": 1},
     },
     "required": ['db_user', 'db_passwd', 'db_name'],
     "additionalProperties": False
@@ -79,6 +79,14 @@ class openmanoclient():
         self.logger = logging.getLogger(kwargs.get('logger','manoclient'))
         if kwargs.get("debug"):
             self.logger.setLevel(logging.DEBUG)
+        # keep connections alive among calls. A shared session can be provided by the caller
+        self.session = kwargs.get("session")
+        if not self.session:
+            self.session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=kwargs.get("pool_maxsize", 10),
+                                                    max_retries=kwargs.get("max_retries", 3))
+            self.session.mount("http://", adapter)
+            self.session.mount("https://", adapter)
         
     def __getitem__(self, index):
         if index=='tenant_name':
@@ -165,7 +173,7 @@ class openmanoclient():
             tenant_text = "/any"
         URLrequest = "{}{}/{}".format(self.endpoint_url, tenant_text, item)
         self.logger.debug("GET %s", URLrequest )
-        mano_response = requests.get(URLrequest, headers=self.headers_req)
+        mano_response = self.session.get(URLrequest, headers=self.headers_req)
         self.logger.debug("openmano response: %s", mano_response.text )
         content = self._parse_yaml(mano_response.text, response=True)
         #print content
@@ -202,7 +210,7 @@ class openmanoclient():
         
         URLrequest = "{}{}/{}/{}".format(self.endpoint_url, tenant_text, item, uuid)
         self.logger.debug("GET %s", URLrequest )
-        mano_response = requests.get(URLrequest, headers=self.headers_req)
+        mano_response = self.session.get(URLrequest, headers=self.headers_req)
         self.logger.debug("openmano response: %s", mano_response.text )
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -241,7 +249,7 @@ class openmanoclient():
         URLrequest = "{}{apiver}{tenant}/{item}".format(self.endpoint_url, apiver=api_version_text, tenant=tenant_text,
                                                         item=item)
         self.logger.debug("openmano POST %s %s", URLrequest, payload_req)
-        mano_response = requests.post(URLrequest, headers=self.headers_req, data=payload_req)
+        mano_response = self.session.post(URLrequest, headers=self.headers_req, data=payload_req)
         self.logger.debug("openmano response: %s", mano_response.text)
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -263,7 +271,7 @@ class openmanoclient():
         
         URLrequest = "{}{}/{}/{}".format(self.endpoint_url, tenant_text, item, uuid)
         self.logger.debug("DELETE %s", URLrequest )
-        mano_response = requests.delete(URLrequest, headers = self.headers_req)
+        mano_response = self.session.delete(URLrequest, headers = self.headers_req)
         self.logger.debug("openmano response: %s", mano_response.text )
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -287,7 +295,7 @@ class openmanoclient():
                 URLrequest += separator + quote(str(k)) + "=" + quote(str(filter_dict[k])) 
                 separator = "&"
         self.logger.debug("openmano GET %s", URLrequest)
-        mano_response = requests.get(URLrequest, headers=self.headers_req)
+        mano_response = self.session.get(URLrequest, headers=self.headers_req)
         self.logger.debug("openmano response: %s", mano_response.text )
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -314,7 +322,7 @@ class openmanoclient():
             
         URLrequest = "{}{}/{}/{}".format(self.endpoint_url, tenant_text, item, uuid)
         self.logger.debug("openmano PUT %s %s", URLrequest, payload_req)
-        mano_response = requests.put(URLrequest, headers = self.headers_req, data=payload_req)
+        mano_response = self.session.put(URLrequest, headers = self.headers_req, data=payload_req)
         self.logger.debug("openmano response: %s", mano_response.text )
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -542,7 +550,7 @@ class openmanoclient():
         #print payload_req
         URLrequest = "{}{}/datacenters/{}".format(self.endpoint_url, tenant_text, uuid)
         self.logger.debug("openmano POST %s %s", URLrequest, payload_req)
-        mano_response = requests.post(URLrequest, headers = self.headers_req, data=payload_req)
+        mano_response = self.session.post(URLrequest, headers = self.headers_req, data=payload_req)
         self.logger.debug("openmano response: %s", mano_response.text )
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -558,7 +566,7 @@ class openmanoclient():
         tenant_text = "/"+self._get_tenant()
         URLrequest = "{}{}/datacenters/{}".format(self.endpoint_url, tenant_text, uuid)
         self.logger.debug("openmano DELETE %s", URLrequest)
-        mano_response = requests.delete(URLrequest, headers = self.headers_req)
+        mano_response = self.session.delete(URLrequest, headers = self.headers_req)
         self.logger.debug("openmano response: %s", mano_response.text )
     
         content = self._parse_yaml(mano_response.text, response=True)
@@ -703,7 +711,7 @@ class openmanoclient():
         # print payload_req
         URLrequest = "{}{}/wims/{}".format(self.endpoint_url, tenant_text, uuid)
         self.logger.debug("openmano POST %s %s", URLrequest, payload_req)
-        mano_response = requests.post(URLrequest, headers=self.headers_req, data=payload_req)
+        mano_response = self.session.post(URLrequest, headers=self.headers_req, data=payload_req)
         self.logger.debug("openmano response: %s", mano_response.text)
 
         content = self._parse_yaml(mano_response.text, response=True)
@@ -719,7 +727,7 @@ class openmanoclient():
         tenant_text = "/" + self._get_tenant()
         URLrequest = "{}{}/wims/{}".format(self.endpoint_url, tenant_text, uuid)
         self.logger.debug("openmano DELETE %s", URLrequest)
-        mano_response = requests.delete(URLrequest, headers=self.headers_req)
+        mano_response = self.session.delete(URLrequest, headers=self.headers_req)
         self.logger.debug("openmano response: %s", mano_response.text)
 
         content = self._parse_yaml(mano_response.text, response=True)
@@ -1163,7 +1171,7 @@ class openmanoclient():
         if action=="list":
             URLrequest = "{}{}/vim/{}/{}".format(self.endpoint_url, tenant_text, datacenter, item)
             self.logger.debug("GET %s", URLrequest )
-            mano_response = requests.get(URLrequest, headers=self.headers_req)
+            mano_response = self.session.get(URLrequest, headers=self.headers_req)
             self.logger.debug("openmano response: %s", mano_response.text )
             content = self._parse_yaml(mano_response.text, response=True)            
             if mano_response.status_code==200:
@@ -1173,7 +1181,7 @@ class openmanoclient():
         elif action=="get" or action=="show":
             URLrequest = "{}{}/vim/{}/{}/{}".format(self.endpoint_url, tenant_text, datacenter, item, uuid)
             self.logger.debug("GET %s", URLrequest )
-            mano_response = requests.get(URLrequest, headers=self.headers_req)
+            mano_response = self.session.get(URLrequest, headers=self.headers_req)
             self.logger.debug("openmano response: %s", mano_response.text )
             content = self._parse_yaml(mano_response.text, response=True)            
             if mano_response.status_code==200:
@@ -1183,7 +1191,7 @@ class openmanoclient():
         elif action=="delete":
             URLrequest = "{}{}/vim/{}/{}/{}".format(self.endpoint_url, tenant_text, datacenter, item, uuid)
             self.logger.debug("DELETE %s", URLrequest )
-            mano_response = requests.delete(URLrequest, headers=self.headers_req)
+            mano_response = self.session.delete(URLrequest, headers=self.headers_req)
             self.logger.debug("openmano response: %s", mano_response.text )
             content = self._parse_yaml(mano_response.text, response=True)            
             if mano_response.status_code==200:
@@ -1211,7 +1219,7 @@ class openmanoclient():
             #print payload_req
             URLrequest = "{}{}/vim/{}/{}".format(self.endpoint_url, tenant_text, datacenter, item)
             self.logger.debug("openmano POST %s %s", URLrequest, payload_req)
-            mano_response = requests.post(URLrequest, headers = self.headers_req, data=payload_req)
+            mano_response = self.session.post(URLrequest, headers = self.headers_req, data=payload_req)
             self.logger.debug("openmano response: %s", mano_response.text )
             content = self._parse_yaml(mano_response.text, response=True)
             if mano_response.status_code==200:
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import threading
+import unittest
+from time import time
+
+import mock
+
+from ..circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN, get_metrics
+
+try:
+    from .. import vim_thread, vimconn
+except ImportError:
+    vim_thread = None
+
+
+class Unreachable(Exception):
+    pass
+
+
+def is_unreachable(exception):
+    return isinstance(exception, Unreachable)
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker('test', is_unreachable, failure_threshold=3, reset_timeout=5,
+                                      max_reset_timeout=15)
+
+    def fail(self):
+        with self.assertRaises(Unreachable):
+            self.breaker.call(mock.Mock(side_effect=Unreachable("timeout")))
+
+    def test_opens_after_consecutive_failures(self):
+        self.fail()
+        self.fail()
+        # other errors mean that the VIM is reachable
+        with self.assertRaises(ValueError):
+            self.breaker.call(mock.Mock(side_effect=ValueError))
+        self.fail()
+        self.fail()
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail()
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow())
+        metrics = get_metrics()['test']
+        self.assertEqual((metrics['opened'], metrics['rejected'], metrics['last_error']), (1, 1, 'timeout'))
+
+    def test_exponential_backoff(self):
+        for _ in range(3):
+            self.fail()
+        now = time()
+        for open_timeout in (5, 10, 15, 15):
+            self.assertFalse(self.breaker.allow(now + open_timeout - 1))
+            # after the timeout a trial is allowed
+            self.assertTrue(self.breaker.allow(now + open_timeout + 1))
+            self.assertEqual(self.breaker.state, HALF_OPEN)
+            # a failed trial opens it again for longer
+            self.breaker.record_failure(Unreachable(), now=now)
+            self.assertEqual(self.breaker.state, OPEN)
+        self.breaker.allow(now + 16)
+        self.breaker.call(mock.Mock())
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.open_timeout, 5)
+
+    def test_guarded_connector(self):
+        connector = mock.Mock(config={'datacenter_id': 'dc'})
+        connector.__getitem__ = mock.Mock(return_value='item')
+        connector.refresh_vms_status.side_effect = Unreachable
+        guarded = self.breaker.guard(connector)
+        self.assertEqual(guarded.config['datacenter_id'], 'dc')
+        self.assertEqual(guarded['config'], 'item')
+        for _ in range(3):
+            with self.assertRaises(Unreachable):
+                guarded.refresh_vms_status(['vm'])
+        self.assertEqual(self.breaker.state, OPEN)
+
+
+@unittest.skipUnless(vim_thread, "cannot import vim_thread")
+class TestVimThreadBreaker(unittest.TestCase):
+    def setUp(self):
+        self.db = mock.Mock()
+        self.thread = vim_thread.vim_thread(threading.Lock(), 'test-vim', 'dc', 'dt', db=self.db,
+                                            db_lock=threading.Lock())
+        self.thread.vim = self.thread.breaker.guard(mock.Mock())
+        self.tasks = [{"instance_action_id": "action", "task_index": index, "item": "instance_vms",
+                       "item_id": "vm{}".format(index), "action": "CREATE", "status": "SCHEDULED", "extra": {},
+                       "params": None, "depends": {}, "vim_id": None, "error_msg": None}
+                      for index in range(3)]
+        self.thread.pending_tasks = list(self.tasks)
+        for _ in range(self.thread.breaker.failure_threshold):
+            self.thread.breaker.record_failure(vimconn.vimconnConnectionException("timeout"))
+
+    def test_tasks_are_deferred_while_vim_unreachable(self):
+        self.assertEqual(self.thread._proccess_pending_tasks(), 0)
+        self.assertEqual(self.thread._refres_elements(), 0)
+        self.assertEqual(self.thread.pending_tasks, self.tasks)
+        self.db.update_rows.assert_not_called()
+        self.assertFalse(self.thread.vim.connector.method_calls)
+
+    def test_tasks_fail_fast_after_defer_timeout(self):
+        self.tasks[0]["deferred_at"] = time() - self.thread.DEFER_TIMEOUT - 1
+        self.assertEqual(self.thread._proccess_pending_tasks(), 1)
+        self.assertEqual(self.thread.pending_tasks, self.tasks[1:])
+        self.assertEqual(self.tasks[0]["status"], "FAILED")
+        self.db.update_rows.assert_any_call(table="instance_vms", WHERE={"uuid": "vm0"},
+                                            UPDATE={"status": "VIM_ERROR", "error_msg": "VIM unreachable: timeout"})
+        self.assertFalse(self.thread.vim.connector.method_calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import cPickle
+import unittest
+from collections import OrderedDict
+from copy import deepcopy
+
+import mock
+
+from ..descriptor_cache import DescriptorCache, plain
+
+try:
+    import osm_im.vnfd as vnfd_catalog
+    from pyangbind.lib.serialise import pybindJSONDecoder
+except ImportError:
+    vnfd_catalog = None
+
+
+def _big_vnfd(vdus=50, interfaces=4):
+    """vnfd catalog with several VDUs, each one with several interfaces"""
+    vnfd = {"id": "big_vnf", "name": "big_vnf", "short-name": "big_vnf", "vendor": "ROtest", "version": "1.0",
+            "description": "VNF with {} VDUs".format(vdus), "mgmt-interface": {"cp": "eth0-0"},
+            "connection-point": [], "vdu": []}
+    for vdu_index in range(vdus):
+        vdu = {"id": "VM{}".format(vdu_index), "name": "VM{}".format(vdu_index), "image": "US1604",
+               "vm-flavor": {"memory-mb": "2048", "storage-gb": "8", "vcpu-count": "1"}, "interface": []}
+        for iface_index in range(interfaces):
+            cp = "eth{}-{}".format(vdu_index, iface_index)
+            vnfd["connection-point"].append({"name": cp, "type": "VPORT"})
+            vdu["interface"].append({"name": "iface{}".format(iface_index), "type": "EXTERNAL",
+                                     "virtual-interface": {"type": "VIRTIO"}, "external-connection-point-ref": cp})
+        vnfd["vdu"].append(vdu)
+    return {"vnfd-catalog": {"vnfd": [vnfd]}}
+
+
+def _parse_vnfd_catalog(vnf_descriptor):
+    """As done by nfvo.new_vnfd_v3"""
+    myvnfd = vnfd_catalog.vnfd()
+    pybindJSONDecoder.load_ietf_json(vnf_descriptor, None, None, obj=myvnfd, path_helper=True)
+    return [plain(vnfd_yang.get()) for vnfd_yang in myvnfd.vnfd_catalog.vnfd.itervalues()]
+
+
+class TestDescriptorCache(unittest.TestCase):
+    def setUp(self):
+        self.parsed = []
+
+    def parse(self, descriptor):
+        self.parsed.append(descriptor)
+        if descriptor.get("invalid"):
+            raise ValueError("invalid descriptor")
+        return [dict(descriptor, parsed=True)]
+
+    def test_known_descriptors_are_not_parsed_again(self):
+        cache = DescriptorCache()
+        descriptor = _big_vnfd(vdus=2)
+        first = cache.get("vnfd", descriptor, self.parse)
+        # the same content, although being other object, should be found at the cache
+        second = cache.get("vnfd", deepcopy(descriptor), self.parse)
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.parsed), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        # the same content as other kind of descriptor should be parsed
+        cache.get("nsd", descriptor, self.parse)
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_entries_are_copied(self):
+        cache = DescriptorCache()
+        cache.get("vnfd", {"id": "a"}, self.parse)[0]["id"] = "modified"
+        self.assertEqual(cache.get("vnfd", {"id": "a"}, self.parse)[0]["id"], "a")
+
+    def test_invalid_descriptors_are_not_cached(self):
+        cache = DescriptorCache()
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.get("vnfd", {"invalid": True}, self.parse)
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_least_recently_used_are_discarded(self):
+        cache = DescriptorCache(maxsize=2)
+        cache.get("vnfd", {"id": "a"}, self.parse)
+        cache.get("vnfd", {"id": "b"}, self.parse)
+        cache.get("vnfd", {"id": "a"}, self.parse)
+        cache.get("vnfd", {"id": "c"}, self.parse)  # discards b
+        cache.get("vnfd", {"id": "a"}, self.parse)
+        self.assertEqual(len(self.parsed), 3)
+        cache.get("vnfd", {"id": "b"}, self.parse)
+        self.assertEqual(len(self.parsed), 4)
+
+
+class YangLeaf(unicode):
+    """As the pyangbind leaves, that keep a reference to their parent"""
+    _parent = None
+
+
+class TestPlain(unittest.TestCase):
+    def test_plain(self):
+        # Given the output of the get method of pyangbind, whose leaves are pyangbind objects
+        vdus = OrderedDict((name, {"id": YangLeaf(name), "count": 1}) for name in ("z", "a", "m"))
+        parsed = {"id": YangLeaf("vnf"), "vdu": vdus, "tags": [YangLeaf("tag")]}
+        # When it is converted to plain data, by the JSON encoder of pyangbind
+        encoder = mock.Mock(**{"default.side_effect": unicode})
+        with mock.patch("osm_ro.descriptor_cache.json_encoder", encoder):
+            result = plain(parsed)
+        # Then no pyangbind object is left, and the order of the YANG lists is kept
+        self.assertEqual(result, parsed)
+        self.assertEqual(encoder.default.call_count, 5)
+        self.assertIs(type(result["vdu"]["a"]["id"]), unicode)
+        self.assertEqual(list(result["vdu"]), ["z", "a", "m"])
+        self.assertEqual(cPickle.loads(cPickle.dumps(result)), result)
+
+
+@unittest.skipUnless(vnfd_catalog, "osm_im is not installed")
+class TestDescriptorCacheOsmIm(unittest.TestCase):
+    ROUNDS = 10
+
+    def test_onboarding_big_vnfd(self):
+        # Given a big VNFD, onboarded several times
+        descriptor = _big_vnfd()
+        expected = _parse_vnfd_catalog(descriptor)
+        cache = DescriptorCache()
+        parse = mock.Mock(side_effect=_parse_vnfd_catalog)
+        results = [cache.get("vnfd", descriptor, parse) for _ in range(self.ROUNDS)]
+        # Then it should be parsed by pyangbind just once
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual((cache.hits, cache.misses), (self.ROUNDS - 1, 1))
+        # and every onboarding should get its own copy of the same result
+        results[0][0]["vdu"]["VM0"]["name"] = "modified"
+        self.assertEqual(results[1:], [expected] * (self.ROUNDS - 1))
+        self.assertIsNot(results[1][0]["vdu"], results[2][0]["vdu"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import mock
+from keystoneauth1 import access
+from keystoneauth1 import exceptions as ksExceptions
+from keystoneauth1.identity import v3
+
+from ..keystone_cache import TokenCache, EXPIRATION_MARGIN, token_cache
+from ..vimconn import vimconnException
+from ..vimconn_openstack import vimconnector
+
+
+def _auth_ref(*args, **kwargs):
+    """Token returned by the fake keystone, valid for an hour"""
+    expires_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + 3600))
+    body = {'token': {'methods': ['password'], 'expires_at': expires_at, 'catalog': [],
+                      'user': {'id': 'u0', 'name': 'user', 'domain': {'id': 'default', 'name': 'Default'}},
+                      'project': {'id': 'c6a1b3bd3e6a4c5c8f53a2b6c0b7e1a9', 'name': 'tenant',
+                                  'domain': {'id': 'default', 'name': 'Default'}}}}
+    return access.create(body=body, auth_token='token-{}'.format(time.time()))
+
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'tokens.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_entries_expire(self):
+        cache = TokenCache()
+        now = time.time()
+        cache.set('k', 'state', now + 3600)
+        self.assertEqual(cache.get('k', now)['auth_state'], 'state')
+        # tokens about to expire are not reused
+        self.assertIsNone(cache.get('k', now + 3600 - EXPIRATION_MARGIN))
+        self.assertIsNone(cache.get('other', now))
+
+    def test_entries_are_persisted(self):
+        # Given an entry stored by a RO
+        TokenCache(self.path).set('k', 'state', time.time() + 3600, glance_endpoint='http://glance')
+        # then other process, or the RO after a restart, should get it
+        entry = TokenCache(self.path).get('k')
+        self.assertEqual(entry['auth_state'], 'state')
+        self.assertEqual(entry['glance_endpoint'], 'http://glance')
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_invalid_file_is_ignored(self):
+        with open(self.path, 'w') as f:
+            f.write('{not json')
+        cache = TokenCache(self.path)
+        self.assertIsNone(cache.get('k'))
+        cache.set('k', 'state', time.time() + 3600)
+        self.assertEqual(TokenCache(self.path).get('k')['auth_state'], 'state')
+
+
+class TestConnectorsShareTokens(unittest.TestCase):
+    def setUp(self):
+        token_cache.clear()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def _connector(self, user='user', region=None):
+        config = {'availability_zone': 'nova', 'region_name': region}
+        return vimconnector('123', 'openstackvim', '456', 'tenant', 'http://dummy.url/v3', None, user, 'pass',
+                            config=config, persistent_info={})
+
+    @mock.patch.object(v3.Password, 'get_auth_ref', side_effect=_auth_ref)
+    def test_one_authentication_per_identity(self, get_auth_ref):
+        # Given several connectors of the same cloud and credentials
+        for _ in range(5):
+            vim = self._connector()
+            vim._reload_connection()
+            self.assertEqual(vim.my_tenant_id, 'c6a1b3bd3e6a4c5c8f53a2b6c0b7e1a9')
+        # then just one authentication should be done
+        self.assertEqual(get_auth_ref.call_count, 1)
+        # while other user or region gets its own token
+        self._connector(user='other')._reload_connection()
+        self._connector(region='RegionTwo')._reload_connection()
+        self.assertEqual(get_auth_ref.call_count, 3)
+
+    @mock.patch.object(v3.Password, 'get_auth_ref', side_effect=_auth_ref)
+    def test_token_renewed_after_rejected(self, get_auth_ref):
+        # Given a connector whose token is revoked, so keystoneauth authenticates again
+        vim = self._connector()
+        vim._reload_connection()
+        auth = vim.session['auth']
+        auth.invalidate()
+        auth.get_access(mock.Mock())
+        # then the new token should be shared at the next operation
+        vim._reload_connection()
+        self.assertEqual(token_cache.get(vim.session['token_key'])['auth_state'], auth.get_auth_state())
+        self._connector()._reload_connection()
+        self.assertEqual(get_auth_ref.call_count, 2)
+
+    @mock.patch.object(v3.Password, 'get_auth_ref', side_effect=_auth_ref)
+    def test_token_discarded_when_unauthorized(self, get_auth_ref):
+        vim = self._connector()
+        vim._reload_connection()
+        # When the VIM rejects the token even after authenticating again
+        with self.assertRaises(vimconnException):
+            vim._format_exception(ksExceptions.Unauthorized())
+        # Then it should not be reused by other connectors
+        self.assertIsNone(token_cache.get(vim.session['token_key']))
+        self._connector()._reload_connection()
+        self.assertEqual(get_auth_ref.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
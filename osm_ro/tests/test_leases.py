@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import multiprocessing
+import os
+import shutil
+import signal
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from ..db_base import db_base_Exception
+from ..http_tools import errors as httperrors
+from ..leases import LeaseKeeper, LeaseManager
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS account_leases (
+    account_type VARCHAR(16) NOT NULL,
+    account_id VARCHAR(64) NOT NULL,
+    owner VARCHAR(64) NULL DEFAULT NULL,
+    expires_at DOUBLE NOT NULL DEFAULT 0,
+    notifications INTEGER NOT NULL DEFAULT 0,
+    created_at DOUBLE NOT NULL DEFAULT 0,
+    modified_at DOUBLE NULL DEFAULT NULL,
+    PRIMARY KEY (account_type, account_id))
+"""
+
+
+class SqliteDb(object):
+    """Stand-in for the MySQL database, implementing the subset of the ``db_base`` interface used by the leases. The
+    database file can be shared among several processes"""
+
+    def __init__(self, path):
+        self.con = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.con.row_factory = sqlite3.Row
+        self.con.execute(_SCHEMA)
+
+    def _where(self, where, use_or=False):
+        cmd, params = [], []
+        for k, v in where.items():
+            if k in ("OR", "AND"):
+                sub_cmd, sub_params = self._where(v, use_or=k == "OR")
+                cmd.append("(" + sub_cmd + ")")
+                params += sub_params
+                continue
+            op = "="
+            for suffix in ("<>", ">=", "<=", ">", "<"):
+                if k.endswith(suffix):
+                    k, op = k[:-len(suffix)], suffix
+                    break
+            if v is None:
+                cmd.append(k + (" is not Null" if op == "<>" else " is Null"))
+            else:
+                cmd.append(k + op + "?")
+                params.append(v)
+        return (" OR " if use_or else " AND ").join(cmd), params
+
+    def _execute(self, cmd, params=()):
+        try:
+            with self.lock:
+                return self.con.execute(cmd, params)
+        except sqlite3.IntegrityError as e:
+            raise db_base_Exception(str(e), httperrors.Conflict)
+
+    def new_row(self, table, INSERT, **_):
+        INSERT = dict(INSERT, created_at=time.time())
+        self._execute("INSERT INTO {} ({}) VALUES ({})".format(table, ",".join(INSERT), ",".join("?" * len(INSERT))),
+                      list(INSERT.values()))
+
+    def update_rows(self, table, UPDATE, WHERE, **_):
+        values, params = [], []
+        for k, v in UPDATE.items():
+            if isinstance(v, dict):
+                values.append("{0}={0}+{1:d}".format(k, v["INCREMENT"]))
+            else:
+                values.append(k + "=?")
+                params.append(v)
+        where, where_params = self._where(WHERE)
+        return self._execute("UPDATE {} SET {} WHERE {}".format(table, ",".join(values), where),
+                             params + where_params).rowcount
+
+    def delete_row(self, FROM, WHERE):
+        where, params = self._where(WHERE)
+        return self._execute("DELETE FROM {} WHERE {}".format(FROM, where), params).rowcount
+
+    def get_rows(self, FROM, SELECT=("*",), WHERE=None):
+        cmd, params = "SELECT {} FROM {}".format(",".join(SELECT), FROM), []
+        if WHERE:
+            where, params = self._where(WHERE)
+            cmd += " WHERE " + where
+        return [dict(row) for row in self._execute(cmd, params).fetchall()]
+
+
+class _FakeThread(object):
+    def __init__(self, account_id):
+        self.account_id = account_id
+        self.tasks = []
+        self.alive = True
+
+    def insert_task(self, task):
+        self.tasks.append(task)
+        if task == 'exit':
+            self.alive = False
+
+
+class TestCaseWithSqlite(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'mano_db.sqlite')
+        self.db = SqliteDb(self.db_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+class TestLeaseManager(TestCaseWithSqlite):
+    def test_acquire_is_exclusive_until_expiration(self):
+        # Given 2 replicas
+        ro_a = LeaseManager(self.db, owner='ro-a', lease_time=10)
+        ro_b = LeaseManager(self.db, owner='ro-b', lease_time=10)
+        now = time.time()
+        # when the first one acquires the lease
+        self.assertTrue(ro_a.acquire('vim', 'dt0', now))
+        # then the other one should not get it until it expires
+        self.assertFalse(ro_b.acquire('vim', 'dt0', now + 5))
+        self.assertTrue(ro_a.acquire('vim', 'dt0', now + 5))
+        self.assertFalse(ro_b.acquire('vim', 'dt0', now + 14))
+        self.assertTrue(ro_b.acquire('vim', 'dt0', now + 16))
+
+    def test_renew_and_release(self):
+        ro_a = LeaseManager(self.db, owner='ro-a', lease_time=10)
+        ro_b = LeaseManager(self.db, owner='ro-b', lease_time=10)
+        now = time.time()
+        ro_a.acquire('vim', 'dt0', now)
+        ro_a.acquire('wim', 'wa0', now)
+        # renewed leases should not expire
+        self.assertEqual(ro_a.renew(now + 8), 2)
+        self.assertFalse(ro_b.acquire('vim', 'dt0', now + 12))
+        # released leases should be immediately available
+        ro_a.release('vim', 'dt0')
+        self.assertTrue(ro_b.acquire('vim', 'dt0', now + 12))
+        self.assertFalse(ro_b.acquire('wim', 'wa0', now + 12))
+
+    def test_notify_increments_the_counter(self):
+        ro_a = LeaseManager(self.db, owner='ro-a')
+        ro_a.acquire('vim', 'dt0')
+        ro_a.notify('vim', 'dt0')
+        ro_a.notify('vim', 'dt0')
+        self.assertEqual(ro_a.get_leases()[0]['notifications'], 2)
+
+
+class TestLeaseKeeper(TestCaseWithSqlite):
+    def _keeper(self, owner, accounts):
+        keeper = LeaseKeeper(LeaseManager(SqliteDb(self.db_path), owner=owner, lease_time=10))
+        keeper.spawned = []
+
+        def spawn(account_id):
+            thread = _FakeThread(account_id)
+            keeper.spawned.append(thread)
+            return thread
+
+        keeper.proxies = {a: keeper.add('vim', a, lambda a=a: spawn(a)) for a in accounts}
+        return keeper
+
+    @staticmethod
+    def _owned(keeper):
+        return {a for a, proxy in keeper.proxies.items() if proxy.is_alive()}
+
+    def test_accounts_are_split_among_replicas(self):
+        accounts = ['dt{}'.format(i) for i in range(20)]
+        now = time.time()
+        # Given a replica that owns all the accounts
+        ro_a = self._keeper('ro-a', accounts)
+        ro_a.heartbeat(now)
+        self.assertEqual(self._owned(ro_a), set(accounts))
+        # when a second replica joins
+        ro_b = self._keeper('ro-b', accounts)
+        for tick in range(1, 3):
+            ro_b.heartbeat(now + tick)
+            ro_a.heartbeat(now + tick)
+        ro_b.heartbeat(now + 3)
+        # then the accounts should be split, each one running at just one replica
+        owned_a, owned_b = self._owned(ro_a), self._owned(ro_b)
+        self.assertEqual(owned_a | owned_b, set(accounts))
+        self.assertFalse(owned_a & owned_b)
+        self.assertTrue(owned_a and owned_b)
+
+    def test_tasks_are_routed_to_the_owner(self):
+        # Given an account owned by ro_a
+        now = time.time()
+        ro_a = self._keeper('ro-a', ['dt0'])
+        ro_b = self._keeper('ro-b', ['dt0'])
+        ro_a.heartbeat(now)
+        self.assertTrue(ro_a.proxies['dt0'].is_alive())
+        self.assertFalse(ro_b.proxies['dt0'].is_alive())
+        # when a task is inserted at ro_b
+        ro_b.proxies['dt0'].insert_task([{'uuid': 'action'}])
+        # then ro_a should reload the thread at the next heartbeat
+        ro_a.heartbeat(now + 1)
+        self.assertEqual(ro_a.spawned[0].tasks, ['reload'])
+
+    def test_deleted_accounts_are_forgotten(self):
+        now = time.time()
+        ro_a = self._keeper('ro-a', ['dt0'])
+        ro_b = self._keeper('ro-b', ['dt0'])
+        forgotten = []
+        ro_a.register('vim', forget=forgotten.append)
+        ro_a.heartbeat(now)
+        # when the account is deleted at other replica
+        ro_b.proxies['dt0'].exit()
+        ro_a.heartbeat(now + 1)
+        # then the owner should stop its thread
+        self.assertFalse(ro_a.spawned[0].alive)
+        self.assertEqual(forgotten, ['dt0'])
+
+    def test_threads_stopped_before_the_leases_expire(self):
+        # Given a replica that owns an account, with a lease time of 10s and heartbeats every 10/3s
+        now = time.time()
+        ro_a = self._keeper('ro-a', ['dt0'])
+        ro_a.heartbeat(now)
+        # when its heartbeats fail, then its thread is stopped while the lease is still valid
+        self.assertFalse(ro_a.check_expiration(now + 4.9))
+        self.assertTrue(ro_a.check_expiration(now + 5.1))
+        self.assertFalse(ro_a.spawned[0].alive)
+        lease = [l for l in ro_a.manager.get_leases() if l['account_id'] == 'dt0'][0]
+        self.assertGreater(lease['expires_at'], now + 5.1 + ro_a.interval)
+        # and it runs again after a successful heartbeat
+        ro_a.heartbeat(now + 6)
+        self.assertTrue(ro_a.proxies['dt0'].is_alive())
+        self.assertFalse(ro_a.check_expiration(now + 6.1))
+
+    def test_late_heartbeat(self):
+        # Given a heartbeat that renews the leases, but finishes late (e.g. a slow database)
+        now = time.time()
+        ro_a = self._keeper('ro-a', ['dt0'])
+        ro_a.heartbeat(now)
+        # then the thread is stopped, as the lease could expire before the next heartbeat
+        self.assertTrue(ro_a.check_expiration(now + 8))
+        self.assertFalse(ro_a.proxies['dt0'].is_alive())
+
+
+def _run_replica(db_path, owner, accounts, lease_time, interval):
+    """Replica running in a separate process, until killed"""
+    keeper = LeaseKeeper(LeaseManager(SqliteDb(db_path), owner=owner, lease_time=lease_time), interval=interval)
+    for account in accounts:
+        keeper.add('vim', account, lambda a=account: _FakeThread(a))
+    keeper.run()
+
+
+class TestLeaseFailover(TestCaseWithSqlite):
+    LEASE_TIME = 2
+    INTERVAL = 0.2
+
+    def test_failover_within_a_lease_period(self):
+        accounts = ['dt{}'.format(i) for i in range(10)]
+        # Given a replica running in other process, that owns all the accounts
+        process = multiprocessing.Process(target=_run_replica, args=(
+            self.db_path, 'ro-a', accounts, self.LEASE_TIME, self.INTERVAL))
+        process.daemon = True
+        process.start()
+        manager = LeaseManager(self.db, owner='ro-check')
+        for _ in range(50):
+            if len([l for l in manager.get_leases() if l['owner'] == 'ro-a']) == len(accounts) + 1:
+                break
+            time.sleep(0.1)
+        else:
+            self.fail('Replica ro-a did not acquire the accounts')
+
+        # and a second replica in this process, that gets its share
+        keeper = LeaseKeeper(LeaseManager(SqliteDb(self.db_path), owner='ro-b', lease_time=self.LEASE_TIME),
+                             interval=self.INTERVAL)
+        proxies = [keeper.add('vim', a, lambda a=a: _FakeThread(a)) for a in accounts]
+        keeper.start()
+        try:
+            time.sleep(4 * self.INTERVAL)
+            owned = [p for p in proxies if p.is_alive()]
+            self.assertTrue(0 < len(owned) < len(accounts))
+
+            # when the first replica dies
+            os.kill(process.pid, signal.SIGKILL)
+            process.join()
+            killed_at = time.time()
+
+            # then the second one should own all the accounts within a lease period
+            while not all(p.is_alive() for p in proxies):
+                self.assertLess(time.time() - killed_at, self.LEASE_TIME + 2 * self.INTERVAL,
+                                'Failover took too long')
+                time.sleep(0.05)
+            self.assertEqual({l['owner'] for l in manager.get_leases() if l['account_type'] == 'vim'}, {'ro-b'})
+        finally:
+            keeper.stop()
+            keeper.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
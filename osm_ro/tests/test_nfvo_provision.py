@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import threading
+import unittest
+from collections import OrderedDict
+from time import sleep, time
+
+import mock
+
+from .. import vimconn
+
+try:
+    from .. import nfvo
+except ImportError:
+    nfvo = None
+
+
+class FakeVim(dict):
+    """Connector of a VIM without the image, that creates it after a delay"""
+
+    def __init__(self, name, delay=0, error=None, release=None):
+        dict.__init__(self, name=name, config={"datacenter_tenant_id": "dt-" + name})
+        self.delay = delay
+        self.error = error
+        self.release = release  # new_image waits for it, if given
+        self.deleted = []
+
+    def get_image_id_from_path(self, path):
+        raise vimconn.vimconnNotFoundException("Image not found at VIM")
+
+    def new_image(self, image_dict):
+        sleep(self.delay)
+        if self.release:
+            self.release.wait(5)
+        if self.error:
+            raise self.error
+        return "img-" + self["name"]
+
+    def delete_image(self, image_id):
+        self.deleted.append(image_id)
+
+
+def _vims(*vims):
+    return OrderedDict((vim["name"], vim) for vim in vims)
+
+
+@unittest.skipUnless(nfvo, "cannot import nfvo")
+class TestProvisionAtVims(unittest.TestCase):
+    def setUp(self):
+        self.db = mock.Mock()
+        self.db.get_rows.return_value = []
+        self.db.new_row.return_value = "image-mano-id"
+        self.image = {"name": "image", "location": "/images/image.qcow2", "metadata": None,
+                      "universal_name": None, "checksum": None}
+
+    def test_results_in_the_order_of_vims(self):
+        # Given VIMs that answer in reverse order
+        vims = _vims(FakeVim("a", delay=0.2), FakeVim("b", delay=0.1), FakeVim("c"))
+        # then the results are in the order of vims
+        results = nfvo._run_at_vims(vims, lambda vim_id, vim: vim.new_image({}))
+        self.assertEqual([(vim_id, result, error) for vim_id, _, result, error in results],
+                         [("a", "img-a", None), ("b", "img-b", None), ("c", "img-c", None)])
+        self.assertEqual(nfvo._run_at_vims({}, None), [])
+
+    def test_rollback_on_partial_failure(self):
+        # Given an image that can be created at some VIMs but not at others
+        error_b = vimconn.vimconnException("quota exceeded")
+        error_d = vimconn.vimconnException("bad image")
+        vims = _vims(FakeVim("a"), FakeVim("b", error=error_b), FakeVim("c", delay=0.1), FakeVim("d", error=error_d))
+        rollback_list = []
+        # When it is created and the errors are not tolerated
+        with self.assertRaises(vimconn.vimconnException) as context:
+            nfvo.create_or_use_image(self.db, vims, self.image, rollback_list, return_on_error=True)
+        # Then the error of the first failed VIM is raised
+        self.assertIs(context.exception, error_b)
+        # and all the images created, at any VIM, are at the rollback list
+        self.assertEqual(rollback_list, [{"where": "mano", "what": "image", "uuid": "image-mano-id"},
+                                         {"where": "vim", "vim_id": "a", "what": "image", "uuid": "img-a"},
+                                         {"where": "vim", "vim_id": "c", "what": "image", "uuid": "img-c"}])
+        self.assertEqual([call[0][1]["datacenter_vim_id"] for call in self.db.new_row.call_args_list[1:]],
+                         ["dt-a", "dt-c"])
+
+    def test_errors_tolerated(self):
+        vims = _vims(FakeVim("a", error=vimconn.vimconnException("quota exceeded")), FakeVim("b"))
+        rollback_list = []
+        self.assertEqual(nfvo.create_or_use_image(self.db, vims, self.image, rollback_list), "image-mano-id")
+        self.assertEqual(rollback_list[1:], [{"where": "vim", "vim_id": "b", "what": "image", "uuid": "img-b"}])
+        # but not the unexpected ones
+        vims = _vims(FakeVim("a"), FakeVim("b", error=KeyError("vim_id")))
+        with self.assertRaises(KeyError):
+            nfvo.create_or_use_image(self.db, vims, self.image, [])
+
+    @mock.patch("osm_ro.nfvo.VIM_PROVISION_TIMEOUT", 0.2)
+    def test_timeout(self):
+        # Given a VIM that does not answer in time
+        release = threading.Event()
+        slow = FakeVim("slow", release=release)
+        vims = _vims(FakeVim("a"), slow)
+        rollback_list = []
+        # Then it is reported as failed
+        with self.assertRaises(vimconn.vimconnException) as context:
+            nfvo.create_or_use_image(self.db, vims, self.image, rollback_list, return_on_error=True)
+        self.assertEqual(context.exception.http_code, vimconn.HTTP_Request_Timeout)
+        self.assertEqual([entry.get("vim_id") for entry in rollback_list], [None, "a"])
+        # and when it answers, the image it created is deleted, as it is not at the rollback list
+        release.set()
+        deadline = time() + 5
+        while not slow.deleted and time() < deadline:
+            sleep(0.01)
+        self.assertEqual(slow.deleted, ["img-slow"])
+
+    @mock.patch("osm_ro.nfvo.VIM_PROVISION_TIMEOUT", 0.3)
+    @mock.patch("osm_ro.nfvo.VIM_PROVISION_CONCURRENCY", 1)
+    def test_timeout_counted_since_the_call_starts(self):
+        # Given VIMs called one after another, that take less than the timeout each, but more all together
+        vims = _vims(FakeVim("a", delay=0.2), FakeVim("b", delay=0.2))
+        results = nfvo._run_at_vims(vims, lambda vim_id, vim: vim.new_image({}))
+        # then no one times out
+        self.assertEqual([error for _, _, _, error in results], [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+from time import sleep, time
+
+import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# run at a new interpreter, so that the modules imported by other tests are not counted
+IMPORT_SCRIPT = """
+import json, sys
+try:
+    import osm_ro.{module}
+except ImportError as e:
+    print(json.dumps({{"error": str(e)}}))
+    sys.exit()
+print(json.dumps({{"connectors": sorted(m for m in sys.modules if m.startswith("osm_ro.vimconn_"))}}))
+"""
+
+
+def _import_in_subprocess(module):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT] + sys.path))
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)], cwd=ROOT, env=env)
+    return json.loads(output.decode("utf-8").strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+    def test_connectors_are_not_imported_at_startup(self):
+        for module in ("vim_thread", "nfvo"):
+            result = _import_in_subprocess(module)
+            if "error" in result:
+                self.skipTest("Cannot import osm_ro.{}: {}".format(module, result["error"]))
+            self.assertEqual(result["connectors"], [], module)
+
+    def test_start_service(self):
+        try:
+            from osm_ro import nfvo, vim_thread
+        except ImportError as e:
+            self.skipTest("Cannot import osm_ro.nfvo: {}".format(e))
+        # Given a database with VIMs of a single type
+        vims = [{"type": "openstack", "config": None, "dt_config": None, "datacenter_id": "dc{}".format(i),
+                 "datacenter_name": "dc{}".format(i), "datacenter_tenant_id": "dt{}".format(i),
+                 "vim_tenant_name": "tenant", "vim_tenant_id": "t{}".format(i), "vim_url": "http://dummy.url/v3",
+                 "vim_url_admin": None, "user": "user", "passwd": "pass", "nfvo_tenant_id": "nt"}
+                for i in range(50)]
+        mydb = mock.Mock()
+        mydb.get_rows.return_value = vims
+        global_config = {"db_host": "localhost", "db_user": "mano", "db_passwd": "manopw", "db_name": "mano_db"}
+        vim_thread.vim_module.clear()
+
+        with mock.patch.object(nfvo, "global_config", global_config), \
+                mock.patch.object(nfvo, "nfvo_db"), mock.patch.object(nfvo, "ovim_module"), \
+                mock.patch.object(nfvo, "_ovim_configuration"), mock.patch.object(nfvo, "clean_db"), \
+                mock.patch.object(nfvo, "_start_vim_thread") as start_vim_thread:
+            nfvo.start_service(mydb, persistence=mock.Mock(), wim=mock.Mock())
+            # VIM threads are started at background
+            deadline = time() + 30
+            while not nfvo.startup_status["ready"] and not nfvo.startup_status["error"]:
+                self.assertLess(time(), deadline, "start_service did not finish")
+                sleep(0.01)
+            nfvo.vim_threads["running"].clear()
+
+        # then all the VIM threads should be started, and just the connector of that type imported
+        self.assertIsNone(nfvo.get_startup_status()["error"])
+        self.assertEqual(nfvo.get_startup_status()["vims_started"], len(vims))
+        self.assertEqual(start_vim_thread.call_count, len(vims))
+        self.assertEqual(list(vim_thread.vim_module), ["openstack"])
+
+
+class TestStartupReadiness(unittest.TestCase):
+    """Requests that need a VIM thread, received before all of them are started"""
+
+    def setUp(self):
+        try:
+            from osm_ro import nfvo
+        except ImportError as e:
+            self.skipTest("Cannot import osm_ro.nfvo: {}".format(e))
+        self.nfvo = nfvo
+        self.mydb = mock.Mock()
+        self.mydb.get_rows.return_value = [{"datacenter_tenant_id": "dt1"}]
+        self.mydb.get_instance_scenario.return_value = {
+            "tenant_id": "nt", "sfps": [], "classifications": [], "sfs": [], "sfis": [],
+            "vnfs": [{"datacenter_tenant_id": "dt1"}], "nets": [{"datacenter_tenant_id": "dt2"}]}
+        for patcher in (mock.patch.dict(nfvo.startup_status, ready=False),
+                        mock.patch.dict(nfvo.vim_threads["running"], {"dt2": mock.Mock()}, clear=True)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_vim_thread_not_started(self):
+        # Given a VIM account whose thread is not started yet
+        for kwargs in ({"datacenter_id_name": "dc1"}, {"datacenter_tenant_id": "dt1"}):
+            with self.assertRaises(self.nfvo.NfvoException) as context:
+                self.nfvo.get_vim_thread(self.mydb, "nt", **kwargs)
+            # then the client is told to try again later, rather than the VIM is not found
+            self.assertEqual(context.exception.http_code, 503)
+
+        # but once the service is ready, it is not found
+        self.nfvo.startup_status["ready"] = True
+        with self.assertRaises(self.nfvo.NfvoException) as context:
+            self.nfvo.get_vim_thread(self.mydb, "nt", "dc1")
+        self.assertEqual(context.exception.http_code, 404)
+
+    def test_vim_thread_started(self):
+        self.mydb.get_rows.return_value = [{"datacenter_tenant_id": "dt2"}]
+        self.assertEqual(self.nfvo.get_vim_thread(self.mydb, "nt", "dc2"),
+                         ("dt2", self.nfvo.vim_threads["running"]["dt2"]))
+
+    def test_delete_instance(self):
+        with self.assertRaises(self.nfvo.NfvoException) as context:
+            self.nfvo.delete_instance(self.mydb, "nt", "instance")
+        self.assertEqual(context.exception.http_code, 503)
+        self.assertIn("dt1", str(context.exception))
+        # nothing is deleted
+        self.mydb.delete_instance_scenario.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import re
+import unittest
+from xml.etree import ElementTree
+
+from .. import vcd_xml
+from . import test_vimconn_vmware_xml_response as xml_resp
+
+UPLOAD_LINKS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<VAppTemplate xmlns="http://www.vmware.com/vcloud/v1.5" ovfDescriptorUploaded="true" status="0" name="cirros">
+    <Link rel="up" href="https://localhost/api/vdc/2584137f-6541-4c04-a2a2-e56bfca14c69"/>
+    <Tasks>
+        <Task status="running" operation="Importing Virtual Machine cirros" operationName="vdcUploadOvfContents">
+            <Progress>40</Progress>
+        </Task>
+    </Tasks>
+    <Files>
+        <File size="3314" bytesTransferred="3314" name="descriptor.ovf">
+            <Link rel="upload:default" href="https://localhost/transfer/7b8c0e5e-4b52-4a6f-9ebd-a4a3fd4e4a2b/descriptor.ovf"/>
+        </File>
+        <File size="13224448" bytesTransferred="0" name="cirros-disk1.vmdk">
+            <Link rel="upload:default" href="https://localhost/transfer/7b8c0e5e-4b52-4a6f-9ebd-a4a3fd4e4a2b/cirros-disk1.vmdk"/>
+        </File>
+    </Files>
+</VAppTemplate>"""
+
+
+def _regex_vm_details(content):
+    """Previous implementation, with regular expressions and a full parse of the document"""
+    result = content.replace("\n", " ")
+    xmlroot = ElementTree.fromstring(content)
+    details = {'status': xmlroot.get('status'), 'id': xmlroot.get('id'), 'name': xmlroot.get('name')}
+    details['hdd_mb'] = int(re.search(r'vcloud:capacity="(\d+)"\svcloud:storageProfileOverrideVmDefault=',
+                                      result).group(1))
+    details['cpus'] = int(re.search(r'<rasd:Description>Number of Virtual CPUs</.*?>(\d+)</rasd:VirtualQuantity>',
+                                    result).group(1))
+    details['memory_mb'] = int(re.search(r'<rasd:Description>Memory Size</.*?>(\d+)</rasd:VirtualQuantity>',
+                                         result).group(1))
+    connections = []
+    for network in re.findall('<NetworkConnection needsCustomization=.*?</NetworkConnection>', result):
+        connections.append((re.search('network="(.*?)"', network).group(1),
+                            re.search('<MACAddress>(.*?)</MACAddress>', network).group(1),
+                            re.search('<IpAddress>(.*?)</IpAddress>', network).group(1)))
+    details['network_connections'] = connections
+    return details
+
+
+class TestVcdXml(unittest.TestCase):
+    def test_get_vm_details_of_vm(self):
+        details = vcd_xml.get_vm_details(xml_resp.vm_xml_response)
+        self.assertEqual(details['id'], 'urn:vcloud:vm:53a529b2-10d8-4d56-a7ad-8182acdbe71c')
+        self.assertEqual(details['status'], '4')
+        self.assertEqual(details['cpus'], 1)
+        self.assertEqual(details['memory_mb'], 1024)
+        self.assertEqual(details['cores_per_socket'], 1)
+        self.assertEqual(details['network_connections'][0],
+                         ('testing_6SNBKa9pz62P-63e13553-ebf9-4518-a33d-6ea922a6d2ce', '00:50:56:01:14:1a',
+                          '172.16.27.72'))
+
+    def test_get_vm_details_matches_regex_parsing(self):
+        expected = _regex_vm_details(xml_resp.vm_xml_response)
+        details = vcd_xml.get_vm_details(xml_resp.vm_xml_response)
+        for key, value in expected.items():
+            self.assertEqual(details[key], value, key)
+
+    def test_get_vm_details_uses_the_first_vm(self):
+        # Given a vApp template, whose root element is not a Vm
+        details = vcd_xml.get_vm_details(xml_resp.vapp_template_xml)
+        # then the attributes of its Vm should be returned
+        self.assertEqual(details['id'], 'urn:vcloud:vm:bd3fe155-3fb2-40a8-af48-89c276983166')
+        self.assertEqual(details['href'], 'https://localhost/api/vAppTemplate/vm-bd3fe155-3fb2-40a8-af48-89c276983166')
+        self.assertEqual(details['name'], 'Ubuntu_no_nic')
+        self.assertEqual(details['hdd_mb'], 5120)
+
+    def test_get_network_connections(self):
+        self.assertEqual(vcd_xml.get_network_connections(xml_resp.vapp_xml_response),
+                         [('testing_T6nODiW4-68f68d93-0350-4d86-b40b-6e74dedf994d', '00:50:56:01:12:a2',
+                           '12.19.21.20')])
+
+    def test_get_link_hrefs(self):
+        self.assertEqual(
+            vcd_xml.get_link_hrefs(UPLOAD_LINKS_XML, 'upload:default'),
+            ['https://localhost/transfer/7b8c0e5e-4b52-4a6f-9ebd-a4a3fd4e4a2b/descriptor.ovf',
+             'https://localhost/transfer/7b8c0e5e-4b52-4a6f-9ebd-a4a3fd4e4a2b/cirros-disk1.vmdk'])
+
+    def test_get_files(self):
+        files = vcd_xml.get_files(UPLOAD_LINKS_XML)
+        self.assertEqual(files['cirros-disk1.vmdk'], {
+            'size': 13224448, 'bytes_transferred': 0,
+            'href': 'https://localhost/transfer/7b8c0e5e-4b52-4a6f-9ebd-a4a3fd4e4a2b/cirros-disk1.vmdk'})
+        self.assertEqual(files['descriptor.ovf']['bytes_transferred'], 3314)
+
+    def test_get_status_and_tasks(self):
+        self.assertEqual(vcd_xml.get_status(UPLOAD_LINKS_XML), 0)
+        self.assertEqual(vcd_xml.get_tasks(UPLOAD_LINKS_XML), [
+            {'status': 'running', 'operation': 'Importing Virtual Machine cirros', 'progress': 40}])
+
+    def test_accepts_text(self):
+        details = vcd_xml.get_vm_details(xml_resp.vm_xml_response.decode('utf-8')
+                                         if isinstance(xml_resp.vm_xml_response, bytes)
+                                         else xml_resp.vm_xml_response)
+        self.assertEqual(details['memory_mb'], 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import threading
+import unittest
+from time import sleep, time
+
+import mock
+
+from .. import vimconn
+from ..vim_governor import TokenBucket, VimGovernor, get_governor, governed, governors
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_rate(self):
+        bucket = TokenBucket(rate=10, burst=5)
+        now = time()
+        # the burst is sent at once, then one request every 1/rate seconds
+        waits = [bucket.reserve(now) for _ in range(7)]
+        self.assertEqual(waits[:5], [0] * 5)
+        self.assertAlmostEqual(waits[5], 0.1)
+        self.assertAlmostEqual(waits[6], 0.2)
+        # refilled while idle
+        self.assertEqual(bucket.reserve(now + 10), 0)
+
+
+@mock.patch('osm_ro.vim_governor.sleep')
+class TestVimGovernor(unittest.TestCase):
+    def test_retry_after(self, sleep_mock):
+        # Given a VIM that rejects two requests because of its rate limits
+        governor = VimGovernor('vim', rate=10, max_retries=3)
+        function = mock.Mock(side_effect=[vimconn.vimconnException("too many", http_code=429),
+                                          vimconn.vimconnRateLimitException("too many", retry_after=7), "result"])
+        # then the request is retried, waiting for the backoff, or the Retry-After of the VIM
+        self.assertEqual(governor.call(function, "arg"), "result")
+        function.assert_called_with("arg")
+        waits = [call[0][0] for call in sleep_mock.call_args_list]
+        self.assertEqual(len(waits), 2)
+        self.assertAlmostEqual(waits[0], 1, places=1)
+        self.assertAlmostEqual(waits[1], 7, places=1)
+        self.assertEqual(governor.throttled, 2)
+
+    def test_other_errors_are_not_retried(self, sleep_mock):
+        governor = VimGovernor('vim', max_retries=3)
+        function = mock.Mock(side_effect=vimconn.vimconnNotFoundException("not found"))
+        with self.assertRaises(vimconn.vimconnNotFoundException):
+            governor.call(function)
+        self.assertEqual(function.call_count, 1)
+        # nor the rate limited ones, once the retries are exhausted
+        function = mock.Mock(side_effect=vimconn.vimconnRateLimitException("too many"))
+        with self.assertRaises(vimconn.vimconnRateLimitException):
+            governor.call(function)
+        self.assertEqual(function.call_count, 4)
+
+    def test_slow_down_and_recover(self, sleep_mock):
+        governor = VimGovernor('vim', rate=10, max_retries=1)
+        function = mock.Mock(side_effect=[vimconn.vimconnRateLimitException("too many"), None])
+        governor.call(function)
+        # halved at the rate limited request, and increased with the successful one
+        self.assertAlmostEqual(governor.bucket.rate, 5.5)
+        for _ in range(20):
+            governor.call(mock.Mock())
+        self.assertEqual(governor.bucket.rate, 10)
+
+    def test_max_in_flight(self, sleep_mock):
+        governor = VimGovernor('vim', max_in_flight=2)
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, maximum
+
+        def request():
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            sleep(0.01)
+            with lock:
+                in_flight[0] -= 1
+
+        threads = [threading.Thread(target=governor.call, args=(request,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(in_flight[1], 2)
+
+
+class TestGetGovernor(unittest.TestCase):
+    def tearDown(self):
+        governors.clear()
+
+    def test_shared_by_the_connectors_of_a_vim_account(self):
+        config = {"api_rate_limit": 5, "api_max_in_flight": "4"}
+        governor = get_governor("dt0", config)
+        self.assertIs(get_governor("dt0", dict(config)), governor)
+        self.assertIsNot(get_governor("dt1", config), governor)
+        self.assertEqual(governor.settings, (5.0, None, 4, 3))
+        # reconfigured when the config of the VIM account changes
+        get_governor("dt0", {"api_rate_limit": 20})
+        self.assertEqual(governor.bucket.rate, 20)
+        self.assertIsNone(governor.in_flight)
+
+    def test_invalid_config(self):
+        for config in ({"api_rate_limit": 0}, {"api_max_in_flight": "many"}, {"api_max_retries": -1}):
+            with self.assertRaises(vimconn.vimconnException):
+                get_governor("dt0", config)
+
+    def test_governed_connector(self):
+        connector = mock.Mock(config={"api_rate_limit": 5})
+        connector.get_network_list.return_value = []
+        vim = governed(connector, "dt0", connector.config)
+        self.assertEqual(vim.get_network_list({"name": "net"}), [])
+        connector.get_network_list.assert_called_once_with({"name": "net"})
+        self.assertEqual(vim.config, connector.config)
+        self.assertEqual(governors["dt0"].calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import threading
+import unittest
+
+import mock
+
+try:
+    from .. import vim_thread
+except ImportError:
+    vim_thread = None
+
+
+class FakeVim(object):
+    """Connector of a VIM whose VMs are ACTIVE, unless changed by the test"""
+
+    def __init__(self):
+        self.status = {}
+        self.calls = 0
+        self.refreshed = 0
+
+    def refresh_vms_status(self, vm_list):
+        self.calls += 1
+        self.refreshed += len(vm_list)
+        return {vm_id: {"status": self.status.get(vm_id, "ACTIVE"), "vim_info": "info"} for vm_id in vm_list}
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def _vm_task(index, vim_status="ACTIVE"):
+    return {"instance_action_id": "action", "task_index": index, "item": "instance_vms", "action": "CREATE",
+            "item_id": "vm{}".format(index), "vim_id": "vim-vm{}".format(index), "status": "DONE",
+            "error_msg": None, "vim_info": "info", "vim_interfaces": {},
+            "extra": {"interfaces": {}, "vim_status": vim_status}}
+
+
+@unittest.skipUnless(vim_thread, "cannot import vim_thread")
+class TestAdaptiveRefresh(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch.object(vim_thread, "time", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.thread = vim_thread.vim_thread(threading.Lock(), 'test-vim', 'dc', 'dt', db=mock.Mock(),
+                                            db_lock=threading.Lock())
+        self.thread.vim = self.vim = FakeVim()
+
+    def refresh_due(self):
+        while self.thread._refres_elements():
+            pass
+
+    def test_interval_grows_while_unchanged(self):
+        task = _vm_task(0)
+        self.thread._insert_refresh(task)
+        intervals = []
+        for _ in range(6):
+            self.refresh_due()
+            intervals.append(task["refresh_interval"])
+            self.clock.now = task["modified_at"]
+        self.assertEqual(intervals, [60, 120, 240, 480, 600, 600])
+
+        # a change restarts it
+        self.vim.status["vim-vm0"] = "PAUSED"
+        self.refresh_due()
+        self.assertEqual(task["refresh_interval"], 60)
+        self.thread.db.update_rows.assert_any_call('instance_vms', UPDATE={"status": "PAUSED", "error_msg": None,
+                                                                           "vim_info": "info"},
+                                                   WHERE={"uuid": "vm0"})
+
+    def test_build_vms_are_refreshed_first(self):
+        # Given more ACTIVE VMs due than the batch size, and a VM in BUILD due later
+        for index in range(15):
+            self.thread._insert_refresh(_vm_task(index))
+        self.thread._insert_refresh(_vm_task(15, "BUILD"), self.clock.now + 1)
+        self.clock.now += 2
+        self.vim.status["vim-vm15"] = "BUILD"
+
+        self.thread._refres_elements()
+        refreshed = [task for task in self.thread.refresh_tasks if task.get("refresh_interval")]
+        self.assertEqual(len(refreshed), vim_thread.vim_thread.REFRESH_VM_BATCH)
+        self.assertIn("vm15", [task["item_id"] for task in refreshed])
+        self.assertEqual(self.thread.refresh_tasks[0]["item_id"], "vm9")  # the ACTIVE ones left for next call
+
+    def test_refresh_requested(self):
+        tasks = [_vm_task(index) for index in range(3)]
+        for task in tasks:
+            self.thread._insert_refresh(task)
+        for _ in range(3):
+            self.refresh_due()
+            self.clock.now = tasks[0]["modified_at"]
+        self.assertEqual(tasks[1]["refresh_interval"], 240)
+
+        # When the refresh of a VM is requested (e.g. after an action over it), before its next refresh
+        self.clock.now -= 100
+        self.thread.insert_task(("refresh", ["vm1"]))
+        self.thread._refresh_now(self.thread.task_queue.get()[1])
+        # Then it should be refreshed at once, at the initial interval
+        self.refresh_due()
+        self.assertEqual(tasks[1]["refresh_interval"], 60)
+        self.assertEqual(tasks[0]["refresh_interval"], 240)
+
+    def test_configure_refresh(self):
+        with mock.patch.multiple(vim_thread.vim_thread, REFRESH_BUILD=5, REFRESH_ACTIVE=60, REFRESH_ACTIVE_MAX=600,
+                                 REFRESH_BACKOFF=2):
+            vim_thread.vim_thread.configure_refresh(build="10", active=120, active_max=None, backoff=1.5)
+            self.assertEqual((self.thread.REFRESH_BUILD, self.thread.REFRESH_ACTIVE, self.thread.REFRESH_ACTIVE_MAX,
+                              self.thread.REFRESH_BACKOFF), (10, 120, 600, 1.5))
+            # the maximum is never below the initial interval
+            vim_thread.vim_thread.configure_refresh(active=900)
+            self.assertEqual(self.thread.REFRESH_ACTIVE_MAX, 900)
+
+
+@unittest.skipUnless(vim_thread, "cannot import vim_thread")
+class TestAdaptiveRefreshBenchmark(unittest.TestCase):
+    VMS = 200
+    DURATION = 4 * 3600  # simulated seconds
+    CHANGES = 20  # VMs that change their status, spread along the simulation
+
+    def simulate(self, active_max):
+        clock = Clock()
+        with mock.patch.object(vim_thread, "time", clock), \
+                mock.patch.object(vim_thread.vim_thread, "REFRESH_ACTIVE_MAX", active_max):
+            thread = vim_thread.vim_thread(threading.Lock(), 'bench-vim', 'dc', 'dt', db=mock.Mock(),
+                                           db_lock=threading.Lock())
+            thread.vim = vim = FakeVim()
+            for index in range(self.VMS):
+                thread._insert_refresh(_vm_task(index))
+            start = clock.now
+            change_every = self.DURATION // self.CHANGES
+            while clock.now < start + self.DURATION:
+                elapsed = int(clock.now - start)
+                if elapsed % change_every == 0:
+                    vim.status["vim-vm{}".format(elapsed // change_every)] = "PAUSED"
+                while thread._refres_elements():
+                    pass
+                clock.now += 1  # as the thread sleeps when there is nothing to process
+            return vim
+
+    def test_refresh_calls(self):
+        fixed = self.simulate(vim_thread.vim_thread.REFRESH_ACTIVE)
+        adaptive = self.simulate(vim_thread.vim_thread.REFRESH_ACTIVE_MAX)
+        self.assertLess(adaptive.refreshed, fixed.refreshed / 4)
+        self.assertLess(adaptive.calls, fixed.calls / 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import unittest
+
+import mock
+import yaml
+
+from osm_ro import vimconn
+
+try:
+    from osm_ro.vimconn_aws import vimconnector, DESCRIBE_BATCH
+except (ImportError, SystemExit):  # vimconn_aws exits when boto is not installed
+    vimconnector = None
+    DESCRIBE_BATCH = 200
+
+NICS_PER_VM = 3
+
+
+class Page(list):
+    """Result of a boto describe call"""
+    next_token = None
+
+
+class FakeEC2(object):
+    """Implements the describe calls used by refresh_vms_status, with the filter limits of EC2"""
+
+    def __init__(self, vm_count, states=None):
+        self.calls = []
+        self.instances = []
+        self.interfaces = []
+        self.addresses = []
+        for index in range(vm_count):
+            instance_id = 'i-{:04x}'.format(index)
+            self.instances.append(mock.Mock(
+                id=instance_id, state=(states or {}).get(index, 'running'), instance_type='t2.micro',
+                image_id='ami-1', launch_time='2018-01-01T00:00:00.000Z', placement='eu-west-1a', vpc_id='vpc-1',
+                subnet_id='subnet-1', private_ip_address='10.0.0.1', ip_address=None))
+            for device_index in reversed(range(NICS_PER_VM)):
+                interface_id = 'eni-{:04x}{}'.format(index, device_index)
+                self.interfaces.append(mock.Mock(
+                    id=interface_id, subnet_id='subnet-{}'.format(device_index),
+                    mac_address='0a:00:00:{:02x}:{:02x}:{:02x}'.format(index // 256, index % 256, device_index),
+                    private_ip_address='10.{}.{}.{}'.format(device_index, index // 256, index % 256),
+                    attachment=mock.Mock(instance_id=instance_id, device_index=device_index), publicIp=None))
+                if device_index == 0:
+                    self.addresses.append(mock.Mock(network_interface_id=interface_id,
+                                                    public_ip='52.0.{}.{}'.format(index // 256, index % 256)))
+
+    def _filter(self, method, filters, items, key):
+        self.calls.append(method)
+        name, values = list(filters.items())[0]
+        if len(values) > DESCRIBE_BATCH:
+            raise Exception("FilterLimitExceeded: The maximum number of filter values specified on a single call "
+                            "is {}".format(DESCRIBE_BATCH))
+        return Page(item for item in items if key(item) in values)
+
+    def get_all_reservations(self, filters, max_results=None, next_token=None):
+        instances = self._filter('get_all_reservations', filters, self.instances, lambda i: i.id)
+        return Page([mock.Mock(instances=instances)])
+
+    def get_all_network_interfaces(self, filters):
+        return self._filter('get_all_network_interfaces', filters, self.interfaces,
+                            lambda i: i.attachment.instance_id)
+
+    def get_all_addresses(self, filters):
+        return self._filter('get_all_addresses', filters, self.addresses, lambda a: a.network_interface_id)
+
+
+@unittest.skipUnless(vimconnector, "boto is not installed")
+class TestRefreshVmsStatus(unittest.TestCase):
+    def setUp(self):
+        with mock.patch.object(vimconnector, 'get_tenant_list', return_value=[{'id': 'vpc-1'}]):
+            self.vim = vimconnector('vim-1', 'aws', None, None, None, user='key', passwd='secret',
+                                    config={'region_name': 'eu-west-1'})
+        patcher = mock.patch.object(vimconnector, '_reload_connection')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_batch(self):
+        # Given a whole batch of VMs, with several network interfaces each
+        self.vim.conn = ec2 = FakeEC2(DESCRIBE_BATCH, states={1: 'pending', 2: 'stopped'})
+        vm_ids = [instance.id for instance in ec2.instances]
+
+        # When their status is refreshed
+        result = self.vim.refresh_vms_status(vm_ids)
+
+        # Then the elastic IPs are described in chunks, within the filter limits of EC2
+        self.assertEqual(ec2.calls, ['get_all_reservations', 'get_all_network_interfaces'] +
+                         ['get_all_addresses'] * NICS_PER_VM)
+        self.assertEqual(sorted(result), sorted(vm_ids))
+        self.assertEqual([result[vm_id]['status'] for vm_id in vm_ids[:4]], ['ACTIVE', 'BUILD', 'INACTIVE', 'ACTIVE'])
+        # and the interfaces are sorted by their device index, with the public IP of the first one
+        interfaces = result['i-0005']['interfaces']
+        self.assertEqual([interface['vim_interface_id'] for interface in interfaces],
+                         ['eni-00050', 'eni-00051', 'eni-00052'])
+        self.assertEqual(interfaces[0], {'vim_interface_id': 'eni-00050', 'vim_net_id': 'subnet-0',
+                                         'mac_address': '0a:00:00:00:05:00', 'ip_address': '52.0.0.5;10.0.0.5'})
+        self.assertEqual(interfaces[1]['ip_address'], '10.1.0.5')
+        self.assertEqual(yaml.safe_load(result['i-0005']['vim_info'])['instance_type'], 't2.micro')
+
+    def test_several_batches(self):
+        self.vim.conn = ec2 = FakeEC2(DESCRIBE_BATCH + 10)
+        vm_ids = [instance.id for instance in ec2.instances] + ['i-deleted']
+
+        result = self.vim.refresh_vms_status(vm_ids)
+
+        self.assertEqual(ec2.calls.count('get_all_reservations'), 2)
+        self.assertEqual(len([vm for vm in result.values() if vm['status'] == 'ACTIVE']), DESCRIBE_BATCH + 10)
+        # VMs not found are reported as deleted
+        self.assertEqual(result['i-deleted']['status'], 'DELETED')
+
+    def test_error(self):
+        self.vim.conn = mock.Mock(**{'get_all_reservations.side_effect': Exception('EC2 unavailable')})
+        with self.assertRaises(vimconn.vimconnConnectionException) as context:
+            self.vim.refresh_vms_status(['i-0000'])
+        self.assertIn('EC2 unavailable', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import unittest
+
+import mock
+
+try:
+    from osm_ro.vimconn_opennebula import vimconnector
+except ImportError:  # oca and untangle are optional
+    vimconnector = None
+
+DELETED_RESPONSE = """<?xml version="1.0"?>
+<methodResponse><params><param><value><array><data>
+<value><boolean>true</boolean></value><value><i4>{}</i4></value><value><i4>0</i4></value>
+</data></array></value></param></params></methodResponse>"""
+
+
+def _vm(vm_id, lcm_state="RUNNING"):
+    vm = mock.Mock(id=vm_id, str_lcm_state=lcm_state)
+    vm.template.nics = [mock.Mock(mac="02:00:0a:00:00:{:02x}".format(vm_id), network_id=0, ip="10.0.0.{}".format(vm_id),
+                                  spec=["mac", "network_id", "ip"])]
+    return vm
+
+
+class FakeOpenNebula(object):
+    """Pools of the VIM, that count the info calls used to download them"""
+
+    def __init__(self):
+        self.elements = {'vm': [_vm(1), _vm(2)], 'net': [mock.Mock(id=0)], 'template': []}
+        self.info_calls = 0
+
+    def pool(self, kind):
+        fake = self
+
+        class Pool(list):
+            def __init__(self, client):
+                list.__init__(self)
+
+            def info(self):
+                fake.info_calls += 1
+                self[:] = list(fake.elements[kind])
+
+        return Pool
+
+
+@unittest.skipUnless(vimconnector, "oca is not installed")
+class TestPoolCache(unittest.TestCase):
+    def setUp(self):
+        self.one = FakeOpenNebula()
+        self.now = 1000.0
+        for patcher in (mock.patch('osm_ro.vimconn_opennebula.oca.Client'),
+                        mock.patch('osm_ro.vimconn_opennebula.oca.VirtualMachinePool', self.one.pool('vm')),
+                        mock.patch('osm_ro.vimconn_opennebula.oca.VirtualNetworkPool', self.one.pool('net')),
+                        mock.patch('osm_ro.vimconn_opennebula.oca.VmTemplatePool', self.one.pool('template')),
+                        mock.patch('osm_ro.vimconn_opennebula.time.time', lambda: self.now)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.vim = vimconnector('vim-1', 'one', None, None, 'http://one:2633/RPC2', user='oneadmin', passwd='secret',
+                                config={'pool_cache_ttl': 10})
+
+    def test_cache_hit(self):
+        # Given the VMs were refreshed
+        first = self.vim.refresh_vms_status(['1', '2'])
+        # When they are refreshed again, before the TTL
+        self.now += 5
+        second = self.vim.refresh_vms_status(['2', '1'])
+        # Then the pool should be downloaded just once
+        self.assertEqual(self.one.info_calls, 1)
+        self.assertEqual(second, first)
+        self.assertEqual(first['1']['status'], 'ACTIVE')
+        self.assertEqual(first['1']['interfaces'], [{'vim_info': None, 'mac_address': '02:00:0a:00:00:01',
+                                                     'vim_net_id': '0', 'vim_interface_id': '0',
+                                                     'ip_address': '10.0.0.1'}])
+        # and each pool is cached on its own
+        self.assertEqual(self.vim.refresh_nets_status(['0'])['0']['status'], 'ACTIVE')
+        self.assertEqual(self.one.info_calls, 2)
+
+    def test_state_change_visible_after_ttl(self):
+        # Given a VM that changes its state after being refreshed
+        self.assertEqual(self.vim.refresh_vms_status(['1'])['1']['status'], 'ACTIVE')
+        self.one.elements['vm'][0] = _vm(1, "BOOT_FAILURE")
+        # Then the change is not seen until the TTL expires
+        self.now += 9
+        self.assertEqual(self.vim.refresh_vms_status(['1'])['1']['status'], 'ACTIVE')
+        self.now += 1
+        result = self.vim.refresh_vms_status(['1'])
+        self.assertEqual(result['1']['status'], 'ERROR')
+        self.assertEqual(self.one.info_calls, 2)
+
+    def test_created_vm_is_visible(self):
+        # Given the VM pool was cached
+        self.vim.refresh_vms_status(['1'])
+        template = mock.Mock(id=5)
+        template.name = 'flavor'
+        template.instantiate.side_effect = lambda name: self.one.elements['vm'].append(_vm(3)) or 3
+        self.one.elements['template'].append(template)
+
+        # When a VM is created
+        with mock.patch('osm_ro.vimconn_opennebula.oca.VmTemplate.update'):
+            vm_id, _ = self.vim.new_vminstance('vm3', None, True, 'image', 5, [])
+
+        # Then it is found by the next refresh, before the TTL
+        self.assertEqual(vm_id, '3')
+        self.assertEqual(self.vim.refresh_vms_status(['3'])['3']['status'], 'ACTIVE')
+        self.assertEqual(self.one.info_calls, 3)  # VMs, templates and VMs again
+
+    def test_deleted_vm_is_not_visible(self):
+        self.vim.refresh_vms_status(['1', '2'])
+
+        with mock.patch('osm_ro.vimconn_opennebula.requests.post') as post:
+            post.return_value.content = DELETED_RESPONSE.format(2)
+            del self.one.elements['vm'][1]
+            self.assertEqual(self.vim.delete_vminstance('2'), '2')
+
+        result = self.vim.refresh_vms_status(['1', '2'])
+        self.assertEqual(result['1']['status'], 'ACTIVE')
+        self.assertEqual(result['2']['status'], 'DELETED')
+        self.assertEqual(self.one.info_calls, 2)
+
+    def test_vim_error(self):
+        self.one.elements = None  # the download of the pool fails
+        result = self.vim.refresh_vms_status(['1', '2'])
+        self.assertEqual({vm['status'] for vm in result.values()}, {'VIM_ERROR'})
+
+
+if __name__ == '__main__':
+    unittest.main()
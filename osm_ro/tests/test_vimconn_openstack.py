@@ -29,6 +29,11 @@ import unittest
 
 import mock
 from neutronclient.v2_0.client import Client
+from neutronclient.common import exceptions as neExceptions
+from glanceclient import exc as glExceptions
+from novaclient import exceptions as nvExceptions
+from novaclient.v2.flavors import Flavor, FlavorManager
+from novaclient.v2.servers import ServerManager
 
 from osm_ro import vimconn
 from osm_ro.vimconn_openstack import vimconnector
@@ -850,5 +855,173 @@ class TestSfcOperations(unittest.TestCase):
         self.assertEqual(result, '638f957c-82df-11e7-b7c8-132706021464')
 
 
+
+class TestNetworkOperations(unittest.TestCase):
+    def setUp(self):
+        # instantiate dummy VIM connector so we can test it
+        self.vimconn = vimconnector(
+            '123', 'openstackvim', '456', '789', 'http://dummy.url', None,
+            'user', 'pass')
+
+    @mock.patch.object(Client, 'list_subnets')
+    @mock.patch.object(Client, 'list_networks')
+    def test_refresh_nets_status_in_chunks(self, list_networks, list_subnets):
+        # what OpenStack is assumed to return: all the networks but the last one
+        net_ids = ['{:08x}-82d6-11e7-ad95-9bb52fbec2f2'.format(i) for i in range(100)]
+
+        def networks(id):
+            return {'networks': [
+                {'id': net_id, 'name': 'net', 'status': 'ACTIVE', 'admin_state_up': net_id != net_ids[1],
+                 'subnets': ['subnet-' + net_id]}
+                for net_id in id if net_id != net_ids[-1]]}
+        list_networks.side_effect = networks
+        list_subnets.side_effect = lambda network_id: {'subnets': [
+            {'id': 'subnet-' + net_id, 'network_id': net_id, 'cidr': '10.0.0.0/24'} for net_id in network_id]}
+
+        # call the VIM connector
+        result = self.vimconn.refresh_nets_status(net_ids)
+
+        # assert that networks and subnets are listed once per chunk
+        self.assertEqual(list_networks.call_count, 2)
+        self.assertEqual(list_subnets.call_count, 2)
+        self.assertEqual(list_networks.call_args_list[0][1]['id'], net_ids[:80])
+        # and the status of each network is returned
+        self.assertEqual(set(result), set(net_ids))
+        self.assertEqual(result[net_ids[0]]['status'], 'ACTIVE')
+        self.assertIn('10.0.0.0/24', result[net_ids[0]]['vim_info'])
+        self.assertEqual(result[net_ids[1]]['status'], 'DOWN')
+        self.assertEqual(result[net_ids[-1]]['status'], 'DELETED')
+
+
+class TestPortOperations(unittest.TestCase):
+    def setUp(self):
+        # instantiate dummy VIM connector so we can test it
+        self.vimconn = vimconnector(
+            '123', 'openstackvim', '456', '789', 'http://dummy.url', None,
+            'user', 'pass', config={'availability_zone': 'nova'}, persistent_info={})
+
+    @mock.patch.object(ServerManager, 'create')
+    @mock.patch.object(Client, 'create_port')
+    def test_new_vminstance_creates_ports_in_bulk(self, create_port, create_server):
+        # what OpenStack is assumed to return: the ports in the same order
+        create_port.side_effect = lambda body: {'ports': [
+            dict(port, id='port-{}'.format(i), mac_address='fa:16:3e:00:00:{:02x}'.format(i),
+                 fixed_ips=[{'ip_address': '10.0.0.{}'.format(i)}])
+            for i, port in enumerate(body['ports'])]}
+        create_server.return_value = mock.Mock(id='vm-0')
+        net_list = [{'name': 'eth{}'.format(i), 'net_id': 'net-{}'.format(i), 'type': 'virtual', 'use': 'data'}
+                    for i in range(12)]
+        net_list.append({'name': 'not-connected', 'type': 'virtual', 'use': 'data'})
+
+        # call the VIM connector
+        vm_id, created_items = self.vimconn.new_vminstance('vm', 'vm', True, 'image', 'flavor', net_list)
+
+        # assert that the ports are created with a single request
+        self.assertEqual(create_port.call_count, 1)
+        self.assertEqual([port['network_id'] for port in create_port.call_args[0][0]['ports']],
+                         ['net-{}'.format(i) for i in range(12)])
+        self.assertEqual(vm_id, 'vm-0')
+        self.assertEqual(set(created_items), set('port:port-{}'.format(i) for i in range(12)))
+        self.assertEqual(net_list[3]['vim_id'], 'port-3')
+        self.assertEqual(net_list[3]['ip'], '10.0.0.3')
+        self.assertEqual([nic['port-id'] for nic in create_server.call_args[1]['nics']],
+                         ['port-{}'.format(i) for i in range(12)])
+
+    @mock.patch.object(Client, 'delete_port')
+    def test_delete_vminstance_records_deleted_ports(self, delete_port):
+        # what OpenStack is assumed to do: fail deleting a port and not to find other
+        def delete(port_id):
+            if port_id == 'port-1':
+                raise neExceptions.NeutronClientException(message='conflict', status_code=409)
+            if port_id == 'port-2':
+                raise neExceptions.PortNotFoundClient(message='not found', status_code=404)
+        delete_port.side_effect = delete
+        created_items = {'port:port-{}'.format(i): True for i in range(10)}
+        created_items['port:port-9'] = False
+
+        # call the VIM connector
+        self.vimconn.delete_vminstance(None, created_items)
+
+        # assert that pending ports are deleted, and just the failed one remains to be deleted
+        self.assertEqual(delete_port.call_count, 9)
+        self.assertEqual([k for k, v in created_items.items() if v], ['port:port-1'])
+
+        # and that a retry just deletes the remaining port
+        delete_port.reset_mock()
+        delete_port.side_effect = None
+        self.vimconn.delete_vminstance(None, created_items)
+        delete_port.assert_called_once_with('port-1')
+        self.assertFalse(any(created_items.values()))
+
+
+class TestFlavorOperations(unittest.TestCase):
+    def setUp(self):
+        # instantiate dummy VIM connector so we can test it
+        self.vimconn = vimconnector(
+            '123', 'openstackvim', '456', '789', 'http://dummy.url', None,
+            'user', 'pass', persistent_info={})
+
+    @mock.patch.object(FlavorManager, 'create')
+    @mock.patch.object(FlavorManager, 'list')
+    def test_flavors_are_cached(self, list_flavors, create_flavor):
+        # what OpenStack is assumed to return, with the extra specs included at the list
+        list_flavors.side_effect = lambda: [
+            Flavor(None, {'id': 'f-epa', 'name': 'small-epa', 'ram': 1024, 'vcpus': 1, 'disk': 10,
+                          'extra_specs': {'hw:cpu_policy': 'dedicated'}}, loaded=True),
+            Flavor(None, {'id': 'f-small', 'name': 'small', 'ram': 1024, 'vcpus': 1, 'disk': 10,
+                          'extra_specs': {}}, loaded=True)]
+        create_flavor.return_value = mock.Mock(id='f-new')
+
+        # flavors are resolved several times, as done when instantiating a scenario
+        for _ in range(3):
+            flavor_id = self.vimconn.get_flavor_id_from_data({'ram': 1024, 'vcpus': 1, 'disk': 10})
+        self.assertEqual(flavor_id, 'f-small')
+        self.assertEqual(list_flavors.call_count, 1)
+
+        # a new flavor does not reuse a cached name and invalidates the cache
+        self.assertEqual(self.vimconn.new_flavor({'name': 'small', 'ram': 2048, 'vcpus': 2, 'disk': 20}), 'f-new')
+        self.assertEqual(create_flavor.call_args[0][0], 'small-1')
+        self.vimconn.get_flavor_id_from_data({'ram': 1024, 'vcpus': 1, 'disk': 10})
+        self.assertEqual(list_flavors.call_count, 2)
+
+        # and the cache is shared by the connectors of the same VIM
+        other = vimconnector('123', 'openstackvim', '456', '789', 'http://dummy.url', None, 'user', 'pass',
+                             persistent_info=self.vimconn.persistent_info)
+        other.get_flavor_id_from_data({'ram': 1024, 'vcpus': 1, 'disk': 10})
+        self.assertEqual(list_flavors.call_count, 2)
+
+
+class TestRateLimits(unittest.TestCase):
+    def setUp(self):
+        # instantiate dummy VIM connector so we can test it
+        self.vimconn = vimconnector(
+            '123', 'openstackvim', '456', '789', 'http://dummy.url', None,
+            'user', 'pass', persistent_info={})
+
+    @mock.patch.object(ServerManager, 'find')
+    def test_rate_limited_requests(self, find_server):
+        # Given nova and neutron rejecting requests because of their rate limits
+        find_server.side_effect = nvExceptions.OverLimit(413, retry_after=30)
+        with self.assertRaises(vimconn.vimconnRateLimitException) as context:
+            self.vimconn.get_vminstance('vm0')
+        self.assertEqual(context.exception.retry_after, 30)
+
+        error = neExceptions.NeutronClientException("Too Many Requests", status_code=429)
+        with self.assertRaises(vimconn.vimconnRateLimitException):
+            self.vimconn._format_exception(error)
+        # while other errors are not
+        with self.assertRaises(vimconn.vimconnNotFoundException):
+            self.vimconn._format_exception(nvExceptions.NotFound(404))
+
+    def test_quota_exceeded_is_not_rate_limited(self):
+        # nova also answers 413 when a quota is exceeded, but without Retry-After
+        for error in (nvExceptions.OverLimit(413, "Quota exceeded for instances"), glExceptions.HTTPOverLimit()):
+            self.assertFalse(self.vimconn._is_rate_limited(error))
+            with self.assertRaises(vimconn.vimconnException) as context:
+                self.vimconn._format_exception(error)
+            self.assertNotIsInstance(context.exception, vimconn.vimconnRateLimitException)
+        self.assertTrue(self.vimconn._is_rate_limited(nvExceptions.RateLimit(429)))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import json
+import threading
+import unittest
+
+import yaml
+
+from six.moves.BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from six.moves.urllib.parse import parse_qs, urlsplit
+
+from osm_ro.vimconn_openvim import vimconnector, REFRESH_BATCH
+
+TENANT = 'fc2a4e4a-5e22-11e8-a0fc-0242ac110002'
+
+
+def _id(kind, index):
+    """uuid of a fake openvim element"""
+    return '{:08x}-0000-0000-0000-{:012x}'.format(kind, index)
+
+
+VM, PORT, NET = 1, 2, 3
+SERVERS = {_id(VM, i): {'id': _id(VM, i), 'name': 'vm{}'.format(i), 'status': 'ACTIVE', 'hostId': 'host0'}
+           for i in range(60)}
+SERVERS[_id(VM, 1)]['status'] = 'CREATING'
+PORTS = [{'id': _id(PORT, i), 'device_id': _id(VM, i), 'network_id': _id(NET, 0),
+          'mac_address': 'fa:16:3e:00:00:{:02x}'.format(i), 'ip_address': '10.0.0.{}'.format(i)}
+         for i in range(60)]
+NETWORKS = {_id(NET, i): {'id': _id(NET, i), 'name': 'net{}'.format(i), 'status': 'ACTIVE', 'admin_state_up': i != 1}
+            for i in range(3)}
+
+
+class FakeOpenvimHandler(BaseHTTPRequestHandler):
+    """Implements the GET methods of openvim used by the refresh, filtering the lists by any number of ids"""
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        self.server.requests.append(self.path)
+        parts = url.path.strip('/').split('/')
+        if parts == ['openvim', TENANT, 'servers']:
+            self._send({'servers': [{'id': s['id'], 'name': s['name'], 'status': s['status']}
+                                    for s in SERVERS.values() if s['id'] in query.get('id', SERVERS)]})
+        elif parts[:3] == ['openvim', TENANT, 'servers'] and len(parts) == 4:
+            if parts[3] in SERVERS:
+                self._send({'server': SERVERS[parts[3]]})
+            else:
+                self._send({'error': {'description': 'server not found'}}, 404)
+        elif parts == ['openvim', 'ports']:
+            self._send({'ports': [p for p in PORTS if p['device_id'] in query.get('device_id', ())]})
+        elif parts == ['openvim', 'networks']:
+            self._send({'networks': [n for n in NETWORKS.values() if n['id'] in query.get('id', NETWORKS)]})
+        elif parts[:2] == ['openvim', 'networks'] and len(parts) == 3:
+            if parts[2] in NETWORKS:
+                self._send({'network': NETWORKS[parts[2]]})
+            else:
+                self._send({'error': {'description': 'network not found'}}, 404)
+        else:
+            self._send({'error': {'description': 'not implemented'}}, 501)
+
+    def _send(self, content, code=200):
+        body = json.dumps(content).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestVimconnOpenvimRefresh(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), FakeOpenvimHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        url = 'http://127.0.0.1:{}/openvim'.format(self.server.server_port)
+        self.vim = vimconnector('uuid', 'openvim', TENANT, 'tenant', url, config={})
+        del self.server.requests[:]
+
+    def test_refresh_vms_status_uses_list_endpoints(self):
+        # Given more vms than a batch, and one that does not exist
+        vm_list = sorted(SERVERS) + [_id(VM, 999)]
+        # when their status is refreshed
+        self.vim.refresh_vms_status(vm_list)
+        # then a server list and a port list should be requested per batch, plus the missing vm, and the detail of
+        # each server the first time
+        batches = (len(vm_list) + REFRESH_BATCH - 1) // REFRESH_BATCH
+        self.assertEqual(len(self.server.requests), 2 * batches + 1 + len(SERVERS))
+        del self.server.requests[:]
+        result = self.vim.refresh_vms_status(vm_list)
+        self.assertEqual(len(self.server.requests), 2 * batches + 1)
+        self.assertEqual(result[_id(VM, 0)]['status'], 'ACTIVE')
+        self.assertEqual(result[_id(VM, 1)]['status'], 'BUILD')
+        self.assertEqual(result[_id(VM, 999)]['status'], 'DELETED')
+        self.assertEqual(result[_id(VM, 5)]['interfaces'][0]['vim_interface_id'], _id(PORT, 5))
+        self.assertEqual(result[_id(VM, 5)]['interfaces'][0]['ip_address'], '10.0.0.5')
+        self.assertEqual(set(result), set(vm_list))
+
+    def test_refresh_vms_status_without_ports(self):
+        # Given a vm without ports at the list
+        PORTS[0]['device_id'] = _id(VM, 999)
+        try:
+            result = self.vim.refresh_vms_status([_id(VM, 0), _id(VM, 2)])
+        finally:
+            PORTS[0]['device_id'] = _id(VM, 0)
+        # then its ports should be requested individually (besides the lists and the details of the servers)
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertIn('/openvim/ports?device_id=' + _id(VM, 0), self.server.requests)
+        self.assertEqual(result[_id(VM, 0)]['status'], 'ACTIVE:NoMgmtIP')
+        self.assertEqual(result[_id(VM, 0)]['interfaces'], [])
+        self.assertEqual(result[_id(VM, 2)]['status'], 'ACTIVE')
+
+    def test_refresh_vms_status_vim_info(self):
+        # Given a vm that was refreshed
+        vm_id = _id(VM, 3)
+        result = self.vim.refresh_vms_status([vm_id])
+        # then its vim_info should be the detail of the server, not the abbreviated entry of the list
+        self.assertEqual(yaml.safe_load(result[vm_id]['vim_info']), SERVERS[vm_id])
+        # and it should be reused while the status does not change
+        del self.server.requests[:]
+        self.assertEqual(self.vim.refresh_vms_status([vm_id]), result)
+        self.assertEqual(len(self.server.requests), 2)
+        SERVERS[vm_id]['status'] = 'ERROR'
+        SERVERS[vm_id]['last_error'] = 'host failure'
+        try:
+            result = self.vim.refresh_vms_status([vm_id])
+        finally:
+            SERVERS[vm_id]['status'] = 'ACTIVE'
+            del SERVERS[vm_id]['last_error']
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(result[vm_id]['status'], 'ERROR')
+        self.assertEqual(result[vm_id]['error_msg'], 'host failure')
+
+    def test_refresh_nets_status_uses_list_endpoint(self):
+        result = self.vim.refresh_nets_status([_id(NET, 0), _id(NET, 1), _id(NET, 999)])
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(result[_id(NET, 0)]['status'], 'ACTIVE')
+        self.assertEqual(result[_id(NET, 1)]['status'], 'DOWN')
+        self.assertEqual(result[_id(NET, 999)]['status'], 'DELETED')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -22,7 +22,7 @@
 ##
 
 
-from osm_ro.vimconn_vmware import vimconnector
+from osm_ro.vimconn_vmware import vimconnector, vim
 from osm_ro.vimconn import vimconnUnexpectedResponse,vimconnNotFoundException,vimconnException
 from pyvcloud.vcd.client import Client
 from lxml import etree as lxmlElementTree
@@ -30,8 +30,11 @@ from pyvcloud.vcd.org import Org
 from pyvcloud.vcd.vdc import VDC
 from pyvcloud.vcd.vapp import VApp
 import os
+import tempfile
+import time
 import unittest
 import mock
+import yaml
 import test_vimconn_vmware_xml_response as xml_resp
 from os import path
 
@@ -193,6 +196,28 @@ class TestVimconn_VMware(unittest.TestCase):
                                                               'test_net',
                                                                 'bridge')
 
+    @mock.patch.object(vimconnector, 'create_network_rest')
+    @mock.patch.object(vimconnector, 'get_org_action')
+    def test_org_networks_are_cached(self, get_org_action, create_network_rest):
+        """
+        Testcase to verify that org networks are fetched once and refreshed after creating a network
+        """
+        net_id = '090ffa68-9be6-4d74-af45-9a071544a633'
+        net_name = 'default.cirros_ns.cirros_nsd_vld1-73a7d683-af17-49ff-95d3-72f8feb25537'
+        self.vim.org_uuid = '2cb3dffb-5c51-4355-8406-28553ead28ac'
+        get_org_action.return_value = xml_resp.org_xml_response
+        create_network_rest.return_value = xml_resp.create_network_xml_response
+
+        # repeated lookups are served from the cache
+        self.assertEqual(self.vim.get_network_id_by_name(net_name), net_id)
+        self.assertEqual(self.vim.get_network_name_by_id(net_id), net_name)
+        self.assertEqual(get_org_action.call_count, 1)
+
+        # creating a network invalidates the cache
+        self.vim.new_network('Test_network', 'bridge')
+        self.assertEqual(self.vim.get_network_id_by_name(net_name), net_id)
+        self.assertEqual(get_org_action.call_count, 2)
+
     @mock.patch.object(vimconnector, 'connect')
     @mock.patch.object(vimconnector, 'get_network_action')
     @mock.patch.object(vimconnector, 'delete_network_action')
@@ -437,13 +462,141 @@ class TestVimconn_VMware(unittest.TestCase):
 
         perform_request.return_value.status_code = 200
         perform_request.return_value.content = vm_resp
-        # call to VIM connector method
+        # call to VIM connector method, with the per vApp requests
+        self.vim.bulk_refresh = False
         result = self.vim.refresh_vms_status([vm_id])
         for attr in result[vm_id]:
             if attr == 'status':
                 # assert verified expected and return result from VIM connector
                 self.assertEqual(result[vm_id][attr], 'ACTIVE')
 
+    @mock.patch.object(vimconnector,'get_network_id_by_name')
+    @mock.patch.object(vimconnector,'get_vms_pci_details')
+    @mock.patch.object(vimconnector,'get_nsx_dhcp_leases')
+    @mock.patch.object(vimconnector,'refresh_vms_status_per_vapp')
+    @mock.patch.object(vimconnector,'connect')
+    @mock.patch.object(vimconnector,'perform_request')
+    def test_refresh_vms_status_bulk(self, perform_request, connect, refresh_vms_status_per_vapp,
+                                     get_nsx_dhcp_leases, get_vms_pci_details, get_network_id_by_name):
+        """
+        Testcase to refresh vms status with the vCD query service
+        """
+        vm_id = '53a529b2-10d8-4d56-a7ad-8182acdbe71c'
+        missing_vm_id = '2f1c8a8c-3d5e-4b39-9a2e-0a3c3b3a6a61'
+        net_id = '47d12505-5968-4e16-95a7-18743edb0c8b'
+        self.vim.client = self.vim.connect()
+        # the hrefs returned by vCD do not start with the configured url
+        self.vim.url = 'https://test/'
+        get_vms_pci_details.return_value = {vm_id: {'host_name': 'test-esx-1.corp.local', 'host_ip': '12.19.24.31'}}
+        get_network_id_by_name.return_value = net_id
+        refresh_vms_status_per_vapp.return_value = {missing_vm_id: {'status': 'INACTIVE'}}
+        perform_request.side_effect = [mock.Mock(status_code=200, content=xml_resp.vm_query_records_xml),
+                                       mock.Mock(status_code=200, content=xml_resp.vm_xml_response)]
+
+        # call to VIM connector method
+        result = self.vim.refresh_vms_status([vm_id, missing_vm_id])
+
+        # a single query is sent for all the vApps, plus a request per VM for its disks and network connections
+        self.assertEqual(perform_request.call_count, 2)
+        query_url = perform_request.call_args_list[0][1]['url']
+        self.assertTrue(query_url.startswith('https://test/api/query?'))
+        self.assertIn('type=vm', query_url)
+        self.assertIn('vapp-' + missing_vm_id, query_url)
+        self.assertEqual(result[vm_id]['status'], 'ACTIVE')
+        self.assertEqual(result[vm_id]['interfaces'][0], {'mac_address': '00:50:56:01:14:1a',
+                                                           'vim_net_id': net_id,
+                                                           'vim_interface_id': net_id,
+                                                           'ip_address': '172.16.27.72'})
+        vim_info = yaml.safe_load(result[vm_id]['vim_info'])
+        self.assertEqual(vim_info, [{'id': 'urn:vcloud:vm:' + vm_id, 'name': 'Ubuntu_no_nic', 'status': 'ACTIVE',
+                                     'cpus': 1, 'memory_mb': 1024, 'hdd_mb': 10240,
+                                     'host_name': 'test-esx-1.corp.local', 'host_ip': '12.19.24.31'}])
+        get_vms_pci_details.assert_called_once_with([vm_id])
+        # vApps not found by the query service are looked up one by one
+        refresh_vms_status_per_vapp.assert_called_once_with([missing_vm_id])
+        self.assertEqual(result[missing_vm_id]['status'], 'INACTIVE')
+        # IP addresses are known, so NSX edges are not queried
+        get_nsx_dhcp_leases.assert_not_called()
+
+    @mock.patch.object(vimconnector,'get_network_id_by_name')
+    @mock.patch.object(vimconnector,'get_vms_pci_details')
+    @mock.patch.object(vimconnector,'connect')
+    @mock.patch.object(vimconnector,'perform_request')
+    def test_refresh_vms_status_bulk_keeps_vm_details(self, perform_request, connect, get_vms_pci_details,
+                                                      get_network_id_by_name):
+        """
+        Testcase to refresh vms status with the vCD query service, when the VMs do not change
+        """
+        vm_id = '53a529b2-10d8-4d56-a7ad-8182acdbe71c'
+        self.vim.client = self.vim.connect()
+        get_vms_pci_details.return_value = {}
+        query = mock.Mock(status_code=200, content=xml_resp.vm_query_records_xml)
+        vm = mock.Mock(status_code=200, content=xml_resp.vm_xml_response)
+        perform_request.side_effect = [query, vm, query]
+
+        first = self.vim.refresh_vms_status([vm_id])
+        second = self.vim.refresh_vms_status([vm_id])
+
+        # the details of the VM are not requested again while its status does not change
+        self.assertEqual(perform_request.call_count, 3)
+        self.assertEqual(second, first)
+
+        # but they are when it changes
+        powered_off = mock.Mock(status_code=200,
+                                content=xml_resp.vm_query_records_xml.replace('POWERED_ON', 'POWERED_OFF'))
+        perform_request.side_effect = [powered_off, vm]
+        result = self.vim.refresh_vms_status([vm_id])
+        self.assertEqual(perform_request.call_count, 5)
+        self.assertEqual(result[vm_id]['status'], 'INACTIVE')
+
+        # or after vm_details_ttl
+        perform_request.side_effect = [powered_off, vm]
+        with mock.patch('osm_ro.vimconn_vmware.time.time', return_value=time.time() + self.vim.vm_details_ttl):
+            self.vim.refresh_vms_status([vm_id])
+        self.assertEqual(perform_request.call_count, 7)
+
+    @mock.patch.object(vimconnector,'get_vcenter_content')
+    @mock.patch.object(vimconnector,'get_vm_moref_id')
+    def test_get_vms_pci_details(self, get_vm_moref_id, get_vcenter_content):
+        """
+        Testcase to get the PCI details of several VMs with a couple of vCenter requests
+        """
+        self.vim.vcenter_ip = '10.0.0.1'
+        get_vm_moref_id.side_effect = lambda vapp_uuid: 'vm-' + vapp_uuid
+        vcenter_conect, content = mock.Mock(), mock.Mock()
+        get_vcenter_content.return_value = vcenter_conect, content
+        host = vim.HostSystem('host-1')
+        device = vim.vm.device.VirtualPCIPassthrough(
+            deviceInfo=vim.Description(label='PCI device 0'),
+            backing=vim.vm.device.VirtualPCIPassthrough.DeviceBackingInfo(id='08:00.0'),
+            slotInfo=vim.vm.device.VirtualDevice.PciBusSlotInfo(pciSlotNumber=160))
+        vnic = mock.Mock()
+        vnic.spec.ip.ipAddress = '12.19.24.31'
+
+        def prop(name, val):
+            # name is an argument of the Mock constructor, it has to be set afterwards
+            dynamic_property = mock.Mock(val=val)
+            dynamic_property.name = name
+            return dynamic_property
+
+        def retrieve_contents(filter_specs):
+            objects = [object_spec.obj for object_spec in filter_specs[0].objectSet]
+            if filter_specs[0].propSet[0].type == vim.HostSystem:
+                return [mock.Mock(obj=host, propSet=[prop('name', 'esx-1'), prop('config.network.vnic', [vnic])])]
+            return [mock.Mock(obj=vm, propSet=[prop('runtime.host', host), prop('config.hardware.device', [device])])
+                    for vm in objects]
+
+        content.propertyCollector.RetrieveContents.side_effect = retrieve_contents
+
+        result = self.vim.get_vms_pci_details(['a', 'b'])
+        self.assertEqual(content.propertyCollector.RetrieveContents.call_count, 2)
+        self.assertEqual(sorted(result), ['a', 'b'])
+        self.assertEqual(result['a'], {'host_name': 'esx-1', 'host_ip': '12.19.24.31',
+                                       'PCI device 0': {'devide_id': '08:00.0', 'pciSlotNumber': 160}})
+        # the moref ids are obtained just once
+        self.vim.get_vms_pci_details(['a', 'b'])
+        self.assertEqual(get_vm_moref_id.call_count, 2)
+
     @mock.patch.object(vimconnector,'get_vcd_network')
     def test_refresh_nets_status(self, get_vcd_network):
         net_id = 'c2d0f28f-d38b-4588-aecc-88af3d4af58b'
@@ -714,6 +867,127 @@ class TestVimconn_VMware(unittest.TestCase):
                                                                  flavor_id=flavor_id,
                                                                  net_list=net_list)
 
+    @mock.patch('osm_ro.vimconn_vmware.time.sleep')
+    @mock.patch.object(vimconnector, 'get_token')
+    @mock.patch.object(vimconnector, 'get_session')
+    def test_upload_file_resumes_failed_chunks(self, get_session, get_token, sleep):
+        """
+        Testcase to upload a file in parallel chunks, resuming the ones that fail
+        """
+        file_content = os.urandom(10 * 1024 + 100)
+        tmp_file = tempfile.NamedTemporaryFile(suffix='.vmdk')
+        tmp_file.write(file_content)
+        tmp_file.flush()
+        self.vim.client = mock.Mock()
+        self.vim.client._session.headers = {'x-vcloud-authorization': 'token'}
+        self.vim.upload_concurrency = 4
+        self.vim.upload_retries = 1
+        # assumed transfer service, failing twice (i.e. all the retries) the 4th chunk
+        received = {}
+        failures = [3 * 1024, 3 * 1024]
+
+        def put(url=None, headers=None, data=None, verify=None):
+            byte_range = headers['Content-Range'].split()[1]
+            start = int(byte_range.split('-')[0])
+            if start in failures:
+                failures.remove(start)
+                return mock.Mock(status_code=500, content='Internal error')
+            received[start] = data.read()
+            self.assertEqual(int(headers['Content-Length']), len(received[start]))
+            return mock.Mock(status_code=200)
+        get_session.return_value.put.side_effect = put
+
+        # call to VIM connector method
+        result = self.vim.upload_file('https://localhost/transfer/disk.vmdk', {}, tmp_file.name, chunk_bytes=1024)
+
+        # assert the whole file is uploaded, after getting a new token to resume the failed chunk
+        self.assertTrue(result)
+        self.assertEqual(sorted(received), list(range(0, len(file_content), 1024)))
+        self.assertEqual(b''.join(received[start] for start in sorted(received)), file_content)
+        get_token.assert_called_once_with()
+        tmp_file.close()
+
+    @mock.patch.object(vimconnector, 'get_session')
+    def test_perform_requests_renew_the_token_once(self, get_session):
+        """
+        Testcase for concurrent requests rejected with an expired token, that get a single new one
+        """
+        self.vim.client = mock.Mock()
+        self.vim.client._session.headers = {'x-vcloud-authorization': 'expired'}
+        self.vim.rest_concurrency = 4
+
+        def get_token():
+            time.sleep(0.1)  # let the other requests be rejected meanwhile
+            self.vim.expired_token = self.vim.client._session.headers['x-vcloud-authorization']
+            self.vim.client = mock.Mock()
+            self.vim.client._session.headers = {'x-vcloud-authorization': 'renewed'}
+
+        def request(req_type, url, headers=None, data=None, verify=None):
+            if headers['x-vcloud-authorization'] == 'expired':
+                return mock.Mock(status_code=403)
+            return mock.Mock(status_code=200)
+        get_session.return_value.request.side_effect = request
+
+        # call to VIM connector method
+        with mock.patch.object(self.vim, 'get_token', side_effect=get_token) as renew:
+            responses = self.vim.perform_requests([('GET', 'https://test/api/vm/{}'.format(index),
+                                                    {'x-vcloud-authorization': 'expired'})
+                                                   for index in range(8)])
+
+        # assert all the requests are retried with the token got by just one of them
+        self.assertEqual([response.status_code for response in responses], [200] * 8)
+        renew.assert_called_once_with()
+
+    @mock.patch('osm_ro.vimconn_vmware.SmartConnect')
+    def test_get_vcenter_content_reuses_the_session(self, smart_connect):
+        """
+        Testcase for reusing the vCenter service instance while its session is valid
+        """
+        self.vim.vcenter_ip, self.vim.vcenter_port = '10.0.0.1', 443
+        self.vim.vcenter_user, self.vim.vcenter_password = 'user', 'password'
+        content = smart_connect.return_value.RetrieveContent.return_value
+
+        # call to VIM connector method
+        first = self.vim.get_vcenter_content()
+        second = self.vim.get_vcenter_content()
+        self.assertEqual(first, second)
+        self.assertEqual(smart_connect.call_count, 1)
+
+        # a new connection should be opened after the session expires
+        content.sessionManager.currentSession = None
+        self.vim.get_vcenter_content()
+        self.assertEqual(smart_connect.call_count, 2)
+
+    @mock.patch('osm_ro.vimconn_vmware.vmodl')
+    @mock.patch.object(vimconnector, 'get_vcenter_content')
+    def test_wait_for_vcenter_tasks(self, get_vcenter_content, vmodl):
+        """
+        Testcase for waiting several vCenter tasks with the property collector
+        """
+        tasks = [mock.Mock(_moId='task-1'), mock.Mock(_moId='task-2')]
+        collector = mock.Mock()
+        get_vcenter_content.return_value = mock.Mock(), mock.Mock(propertyCollector=collector)
+
+        def update(version, moref, state):
+            change = mock.Mock(val=state)
+            change.name = 'info.state'
+            object_set = mock.Mock(obj=mock.Mock(_moId=moref), changeSet=[change])
+            return mock.Mock(version=version, filterSet=[mock.Mock(objectSet=[object_set])])
+
+        # assumed updates: both running, a timeout without changes, then each task finishes
+        collector.WaitForUpdatesEx.side_effect = [
+            update('1', 'task-1', vim.TaskInfo.State.running), None,
+            update('2', 'task-2', vim.TaskInfo.State.error), update('3', 'task-1', vim.TaskInfo.State.success)]
+
+        # call to VIM connector method
+        result = self.vim.wait_for_vcenter_tasks(tasks)
+
+        # assert the final states are returned without polling, and the filter is removed
+        self.assertEqual(result, {'task-1': vim.TaskInfo.State.success, 'task-2': vim.TaskInfo.State.error})
+        self.assertEqual(collector.WaitForUpdatesEx.call_count, 4)
+        self.assertEqual([c[0][0] for c in collector.WaitForUpdatesEx.call_args_list], [None, '1', '1', '2'])
+        collector.CreateFilter.return_value.Destroy.assert_called_once_with()
+
     @mock.patch.object(vimconnector,'get_catalogid')
     @mock.patch.object(vimconnector,'upload_vimimage')
     @mock.patch.object(Org,'create_catalog')
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+# pylint: disable=E1101
+
+import json
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+
+from ..workers import HashRing, WorkerPool, WorkerPoolException
+
+# Worker processes report what they receive by appending lines to this file.
+# A file is used instead of a multiprocessing.Queue, since killing a worker
+# could leave the queue locked
+_events_file = None
+_calculator = None  # RemoteService of the worker
+
+
+def _report(*event):
+    with open(_events_file, 'a') as events:
+        events.write(json.dumps(event) + '\n')
+
+
+class _FakeThread(threading.Thread):
+    def __init__(self, key):
+        threading.Thread.__init__(self)
+        self.key = key
+
+    def run(self):
+        _report('started', self.key, os.getpid())
+
+    def insert_task(self, task):
+        if isinstance(task, list) and task[0] == 'divide':
+            # as the real threads, it is done out of insert_task, that runs at the main loop of the worker
+            threading.Thread(target=self.divide, args=task[1:]).start()
+            return
+        _report('task', self.key, task, os.getpid())
+
+    def divide(self, dividend, divisor):
+        try:
+            _report('result', self.key, _calculator.divide(dividend, divisor), os.getpid())
+        except Exception as e:
+            _report('error', self.key, type(e).__name__, str(e))
+
+
+class _Calculator(object):
+    """Service of the main process"""
+
+    def divide(self, dividend, divisor):
+        return dividend / divisor, os.getpid()
+
+
+def _bootstrap(parent):
+    global _calculator
+    _calculator = parent.service('calculator')
+    return {'vim': _FakeThread}
+
+
+def _metrics():
+    return {'pid': os.getpid()}
+
+
+class _Events(object):
+    def __init__(self):
+        self.read = 0
+
+    def wait(self, number, timeout=10):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            with open(_events_file) as events:
+                lines = events.readlines()
+            if len(lines) >= self.read + number:
+                new = lines[self.read:self.read + number]
+                self.read += number
+                return [tuple(json.loads(line)) for line in new]
+            time.sleep(0.05)
+        raise AssertionError('Timeout waiting for {} events'.format(number))
+
+
+class TestHashRing(unittest.TestCase):
+    def test_get_is_stable_and_balanced(self):
+        # Given a ring with 4 nodes
+        ring = HashRing(range(4))
+        keys = ['account{}'.format(i) for i in range(4000)]
+        # when keys are assigned
+        assignment = {k: ring.get(k) for k in keys}
+        # then the assignment should be deterministic
+        self.assertEqual(assignment, {k: HashRing(range(4)).get(k) for k in keys})
+        # and all nodes should get a similar share
+        for node, count in Counter(assignment.values()).items():
+            self.assertGreater(count, 500, "node {} got only {} keys".format(node, count))
+
+    def test_adding_nodes_moves_few_keys(self):
+        # Given a ring with 4 nodes
+        ring = HashRing(range(4))
+        keys = ['account{}'.format(i) for i in range(4000)]
+        before = {k: ring.get(k) for k in keys}
+        # when a new node is added
+        ring.add(4)
+        after = {k: ring.get(k) for k in keys}
+        # then just the keys moved to the new node should change
+        moved = [k for k in keys if before[k] != after[k]]
+        self.assertTrue(all(after[k] == 4 for k in moved))
+        self.assertLess(len(moved), len(keys) / 3)
+
+    def test_empty_ring_raises(self):
+        self.assertRaises(WorkerPoolException, HashRing().get, 'x')
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        global _events_file
+        self.tmp_dir = tempfile.mkdtemp()
+        _events_file = os.path.join(self.tmp_dir, 'events')
+        open(_events_file, 'w').close()
+        self.events = _Events()
+        self.pool = WorkerPool(2, _bootstrap, check_interval=3600, metrics=_metrics)
+        self.pool.serve('calculator', _Calculator())
+        self.pool.start()
+
+    def tearDown(self):
+        self.pool.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_tasks_are_routed_to_the_owner_worker(self):
+        # Given threads started for several accounts
+        keys = ['dt{}'.format(i) for i in range(6)]
+        proxies = {k: self.pool.start_thread('vim', k, k) for k in keys}
+        started = {e[1]: e[2] for e in self.events.wait(len(keys))}
+        self.assertEqual(set(started), set(keys))
+        # when a task is sent to each of them
+        for key, proxy in proxies.items():
+            proxy.insert_task([{'uuid': key}])
+        received = self.events.wait(len(keys))
+        # then each task should be received by the right thread, at the same process that started it
+        for _, key, task, pid in received:
+            self.assertEqual(task, [{'uuid': key}])
+            self.assertEqual(pid, started[key])
+        # and accounts of different workers should run at different processes
+        pids = {self.pool.worker_for(k): started[k] for k in keys}
+        self.assertEqual(len(set(pids.values())), len(pids))
+
+    def test_exit_forgets_the_thread(self):
+        proxy = self.pool.start_thread('vim', 'dt0', 'dt0')
+        self.events.wait(1)
+        proxy.exit()
+        self.assertEqual(self.events.wait(1)[0][2], 'exit')
+        self.assertFalse(proxy.is_alive())
+        self.assertRaises(WorkerPoolException, proxy.insert_task, 'reload')
+
+    def test_dead_workers_are_restarted_with_their_threads(self):
+        # Given a thread running at a worker
+        proxy = self.pool.start_thread('vim', 'dt0', 'dt0')
+        old_pid = self.events.wait(1)[0][2]
+        # when the worker dies
+        os.kill(old_pid, signal.SIGKILL)
+        for _ in range(50):
+            if not self.pool._workers[self.pool.worker_for('dt0')][0].is_alive():
+                break
+            time.sleep(0.1)
+        # then the supervisor should restart it and spawn the thread again
+        self.assertEqual(self.pool.check_workers(), 1)
+        _, key, new_pid = self.events.wait(1)[0]
+        self.assertEqual(key, 'dt0')
+        self.assertNotEqual(new_pid, old_pid)
+        # and new tasks should reach the new thread
+        proxy.insert_task('reload')
+        self.assertEqual(self.events.wait(1)[0][1:],
+                         ('dt0', 'reload', new_pid))
+
+    def test_services_run_at_the_main_process(self):
+        # Given a thread running at a worker
+        proxy = self.pool.start_thread('vim', 'dt0', 'dt0')
+        worker_pid = self.events.wait(1)[0][2]
+        # when it calls a service of the main process
+        proxy.insert_task(['divide', 6, 3])
+        # then the call should be done at the main process, and its result returned to the thread
+        self.assertEqual(self.events.wait(1)[0][1:], ('dt0', [2, os.getpid()], worker_pid))
+        # and the exceptions raised at the thread
+        proxy.insert_task(['divide', 1, 0])
+        self.assertEqual(self.events.wait(1)[0][1:3], ('dt0', 'ZeroDivisionError'))
+
+    def test_metrics_of_the_workers(self):
+        deadline = time.time() + 10
+        while len(self.pool.get_metrics()) < 2 and time.time() < deadline:
+            time.sleep(0.05)
+        metrics = self.pool.get_metrics()
+        self.assertEqual(sorted(metrics), [0, 1])
+        self.assertEqual({m['pid'] for m in metrics.values()},
+                         {worker[0].pid for worker in self.pool._workers})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""Single pass extraction of data from the XML documents of vCloud Director.
+
+The documents returned by vCD for vApps, VMs or vApp templates are large
+(every section, link and extension of the object), while the vmware
+connector just needs a few values of them. Instead of running several regular
+expressions over the whole body and/or building the complete tree, the
+functions of this module walk the document once with ``iterparse``, matching
+namespace-qualified tags and clearing the elements already processed.
+"""
+
+from io import BytesIO
+
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+NAMESPACES = {
+    'vcloud': 'http://www.vmware.com/vcloud/v1.5',
+    'ovf': 'http://schemas.dmtf.org/ovf/envelope/1',
+    'rasd': 'http://schemas.dmtf.org/wbem/wscim/1/cim-schema/2/CIM_ResourceAllocationSettingData',
+    'vmw': 'http://www.vmware.com/schema/ovf',
+}
+
+
+def qname(prefix, tag):
+    """Return the qualified ``{namespace}tag`` name, as used by ElementTree"""
+    return '{{{}}}{}'.format(NAMESPACES[prefix], tag)
+
+
+VM = qname('vcloud', 'Vm')
+LINK = qname('vcloud', 'Link')
+NETWORK_CONNECTION = qname('vcloud', 'NetworkConnection')
+MAC_ADDRESS = qname('vcloud', 'MACAddress')
+IP_ADDRESS = qname('vcloud', 'IpAddress')
+CAPACITY = qname('vcloud', 'capacity')
+ITEM = qname('ovf', 'Item')
+DESCRIPTION = qname('rasd', 'Description')
+VIRTUAL_QUANTITY = qname('rasd', 'VirtualQuantity')
+HOST_RESOURCE = qname('rasd', 'HostResource')
+CORES_PER_SOCKET = qname('vmw', 'CoresPerSocket')
+FILE = qname('vcloud', 'File')
+TASK = qname('vcloud', 'Task')
+PROGRESS = qname('vcloud', 'Progress')
+
+
+def iterparse(content, events=('end',)):
+    """Iterate over the (event, element) of a document given as bytes or text"""
+    if not isinstance(content, bytes):
+        content = content.encode('utf-8')
+    return ElementTree.iterparse(BytesIO(content), events)
+
+
+def _int(text):
+    return int(text) if text else None
+
+
+def get_vm_details(content):
+    """Get the main data of a VM, vApp or vApp template document.
+
+    Returns:
+        dict with the keys ``name``, ``id``, ``href``, ``status`` (attributes
+        of the first Vm element, or of the root element if there is no Vm),
+        ``cpus``, ``memory_mb``, ``cores_per_socket``, ``hdd_mb`` (the first
+        values found, i.e. those of the first VM and its first hard disk) and
+        ``network_connections``, a list of
+        ``(network name, MAC address, IP address)`` of all the VMs of the
+        document. Values not found are None
+    """
+    details = dict.fromkeys(('name', 'id', 'href', 'status', 'cpus', 'memory_mb', 'cores_per_socket', 'hdd_mb'))
+    connections = []
+    root = None
+    vm_found = False
+    for event, element in iterparse(content, ('start', 'end')):
+        tag = element.tag
+        if event == 'start':
+            if root is None or tag == VM and not vm_found:
+                # attributes of the root element are used until a Vm is found
+                root = element if root is None else root
+                vm_found = tag == VM
+                for key in ('name', 'id', 'href', 'status'):
+                    details[key] = element.get(key)
+            continue
+        if tag == ITEM:
+            description = element.findtext(DESCRIPTION)
+            if description == 'Number of Virtual CPUs' and details['cpus'] is None:
+                details['cpus'] = _int(element.findtext(VIRTUAL_QUANTITY))
+            elif description == 'Memory Size' and details['memory_mb'] is None:
+                details['memory_mb'] = _int(element.findtext(VIRTUAL_QUANTITY))
+            elif description == 'Hard disk' and details['hdd_mb'] is None:
+                host_resource = element.find(HOST_RESOURCE)
+                if host_resource is not None:
+                    details['hdd_mb'] = _int(host_resource.get(CAPACITY))
+            element.clear()
+        elif tag == CORES_PER_SOCKET and details['cores_per_socket'] is None:
+            details['cores_per_socket'] = _int(element.text)
+        elif tag == NETWORK_CONNECTION:
+            connections.append((element.get('network'), element.findtext(MAC_ADDRESS),
+                                element.findtext(IP_ADDRESS)))
+            element.clear()
+    details['network_connections'] = connections
+    return details
+
+
+def get_network_connections(content):
+    """Get the network connections of a VM document or its NetworkConnectionSection.
+
+    Returns:
+        list of ``(network name, MAC address, IP address)``
+    """
+    connections = []
+    for _, element in iterparse(content):
+        if element.tag == NETWORK_CONNECTION:
+            connections.append((element.get('network'), element.findtext(MAC_ADDRESS),
+                                element.findtext(IP_ADDRESS)))
+            element.clear()
+    return connections
+
+
+def get_link_hrefs(content, rel):
+    """Get the href of the Link elements with the given ``rel``, in document order"""
+    hrefs = []
+    for _, element in iterparse(content):
+        if element.tag == LINK and element.get('rel') == rel:
+            hrefs.append(element.get('href'))
+    return hrefs
+
+
+def get_status(content):
+    """Get the status attribute of the root element of a document"""
+    for _, element in iterparse(content, ('start',)):
+        return _int(element.get('status'))
+
+
+def get_files(content):
+    """Get the files of a vApp template or media being uploaded.
+
+    Returns:
+        dict with the ``size``, ``bytes_transferred`` and upload ``href``
+        (None if not available) of each file name
+    """
+    files = {}
+    for _, element in iterparse(content):
+        if element.tag == FILE:
+            href = None
+            for link in element.iter(LINK):
+                if link.get('rel') == 'upload:default':
+                    href = link.get('href')
+                    break
+            files[element.get('name')] = {'size': _int(element.get('size')),
+                                          'bytes_transferred': _int(element.get('bytesTransferred')),
+                                          'href': href}
+            element.clear()
+    return files
+
+
+def get_tasks(content):
+    """Get the tasks running over an entity, as dicts with ``status``, ``operation`` and ``progress``"""
+    tasks = []
+    for _, element in iterparse(content):
+        if element.tag == TASK:
+            tasks.append({'status': element.get('status'), 'operation': element.get('operation'),
+                          'progress': _int(element.findtext(PROGRESS))})
+            element.clear()
+    return tasks
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+
+"""Rate limiter and concurrency governor of the calls to the VIMs.
+
+The calls to the connector of a VIM account, from its vim_thread and from the
+NBI (e.g. when provisioning images and flavors), go through a VimGovernor
+shared by all the connectors of the account. The limits are set at the config
+of the VIM account (datacenter_tenants.config), or of the datacenter:
+
+    api_rate_limit:     connector calls per second (token bucket). Unlimited if not set
+    api_burst:          bucket size, calls done at once after idle. Default: api_rate_limit
+    api_max_in_flight:  concurrent calls. Unlimited if not set
+    api_max_retries:    retries of a call rejected by the rate limits of the VIM. Default: 3
+
+The limits count calls to the methods of the connector, not HTTP requests: a
+call can send several requests to the VIM (e.g. authentication, or the list of
+servers and then their ports), so api_rate_limit has to be set below the rate
+limit of the VIM accordingly.
+
+When the VIM rejects a call because of its rate limits (HTTP 429, or
+vimconnRateLimitException) all the calls to the VIM wait for its Retry-After
+(or an exponential backoff) and the call is retried. The rate is also halved,
+and then increased again by small steps with each successful call, so that it
+converges to what the VIM can sustain instead of oscillating between overload
+and failures.
+"""
+
+import logging
+import threading
+from time import time, sleep
+
+import vimconn
+from circuit_breaker import GuardedConnector
+
+MAX_RETRIES = 3
+BACKOFF = 1  # seconds waited the first retry, when the VIM does not send Retry-After
+MAX_BACKOFF = 60
+MIN_RATE_FACTOR = 0.1  # the rate is not reduced below this fraction of api_rate_limit
+INCREASE_FACTOR = 0.05  # fraction of api_rate_limit recovered with each successful call
+
+governors = {}  # VIM account -> VimGovernor
+governors_lock = threading.Lock()
+
+
+def is_rate_limited(exception):
+    return isinstance(exception, vimconn.vimconnRateLimitException) or \
+        getattr(exception, "http_code", None) == vimconn.HTTP_Too_Many_Requests
+
+
+class TokenBucket(object):
+    """Token bucket that is filled at rate tokens per second, up to burst tokens"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self.tokens = self.burst
+        self.updated = time()
+
+    def reserve(self, now):
+        """Take a token. The bucket can be left in debt, then the seconds to wait for it are returned"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0, -self.tokens / self.rate)
+
+
+class VimGovernor(object):
+    """Limits the calls to a VIM, see module documentation. Thread safe
+
+    Arguments:
+        name (str): for logging and metrics
+        rate (float): connector calls per second. None for unlimited
+        burst (int): bucket size
+        max_in_flight (int): concurrent calls. None for unlimited
+        max_retries (int): retries of the calls rejected by the VIM rate limits
+    """
+
+    def __init__(self, name, rate=None, burst=None, max_in_flight=None, max_retries=MAX_RETRIES, logger=None):
+        self.name = name
+        self.logger = logger or logging.getLogger('openmano.vim.governor')
+        self.lock = threading.Lock()
+        self.resume_at = 0  # all the calls wait until then, after a rate limited request
+        self.calls = 0
+        self.throttled = 0  # calls rejected by the VIM rate limits
+        self.waited = 0.0  # seconds waited by the calls
+        self.configure(rate, burst, max_in_flight, max_retries)
+
+    def configure(self, rate=None, burst=None, max_in_flight=None, max_retries=MAX_RETRIES):
+        with self.lock:
+            self.settings = (rate, burst, max_in_flight, max_retries)
+            self.max_rate = rate
+            self.bucket = TokenBucket(rate, burst) if rate else None
+            # calls in flight keep the previous semaphore
+            self.in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+            self.max_retries = max_retries
+
+    def _wait_turn(self):
+        with self.lock:
+            now = time()
+            wait = max(0, self.resume_at - now)
+            if self.bucket:
+                wait = max(wait, self.bucket.reserve(now))
+            self.calls += 1
+            self.waited += wait
+        if wait:
+            sleep(wait)
+
+    def _slow_down(self, exception, attempt):
+        retry_after = getattr(exception, "retry_after", None)
+        delay = float(retry_after) if retry_after else min(BACKOFF * 2 ** attempt, MAX_BACKOFF)
+        with self.lock:
+            self.throttled += 1
+            self.resume_at = max(self.resume_at, time() + delay)
+            if self.bucket:
+                self.bucket.rate = max(self.max_rate * MIN_RATE_FACTOR, self.bucket.rate / 2.0)
+            rate = self.bucket.rate if self.bucket else None
+        self.logger.warning("VIM {} rate limited, retrying in {}s at {} calls/s: {}".format(
+            self.name, delay, rate or "unlimited", exception))
+
+    def _speed_up(self):
+        if self.bucket and self.bucket.rate < self.max_rate:
+            with self.lock:
+                self.bucket.rate = min(self.max_rate, self.bucket.rate + self.max_rate * INCREASE_FACTOR)
+
+    def call(self, function, *args, **kwargs):
+        attempt = 0
+        while True:
+            self._wait_turn()
+            in_flight = self.in_flight
+            if in_flight:
+                in_flight.acquire()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as e:
+                if not is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                self._slow_down(e, attempt)
+                attempt += 1
+                continue
+            finally:
+                if in_flight:
+                    in_flight.release()
+            self._speed_up()
+            return result
+
+    def metrics(self):
+        with self.lock:
+            return {"rate": self.bucket.rate if self.bucket else None, "max_rate": self.max_rate,
+                    "max_in_flight": self.settings[2], "calls": self.calls, "throttled": self.throttled,
+                    "waited": round(self.waited, 3), "paused_for": max(0, self.resume_at - time())}
+
+
+def _get_setting(config, key, kind, default=None, minimum=1):
+    value = config.get(key)
+    if value is None:
+        return default
+    try:
+        value = kind(value)
+    except (TypeError, ValueError):
+        value = None
+    if value is None or value < minimum:
+        raise vimconn.vimconnException("Invalid VIM config '{}': '{}'. It must be a number >= {}".format(
+            key, config[key], minimum))
+    return value
+
+
+def get_governor(vim_account, config):
+    """Return the governor of a VIM account, shared by all its connectors. It is reconfigured if the config changes"""
+    config = config or {}
+    settings = (_get_setting(config, "api_rate_limit", float), _get_setting(config, "api_burst", int),
+                _get_setting(config, "api_max_in_flight", int),
+                _get_setting(config, "api_max_retries", int, MAX_RETRIES, minimum=0))
+    with governors_lock:
+        governor = governors.get(vim_account)
+        if governor is None:
+            governor = governors[vim_account] = VimGovernor(vim_account, *settings)
+            return governor
+    if governor.settings != settings:
+        governor.configure(*settings)
+    return governor
+
+
+def governed(connector, vim_account, config):
+    """Return a proxy of connector whose method calls are done through the governor of the VIM account"""
+    return GuardedConnector(connector, get_governor(vim_account, config))
+
+
+def get_metrics():
+    with governors_lock:
+        current = list(governors.items())
+    return {vim_account: governor.metrics() for vim_account, governor in current}
@@ -54,34 +54,45 @@ The task content is (M: stored at memory, D: stored at database):
     MD  error_msg:  descriptive text upon an error.Stored also at database instance_XXX
     MD  created_at: task creation time
     MD  modified_at: last task update time. On refresh it contains when this task need to be refreshed
+    M   refresh_interval: seconds between the last refreshes. It grows while the element does not change
 
 """
 
 import threading
 import time
 import Queue
+from operator import itemgetter
 import logging
 import vimconn
-import vimconn_openvim
-import vimconn_aws
-import vimconn_opennebula
-import vimconn_openstack
-import vimconn_vmware
 import yaml
+from importlib import import_module
 from db_base import db_base_Exception
+from circuit_breaker import CircuitBreaker
+from vim_governor import governed
 from lib_osm_openvim.ovim import ovimException
 from copy import deepcopy
 
 __author__ = "Alfonso Tierno, Pablo Montes"
 __date__ = "$28-Sep-2017 12:07:15$"
 
-vim_module = {
-    "openvim": vimconn_openvim,
-    "aws": vimconn_aws,
-    "opennebula": vimconn_opennebula,
-    "openstack": vimconn_openstack,
-    "vmware": vimconn_vmware,
-}
+vim_module = {}  # VIM type -> connector module, imported the first time the type is used. See get_vim_module
+
+
+def get_vim_module(vim_type):
+    """Return the connector module 'vimconn_<vim_type>', importing it on first use, so that openmanod starts without
+    loading the SDKs of every VIM type, and a missing SDK only affects the VIMs of its type.
+    Raises ImportError if the module or its dependencies cannot be imported"""
+    module = vim_module.get(vim_type)
+    if module is None:
+        package = __name__.rpartition(".")[0]
+        module = import_module("{}vimconn_{}".format(package + "." if package else "", vim_type))
+        vim_module[vim_type] = module
+    return module
+
+
+def is_vim_unreachable(exception):
+    """Connector exceptions that count as failures for the circuit breaker of the thread"""
+    return isinstance(exception, vimconn.vimconnConnectionException)
 
 
 def is_task_id(task_id):
@@ -98,7 +109,11 @@ class VimThreadExceptionNotFound(VimThreadException):
 
 class vim_thread(threading.Thread):
     REFRESH_BUILD = 5  # 5 seconds
-    REFRESH_ACTIVE = 60  # 1 minute
+    REFRESH_ACTIVE = 60  # 1 minute. Elements not in BUILD are refreshed at this interval after changing, and
+    REFRESH_BACKOFF = 2  # the interval is multiplied by this at each refresh without changes,
+    REFRESH_ACTIVE_MAX = 600  # up to 10 minutes
+    REFRESH_VM_BATCH = 10  # VMs refreshed at each call to the VIM. All the due networks are refreshed at once
+    DEFER_TIMEOUT = 300  # 5 minutes. Tasks are deferred while the VIM is unreachable, then they fail without calling it
 
     def __init__(self, task_lock, name=None, datacenter_name=None, datacenter_tenant_id=None,
                  db=None, db_lock=None, ovim=None):
@@ -122,6 +137,8 @@ class vim_thread(threading.Thread):
         self.vim_persistent_info = {}
 
         self.logger = logging.getLogger('openmano.vim.' + self.name)
+        self.breaker = CircuitBreaker('vim.' + self.name, is_vim_unreachable, logger=self.logger)
+        """Opened when the VIM is unreachable. Then tasks are deferred and the connector is loaded with backoff"""
         self.db = db
         self.db_lock = db_lock
 
@@ -141,6 +158,20 @@ class vim_thread(threading.Thread):
                     <task2>  # e.g. DELETE task
         """
 
+    @classmethod
+    def configure_refresh(cls, build=None, active=None, active_max=None, backoff=None):
+        """Set the refresh intervals (seconds) of all the threads, from the 'vim_refresh_*' parameters of
+        openmanod.cfg. Set active_max equal to active to refresh at a fixed interval"""
+        if build:
+            cls.REFRESH_BUILD = float(build)
+        if active:
+            cls.REFRESH_ACTIVE = float(active)
+        if active_max:
+            cls.REFRESH_ACTIVE_MAX = float(active_max)
+        if backoff:
+            cls.REFRESH_BACKOFF = float(backoff)
+        cls.REFRESH_ACTIVE_MAX = max(cls.REFRESH_ACTIVE_MAX, cls.REFRESH_ACTIVE)
+
     def get_vimconnector(self):
         try:
             from_ = "datacenter_tenants as dt join datacenters as d on dt.datacenter_id=d.uuid"
@@ -164,18 +195,23 @@ class vim_thread(threading.Thread):
                 vim_config["wim_external_ports"] = self.ovim.get_of_port_mappings(
                     db_filter={"region": vim_config['datacenter_id'], "pci": None})
 
-            self.vim = vim_module[vim["type"]].vimconnector(
+            vim_connector = get_vim_module(vim["type"]).vimconnector(
                 uuid=vim['datacenter_id'], name=vim['datacenter_name'],
                 tenant_id=vim['vim_tenant_id'], tenant_name=vim['vim_tenant_name'],
                 url=vim['vim_url'], url_admin=vim['vim_url_admin'],
                 user=vim['user'], passwd=vim['passwd'],
                 config=vim_config, persistent_info=self.vim_persistent_info
             )
+            # calls are rate limited, and the breaker records them once retried
+            self.vim = self.breaker.guard(governed(vim_connector, self.datacenter_tenant_id, vim_config))
+            self.breaker.record_success()
             self.error_status = None
         except Exception as e:
             self.logger.error("Cannot load vimconnector for vim_account {}: {}".format(self.datacenter_tenant_id, e))
             self.vim = None
             self.error_status = "Error loading vimconnector: {}".format(e)
+            # retried at run with the backoff of the breaker
+            self.breaker.record_failure(e)
 
     def _reload_vim_actions(self):
         """
@@ -183,6 +219,10 @@ class vim_thread(threading.Thread):
         :return: None
         """
         try:
+            # clean previous content, as this is also called when the thread is reloaded
+            self.refresh_tasks = []
+            self.pending_tasks = []
+            self.grouped_tasks = {}
             action_completed = False
             task_list = []
             old_action_key = None
@@ -250,27 +290,36 @@ class vim_thread(threading.Thread):
             self.logger.critical("Unexpected exception at _reload_vim_actions: " + str(e), exc_info=True)
 
     def _refres_elements(self):
-        """Call VIM to get VMs and networks status until 10 elements"""
+        """Call VIM to get the status of up to REFRESH_VM_BATCH VMs and of all the networks due to be refreshed"""
+        if not self.breaker.allow():
+            return 0  # VIM unreachable, refresh later
         now = time.time()
         nb_processed = 0
         vm_to_refresh_list = []
         net_to_refresh_list = []
         vm_to_refresh_dict = {}
         net_to_refresh_dict = {}
-        items_to_refresh = 0
-        while self.refresh_tasks:
-            task = self.refresh_tasks[0]
+        # the due tasks are at the head of the time ordered list
+        nb_due = 0
+        due_tasks = []
+        for task in self.refresh_tasks:
             with self.task_lock:
-                if task['status'] == 'SUPERSEDED':
-                    self.refresh_tasks.pop(0)
-                    continue
                 if task['modified_at'] > now:
                     break
-                # task["status"] = "processing"
-                nb_processed += 1
-            self.refresh_tasks.pop(0)
+                if task['status'] != 'SUPERSEDED':
+                    due_tasks.append(task)
+            nb_due += 1
+        # VMs in BUILD (or just created) are taken first, as the number of VMs refreshed at once is limited. The sort is
+        # stable, so the time order is kept otherwise
+        due_tasks.sort(key=lambda task: task["item"] == 'instance_vms' and
+                       task["extra"].get("vim_status") not in (None, "BUILD"))
+        left_tasks = []
+        for task in due_tasks:
             if task["item"] == 'instance_vms':
                 if task["vim_id"] not in vm_to_refresh_dict:
+                    if len(vm_to_refresh_list) >= self.REFRESH_VM_BATCH:
+                        left_tasks.append(task)  # for next call
+                        continue
                     vm_to_refresh_dict[task["vim_id"]] = [task]
                     vm_to_refresh_list.append(task["vim_id"])
                 else:
@@ -284,9 +333,11 @@ class vim_thread(threading.Thread):
             else:
                 task_id = task["instance_action_id"] + "." + str(task["task_index"])
                 self.logger.critical("task={}: unknown task {}".format(task_id, task["item"]), exc_info=True)
-            items_to_refresh += 1
-            if items_to_refresh == 10:
-                break
+            # task["status"] = "processing"
+            nb_processed += 1
+        # the ones left keep their place at the head of the list
+        left_tasks.sort(key=itemgetter("modified_at"))
+        self.refresh_tasks[:nb_due] = left_tasks
 
         if vm_to_refresh_list:
             now = time.time()
@@ -400,10 +451,7 @@ class vim_thread(threading.Thread):
                                     "error_msg": task.get("error_msg"), "modified_at": now},
                             WHERE={'instance_action_id': task['instance_action_id'],
                                     'task_index': task['task_index']})
-                    if task["extra"].get("vim_status") == "BUILD":
-                        self._insert_refresh(task, now + self.REFRESH_BUILD)
-                    else:
-                        self._insert_refresh(task, now + self.REFRESH_ACTIVE)
+                    self._schedule_refresh(task, now, changed=task_need_update)
 
         if net_to_refresh_list:
             now = time.time()
@@ -453,8 +501,9 @@ class vim_thread(threading.Thread):
                     # update database
                     if vim_info_error_msg:
                         vim_info_error_msg = self._format_vim_error_msg(vim_info_error_msg)
-                    if task_vim_status != vim_info_status or task_error_msg != vim_info_error_msg or \
-                            (vim_info.get("vim_info") and task_vim_info != vim_info["vim_info"]):
+                    task_need_update = task_vim_status != vim_info_status or task_error_msg != vim_info_error_msg \
+                        or (vim_info.get("vim_info") and task_vim_info != vim_info["vim_info"])
+                    if task_need_update:
                         task["extra"]["vim_status"] = vim_info_status
                         task["error_msg"] = vim_info_error_msg
                         if vim_info.get("vim_info"):
@@ -469,13 +518,34 @@ class vim_thread(threading.Thread):
                                     "error_msg": task.get("error_msg"), "modified_at": now},
                             WHERE={'instance_action_id': task['instance_action_id'],
                                     'task_index': task['task_index']})
-                    if task["extra"].get("vim_status") == "BUILD":
-                        self._insert_refresh(task, now + self.REFRESH_BUILD)
-                    else:
-                        self._insert_refresh(task, now + self.REFRESH_ACTIVE)
+                    self._schedule_refresh(task, now, changed=task_need_update)
 
         return nb_processed
 
+    def _schedule_refresh(self, task, now, changed):
+        """Insert a refreshed task at the refreshing list. Elements in BUILD are refreshed every REFRESH_BUILD. The
+        others every REFRESH_ACTIVE after changing, and then less often (REFRESH_BACKOFF) while they do not change, up to
+        REFRESH_ACTIVE_MAX"""
+        if task["extra"].get("vim_status") == "BUILD":
+            interval = self.REFRESH_BUILD
+        elif changed:
+            interval = self.REFRESH_ACTIVE
+        else:
+            interval = min(max(task.get("refresh_interval", 0) * self.REFRESH_BACKOFF, self.REFRESH_ACTIVE),
+                           self.REFRESH_ACTIVE_MAX)
+        task["refresh_interval"] = interval
+        self._insert_refresh(task, now + interval)
+
+    def _refresh_now(self, item_ids=None):
+        """Refresh these elements (instance_vms/instance_nets uuids, or all if None) at next iteration, restarting
+        their refresh interval. Requested with the ("refresh", item_ids) message, e.g. after actions over VMs"""
+        now = time.time()
+        for task in self.refresh_tasks:
+            if item_ids is None or task["item_id"] in item_ids:
+                task["modified_at"] = now
+                task.pop("refresh_interval", None)
+        self.refresh_tasks.sort(key=itemgetter("modified_at"))
+
     def _insert_refresh(self, task, threshold_time=None):
         """Insert a task at list of refreshing elements. The refreshing list is ordered by threshold_time (task['modified_at']
         It is assumed that this is called inside this thread
@@ -517,6 +587,7 @@ class vim_thread(threading.Thread):
     def _proccess_pending_tasks(self):
         nb_created = 0
         nb_processed = 0
+        deferred_tasks = []
         while self.pending_tasks:
             task = self.pending_tasks.pop(0)
             nb_processed += 1
@@ -565,6 +636,18 @@ class vim_thread(threading.Thread):
                     task["error_msg"] = self.error_status
                     result = False
                     database_update = {"status": "VIM_ERROR", "error_msg": task["error_msg"]}
+                elif not self.breaker.allow():
+                    # VIM unreachable. Defer the task without updating database, until DEFER_TIMEOUT
+                    now = time.time()
+                    if now - task.setdefault("deferred_at", now) < self.DEFER_TIMEOUT:
+                        deferred_tasks.append(task)
+                        nb_processed -= 1
+                        continue
+                    task["status"] = "FAILED"
+                    task["error_msg"] = self._format_vim_error_msg("VIM unreachable: {}".format(
+                        self.breaker.last_error))
+                    result = False
+                    database_update = {"status": "VIM_ERROR", "error_msg": task["error_msg"]}
                 elif task["item"] == 'instance_vms':
                     if task["action"] == "CREATE":
                         result, database_update = self.new_vm(task)
@@ -664,6 +747,7 @@ class vim_thread(threading.Thread):
 
             if nb_created == 10:
                 break
+        self.pending_tasks[0:0] = deferred_tasks
         return nb_processed
 
     def _insert_pending_tasks(self, vim_actions_list):
@@ -772,6 +856,8 @@ class vim_thread(threading.Thread):
                         task = self.task_queue.get()
                         if isinstance(task, list):
                             self._insert_pending_tasks(task)
+                        elif isinstance(task, tuple) and task[0] == 'refresh':
+                            self._refresh_now(task[1])
                         elif isinstance(task, str):
                             if task == 'exit':
                                 return 0
@@ -781,6 +867,8 @@ class vim_thread(threading.Thread):
                         self.task_queue.task_done()
                     if reload_thread:
                         break
+                    if not self.vim and self.breaker.allow():
+                        self.get_vimconnector()
                     nb_processed = self._proccess_pending_tasks()
                     nb_processed += self._refres_elements()
                     if not nb_processed:
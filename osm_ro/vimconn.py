@@ -44,6 +44,7 @@ HTTP_Not_Found = 404
 HTTP_Method_Not_Allowed = 405 
 HTTP_Request_Timeout = 408
 HTTP_Conflict = 409
+HTTP_Too_Many_Requests = 429
 HTTP_Not_Implemented = 501
 HTTP_Service_Unavailable = 503 
 HTTP_Internal_Server_Error = 500 
@@ -64,6 +65,12 @@ class vimconnUnexpectedResponse(vimconnException):
     def __init__(self, message, http_code=HTTP_Service_Unavailable):
         vimconnException.__init__(self, message, http_code)
 
+class vimconnRateLimitException(vimconnException):
+    """The request is rejected by the API rate limits of the VIM. retry_after: seconds to wait, if sent by the VIM"""
+    def __init__(self, message, http_code=HTTP_Too_Many_Requests, retry_after=None):
+        vimconnException.__init__(self, message, http_code)
+        self.retry_after = retry_after
+
 class vimconnAuthException(vimconnException):
     """Invalid credentials or authorization to perform this action over the VIM"""
     def __init__(self, message, http_code=HTTP_Unauthorized):
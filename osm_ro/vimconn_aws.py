@@ -41,6 +41,12 @@ try:
 except:
     exit("Boto not avialable. Try activating your virtualenv OR `pip install boto`")
 
+# instance states of EC2, in mano format
+instanceState2manoFormat = {'pending': 'BUILD', 'running': 'ACTIVE', 'stopping': 'INACTIVE', 'stopped': 'INACTIVE',
+                            'shutting-down': 'DELETED', 'terminated': 'DELETED'}
+# maximum number of values of a describe filter, and of instances per describe page
+DESCRIBE_BATCH = 200
+
 
 class vimconnector(vimconn.vimconnector):
     def __init__(self, uuid, name, tenant_id, tenant_name, url, url_admin=None, user=None, passwd=None, log_level=None,
@@ -740,45 +746,76 @@ class vimconnector(vimconn.vimconnector):
         self.logger.debug("Getting VM instance information from VIM")
         try:
             self._reload_connection()
-            reservation = self.conn.get_all_instances(vm_list)[0]
+            vm_ids = list(vm_list)
             instances = {}
-            instance_dict = {}
-            for instance in reservation.instances:
-                try:
-                    if instance.state in ("pending"):
-                        instance_dict['status'] = "BUILD"
-                    elif instance.state in ("available", "running", "up"):
-                        instance_dict['status'] = 'ACTIVE'
-                    else:
-                        instance_dict['status'] = 'ERROR'
-                    instance_dict['error_msg'] = ""
-                    instance_dict['interfaces'] = []
-                    interface_dict = {}
-                    for interface in instance.interfaces:
-                        interface_dict['vim_interface_id'] = interface.id
-                        interface_dict['vim_net_id'] = interface.subnet_id
-                        interface_dict['mac_address'] = interface.mac_address
-                        if hasattr(interface, 'publicIp') and interface.publicIp != None:
-                            interface_dict['ip_address'] = interface.publicIp + ";" + interface.private_ip_address
-                        else:
-                            interface_dict['ip_address'] = interface.private_ip_address
-                        instance_dict['interfaces'].append(interface_dict)
-                except Exception as e:
-                    self.logger.error("Exception getting vm status: %s", str(e), exc_info=True)
-                    instance_dict['status'] = "DELETED"
-                    instance_dict['error_msg'] = str(e)
-                finally:
-                    try:
-                        instance_dict['vim_info'] = yaml.safe_dump(instance, default_flow_style=True, width=256)
-                    except yaml.YAMLError as e:
-                        # self.logger.error("Exception getting vm status: %s", str(e), exc_info=True)
-                        instance_dict['vim_info'] = str(instance)
-                instances[instance.id] = instance_dict
+            for index in range(0, len(vm_ids), DESCRIBE_BATCH):
+                instances.update(self._refresh_vms_batch(vm_ids[index:index + DESCRIBE_BATCH]))
+            for vm_id in vm_ids:
+                if vm_id not in instances:
+                    instances[vm_id] = {'status': 'DELETED', 'error_msg': 'VM not found', 'vim_info': None,
+                                        'interfaces': []}
             return instances
         except Exception as e:
             self.logger.error("Exception getting vm status: %s", str(e), exc_info=True)
             self.format_vimconn_exception(e)
 
+    def _refresh_vms_batch(self, vm_ids):
+        """Status of up to DESCRIBE_BATCH instances, with one paginated describe of the instances, one of their
+        network interfaces and one of their elastic IPs per DESCRIBE_BATCH interfaces"""
+        filters = {'instance-id': vm_ids}
+        reservations = []
+        next_token = None
+        while True:
+            page = self.conn.get_all_reservations(filters=filters, max_results=DESCRIBE_BATCH, next_token=next_token)
+            reservations += page
+            next_token = getattr(page, 'next_token', None)
+            if not next_token:
+                break
+
+        interfaces_by_vm = {}
+        for interface in self.conn.get_all_network_interfaces(filters={'attachment.instance-id': vm_ids}):
+            if interface.attachment:
+                interfaces_by_vm.setdefault(interface.attachment.instance_id, []).append(interface)
+        public_ips = {}
+        interface_ids = [interface.id for interfaces in interfaces_by_vm.values() for interface in interfaces]
+        for index in range(0, len(interface_ids), DESCRIBE_BATCH):
+            addresses = self.conn.get_all_addresses(
+                filters={'network-interface-id': interface_ids[index:index + DESCRIBE_BATCH]})
+            for address in addresses:
+                public_ips[address.network_interface_id] = address.public_ip
+
+        instances = {}
+        for reservation in reservations:
+            for instance in reservation.instances:
+                instance_dict = {'error_msg': "", 'interfaces': []}
+                if instance.state in instanceState2manoFormat:
+                    instance_dict['status'] = instanceState2manoFormat[instance.state]
+                else:
+                    instance_dict['status'] = 'OTHER'
+                    instance_dict['error_msg'] = "VIM status reported " + str(instance.state)
+                interfaces = sorted(interfaces_by_vm.get(instance.id, ()),
+                                    key=lambda i: int(getattr(i.attachment, 'device_index', 0) or 0))
+                for interface in interfaces:
+                    interface_dict = {'vim_interface_id': interface.id,
+                                      'vim_net_id': interface.subnet_id,
+                                      'mac_address': interface.mac_address,
+                                      'ip_address': interface.private_ip_address}
+                    public_ip = public_ips.get(interface.id) or getattr(interface, 'publicIp', None)
+                    if public_ip:
+                        interface_dict['ip_address'] = public_ip + ";" + interface.private_ip_address
+                    instance_dict['interfaces'].append(interface_dict)
+                vim_info = {'id': instance.id, 'state': instance.state, 'instance_type': instance.instance_type,
+                            'image_id': instance.image_id, 'launch_time': instance.launch_time,
+                            'placement': instance.placement, 'vpc_id': instance.vpc_id,
+                            'subnet_id': instance.subnet_id, 'private_ip_address': instance.private_ip_address,
+                            'ip_address': instance.ip_address}
+                try:
+                    instance_dict['vim_info'] = yaml.safe_dump(vim_info, default_flow_style=True, width=256)
+                except yaml.YAMLError:
+                    instance_dict['vim_info'] = str(vim_info)
+                instances[instance.id] = instance_dict
+        return instances
+
     def action_vminstance(self, vm_id, action_dict, created_items={}):
         """Send and action over a VM instance from VIM
         Returns the vm_id if the action was successfully sent to the VIM"""
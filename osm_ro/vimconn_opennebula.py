@@ -35,6 +35,10 @@ import oca
 import untangle
 import math
 import random
+import time
+
+# seconds a pool snapshot is reused, see _get_pool
+DEFAULT_POOL_CACHE_TTL = 10
 
 
 class vimconnector(vimconn.vimconnector):
@@ -48,6 +52,10 @@ class vimconnector(vimconn.vimconnector):
         self.persistent_info = persistent_info
         if tenant_id:
             self.tenant = tenant_id
+        # XML-RPC client and pool snapshots shared by all the methods, see _get_client and _get_pool
+        self.client = None
+        self.pool_cache_ttl = float(self.config.get("pool_cache_ttl", DEFAULT_POOL_CACHE_TTL))
+        self.pools = {}
 
     def __setitem__(self, index, value):
         """Set individuals parameters
@@ -57,12 +65,54 @@ class vimconnector(vimconn.vimconnector):
             self.tenant = value
         elif index == 'tenant_name':
             self.tenant = None
+        elif index in ('user', 'passwd', 'url'):
+            self.client = None
+            self.pools = {}
         vimconn.vimconnector.__setitem__(self, index, value)
 
+    def _get_client(self):
+        """Returns the oca client of this connector, created at first use"""
+        if not self.client:
+            self.client = oca.Client(self.user + ':' + self.passwd, self.url)
+        return self.client
+
+    def _get_pool(self, kind, refresh=False):
+        """Returns a snapshot of a whole pool and an index of its elements by id. The snapshot is downloaded with a
+        single info call and reused for pool_cache_ttl seconds
+        Params:
+            kind: 'vm', 'net' or 'template'
+            refresh: download the pool even if the snapshot has not expired
+        Returns a tuple (pool, {str(id): element})
+        """
+        now = time.time()
+        snapshot = self.pools.get(kind)
+        if refresh or not snapshot or snapshot[0] <= now:
+            pool_classes = {'vm': oca.VirtualMachinePool, 'net': oca.VirtualNetworkPool, 'template': oca.VmTemplatePool}
+            pool = pool_classes[kind](self._get_client())
+            pool.info()
+            snapshot = (now + self.pool_cache_ttl, pool, {str(element.id): element for element in pool}, now)
+            self.pools[kind] = snapshot
+        return snapshot[1], snapshot[2]
+
+    def _get_pool_element(self, kind, element_id):
+        """Returns the element of a pool with this id, or None if not found. A pool snapshot that does not contain the
+        element is downloaded again, unless it is brand new"""
+        _, index = self._get_pool(kind)
+        element = index.get(str(element_id))
+        if element is None and self.pools[kind][3] < time.time() - 1:
+            _, index = self._get_pool(kind, refresh=True)
+            element = index.get(str(element_id))
+        return element
+
+    def _invalidate_pools(self, *kinds):
+        """Forget the snapshots of the pools modified by this connector"""
+        for kind in kinds:
+            self.pools.pop(kind, None)
+
     def new_tenant(self, tenant_name, tenant_description):
         # '''Adds a new tenant to VIM with this name and description, returns the tenant identifier'''
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
+            client = self._get_client()
             group_list = oca.GroupPool(client)
             user_list = oca.UserPool(client)
             group_list.info()
@@ -113,7 +163,7 @@ class vimconnector(vimconn.vimconnector):
     def delete_tenant(self, tenant_id):
         """Delete a tenant from VIM. Returns the old tenant identifier"""
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
+            client = self._get_client()
             group_list = oca.GroupPool(client)
             user_list = oca.UserPool(client)
             group_list.info()
@@ -261,6 +311,7 @@ class vimconnector(vimconn.vimconnector):
             </params>\
             </methodCall>'.format(self.user, self.passwd, config, self.config["cluster"]["id"])
             r = requests.post(self.url, params)
+            self._invalidate_pools('net')
             obj = untangle.parse(str(r.content))
             return obj.methodResponse.params.param.value.array.data.value[1].i4.cdata.encode('utf-8')
         except Exception as e:
@@ -279,9 +330,7 @@ class vimconnector(vimconn.vimconnector):
         Returns the network list of dictionaries
         """
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            networkList = oca.VirtualNetworkPool(client)
-            networkList.info()
+            networkList, _ = self._get_pool('net')
             response = []
             if "name" in filter_dict.keys():
                 network_name_filter = filter_dict["name"]
@@ -310,16 +359,12 @@ class vimconnector(vimconn.vimconnector):
     def get_network(self, net_id):
         """Obtain network details of network id"""
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            networkList = oca.VirtualNetworkPool(client)
-            networkList.info()
+            network = self._get_pool_element('net', net_id)
             net = {}
-            for network in networkList:
-                if str(network.id) == str(net_id):
-                    net['id'] = net_id
-                    net['name'] = network.name
-                    net['status'] = "ACTIVE"
-                    break
+            if network is not None:
+                net['id'] = net_id
+                net['name'] = network.name
+                net['status'] = "ACTIVE"
             if net:
                 return net
             else:
@@ -334,14 +379,12 @@ class vimconnector(vimconn.vimconnector):
         """
         try:
             # self.delete_bridge_host()
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            networkList = oca.VirtualNetworkPool(client)
-            networkList.info()
+            network = self._get_pool_element('net', net_id)
             network_deleted = False
-            for network in networkList:
-                if str(network.id) == str(net_id):
-                    oca.VirtualNetwork.delete(network)
-                    network_deleted = True
+            if network is not None:
+                oca.VirtualNetwork.delete(network)
+                self._invalidate_pools('net')
+                network_deleted = True
             if network_deleted:
                 return net_id
             else:
@@ -353,12 +396,9 @@ class vimconnector(vimconn.vimconnector):
     def get_flavor(self, flavor_id):  # Esta correcto
         """Obtain flavor details from the  VIM"""
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            listaTemplate = oca.VmTemplatePool(client)
-            listaTemplate.info()
-            for template in listaTemplate:
-                if str(template.id) == str(flavor_id):
-                    return {'id': template.id, 'name': template.name}
+            template = self._get_pool_element('template', flavor_id)
+            if template is not None:
+                return {'id': template.id, 'name': template.name}
             raise vimconn.vimconnNotFoundException("Flavor {} not found".format(flavor_id))
         except Exception as e:
             self.logger.error("get flavor " + str(flavor_id) + " error: " + str(e))
@@ -368,7 +408,7 @@ class vimconnector(vimconn.vimconnector):
         """Adds a tenant flavor to VIM
             Returns the flavor identifier"""
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
+            client = self._get_client()
             template_name = flavor_data["name"][:-4]
             name = 'NAME = "{}" '.format(template_name)
             cpu = 'CPU = "{}" '.format(flavor_data["vcpus"])
@@ -379,6 +419,7 @@ class vimconnector(vimconn.vimconnector):
             sched_requeriments = 'CLUSTER_ID={}'.format(self.config["cluster"]["id"])
             template = name + cpu + vcpu + memory + context + graphics + sched_requeriments
             template_id = oca.VmTemplate.allocate(client, template)
+            self._invalidate_pools('template')
             return template_id
         except Exception as e:
             self.logger.error("Create new flavor error: " + str(e))
@@ -389,14 +430,12 @@ class vimconnector(vimconn.vimconnector):
             Returns the old flavor_id
         """
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            listaTemplate = oca.VmTemplatePool(client)
-            listaTemplate.info()
+            template = self._get_pool_element('template', flavor_id)
             self.logger.info("Deleting VIM flavor DELETE {}".format(self.url))
-            for template in listaTemplate:
-                if str(template.id) == str(flavor_id):
-                    template.delete()
-                    return template.id
+            if template is not None:
+                template.delete()
+                self._invalidate_pools('template')
+                return template.id
             raise vimconn.vimconnNotFoundException("Flavor {} not found".format(flavor_id))
         except Exception as e:
             self.logger.error("Delete flavor " + str(flavor_id) + " error: " + str(e))
@@ -416,7 +455,7 @@ class vimconnector(vimconn.vimconnector):
         # IMPORTANT!!!!! Modify python oca library path pool.py line 102
 
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
+            client = self._get_client()
             image_pool = oca.ImagePool(client)
             image_pool.info()
             images = []
@@ -465,45 +504,38 @@ class vimconnector(vimconn.vimconnector):
         self.logger.debug(
             "new_vminstance input: image='{}' flavor='{}' nics='{}'".format(image_id, flavor_id, str(net_list)))
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            listaTemplate = oca.VmTemplatePool(client)
-            listaTemplate.info()
-            for template in listaTemplate:
-                if str(template.id) == str(flavor_id):
-                    cpu = ' CPU = "{}"'.format(template.template.cpu)
-                    vcpu = ' VCPU = "{}"'.format(template.template.cpu)
-                    memory = ' MEMORY = "{}"'.format(template.template.memory)
-                    context = ' CONTEXT = [NETWORK = "YES",SSH_PUBLIC_KEY = "$USER[SSH_PUBLIC_KEY]" ]'
-                    graphics = ' GRAPHICS = [ LISTEN = "0.0.0.0", TYPE = "VNC" ]'
-                    disk = ' DISK = [ IMAGE_ID = {}]'.format(image_id)
-                    template_updated = cpu + vcpu + memory + context + graphics + disk 
-                    networkListVim = oca.VirtualNetworkPool(client)
-                    networkListVim.info()
-                    network = ""
-                    for net in net_list:
-                        network_found = False
-                        for network_existingInVim in networkListVim:
-                            if str(net["net_id"]) == str(network_existingInVim.id):
-                                net["vim_id"] = network_existingInVim["id"]
-                                network = 'NIC = [NETWORK = "{}",NETWORK_UNAME = "{}" ]'.format(
-                                    network_existingInVim.name, network_existingInVim.uname)
-                                network_found = True
-                                break
-                        if not network_found:
-                            raise vimconn.vimconnNotFoundException("Network {} not found".format(net["net_id"]))
-                        template_updated += network
-                    if isinstance(cloud_config, dict):
-                        if cloud_config.get("user-data"):
-                            if isinstance(cloud_config["user-data"], str):
-                                template_updated += cloud_config["user-data"]
-                            else:
-                                for u in cloud_config["user-data"]:
-                                    template_updated += u
-                    oca.VmTemplate.update(template, template_updated)
-                    self.logger.info(
-                        "Instanciating in OpenNebula a new VM name:{} id:{}".format(template.name, template.id))
-                    vminstance_id = template.instantiate(name=name)
-                    return str(vminstance_id), None
+            template = self._get_pool_element('template', flavor_id)
+            if template is not None:
+                cpu = ' CPU = "{}"'.format(template.template.cpu)
+                vcpu = ' VCPU = "{}"'.format(template.template.cpu)
+                memory = ' MEMORY = "{}"'.format(template.template.memory)
+                context = ' CONTEXT = [NETWORK = "YES",SSH_PUBLIC_KEY = "$USER[SSH_PUBLIC_KEY]" ]'
+                graphics = ' GRAPHICS = [ LISTEN = "0.0.0.0", TYPE = "VNC" ]'
+                disk = ' DISK = [ IMAGE_ID = {}]'.format(image_id)
+                template_updated = cpu + vcpu + memory + context + graphics + disk
+                network = ""
+                for net in net_list:
+                    network_existingInVim = self._get_pool_element('net', net["net_id"])
+                    if network_existingInVim is None:
+                        raise vimconn.vimconnNotFoundException("Network {} not found".format(net["net_id"]))
+                    net["vim_id"] = network_existingInVim["id"]
+                    network = 'NIC = [NETWORK = "{}",NETWORK_UNAME = "{}" ]'.format(
+                        network_existingInVim.name, network_existingInVim.uname)
+                    template_updated += network
+                if isinstance(cloud_config, dict):
+                    if cloud_config.get("user-data"):
+                        if isinstance(cloud_config["user-data"], str):
+                            template_updated += cloud_config["user-data"]
+                        else:
+                            for u in cloud_config["user-data"]:
+                                template_updated += u
+                oca.VmTemplate.update(template, template_updated)
+                self._invalidate_pools('template')
+                self.logger.info(
+                    "Instanciating in OpenNebula a new VM name:{} id:{}".format(template.name, template.id))
+                vminstance_id = template.instantiate(name=name)
+                self._invalidate_pools('vm')
+                return str(vminstance_id), None
             raise vimconn.vimconnNotFoundException("Flavor {} not found".format(flavor_id))
         except Exception as e:
             self.logger.error("Create new vm instance error: " + str(e))
@@ -512,14 +544,7 @@ class vimconnector(vimconn.vimconnector):
     def delete_vminstance(self, vm_id, created_items=None):
         """Removes a VM instance from VIM, returns the deleted vm_id"""
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            vm_pool = oca.VirtualMachinePool(client)
-            vm_pool.info()
-            vm_exist = False
-            for i in vm_pool:
-                if str(i.id) == str(vm_id):
-                    vm_exist = True
-                    break
+            vm_exist = self._get_pool_element('vm', vm_id) is not None
             if not vm_exist:
                 self.logger.info("The vm " + str(vm_id) + " does not exist or is already deleted")
                 raise vimconn.vimconnNotFoundException("The vm {} does not exist or is already deleted".format(vm_id))
@@ -539,6 +564,7 @@ class vimconnector(vimconn.vimconnector):
                         </params>\
                         </methodCall>'.format(self.user, self.passwd, str(vm_id), str(3))
             r = requests.post(self.url, params)
+            self._invalidate_pools('vm')
             obj = untangle.parse(str(r.content))
             response_success = obj.methodResponse.params.param.value.array.data.value[0].boolean.cdata.encode('utf-8')
             response = obj.methodResponse.params.param.value.array.data.value[1].i4.cdata.encode('utf-8')
@@ -553,27 +579,20 @@ class vimconnector(vimconn.vimconnector):
             raise vimconn.vimconnException(e)
 
     def refresh_vms_status(self, vm_list):
-        """Refreshes the status of the virtual machines"""
+        """Refreshes the status of the virtual machines. The whole batch is obtained from a single snapshot of the
+        virtual machine pool"""
         vm_dict = {}
         try:
-            client = oca.Client(self.user + ':' + self.passwd, self.url)
-            vm_pool = oca.VirtualMachinePool(client)
-            vm_pool.info()
+            _, vm_index = self._get_pool('vm')
             for vm_id in vm_list:
                 vm = {"interfaces": []}
-                vm_exist = False
-                vm_element = None
-                for i in vm_pool:
-                    if str(i.id) == str(vm_id):
-                        vm_exist = True
-                        vm_element = i
-                        break
-                if not vm_exist:
+                vm_element = vm_index.get(str(vm_id))
+                if vm_element is None:
                     self.logger.info("The vm " + str(vm_id) + " does not exist.")
                     vm['status'] = "DELETED"
                     vm['error_msg'] = ("The vm " + str(vm_id) + " does not exist.")
+                    vm_dict[vm_id] = vm
                     continue
-                vm_element.info()
                 vm["vim_info"] = None
                 VMstatus = vm_element.str_lcm_state
                 if VMstatus == "RUNNING":
@@ -601,9 +620,8 @@ class vimconnector(vimconn.vimconnector):
             return vm_dict
         except Exception as e:
             self.logger.error(e)
-            for k in vm_dict:
-                vm_dict[k]["status"] = "VIM_ERROR"
-                vm_dict[k]["error_msg"] = str(e)
+            for k in vm_list:
+                vm_dict[k] = {"status": "VIM_ERROR", "error_msg": str(e)}
             return vm_dict
 
     def refresh_nets_status(self, net_list):
@@ -624,27 +642,19 @@ class vimconnector(vimconn.vimconnector):
         """
         net_dict = {}
         try:
+            _, net_index = self._get_pool('net')
             for net_id in net_list:
-                net = {}
-                try:
-                    net_vim = self.get_network(net_id)
-                    net["status"] = net_vim["status"]
-                    net["vim_info"] = None
-                except vimconn.vimconnNotFoundException as e:
-                    self.logger.error("Exception getting net status: {}".format(str(e)))
-                    net['status'] = "DELETED"
-                    net['error_msg'] = str(e)
-                except vimconn.vimconnException as e:
-                    self.logger.error(e)
-                    net["status"] = "VIM_ERROR"
-                    net["error_msg"] = str(e)
-                net_dict[net_id] = net
+                if str(net_id) in net_index:
+                    net_dict[net_id] = {"status": "ACTIVE", "vim_info": None}
+                else:
+                    error_msg = "Network {} not found".format(net_id)
+                    self.logger.error("Exception getting net status: {}".format(error_msg))
+                    net_dict[net_id] = {"status": "DELETED", "error_msg": error_msg}
             return net_dict
-        except vimconn.vimconnException as e:
+        except Exception as e:
             self.logger.error(e)
-            for k in net_dict:
-                net_dict[k]["status"] = "VIM_ERROR"
-                net_dict[k]["error_msg"] = str(e)
+            for k in net_list:
+                net_dict[k] = {"status": "VIM_ERROR", "error_msg": str(e)}
             return net_dict
 
     # to be used and fixed in future commits... not working properly
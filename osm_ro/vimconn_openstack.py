@@ -36,6 +36,7 @@ __author__ = "Alfonso Tierno, Gerardo Garcia, Pablo Montes, xFlow Research, Igor
 __date__  = "$22-sep-2017 23:59:59$"
 
 import vimconn
+from keystone_cache import token_cache, cache_key, expiration as token_expiration
 # import json
 import logging
 import netaddr
@@ -46,6 +47,7 @@ import re
 import copy
 from pprint import pformat
 from types import StringTypes
+from multiprocessing.pool import ThreadPool
 
 from novaclient import client as nClient, exceptions as nvExceptions
 from keystoneauth1.identity import v2, v3
@@ -75,9 +77,16 @@ netStatus2manoFormat={'ACTIVE':'ACTIVE','PAUSED':'PAUSED','INACTIVE':'INACTIVE',
 
 supportedClassificationTypes = ['legacy_flow_classifier']
 
+# ids filtered at each neutron list request of refresh_nets_status, to keep the URL short
+NETS_REFRESH_CHUNK = 80
+
 #global var to have a timeout creating and deleting volumes
 volume_timeout = 600
 server_timeout = 600
+# seconds the lists of flavors and images are reused, see _get_cached_flavors and _get_cached_images
+DEFAULT_CACHE_TTL = 60
+# ports deleted in parallel, as neutron does not support bulk deletion
+DEFAULT_DELETE_CONCURRENCY = 8
 
 
 class SafeDumper(yaml.SafeDumper):
@@ -135,6 +144,10 @@ class vimconnector(vimconn.vimconnector):
         # self.glancev1 = self.session.get('glancev1')
         self.keystone = self.session.get('keystone')
         self.api_version3 = self.session.get('api_version3')
+        # lists of flavors and images, kept with the session so they are shared by the connectors of the same VIM
+        self.cache = self.session.setdefault('cache', {})
+        self.cache_ttl = float(self.config.get('cache_ttl', DEFAULT_CACHE_TTL))
+        self.delete_concurrency = int(self.config.get('delete_concurrency', DEFAULT_DELETE_CONCURRENCY))
         self.vim_type = self.config.get("vim_type")
         if self.vim_type:
             self.vim_type = self.vim_type.upper()
@@ -177,6 +190,7 @@ class vimconnector(vimconn.vimconnector):
         else:
             vimconn.vimconnector.__setitem__(self, index, value)
         self.session['reload_client'] = True
+        self.cache.clear()
 
     def serialize(self, value):
         """Serialization of python basic types.
@@ -202,7 +216,9 @@ class vimconnector(vimconn.vimconnector):
         Throw keystoneclient.apiclient.exceptions.AuthorizationFailure
         '''
         #TODO control the timing and possible token timeout, but it seams that python client does this task for us :-)
-        if self.session['reload_client']:
+        if not self.session['reload_client']:
+            self._store_token()  # keystoneauth authenticates again when the token is rejected
+        else:
             if self.config.get('APIversion'):
                 self.api_version3 = self.config['APIversion'] == 'v3.3' or self.config['APIversion'] == '3'
             else:  # get from ending auth_url that end with v3 or with v2.0
@@ -232,9 +248,14 @@ class vimconnector(vimconn.vimconnector):
                                    password=self.passwd,
                                    tenant_name=self.tenant_name,
                                    tenant_id=self.tenant_id)
-            sess = session.Session(auth=auth, verify=self.verify)
             # addedd region_name to keystone, nova, neutron and cinder to support distributed cloud for Wind River Titanium cloud and StarlingX
             region_name = self.config.get('region_name')
+            # reuse the token and catalog obtained by other connector of the same cloud and credentials
+            token_key = cache_key(auth, region_name)
+            token_cached = token_key and token_cache.get(token_key)
+            if token_cached:
+                auth.set_auth_state(token_cached['auth_state'])
+            sess = session.Session(auth=auth, verify=self.verify)
             if self.api_version3:
                 self.keystone = ksClient_v3.Client(session=sess, endpoint_type=self.endpoint_type, region_name=region_name)
             else:
@@ -257,7 +278,9 @@ class vimconnector(vimconn.vimconnector):
                 self.my_tenant_id = self.session['my_tenant_id'] = sess.get_project_id()
             except Exception as e:
                 self.logger.error("Cannot get project_id from session", exc_info=True)
-            if self.endpoint_type == "internalURL":
+            if self.endpoint_type == "internalURL" and token_cached and token_cached.get('glance_endpoint'):
+                glance_endpoint = token_cached['glance_endpoint']
+            elif self.endpoint_type == "internalURL":
                 glance_service_id = self.keystone.services.list(name="glance")[0].id
                 glance_endpoint = self.keystone.endpoints.list(glance_service_id, interface="internal")[0].url
             else:
@@ -266,6 +289,8 @@ class vimconnector(vimconn.vimconnector):
             # using version 1 of glance client in new_image()
             # self.glancev1 = self.session['glancev1'] = glClient.Client('1', session=sess,
             #                                                            endpoint=glance_endpoint)
+            self.session.update(auth=auth, token_key=token_key, auth_token=None, glance_endpoint=glance_endpoint)
+            self._store_token()
             self.session['reload_client'] = False
             self.persistent_info['session'] = self.session
             # add availablity zone info inside  self.persistent_info
@@ -273,6 +298,16 @@ class vimconnector(vimconn.vimconnector):
             self.persistent_info['availability_zone'] = self.availability_zone
             self.security_groups_id = None  # force to get again security_groups_ids next time they are needed
 
+    def _store_token(self):
+        """Store the authentication state of the session at the token cache, if its token is new"""
+        auth = self.session.get('auth')
+        token_key = self.session.get('token_key')
+        if not token_key or not auth.auth_ref or auth.auth_ref.auth_token == self.session['auth_token']:
+            return
+        token_cache.set(token_key, auth.get_auth_state(), token_expiration(auth),
+                        glance_endpoint=self.session['glance_endpoint'])
+        self.session['auth_token'] = auth.auth_ref.auth_token
+
     def __net_os2mano(self, net_list_dict):
         '''Transform the net openstack format to mano format
         net_list_dict can be a list of dict or a single dict'''
@@ -392,9 +427,29 @@ class vimconnector(vimconn.vimconnector):
         # Types. Also, abstract vimconnector should call the validation
         # method before the implemented VIM connectors are called.
 
+    @staticmethod
+    def _is_rate_limited(exception):
+        '''Too many requests (429) answers, or over limit (413) with Retry-After, as nova also answers 413 when a quota
+        is exceeded, which is not solved by retrying. Each client stores the HTTP status at a different attribute'''
+        if isinstance(exception, (nvExceptions.ClientException, ksExceptions.ClientException,
+                                  neExceptions.NeutronClientException, gl1Exceptions.HTTPException)):
+            status = getattr(exception, "http_status", None) or getattr(exception, "status_code", None) or \
+                getattr(exception, "code", None)
+            if status == 413:
+                return bool(getattr(exception, "retry_after", None))
+            return status == vimconn.HTTP_Too_Many_Requests
+        return False
+
     def _format_exception(self, exception):
         '''Transform a keystone, nova, neutron  exception into a vimconn exception'''
-        if isinstance(exception, (neExceptions.NetworkNotFoundClient, nvExceptions.NotFound, ksExceptions.NotFound, gl1Exceptions.HTTPNotFound)):
+        if isinstance(exception, (ksExceptions.Unauthorized, nvExceptions.Unauthorized, neExceptions.Unauthorized)) \
+                and self.session.get('token_key'):
+            # rejected even after authenticating again, so the cached token is not valid for other connectors either
+            token_cache.invalidate(self.session['token_key'])
+        if self._is_rate_limited(exception):
+            raise vimconn.vimconnRateLimitException(type(exception).__name__ + ": " + str(exception),
+                                                    retry_after=getattr(exception, "retry_after", None))
+        elif isinstance(exception, (neExceptions.NetworkNotFoundClient, nvExceptions.NotFound, ksExceptions.NotFound, gl1Exceptions.HTTPNotFound)):
             raise vimconn.vimconnNotFoundException(type(exception).__name__ + ": " + str(exception))
         elif isinstance(exception, (HTTPException, gl1Exceptions.HTTPException, gl1Exceptions.CommunicationError,
                                ConnectionError, ksExceptions.ConnectionError, neExceptions.ConnectionFailed)):
@@ -604,12 +659,39 @@ class vimconnector(vimconn.vimconnector):
                 self.logger.error("osconnector.get_network(): Error getting subnet %s %s" % (net_id, str(e)))
                 subnet = {"id": subnet_id, "fault": str(e)}
             subnets.append(subnet)
+        self.__net_add_details(net, subnets)
+        return net
+
+    @staticmethod
+    def __net_add_details(net, subnets):
+        '''Fill the subnets and encapsulation information of a network obtained from neutron'''
         net["subnets"] = subnets
         net["encapsulation"] = net.get('provider:network_type')
         net["encapsulation_type"] = net.get('provider:network_type')
         net["segmentation_id"] = net.get('provider:segmentation_id')
         net["encapsulation_id"] = net.get('provider:segmentation_id')
-        return net
+
+    def get_networks(self, net_ids):
+        '''Obtain details of several networks, with the same format as get_network, using a single list of networks
+        and a single list of subnets
+        Returns a dict of the networks found by id'''
+        self.logger.debug("Getting tenant networks %s from VIM", net_ids)
+        try:
+            self._reload_connection()
+            net_list = self.neutron.list_networks(id=list(net_ids))["networks"]
+            self.__net_os2mano(net_list)
+            subnets = {}
+            if net_list:
+                subnet_list = self.neutron.list_subnets(network_id=[net["id"] for net in net_list])["subnets"]
+                subnets = {subnet["id"]: subnet for subnet in subnet_list}
+        except (neExceptions.ConnectionFailed, ksExceptions.ClientException, neExceptions.NeutronException, ConnectionError) as e:
+            self._format_exception(e)
+        nets = {}
+        for net in net_list:
+            self.__net_add_details(net, [subnets.get(subnet_id, {"id": subnet_id, "fault": "Subnet not found"})
+                                         for subnet_id in net.get("subnets", ())])
+            nets[net["id"]] = net
+        return nets
 
     def delete_network(self, net_id):
         '''Deletes a tenant network from VIM. Returns the old network identifier'''
@@ -617,18 +699,36 @@ class vimconnector(vimconn.vimconnector):
         try:
             self._reload_connection()
             #delete VM ports attached to this networks before the network
-            ports = self.neutron.list_ports(network_id=net_id)
-            for p in ports['ports']:
-                try:
-                    self.neutron.delete_port(p["id"])
-                except Exception as e:
-                    self.logger.error("Error deleting port %s: %s", p["id"], str(e))
+            ports = self.neutron.list_ports(network_id=net_id, fields=["id"])
+            for port_id, e in self._delete_ports([p["id"] for p in ports['ports']]).items():
+                self.logger.error("Error deleting port %s: %s", port_id, str(e))
             self.neutron.delete_network(net_id)
             return net_id
         except (neExceptions.ConnectionFailed, neExceptions.NetworkNotFoundClient, neExceptions.NeutronException,
                 ksExceptions.ClientException, neExceptions.NeutronException, ConnectionError) as e:
             self._format_exception(e)
 
+    def _delete_ports(self, port_ids):
+        """Delete several ports, concurrently up to the 'delete_concurrency' config value. Ports not found are
+        considered deleted. Returns a dictionary with the exception of each port that could not be deleted"""
+        def delete(port_id):
+            try:
+                self.neutron.delete_port(port_id)
+            except neExceptions.NotFound:
+                pass
+            except Exception as e:
+                return port_id, e
+            return port_id, None
+
+        concurrency = min(self.delete_concurrency, len(port_ids))
+        pool = ThreadPool(concurrency) if concurrency > 1 else None
+        try:
+            results = pool.map(delete, port_ids) if pool else [delete(port_id) for port_id in port_ids]
+        finally:
+            if pool:
+                pool.close()
+        return {port_id: e for port_id, e in results if e}
+
     def refresh_nets_status(self, net_list):
         '''Get the status of the networks
            Params: the list of network identifiers
@@ -645,12 +745,28 @@ class vimconnector(vimconn.vimconnector):
                     error_msg:  #Text with VIM error message, if any. Or the VIM connection ERROR
                     vim_info:   #Text with plain information obtained from vim (yaml.safe_dump)
 
+           Networks are obtained in chunks of NETS_REFRESH_CHUNK ids, with a list of networks and a list of subnets
+           per chunk
         '''
         net_dict={}
-        for net_id in net_list:
-            net = {}
+        net_ids = list(net_list)
+        for index in range(0, len(net_ids), NETS_REFRESH_CHUNK):
+            chunk = net_ids[index:index + NETS_REFRESH_CHUNK]
             try:
-                net_vim = self.get_network(net_id)
+                nets_vim = self.get_networks(chunk)
+            except vimconn.vimconnException as e:
+                self.logger.error("Exception getting net status: %s", str(e))
+                for net_id in chunk:
+                    net_dict[net_id] = {"status": "VIM_ERROR", "error_msg": str(e)}
+                continue
+            for net_id in chunk:
+                net = {}
+                net_vim = nets_vim.get(net_id)
+                if not net_vim:
+                    error_msg = "Network '{}' not found".format(net_id)
+                    self.logger.error("Exception getting net status: %s", error_msg)
+                    net_dict[net_id] = {"status": "DELETED", "error_msg": error_msg}
+                    continue
                 if net_vim['status'] in netStatus2manoFormat:
                     net["status"] = netStatus2manoFormat[ net_vim['status'] ]
                 else:
@@ -664,17 +780,59 @@ class vimconnector(vimconn.vimconnector):
 
                 if net_vim.get('fault'):  #TODO
                     net['error_msg'] = str(net_vim['fault'])
-            except vimconn.vimconnNotFoundException as e:
-                self.logger.error("Exception getting net status: %s", str(e))
-                net['status'] = "DELETED"
-                net['error_msg'] = str(e)
-            except vimconn.vimconnException as e:
-                self.logger.error("Exception getting net status: %s", str(e))
-                net['status'] = "VIM_ERROR"
-                net['error_msg'] = str(e)
-            net_dict[net_id] = net
+                net_dict[net_id] = net
         return net_dict
 
+    def _get_cached(self, key, load):
+        '''Return the cached value of key, calling load to obtain it again once cache_ttl seconds have passed'''
+        now = time.time()
+        entry = self.cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        value = load()
+        self.cache[key] = (now + self.cache_ttl, value)
+        return value
+
+    def _invalidate_cache(self, *keys):
+        for key in keys:
+            self.cache.pop(key, None)
+
+    def _load_flavors(self):
+        '''Get all the flavors as (id, (ram, vcpus, disk), extra_specs), plus the set of used names'''
+        flavors = []
+        names = set()
+        for flavor in self.nova.flavors.list():
+            # extra specs are included at the list since microversion 2.61, otherwise they need a call per flavor
+            epa = flavor.to_dict().get('extra_specs')
+            if epa is None:
+                epa = flavor.get_keys()
+            flavors.append((flavor.id, (flavor.ram, flavor.vcpus, flavor.disk), epa))
+            names.add(flavor.name)
+        return {'flavors': flavors, 'names': names}
+
+    def _get_cached_flavors(self):
+        self._reload_connection()
+        return self._get_cached('flavors', self._load_flavors)
+
+    def _load_images(self):
+        '''Get all the images, indexed by id, name, checksum and location'''
+        images = []
+        index = {'id': {}, 'name': {}, 'checksum': {}, 'location': {}}
+        for image in self.glance.images.list():
+            try:
+                image = image.copy()
+            except gl1Exceptions.HTTPNotFound:
+                continue
+            images.append(image)
+            for key in index:
+                if image.get(key):
+                    index[key].setdefault(image[key], []).append(image)
+        return {'images': images, 'index': index}
+
+    def _get_cached_images(self):
+        self._reload_connection()
+        return self._get_cached('images', self._load_images)
+
     def get_flavor(self, flavor_id):
         '''Obtain flavor details from the  VIM. Returns the flavor dict details'''
         self.logger.debug("Getting flavor '%s'", flavor_id)
@@ -696,7 +854,6 @@ class vimconnector(vimconn.vimconnector):
         """
         exact_match = False if self.config.get('use_existing_flavors') else True
         try:
-            self._reload_connection()
             flavor_candidate_id = None
             flavor_candidate_data = (10000, 10000, 10000)
             flavor_target = (flavor_dict["ram"], flavor_dict["vcpus"], flavor_dict["disk"])
@@ -709,16 +866,14 @@ class vimconnector(vimconn.vimconnector):
                 #     raise vimconn.vimconnNotFoundException("Cannot find any flavor with more than one numa")
                 # numa=numas[0]
                 # numas = extended.get("numas")
-            for flavor in self.nova.flavors.list():
-                epa = flavor.get_keys()
+            for flavor_id, flavor_data, epa in self._get_cached_flavors()['flavors']:
                 if epa:
                     continue
                     # TODO
-                flavor_data = (flavor.ram, flavor.vcpus, flavor.disk)
                 if flavor_data == flavor_target:
-                    return flavor.id
+                    return flavor_id
                 elif not exact_match and flavor_target < flavor_data < flavor_candidate_data:
-                    flavor_candidate_id = flavor.id
+                    flavor_candidate_id = flavor_id
                     flavor_candidate_data = flavor_data
             if not exact_match and flavor_candidate_id:
                 return flavor_candidate_id
@@ -743,10 +898,7 @@ class vimconnector(vimconn.vimconnector):
                     self._reload_connection()
                     if change_name_if_used:
                         #get used names
-                        fl_names=[]
-                        fl=self.nova.flavors.list()
-                        for f in fl:
-                            fl_names.append(f.name)
+                        fl_names = self._get_cached_flavors()['names']
                         while name in fl_names:
                             name_suffix += 1
                             name = flavor_data['name']+"-" + str(name_suffix)
@@ -796,6 +948,7 @@ class vimconnector(vimconn.vimconnector):
                                 #     #TODO, add the key 'pci_passthrough:alias"="<label at config>:<number ifaces>"' when a way to connect it is available
 
                     #create flavor
+                    self._invalidate_cache('flavors')
                     new_flavor=self.nova.flavors.create(name,
                                     ram,
                                     vcpus,
@@ -805,6 +958,7 @@ class vimconnector(vimconn.vimconnector):
                     #add metadata
                     if numa_properties:
                         new_flavor.set_keys(numa_properties)
+                    self._invalidate_cache('flavors')
                     return new_flavor.id
                 except nvExceptions.Conflict as e:
                     if change_name_if_used and retry < max_retries:
@@ -819,6 +973,7 @@ class vimconnector(vimconn.vimconnector):
         '''
         try:
             self._reload_connection()
+            self._invalidate_cache('flavors')
             self.nova.flavors.delete(flavor_id)
             return flavor_id
         #except nvExceptions.BadRequest as e:
@@ -841,6 +996,7 @@ class vimconnector(vimconn.vimconnector):
             retry+=1
             try:
                 self._reload_connection()
+                self._invalidate_cache('images')
                 #determine format  http://docs.openstack.org/developer/glance/formats.html
                 if "disk_format" in image_dict:
                     disk_format=image_dict["disk_format"]
@@ -887,6 +1043,7 @@ class vimconnector(vimconn.vimconnector):
                 else:
                     metadata_to_load['location'] = image_dict['location']
                 self.glance.images.update(new_image.id, **metadata_to_load)
+                self._invalidate_cache('images')
                 return new_image.id
             except (nvExceptions.Conflict, ksExceptions.ClientException, nvExceptions.ClientException) as e:
                 self._format_exception(e)
@@ -903,6 +1060,7 @@ class vimconnector(vimconn.vimconnector):
         '''
         try:
             self._reload_connection()
+            self._invalidate_cache('images')
             self.glance.images.delete(image_id)
             return image_id
         except (nvExceptions.NotFound, ksExceptions.ClientException, nvExceptions.ClientException, gl1Exceptions.CommunicationError, gl1Exceptions.HTTPNotFound, ConnectionError) as e: #TODO remove
@@ -911,11 +1069,9 @@ class vimconnector(vimconn.vimconnector):
     def get_image_id_from_path(self, path):
         '''Get the image id from image path in the VIM database. Returns the image_id'''
         try:
-            self._reload_connection()
-            images = self.glance.images.list()
-            for image in images:
-                if image.metadata.get("location")==path:
-                    return image.id
+            images = self._get_cached_images()['index']['location'].get(path)
+            if images:
+                return images[0]['id']
             raise vimconn.vimconnNotFoundException("image with location '{}' not found".format( path))
         except (ksExceptions.ClientException, nvExceptions.ClientException, gl1Exceptions.CommunicationError, ConnectionError) as e:
             self._format_exception(e)
@@ -932,23 +1088,22 @@ class vimconnector(vimconn.vimconnector):
         '''
         self.logger.debug("Getting image list from VIM filter: '%s'", str(filter_dict))
         try:
-            self._reload_connection()
-            filter_dict_os = filter_dict.copy()
+            images = self._get_cached_images()
             #First we filter by the available filter fields: name, id. The others are removed.
-            image_list = self.glance.images.list()
+            image_list = images['images']
+            for key in ("id", "name", "checksum"):
+                if filter_dict.get(key):
+                    image_list = images['index'][key].get(filter_dict[key], ())
+                    break
             filtered_list = []
             for image in image_list:
-                try:
-                    if filter_dict.get("name") and image["name"] != filter_dict["name"]:
-                        continue
-                    if filter_dict.get("id") and image["id"] != filter_dict["id"]:
-                        continue
-                    if filter_dict.get("checksum") and image["checksum"] != filter_dict["checksum"]:
-                        continue
-
-                    filtered_list.append(image.copy())
-                except gl1Exceptions.HTTPNotFound:
-                    pass
+                if filter_dict.get("name") and image.get("name") != filter_dict["name"]:
+                    continue
+                if filter_dict.get("id") and image.get("id") != filter_dict["id"]:
+                    continue
+                if filter_dict.get("checksum") and image.get("checksum") != filter_dict["checksum"]:
+                    continue
+                filtered_list.append(image.copy())
             return filtered_list
         except (ksExceptions.ClientException, nvExceptions.ClientException, gl1Exceptions.CommunicationError, ConnectionError) as e:
             self._format_exception(e)
@@ -1085,6 +1240,7 @@ class vimconnector(vimconn.vimconnector):
             self._reload_connection()
             # metadata_vpci = {}   # For a specific neutron plugin
             block_device_mapping = None
+            ports_to_create = []    # list of (net, port_dict), created with a single bulk request
 
             for net in net_list:
                 if not net.get("net_id"):   # skip non connected iface
@@ -1137,20 +1293,27 @@ class vimconnector(vimconn.vimconnector):
                 if net.get("ip_address"):
                     port_dict["fixed_ips"] = [{'ip_address': net["ip_address"]}]
                     # TODO add 'subnet_id': <subnet_id>
-                new_port = self.neutron.create_port({"port": port_dict })
-                created_items["port:" + str(new_port["port"]["id"])] = True
-                net["mac_adress"] = new_port["port"]["mac_address"]
-                net["vim_id"] = new_port["port"]["id"]
+                ports_to_create.append((net, port_dict))
+
+            new_ports = []
+            if ports_to_create:
+                # neutron creates all the ports or none of them
+                new_ports = self.neutron.create_port({"ports": [port_dict for _, port_dict in ports_to_create]})
+                new_ports = new_ports["ports"]
+            for (net, _), new_port in zip(ports_to_create, new_ports):
+                created_items["port:" + str(new_port["id"])] = True
+                net["mac_adress"] = new_port["mac_address"]
+                net["vim_id"] = new_port["id"]
                 # if try to use a network without subnetwork, it will return a emtpy list
-                fixed_ips = new_port["port"].get("fixed_ips")
+                fixed_ips = new_port.get("fixed_ips")
                 if fixed_ips:
                     net["ip"] = fixed_ips[0].get("ip_address")
                 else:
                     net["ip"] = None
 
-                port = {"port-id": new_port["port"]["id"]}
+                port = {"port-id": new_port["id"]}
                 if float(self.nova.api_version.get_string()) >= 2.32:
-                    port["tag"] = new_port["port"]["name"]
+                    port["tag"] = new_port["name"]
                 net_list_vim.append(port)
 
                 if net.get('floating_ip', False):
@@ -1164,7 +1327,7 @@ class vimconnector(vimconn.vimconnector):
                 # If port security is disabled when the port has not yet been attached to the VM, then all vm traffic is dropped.
                 # As a workaround we wait until the VM is active and then disable the port-security
                 if net.get("port_security") == False and not self.config.get("no_port_security_extension"):
-                    no_secured_ports.append(new_port["port"]["id"])
+                    no_secured_ports.append(new_port["id"])
 
             # if metadata_vpci:
             #     metadata = {"pci_assignement": json.dumps(metadata_vpci)}
@@ -1402,16 +1565,16 @@ class vimconnector(vimconn.vimconnector):
             created_items = {}
         try:
             self._reload_connection()
-            # delete VM ports attached to this networks before the virtual machine
-            for k, v in created_items.items():
-                if not v:  # skip already deleted
-                    continue
-                try:
-                    k_item, _, k_id = k.partition(":")
-                    if k_item == "port":
-                        self.neutron.delete_port(k_id)
-                except Exception as e:
+            # delete VM ports attached to this networks before the virtual machine. Deleted ones are marked at
+            # created_items, so that they are skipped if this method is retried
+            port_ids = [k.partition(":")[2] for k, v in created_items.items() if v and k.startswith("port:")]
+            failed_ports = self._delete_ports(port_ids)
+            for port_id in port_ids:
+                e = failed_ports.get(port_id)
+                if e:
                     self.logger.error("Error deleting port: {}: {}".format(type(e).__name__, e))
+                else:
+                    created_items["port:" + port_id] = False
 
             # #commented because detaching the volumes makes the servers.delete not work properly ?!?
             # #dettach volumes attached
@@ -35,8 +35,10 @@ import logging
 import math
 from openmano_schemas import id_schema, name_schema, nameshort_schema, description_schema, \
                             vlan1000_schema, integer0_schema
-from jsonschema import validate as js_v, exceptions as js_e
+from jsonschema import exceptions as js_e
+from jsonschema.validators import validator_for
 from urllib import quote
+from http_tools.session import get_session, session_options
 
 '''contain the openvim virtual machine status to openmano status'''
 vmStatus2manoFormat={'ACTIVE':'ACTIVE',
@@ -48,6 +50,8 @@ vmStatus2manoFormat={'ACTIVE':'ACTIVE',
                      }
 netStatus2manoFormat={'ACTIVE':'ACTIVE','INACTIVE':'INACTIVE','BUILD':'BUILD','ERROR':'ERROR','DELETED':'DELETED', 'DOWN':'DOWN'
                      }
+# maximum number of ids filtered at each list request of refresh_vms_status/refresh_nets_status
+REFRESH_BATCH = 50
 
 
 host_schema = {
@@ -323,6 +327,28 @@ get_processor_rankings_response_schema = {
     }
 }
 
+_validators = {}
+
+
+def js_v(data, schema):
+    '''Validate data against a jsonschema, checking and compiling each schema just once'''
+    validator = _validators.get(id(schema))
+    if validator is None or validator.schema is not schema:
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        validator = _validators[id(schema)] = validator_class(schema)
+    validator.validate(data)
+
+
+# response schemas are compiled at import
+for _schema in (new_host_response_schema, get_images_response_schema, get_hosts_response_schema,
+                get_server_response_schema, new_tenant_response_schema, new_network_response_schema,
+                new_port_response_schema, get_flavor_response_schema, new_flavor_response_schema,
+                get_image_response_schema, new_image_response_schema, new_vminstance_response_schema,
+                get_processor_rankings_response_schema):
+    _validators[id(_schema)] = validator_for(_schema)(_schema)
+
+
 class vimconnector(vimconn.vimconnector):
     def __init__(self, uuid, name, tenant_id, tenant_name, url, url_admin=None, user=None, passwd=None,
                  log_level="DEBUG", config={}, persistent_info={}):
@@ -331,6 +357,9 @@ class vimconnector(vimconn.vimconnector):
         self.headers_req = {'content-type': 'application/json'}
         self.logger = logging.getLogger('openmano.vim.openvim')
         self.persistent_info = persistent_info
+        self.session = get_session(url, **session_options(config))
+        # last detail obtained of each server, reused by refresh_vms_status while its status does not change
+        self.server_details = {}
         if tenant_id:
             self.tenant = tenant_id
 
@@ -352,7 +381,7 @@ class vimconnector(vimconn.vimconnector):
 
         url = self.url+'/tenants?name='+ quote(self.tenant_name)
         self.logger.info("Getting VIM tenant_id GET %s", url)
-        vim_response = requests.get(url, headers = self.headers_req)
+        vim_response = self.session.get(url, headers = self.headers_req)
         self._check_http_request_response(vim_response)
         try:
             tenant_list = vim_response.json()["tenants"]
@@ -432,7 +461,7 @@ class vimconnector(vimconn.vimconnector):
         try:
             url = self.url_admin+'/tenants'
             self.logger.info("Adding a new tenant %s", url)
-            vim_response = requests.post(url, headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(url, headers = self.headers_req, data=payload_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -451,7 +480,7 @@ class vimconnector(vimconn.vimconnector):
         try:
             url = self.url_admin+'/tenants/'+tenant_id
             self.logger.info("Delete a tenant DELETE %s", url)
-            vim_response = requests.delete(url, headers = self.headers_req)
+            vim_response = self.session.delete(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -476,7 +505,7 @@ class vimconnector(vimconn.vimconnector):
         try:
             url = self.url+'/tenants'+filterquery_text
             self.logger.info("get_tenant_list GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -497,7 +526,7 @@ class vimconnector(vimconn.vimconnector):
             # payload_req.update(vim_specific)
             url = self.url+'/networks'
             self.logger.info("Adding a new network POST: %s  DATA: %s", url, str(payload_req))
-            vim_response = requests.post(url, headers = self.headers_req, data=json.dumps({"network": payload_req}) )
+            vim_response = self.session.post(url, headers = self.headers_req, data=json.dumps({"network": payload_req}) )
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -535,7 +564,7 @@ class vimconnector(vimconn.vimconnector):
                 filterquery_text='?'+ '&'.join(filterquery)
             url = self.url+'/networks'+filterquery_text
             self.logger.info("Getting network list GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -549,7 +578,7 @@ class vimconnector(vimconn.vimconnector):
         try:
             url = self.url+'/networks/'+net_id
             self.logger.info("Getting network GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -565,7 +594,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url+'/networks/'+net_id
             self.logger.info("Deleting VIM network DELETE %s", url)
-            vim_response = requests.delete(url, headers=self.headers_req)
+            vim_response = self.session.delete(url, headers=self.headers_req)
             self._check_http_request_response(vim_response)
             #self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -579,7 +608,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url+'/'+self.tenant+'/flavors/'+flavor_id
             self.logger.info("Getting flavor GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -619,7 +648,7 @@ class vimconnector(vimconn.vimconnector):
             payload_req = json.dumps({'flavor': new_flavor_dict})
             url = self.url+'/'+self.tenant+'/flavors'
             self.logger.info("Adding a new VIM flavor POST %s", url)
-            vim_response = requests.post(url, headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(url, headers = self.headers_req, data=payload_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -640,7 +669,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url+'/'+self.tenant+'/flavors/'+flavor_id
             self.logger.info("Deleting VIM flavor DELETE %s", url)
-            vim_response = requests.delete(url, headers=self.headers_req)
+            vim_response = self.session.delete(url, headers=self.headers_req)
             self._check_http_request_response(vim_response)
             #self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -654,7 +683,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url+'/'+self.tenant+'/images/'+image_id
             self.logger.info("Getting image GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -681,7 +710,7 @@ class vimconnector(vimconn.vimconnector):
             payload_req = json.dumps({"image":new_image_dict})
             url=self.url + '/' + self.tenant + '/images'
             self.logger.info("Adding a new VIM image POST %s", url)
-            vim_response = requests.post(url, headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(url, headers = self.headers_req, data=payload_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -702,7 +731,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url + '/'+ self.tenant +'/images/'+image_id
             self.logger.info("Deleting VIM image DELETE %s", url)
-            vim_response = requests.delete(url, headers=self.headers_req)
+            vim_response = self.session.delete(url, headers=self.headers_req)
             self._check_http_request_response(vim_response)
             #self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -716,7 +745,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url=self.url + '/' + self.tenant + '/images?path='+quote(path)
             self.logger.info("Getting images GET %s", url)
-            vim_response = requests.get(url)
+            vim_response = self.session.get(url)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -754,7 +783,7 @@ class vimconnector(vimconn.vimconnector):
                 filterquery_text='?'+ '&'.join(filterquery)
             url = self.url+'/'+self.tenant+'/images'+filterquery_text
             self.logger.info("Getting image list GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -773,7 +802,7 @@ class vimconnector(vimconn.vimconnector):
         print "VIMConnector: Adding a new VM instance from JSON to VIM"
         payload_req = vm_data
         try:
-            vim_response = requests.post(self.url+'/'+self.tenant+'/servers', headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(self.url+'/'+self.tenant+'/servers', headers = self.headers_req, data=payload_req)
         except requests.exceptions.RequestException as e:
             print "new_vminstancefromJSON Exception: ", e.args
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -866,7 +895,7 @@ class vimconnector(vimconn.vimconnector):
             payload_req = json.dumps({"server": payload_dict})
             url = self.url+'/'+self.tenant+'/servers'
             self.logger.info("Adding a new vm POST %s DATA %s", url, payload_req)
-            vim_response = requests.post(url, headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(url, headers = self.headers_req, data=payload_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -917,8 +946,8 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url+'/'+self.tenant+'/servers/'+vm_id
             self.logger.info("Getting vm GET %s", url)
-            vim_response = requests.get(url, headers = self.headers_req)
-            vim_response = requests.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
+            vim_response = self.session.get(url, headers = self.headers_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -937,7 +966,7 @@ class vimconnector(vimconn.vimconnector):
             self._get_my_tenant()
             url = self.url+'/'+self.tenant+'/servers/'+vm_id
             self.logger.info("Deleting VIM vm DELETE %s", url)
-            vim_response = requests.delete(url, headers=self.headers_req)
+            vim_response = self.session.delete(url, headers=self.headers_req)
             self._check_http_request_response(vim_response)
             #self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -945,71 +974,147 @@ class vimconnector(vimconn.vimconnector):
         except (requests.exceptions.RequestException, js_e.ValidationError) as e:
             self._format_request_exception(e)
 
+    def _get_list(self, path, key, values):
+        '''GET a list endpoint filtered by a list of values of a key. Returns the json response'''
+        url = self.url + path + '?' + '&'.join(key + '=' + quote(value) for value in values)
+        self.logger.info("Getting list GET %s", url)
+        vim_response = self.session.get(url, headers=self.headers_req)
+        self._check_http_request_response(vim_response)
+        return vim_response.json()
+
+    def _get_server(self, vm_id):
+        '''GET the detail of a server, keeping it at server_details'''
+        url = self.url + '/' + self.tenant + '/servers/' + vm_id
+        self.logger.info("Getting vm GET %s", url)
+        vim_response = self.session.get(url, headers = self.headers_req)
+        self._check_http_request_response(vim_response)
+        response = vim_response.json()
+        js_v(response, new_vminstance_response_schema)
+        self.server_details[vm_id] = response['server']
+        return response['server']
+
+    def _get_vm_ports(self, vm_id):
+        url = self.url + '/ports?device_id=' + quote(vm_id)
+        self.logger.info("Getting PORTS GET %s", url)
+        vim_response = self.session.get(url, headers=self.headers_req)
+        self._check_http_request_response(vim_response)
+        return vim_response.json().get("ports")
+
+    def _format_vm_status(self, server, ports):
+        '''Build the refresh_vms_status entry of a server, given its ports (None if they could not be obtained)'''
+        vm = {}
+        if server['status'] in vmStatus2manoFormat:
+            vm['status'] = vmStatus2manoFormat[server['status']]
+        else:
+            vm['status'] = "OTHER"
+            vm['error_msg'] = "VIM status reported " + server['status']
+        if server.get('last_error'):
+            vm['error_msg'] = server['last_error']
+        vm["vim_info"] = yaml.safe_dump(server)
+        #get interfaces info
+        management_ip = False
+        if isinstance(ports, list):
+            vm["interfaces"] = []
+            for port in ports:
+                interface = {}
+                interface['vim_info'] = yaml.safe_dump(port)
+                interface["mac_address"] = port.get("mac_address")
+                interface["vim_net_id"] = port.get("network_id")
+                interface["vim_interface_id"] = port["id"]
+                interface["ip_address"] = port.get("ip_address")
+                if interface["ip_address"]:
+                    management_ip = True
+                if interface["ip_address"] == "0.0.0.0":
+                    interface["ip_address"] = None
+                vm["interfaces"].append(interface)
+        if vm['status'] == "ACTIVE" and not management_ip:
+            vm['status'] = "ACTIVE:NoMgmtIP"
+        return vm
+
+    def _refresh_vm_status(self, vm_id):
+        '''Refreshes the status of a single virtual machine'''
+        try:
+            server = self._get_server(vm_id)
+            ports = None
+            try:
+                ports = self._get_vm_ports(vm_id)
+            except Exception as e:
+                self.logger.error("refresh_vms_and_nets. Port get %s: %s", type(e).__name__, str(e))
+            return self._format_vm_status(server, ports)
+        except vimconn.vimconnNotFoundException as e:
+            self.logger.error("Exception getting vm status: %s", str(e))
+            self.server_details.pop(vm_id, None)
+            return {'status': "DELETED", 'error_msg': str(e)}
+        except (requests.exceptions.RequestException, js_e.ValidationError, vimconn.vimconnException) as e:
+            self.logger.error("Exception getting vm status: %s", str(e))
+            return {'status': "VIM_ERROR", 'error_msg': str(e)}
+
     def refresh_vms_status(self, vm_list):
-        '''Refreshes the status of the virtual machines'''
+        '''Refreshes the status of the virtual machines.
+        Servers and ports are obtained in batches of REFRESH_BATCH ids from the list endpoints. The virtual machines
+        missing at the lists (e.g. deleted ones) are obtained one by one.
+        vim_info is the detail of the server, as given by GET /servers/<id>: the entries of the list are abbreviated.
+        The detail is requested when a server is first refreshed or when its status changes, and reused otherwise'''
         try:
             self._get_my_tenant()
         except requests.exceptions.RequestException as e:
             self._format_request_exception(e)
         vm_dict={}
-        for vm_id in vm_list:
-            vm={}
-            #print "VIMConnector refresh_tenant_vms and nets: Getting tenant VM instance information from VIM"
+        vm_ids = list(vm_list)
+        for index in range(0, len(vm_ids), REFRESH_BATCH):
+            batch = vm_ids[index:index + REFRESH_BATCH]
+            servers = {}
+            ports = {}
             try:
-                url = self.url + '/' + self.tenant + '/servers/' + vm_id
-                self.logger.info("Getting vm GET %s", url)
-                vim_response = requests.get(url, headers = self.headers_req)
-                self._check_http_request_response(vim_response)
-                response = vim_response.json()
-                js_v(response, new_vminstance_response_schema)
-                if response['server']['status'] in vmStatus2manoFormat:
-                    vm['status'] = vmStatus2manoFormat[ response['server']['status']  ]
-                else:
-                    vm['status'] = "OTHER"
-                    vm['error_msg'] = "VIM status reported " + response['server']['status']
-                if response['server'].get('last_error'):
-                    vm['error_msg'] = response['server']['last_error']
-                vm["vim_info"] = yaml.safe_dump(response['server'])
-                #get interfaces info
-                try:
-                    management_ip = False
-                    url2 = self.url + '/ports?device_id=' + quote(vm_id)
-                    self.logger.info("Getting PORTS GET %s", url2)
-                    vim_response2 = requests.get(url2, headers = self.headers_req)
-                    self._check_http_request_response(vim_response2)
-                    client_data = vim_response2.json()
-                    if isinstance(client_data.get("ports"), list):
-                        vm["interfaces"]=[]
-                    for port in client_data.get("ports"):
-                        interface={}
-                        interface['vim_info'] = yaml.safe_dump(port)
-                        interface["mac_address"] = port.get("mac_address")
-                        interface["vim_net_id"] = port.get("network_id")
-                        interface["vim_interface_id"] = port["id"]
-                        interface["ip_address"] = port.get("ip_address")
-                        if interface["ip_address"]:
-                            management_ip = True
-                        if interface["ip_address"] == "0.0.0.0":
-                            interface["ip_address"] = None
-                        vm["interfaces"].append(interface)
-                        
-                except Exception as e:
-                    self.logger.error("refresh_vms_and_nets. Port get %s: %s", type(e).__name__, str(e))
-
-                if vm['status'] == "ACTIVE" and not management_ip:
-                    vm['status'] = "ACTIVE:NoMgmtIP"
-                    
-            except vimconn.vimconnNotFoundException as e:
-                self.logger.error("Exception getting vm status: %s", str(e))
-                vm['status'] = "DELETED"
-                vm['error_msg'] = str(e)
-            except (requests.exceptions.RequestException, js_e.ValidationError, vimconn.vimconnException) as e:
-                self.logger.error("Exception getting vm status: %s", str(e))
-                vm['status'] = "VIM_ERROR"
-                vm['error_msg'] = str(e)
-            vm_dict[vm_id] = vm
+                response = self._get_list('/' + self.tenant + '/servers', 'id', batch)
+                js_v(response, get_server_response_schema)
+                servers = {server['id']: server for server in response['servers']
+                           if server['id'] in batch and 'status' in server}
+                if servers:
+                    for port in self._get_list('/ports', 'device_id', list(servers)).get("ports") or ():
+                        ports.setdefault(port.get("device_id"), []).append(port)
+            except (requests.exceptions.RequestException, js_e.ValidationError, ValueError,
+                    vimconn.vimconnException) as e:
+                self.logger.error("Cannot get vm list, getting them one by one: %s", str(e))
+                servers = {}
+            for vm_id in batch:
+                server = servers.get(vm_id)
+                if server is None:
+                    vm_dict[vm_id] = self._refresh_vm_status(vm_id)
+                    continue
+                detail = self.server_details.get(vm_id)
+                if not detail or detail.get('status') != server['status']:
+                    try:
+                        detail = self._get_server(vm_id)
+                    except (requests.exceptions.RequestException, js_e.ValidationError, ValueError,
+                            vimconn.vimconnException) as e:
+                        self.logger.error("Cannot get vm %s, using its entry at the list: %s", vm_id, str(e))
+                        detail = server
+                vm_ports = ports.get(vm_id)
+                if not vm_ports:
+                    try:
+                        vm_ports = self._get_vm_ports(vm_id)
+                    except Exception as e:
+                        self.logger.error("refresh_vms_and_nets. Port get %s: %s", type(e).__name__, str(e))
+                vm_dict[vm_id] = self._format_vm_status(detail, vm_ports)
         return vm_dict
 
+    def _format_net_status(self, net_vim):
+        '''Build the refresh_nets_status entry of a network'''
+        net = {}
+        if net_vim['status'] in netStatus2manoFormat:
+            net["status"] = netStatus2manoFormat[ net_vim['status'] ]
+        else:
+            net["status"] = "OTHER"
+            net["error_msg"] = "VIM status reported " + net_vim['status']
+
+        if net["status"] == "ACTIVE" and not net_vim['admin_state_up']:
+            net["status"] = "DOWN"
+        if net_vim.get('last_error'):
+            net['error_msg'] = net_vim['last_error']
+        net["vim_info"] = yaml.safe_dump(net_vim)
+        return net
+
     def refresh_nets_status(self, net_list):
         '''Get the status of the networks
            Params: the list of network identifiers
@@ -1026,6 +1131,8 @@ class vimconnector(vimconn.vimconnector):
                     error_msg:  #Text with VIM error message, if any. Or the VIM connection ERROR 
                     vim_info:   #Text with plain information obtained from vim (yaml.safe_dump)
 
+           Networks are obtained in batches of REFRESH_BATCH ids from the list endpoint. The ones missing at the list
+           are obtained one by one
         '''
         try:
             self._get_my_tenant()
@@ -1033,31 +1140,27 @@ class vimconnector(vimconn.vimconnector):
             self._format_request_exception(e)
         
         net_dict={}
-        for net_id in net_list:
-            net = {}
-            #print "VIMConnector refresh_tenant_vms_and_nets: Getting tenant network from VIM (tenant: " + str(self.tenant) + "): "
+        net_ids = list(net_list)
+        for index in range(0, len(net_ids), REFRESH_BATCH):
+            batch = net_ids[index:index + REFRESH_BATCH]
+            networks = {}
             try:
-                net_vim = self.get_network(net_id)
-                if net_vim['status'] in netStatus2manoFormat:
-                    net["status"] = netStatus2manoFormat[ net_vim['status'] ]
-                else:
-                    net["status"] = "OTHER"
-                    net["error_msg"] = "VIM status reported " + net_vim['status']
-                    
-                if net["status"] == "ACTIVE" and not net_vim['admin_state_up']:
-                    net["status"] = "DOWN"
-                if net_vim.get('last_error'):
-                    net['error_msg'] = net_vim['last_error']
-                net["vim_info"] = yaml.safe_dump(net_vim)
-            except vimconn.vimconnNotFoundException as e:
-                self.logger.error("Exception getting net status: %s", str(e))
-                net['status'] = "DELETED"
-                net['error_msg'] = str(e)
-            except (requests.exceptions.RequestException, js_e.ValidationError, vimconn.vimconnException) as e:
-                self.logger.error("Exception getting net status: %s", str(e))
-                net['status'] = "VIM_ERROR"
-                net['error_msg'] = str(e)
-            net_dict[net_id] = net
+                response = self._get_list('/networks', 'id', batch)
+                networks = {net_vim['id']: net_vim for net_vim in response.get('networks') or ()
+                            if net_vim.get('id') in batch and 'status' in net_vim and 'admin_state_up' in net_vim}
+            except (requests.exceptions.RequestException, ValueError, vimconn.vimconnException) as e:
+                self.logger.error("Cannot get network list, getting them one by one: %s", str(e))
+            for net_id in batch:
+                try:
+                    net_vim = networks.get(net_id) or self.get_network(net_id)
+                    net = self._format_net_status(net_vim)
+                except vimconn.vimconnNotFoundException as e:
+                    self.logger.error("Exception getting net status: %s", str(e))
+                    net = {'status': "DELETED", 'error_msg': str(e)}
+                except (requests.exceptions.RequestException, js_e.ValidationError, vimconn.vimconnException) as e:
+                    self.logger.error("Exception getting net status: %s", str(e))
+                    net = {'status': "VIM_ERROR", 'error_msg': str(e)}
+                net_dict[net_id] = net
         return net_dict
     
     def action_vminstance(self, vm_id, action_dict, created_items={}):
@@ -1069,7 +1172,7 @@ class vimconnector(vimconn.vimconnector):
                 raise vimconn.vimconnException("getting console is not available at openvim", http_code=vimconn.HTTP_Service_Unavailable)
             url = self.url+'/'+self.tenant+'/servers/'+vm_id+"/action"
             self.logger.info("Action over VM instance POST %s", url)
-            vim_response = requests.post(url, headers = self.headers_req, data=json.dumps(action_dict) )
+            vim_response = self.session.post(url, headers = self.headers_req, data=json.dumps(action_dict) )
             self._check_http_request_response(vim_response)
             return None
         except (requests.exceptions.RequestException, js_e.ValidationError) as e:
@@ -1120,7 +1223,7 @@ class vimconnector(vimconn.vimconnector):
     #obtain hosts list
         url=self.url+'/hosts'
         try:
-            vim_response = requests.get(url)
+            vim_response = self.session.get(url)
         except requests.exceptions.RequestException as e:
             print "get_hosts_info Exception: ", e.args
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1142,7 +1245,7 @@ class vimconnector(vimconn.vimconnector):
         for host in hosts['hosts']:
             url=self.url+'/hosts/'+host['id']
             try:
-                vim_response = requests.get(url)
+                vim_response = self.session.get(url)
             except requests.exceptions.RequestException as e:
                 print "get_hosts_info Exception: ", e.args
                 return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1164,7 +1267,7 @@ class vimconnector(vimconn.vimconnector):
     #obtain hosts list
         url=self.url+'/hosts'
         try:
-            vim_response = requests.get(url)
+            vim_response = self.session.get(url)
         except requests.exceptions.RequestException as e:
             print "get_hosts Exception: ", e.args
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1185,7 +1288,7 @@ class vimconnector(vimconn.vimconnector):
         for host in hosts['hosts']:
             url=self.url+'/' + vim_tenant + '/servers?hostId='+host['id']
             try:
-                vim_response = requests.get(url)
+                vim_response = self.session.get(url)
             except requests.exceptions.RequestException as e:
                 print "get_hosts Exception: ", e.args
                 return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1205,7 +1308,7 @@ class vimconnector(vimconn.vimconnector):
         '''Get the processor rankings in the VIM database'''
         url=self.url+'/processor_ranking'
         try:
-            vim_response = requests.get(url)
+            vim_response = self.session.get(url)
         except requests.exceptions.RequestException as e:
             print "get_processor_rankings Exception: ", e.args
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1227,7 +1330,7 @@ class vimconnector(vimconn.vimconnector):
         try:
             url = self.url_admin+'/hosts'
             self.logger.info("Adding a new host POST %s", url)
-            vim_response = requests.post(url, headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(url, headers = self.headers_req, data=payload_req)
             self._check_http_request_response(vim_response)
             self.logger.debug(vim_response.text)
             #print json.dumps(vim_response.json(), indent=4)
@@ -1248,7 +1351,7 @@ class vimconnector(vimconn.vimconnector):
         print "VIMConnector: Adding a new external port"
         payload_req = port_data
         try:
-            vim_response = requests.post(self.url_admin+'/ports', headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(self.url_admin+'/ports', headers = self.headers_req, data=payload_req)
         except requests.exceptions.RequestException as e:
             self.logger.error("new_external_port Exception: ", str(e))
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1282,7 +1385,7 @@ class vimconnector(vimconn.vimconnector):
         
         payload_req = '{"network":{"name": "' + net_name + '","shared":true,"type": "' + net_type + '"}}'
         try:
-            vim_response = requests.post(self.url+'/networks', headers = self.headers_req, data=payload_req)
+            vim_response = self.session.post(self.url+'/networks', headers = self.headers_req, data=payload_req)
         except requests.exceptions.RequestException as e:
             self.logger.error( "new_external_network Exception: ", e.args)
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -1322,7 +1425,7 @@ class vimconnector(vimconn.vimconnector):
         else:
             url= self.url
         try:
-            vim_response = requests.put(url +'/ports/'+port_id, headers = self.headers_req, data=payload_req)
+            vim_response = self.session.put(url +'/ports/'+port_id, headers = self.headers_req, data=payload_req)
         except requests.exceptions.RequestException as e:
             print "connect_port_network Exception: ", e.args
             return -vimconn.HTTP_Not_Found, str(e.args[0])
@@ -28,7 +28,9 @@ mbayramov@vmware.com
 from progressbar import Percentage, Bar, ETA, FileTransferSpeed, ProgressBar
 
 import vimconn
+import vcd_xml
 import os
+import mmap
 import traceback
 import itertools
 import requests
@@ -42,21 +44,25 @@ from xml.etree import ElementTree as XmlElementTree
 from lxml import etree as lxmlElementTree
 
 import yaml
+from copy import deepcopy
+from multiprocessing.pool import ThreadPool
+from http_tools.session import get_session, session_options
 from pyvcloud.vcd.client import BasicLoginCredentials,Client,VcdTaskException
 from pyvcloud.vcd.vdc import VDC
 from pyvcloud.vcd.org import Org
-import re
 from pyvcloud.vcd.vapp import VApp
 from xml.sax.saxutils import escape
 import logging
 import json
 import time
 import uuid
+import urllib
 import httplib
 #For python3
 #import http.client
 import hashlib
 import socket
+import threading
 import struct
 import netaddr
 import random
@@ -68,6 +74,17 @@ STANDALONE = 'standalone'
 FLAVOR_RAM_KEY = 'ram'
 FLAVOR_VCPUS_KEY = 'vcpus'
 FLAVOR_DISK_KEY = 'disk'
+# VMDK upload: bytes per chunk, and seconds between checks of the vApp template status
+DEFAULT_UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+UPLOAD_POLL_INTERVAL = 2
+# maximum seconds of each WaitForUpdatesEx call, see wait_for_vcenter_tasks
+VCENTER_WAIT_SECONDS = 60
+
+# seconds the org networks, vApp names and VDC references are cached
+DEFAULT_CACHE_TTL = 60
+# seconds the disk size and network connections of a VM are kept by the bulk refresh_vms_status, if its status does
+# not change
+DEFAULT_VM_DETAILS_TTL = 600
 DEFAULT_IP_PROFILE = {'dhcp_count':50,
                       'dhcp_enabled':True,
                       'ip_version':"IPv4"
@@ -110,10 +127,50 @@ vcdStatusCode2manoFormat = {4: 'ACTIVE',
                             14: 'DELETED'}
 
 #
+# status of the records of the vCD query service
+vcdStatusName2manoFormat = {'POWERED_ON': 'ACTIVE',
+                            'SUSPENDED': 'SUSPENDED',
+                            'POWERED_OFF': 'INACTIVE',
+                            'UNRESOLVED': 'BUILD',
+                            'RESOLVED': 'BUILD',
+                            'FAILED_CREATION': 'ERROR'}
+
+# records per page of the vCD query service, and number of OR conditions sent at the filter of a query
+QUERY_PAGE_SIZE = 128
+QUERY_FILTER_CHUNK = 25
+
 netStatus2manoFormat = {'ACTIVE': 'ACTIVE', 'PAUSED': 'PAUSED', 'INACTIVE': 'INACTIVE', 'BUILD': 'BUILD',
                         'ERROR': 'ERROR', 'DELETED': 'DELETED'
                         }
 
+class MappedChunk(object):
+    """Read only file-like view of the bytes [start, end) of a mmap, used as request body to send a chunk of a file
+    without copying it. It supports seek/tell so that the request can be rewound on retries"""
+
+    def __init__(self, mapped, start, end):
+        self.mapped = mapped
+        self.start = start
+        self.end = end
+        self.position = start
+
+    def __len__(self):
+        return self.end - self.start
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self.end - self.position
+        data = self.mapped[self.position:min(self.position + size, self.end)]
+        self.position += len(data)
+        return data
+
+    def tell(self):
+        return self.position - self.start
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        base = {os.SEEK_SET: self.start, os.SEEK_CUR: self.position, os.SEEK_END: self.end}[whence]
+        self.position = min(max(base + offset, self.start), self.end)
+
+
 class vimconnector(vimconn.vimconnector):
     # dict used to store flavor in memory
     flavorlist = {}
@@ -210,6 +267,31 @@ class vimconnector(vimconn.vimconnector):
         self.vcenter_user = config.get("vcenter_user", None)
         self.vcenter_password = config.get("vcenter_password", None)
 
+        # REST traffic to vCD and NSX is sent through pooled sessions, see http_tools.session
+        self.session_options = session_options(config)
+        self.rest_concurrency = int(config.get("rest_concurrency", 1))
+        # get the status of all the vApps of refresh_vms_status with the vCD query service
+        self.bulk_refresh = config.get("bulk_refresh", True)
+        # details of the VMs not included at the query records, and moref id of the VM of each vApp, see
+        # refresh_vms_status_bulk
+        self.vm_details_ttl = float(config.get("vm_details_ttl", DEFAULT_VM_DETAILS_TTL))
+        self.vm_details = {}
+        self.vm_morefs = {}
+
+        # VMDK uploads, see upload_file
+        self.upload_chunk_bytes = int(config.get("upload_chunk_bytes", DEFAULT_UPLOAD_CHUNK_BYTES))
+        self.upload_concurrency = int(config.get("upload_concurrency", 1))
+        self.upload_retries = int(config.get("upload_retries", 3))
+        self.upload_timeout = float(config.get("upload_timeout", 600))
+
+        # cache of org networks, vApp names and VDC references, see _cached
+        self.cache_ttl = float(config.get("cache_ttl", DEFAULT_CACHE_TTL))
+        self.cache = {}
+
+        # vCenter service instance, reused while its session is alive, see get_vcenter_content
+        self.vcenter_service = None
+        self.vcenter_task_timeout = config.get("vcenter_task_timeout")
+
         #Set availability zone for Affinity rules
         self.availability_zone = self.set_availability_zones()
 
@@ -223,6 +305,8 @@ class vimconnector(vimconn.vimconnector):
 
         self.org_uuid = None
         self.client = None
+        self.token_lock = threading.Lock()  # serializes the token renewals of concurrent requests
+        self.expired_token = None  # token replaced by the last renewal
 
         if not url:
             raise vimconn.vimconnException('url param can not be NoneType')
@@ -523,6 +607,7 @@ class vimconnector(vimconn.vimconnector):
 
         network_uuid = self.create_network(network_name=net_name, net_type=net_type,
                                            ip_profile=ip_profile, isshared=isshared)
+        self.invalidate_cache('org')
         if network_uuid is not None:
             return network_uuid
         else:
@@ -792,7 +877,9 @@ class vimconnector(vimconn.vimconnector):
 
         vcd_network = self.get_vcd_network(network_uuid=net_id)
         if vcd_network is not None and vcd_network:
-            if self.delete_network_action(network_uuid=net_id):
+            deleted = self.delete_network_action(network_uuid=net_id)
+            self.invalidate_cache('org')
+            if deleted:
                 return net_id
         else:
             raise vimconn.vimconnNotFoundException("Network {} not found".format(net_id))
@@ -1040,11 +1127,11 @@ class vimconnector(vimconn.vimconnector):
 
     # noinspection PyIncorrectDocstring
     def upload_ovf(self, vca=None, catalog_name=None, image_name=None, media_file_name=None,
-                   description='', progress=False, chunk_bytes=128 * 1024):
+                   description='', progress=False, chunk_bytes=None):
         """
         Uploads a OVF file to a vCloud catalog
 
-        :param chunk_bytes:
+        :param chunk_bytes: size of the chunks of the VMDK upload. By default 'upload_chunk_bytes' config value
         :param progress:
         :param description:
         :param image_name:
@@ -1092,9 +1179,10 @@ class vimconnector(vimconn.vimconnector):
 
                     if response.status_code == requests.codes.ok:
                         headers['Content-Type'] = 'Content-Type text/xml'
-                        result = re.search('rel="upload:default"\shref="(.*?\/descriptor.ovf)"',response.content)
+                        result = [href for href in vcd_xml.get_link_hrefs(response.content, 'upload:default')
+                                  if href.endswith('/descriptor.ovf')]
                         if result:
-                            transfer_href = result.group(1)
+                            transfer_href = result[0]
 
                         response = self.perform_request(req_type='PUT',
                                                     url=transfer_href,
@@ -1106,67 +1194,27 @@ class vimconnector(vimconn.vimconnector):
                                                                                                       media_file_name))
                             return False
 
-                    # TODO fix this with aync block
-                    time.sleep(5)
-
                     self.logger.debug("vApp template for catalog name {} and image {}".format(catalog_name, media_file_name))
 
-                    # uploading VMDK file
-                    # check status of OVF upload and upload remaining files.
-                    response = self.perform_request(req_type='GET',
-                                                    url=template,
-                                                    headers=headers)
-
-                    if response.status_code == requests.codes.ok:
-                        result = re.search('rel="upload:default"\s*href="(.*?vmdk)"',response.content)
-                        if result:
-                            link_href = result.group(1)
+                    # uploading VMDK files, once vCD has parsed the OVF and knows the files referenced by it
+                    files = self.wait_for_template_files(template, headers)
+                    head, tail = os.path.split(media_file_name)
+                    for file_name, file_info in files.items():
                         # we skip ovf since it already uploaded.
-                        if 'ovf' in link_href:
+                        if file_name.endswith('.ovf') or not file_info['href']:
                             continue
                         # The OVF file and VMDK must be in a same directory
-                        head, tail = os.path.split(media_file_name)
-                        file_vmdk = head + '/' + link_href.split("/")[-1]
+                        file_vmdk = head + '/' + file_info['href'].split("/")[-1]
                         if not os.path.isfile(file_vmdk):
                             return False
                         statinfo = os.stat(file_vmdk)
                         if statinfo.st_size == 0:
                             return False
-                        hrefvmdk = link_href
-
-                        if progress:
-                            widgets = ['Uploading file: ', Percentage(), ' ', Bar(), ' ', ETA(), ' ',
-                                           FileTransferSpeed()]
-                            progress_bar = ProgressBar(widgets=widgets, maxval=statinfo.st_size).start()
-
-                        bytes_transferred = 0
-                        f = open(file_vmdk, 'rb')
-                        while bytes_transferred < statinfo.st_size:
-                            my_bytes = f.read(chunk_bytes)
-                            if len(my_bytes) <= chunk_bytes:
-                                headers['Content-Range'] = 'bytes %s-%s/%s' % (
-                                    bytes_transferred, len(my_bytes) - 1, statinfo.st_size)
-                                headers['Content-Length'] = str(len(my_bytes))
-                                response = requests.put(url=hrefvmdk,
-                                                         headers=headers,
-                                                         data=my_bytes,
-                                                         verify=False)
-                                if response.status_code == requests.codes.ok:
-                                    bytes_transferred += len(my_bytes)
-                                    if progress:
-                                        progress_bar.update(bytes_transferred)
-                                else:
-                                    self.logger.debug(
-                                        'file upload failed with error: [%s] %s' % (response.status_code,
-                                                                                        response.content))
-
-                                    f.close()
-                                    return False
-                        f.close()
-                        if progress:
-                            progress_bar.finish()
-                            time.sleep(10)
-                    return True
+                        if not self.upload_file(file_info['href'], headers, file_vmdk,
+                                                offset=file_info['bytes_transferred'] or 0,
+                                                progress=progress, chunk_bytes=chunk_bytes):
+                            return False
+                    return self.wait_for_template(template, headers)
                 else:
                     self.logger.debug("Failed retrieve vApp template for catalog name {} for OVF {}".
                                       format(catalog_name, media_file_name))
@@ -1188,6 +1236,134 @@ class vimconnector(vimconn.vimconnector):
         return self.upload_ovf(vca=vca, catalog_name=catalog_name, image_name=media_name.split(".")[0],
                                media_file_name=medial_file_name, description='medial_file_name', progress=progress)
 
+    def get_template_content(self, template_href, headers):
+        response = self.perform_request(req_type='GET', url=template_href, headers=headers)
+        if response.status_code != requests.codes.ok:
+            raise vimconn.vimconnUnexpectedResponse("Failed to get vApp template {}. Status code {}: {}".format(
+                template_href, response.status_code, response.content))
+        return response.content
+
+    def wait_for_template_files(self, template_href, headers):
+        """Wait until vCD has parsed the uploaded OVF descriptor of a vApp template and lists the files to upload
+           Returns the files of the template, see vcd_xml.get_files
+        """
+        deadline = time.time() + self.upload_timeout
+        while True:
+            content = self.get_template_content(template_href, headers)
+            files = vcd_xml.get_files(content)
+            if len(files) > 1 or vcd_xml.get_status(content) == -1 or time.time() > deadline:
+                return files
+            time.sleep(UPLOAD_POLL_INTERVAL)
+
+    def wait_for_template(self, template_href, headers):
+        """Wait until vCD finishes the import of an uploaded vApp template, logging the progress of its task
+           Returns True if the template is ready, False if it failed or the 'upload_timeout' expires
+        """
+        deadline = time.time() + self.upload_timeout
+        while time.time() < deadline:
+            content = self.get_template_content(template_href, headers)
+            status = vcd_xml.get_status(content)
+            tasks = vcd_xml.get_tasks(content)
+            if status == -1 or any(task['status'] == 'error' for task in tasks):
+                self.logger.error("Import of vApp template {} failed".format(template_href))
+                return False
+            tasks = [task for task in tasks if task['status'] in ('queued', 'preRunning', 'running')]
+            if status != 0 and not tasks:
+                return True
+            for task in tasks:
+                self.logger.debug("vApp template {} {}: {}%".format(template_href, task['operation'],
+                                                                    task['progress']))
+            time.sleep(UPLOAD_POLL_INTERVAL)
+        self.logger.error("Timeout waiting for the import of vApp template {}".format(template_href))
+        return False
+
+    def upload_file(self, href, headers, file_path, offset=0, progress=False, chunk_bytes=None):
+        """Upload a file to a vCD transfer URL with ranged PUT requests of chunk_bytes ('upload_chunk_bytes' config
+           value by default), sending up to 'upload_concurrency' chunks at the same time. The file is mapped in memory
+           so that chunks are not copied.
+           Each chunk is retried 'upload_retries' times. When some chunks fail anyway, the upload is resumed from the
+           last acknowledged offset, after getting a new token, up to 'upload_retries' times
+           Params: href: upload href of the file
+                   headers: request headers, including the authorization token
+                   offset: bytes already transferred
+           Returns True if the whole file was uploaded
+        """
+        chunk_bytes = chunk_bytes or self.upload_chunk_bytes
+        size = os.stat(file_path).st_size
+        pending = [(start, min(start + chunk_bytes, size)) for start in range(offset, size, chunk_bytes)]
+        progress_bar = None
+        if progress:
+            widgets = ['Uploading file: ', Percentage(), ' ', Bar(), ' ', ETA(), ' ', FileTransferSpeed()]
+            progress_bar = ProgressBar(widgets=widgets, maxval=size).start()
+
+        with open(file_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                for attempt in range(self.upload_retries + 1):
+                    if attempt:
+                        self.logger.info("Resuming upload of {} from offset {}".format(file_path, pending[0][0]))
+                        with self.token_lock:
+                            self.get_token()
+                            headers = dict(headers, **{'x-vcloud-authorization':
+                                                       self.client._session.headers['x-vcloud-authorization']})
+                    pending = self.upload_chunks(href, headers, mapped, size, pending, progress_bar)
+                    if not pending:
+                        break
+            finally:
+                mapped.close()
+
+        if progress_bar:
+            progress_bar.finish()
+        if pending:
+            self.logger.error("Upload of {} failed at offset {}".format(file_path, pending[0][0]))
+            return False
+        return True
+
+    def upload_chunks(self, href, headers, mapped, size, chunks, progress_bar=None):
+        """Upload the (start, end) chunks of a mapped file. Returns the list of failed chunks"""
+        def upload(chunk):
+            return chunk, self.upload_chunk(href, headers, mapped, size, *chunk)
+
+        concurrency = min(self.upload_concurrency, len(chunks))
+        pool = ThreadPool(concurrency) if concurrency > 1 else None
+        try:
+            results = pool.imap_unordered(upload, chunks) if pool else (upload(chunk) for chunk in chunks)
+            failed = []
+            transferred = chunks[0][0] if chunks else 0
+            for chunk, uploaded in results:
+                if not uploaded:
+                    failed.append(chunk)
+                    if not pool:
+                        # sequential upload: later chunks can not be acknowledged
+                        failed += chunks[chunks.index(chunk) + 1:]
+                        break
+                    continue
+                transferred += chunk[1] - chunk[0]
+                if progress_bar:
+                    progress_bar.update(transferred)
+            return sorted(failed)
+        finally:
+            if pool:
+                pool.close()
+
+    def upload_chunk(self, href, headers, mapped, size, start, end):
+        """Upload the bytes [start, end) of a mapped file, retrying 'upload_retries' times. Returns True if uploaded"""
+        chunk_headers = dict(headers, **{'Content-Range': 'bytes {}-{}/{}'.format(start, end - 1, size),
+                                         'Content-Length': str(end - start)})
+        for attempt in range(self.upload_retries + 1):
+            if attempt:
+                time.sleep(2 ** (attempt - 1))
+            try:
+                response = self.get_session(href).put(url=href, headers=chunk_headers,
+                                                      data=MappedChunk(mapped, start, end), verify=False)
+                if response.status_code == requests.codes.ok:
+                    return True
+                self.logger.debug('Upload of bytes {}-{} failed with error: [{}] {}'.format(
+                    start, end - 1, response.status_code, response.content))
+            except requests.exceptions.RequestException as e:
+                self.logger.debug('Upload of bytes {}-{} failed with error: {}'.format(start, end - 1, e))
+        return False
+
     def validate_uuid4(self, uuid_string=None):
         """  Method validate correct format of UUID.
 
@@ -1440,24 +1616,23 @@ class vimconnector(vimconn.vimconnector):
         """
         try:
             if self.client and vapp_uuid:
-                vapp_call = "{}/api/vApp/vapp-{}".format(self.url, vapp_uuid)
-                headers = {'Accept':'application/*+xml;version=' + API_VERSION,
-                     'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
-
-                response = self.perform_request(req_type='GET',
-                                                url=vapp_call,
-                                                headers=headers)
-                #Retry login if session expired & retry sending request
-                if response.status_code == 403:
-                    response = self.retry_rest('GET', vapp_call)
-
-                tree = XmlElementTree.fromstring(response.content)
-                return tree.attrib['name']
+                return self._cached(('vapp_name', vapp_uuid), lambda: self._get_namebyvappid(vapp_uuid))
         except Exception as e:
             self.logger.exception(e)
             return None
         return None
 
+    def _get_namebyvappid(self, vapp_uuid):
+        vapp_call = "{}/api/vApp/vapp-{}".format(self.url, vapp_uuid)
+        headers = {'Accept':'application/*+xml;version=' + API_VERSION,
+             'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
+
+        response = self.perform_request(req_type='GET',
+                                        url=vapp_call,
+                                        headers=headers)
+        tree = XmlElementTree.fromstring(response.content)
+        return tree.attrib['name']
+
     def new_vminstance(self, name=None, description="", start=False, image_id=None, flavor_id=None, net_list=[],
                        cloud_config=None, disk_list=None, availability_zone_index=None, availability_zone_list=None):
         """Adds a VM instance to VIM
@@ -1517,6 +1692,7 @@ class vimconnector(vimconn.vimconnector):
                           "availability_zone_index {} availability_zone_list {}"\
                           .format(description, start, image_id, flavor_id, net_list, cloud_config, disk_list,\
                                   availability_zone_index, availability_zone_list))
+        self.invalidate_cache('vapp_name')
 
         #new vm name = vmname + tenant_id + uuid
         new_vm_name = [name, '-', str(uuid.uuid4())]
@@ -1641,19 +1817,14 @@ class vimconnector(vimconn.vimconnector):
                     self.logger.debug("REST API call {} failed. Return status code {}".format(vapp_tempalte_href,
                                                                                            response.status_code))
                 else:
-                    result = (response.content).replace("\n"," ")
-
-                src = re.search('<Vm goldMaster="false"\sstatus="\d+"\sname="(.*?)"\s'
-                                               'id="(\w+:\w+:vm:.*?)"\shref="(.*?)"\s'
-                              'type="application/vnd\.vmware\.vcloud\.vm\+xml',result)
-                if src:
-                    vm_name = src.group(1)
-                    vm_id = src.group(2)
-                    vm_href = src.group(3)
+                    template_vm = vcd_xml.get_vm_details(response.content)
 
-                cpus = re.search('<rasd:Description>Number of Virtual CPUs</.*?>(\d+)</rasd:VirtualQuantity>',result).group(1)
-                memory_mb = re.search('<rasd:Description>Memory Size</.*?>(\d+)</rasd:VirtualQuantity>',result).group(1)
-                cores = re.search('<vmw:CoresPerSocket ovf:required.*?>(\d+)</vmw:CoresPerSocket>',result).group(1)
+                vm_name = template_vm['name']
+                vm_id = template_vm['id']
+                vm_href = template_vm['href']
+                cpus = template_vm['cpus']
+                memory_mb = template_vm['memory_mb']
+                cores = template_vm['cores_per_socket']
 
                 headers['Content-Type'] = 'application/vnd.vmware.vcloud.instantiateVAppTemplateParams+xml'
                 vdc_id = vdc.get('id').split(':')[-1]
@@ -2610,6 +2781,7 @@ class vimconnector(vimconn.vimconnector):
 
         try:
             vapp_name = self.get_namebyvappid(vm__vim_uuid)
+            self.invalidate_cache(('vapp_name', vm__vim_uuid))
             if vapp_name is None:
                 self.logger.debug("delete_vminstance(): Failed to get vm by given {} vm uuid".format(vm__vim_uuid))
                 return -1, "delete_vminstance(): Failed to get vm by given {} vm uuid".format(vm__vim_uuid)
@@ -2726,6 +2898,16 @@ class vimconnector(vimconn.vimconnector):
 
         self.logger.debug("Client requesting refresh vm status for {} ".format(vm_list))
 
+        if self.bulk_refresh:
+            return self.refresh_vms_status_bulk(vm_list)
+        return self.refresh_vms_status_per_vapp(vm_list)
+
+    def refresh_vms_status_per_vapp(self, vm_list):
+        """Get the status of the vApps with several requests per vApp. vApps not found are not included at the
+           result
+           Params: the list of vApp identifiers
+           Returns the same dictionary than refresh_vms_status
+        """
         org,vdc = self.get_vdc_details()
         if vdc is None:
             raise vimconn.vimconnException("Failed to get a reference of VDC for a tenant {}".format(self.tenant_name))
@@ -2743,13 +2925,11 @@ class vimconnector(vimconn.vimconnector):
                     the_vapp = VApp(self.client, resource=vapp_resource)
 
                     vm_details = {}
-                    for vm in the_vapp.get_all_vms():
-                        headers = {'Accept':'application/*+xml;version=' + API_VERSION,
-                           'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
-                        response = self.perform_request(req_type='GET',
-                                                        url=vm.get('href'),
-                                                        headers=headers)
-
+                    vms = the_vapp.get_all_vms()
+                    headers = {'Accept':'application/*+xml;version=' + API_VERSION,
+                       'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
+                    responses = self.perform_requests([('GET', vm.get('href'), headers) for vm in vms])
+                    for vm, response in zip(vms, responses):
                         if response.status_code != 200:
                             self.logger.error("refresh_vms_status : REST call {} failed reason : {}"\
                                                             "status code : {}".format(vm.get('href'),
@@ -2757,23 +2937,10 @@ class vimconnector(vimconn.vimconnector):
                                                                                response.status_code))
                             raise vimconn.vimconnException("refresh_vms_status : Failed to get "\
                                                                          "VM details")
-                        xmlroot = XmlElementTree.fromstring(response.content)
-
-                        
-                        result = response.content.replace("\n"," ")
-                        hdd_match = re.search('vcloud:capacity="(\d+)"\svcloud:storageProfileOverrideVmDefault=',result)
-                        if hdd_match:
-                            hdd_mb = hdd_match.group(1)
-                            vm_details['hdd_mb'] = int(hdd_mb) if hdd_mb else None
-                        cpus_match = re.search('<rasd:Description>Number of Virtual CPUs</.*?>(\d+)</rasd:VirtualQuantity>',result)
-                        if cpus_match:
-                            cpus = cpus_match.group(1)
-                            vm_details['cpus'] = int(cpus) if cpus else None
-                        memory_mb = re.search('<rasd:Description>Memory Size</.*?>(\d+)</rasd:VirtualQuantity>',result).group(1)
-                        vm_details['memory_mb'] = int(memory_mb) if memory_mb else None
-                        vm_details['status'] = vcdStatusCode2manoFormat[int(xmlroot.get('status'))]
-                        vm_details['id'] = xmlroot.get('id')
-                        vm_details['name'] = xmlroot.get('name')
+                        vm_xml = vcd_xml.get_vm_details(response.content)
+                        for key in ('hdd_mb', 'cpus', 'memory_mb', 'id', 'name'):
+                            vm_details[key] = vm_xml[key]
+                        vm_details['status'] = vcdStatusCode2manoFormat[int(vm_xml['status'])]
                         vm_info = [vm_details]
                         if vm_pci_details:
                             vm_info[0].update(vm_pci_details)
@@ -2785,13 +2952,7 @@ class vimconnector(vimconn.vimconnector):
                         # get networks
                         vm_ip = None
                         vm_mac = None
-                        networks = re.findall('<NetworkConnection needsCustomization=.*?</NetworkConnection>',result)
-                        for network in networks:
-                            mac_s = re.search('<MACAddress>(.*?)</MACAddress>',network)
-                            vm_mac = mac_s.group(1) if mac_s else None
-                            ip_s = re.search('<IpAddress>(.*?)</IpAddress>',network)
-                            vm_ip = ip_s.group(1) if ip_s else None
-
+                        for network_name, vm_mac, vm_ip in vm_xml['network_connections']:
                             if vm_ip is None:
                                 if not nsx_edge_list:
                                     nsx_edge_list = self.get_edge_details()
@@ -2801,9 +2962,6 @@ class vimconnector(vimconn.vimconnector):
                                 if vm_mac is not None:
                                     vm_ip = self.get_ipaddr_from_NSXedge(nsx_edge_list, vm_mac)
 
-                            net_s = re.search('network="(.*?)"',network)
-                            network_name = net_s.group(1) if net_s else None
-
                             vm_net_id = self.get_network_id_by_name(network_name)
                             interface = {"mac_address": vm_mac,
                                          "vim_net_id": vm_net_id,
@@ -2822,6 +2980,217 @@ class vimconnector(vimconn.vimconnector):
         return vms_dict
 
 
+    def refresh_vms_status_bulk(self, vm_list):
+        """Get the status of the vApps with a few requests to the vCD query service, instead of several requests per
+           vApp:
+           - the disk size and network connections, not included at the query records, are fetched for the VMs
+             that are new, whose status changed or after 'vm_details_ttl' seconds, see get_vms_details
+           - the host and PCI devices of all the VMs are obtained with a couple of vCenter requests, see
+             get_vms_pci_details
+           - the NSX edge DHCP leases are fetched at most once
+           Records are matched by the vApp uuid. vApps not found at the query results are refreshed with
+           refresh_vms_status_per_vapp
+           Params: the list of vApp identifiers
+           Returns the same dictionary than refresh_vms_status
+        """
+        records = self.query_records('vm', ['container=={}/api/vApp/vapp-{}'.format(self.url.rstrip('/'), vmuuid)
+                                            for vmuuid in vm_list])
+
+        vapp_records = {}
+        for record in records:
+            vmuuid = record.get('container', '').split('/')[-1].replace('vapp-', '', 1)
+            vapp_records.setdefault(vmuuid, []).append(record)
+
+        found = [vmuuid for vmuuid in vm_list if vmuuid in vapp_records]
+        vm_details = self.get_vms_details([record for vmuuid in found for record in vapp_records[vmuuid]])
+        pci_details = self.get_vms_pci_details(found)
+
+        vms_dict = {}
+        dhcp_leases = None
+        for vmuuid in found:
+            vm_info = []
+            interfaces = []
+            for record in vapp_records[vmuuid]:
+                details = vm_details.get(record.get('href'), {})
+                vm_info.append({'id': record.get('href').split('/')[-1].replace('vm-', 'urn:vcloud:vm:', 1),
+                                'name': record.get('name'),
+                                'status': vcdStatusName2manoFormat.get(record.get('status'), 'OTHER'),
+                                'cpus': int(record.get('numberOfCpus')) if record.get('numberOfCpus') else None,
+                                'memory_mb': int(record.get('memoryMB')) if record.get('memoryMB') else None,
+                                'hdd_mb': details.get('hdd_mb')})
+                vm_info[-1].update(pci_details.get(vmuuid, {}))
+
+                for network_name, vm_mac, vm_ip in details.get('network_connections', ()):
+                    if vm_ip is None and vm_mac is not None:
+                        if dhcp_leases is None:
+                            dhcp_leases = self.get_nsx_dhcp_leases()
+                        vm_ip = dhcp_leases.get(vm_mac)
+                    vm_net_id = self.get_network_id_by_name(network_name)
+                    interfaces.append({"mac_address": vm_mac,
+                                       "vim_net_id": vm_net_id,
+                                       "vim_interface_id": vm_net_id,
+                                       "ip_address": vm_ip})
+
+            # as vCD does, the status of a vApp is the one of its VMs, unless they differ
+            statuses = set(vm['status'] for vm in vm_info)
+            status = statuses.pop() if len(statuses) == 1 else 'OTHER'
+            vms_dict[vmuuid] = {'status': status, 'error_msg': status, 'vim_info': yaml.safe_dump(vm_info),
+                                'interfaces': interfaces}
+            self.logger.debug("refresh_vms_status_bulk : vm info {}".format(vms_dict[vmuuid]))
+
+        missing = [vmuuid for vmuuid in vm_list if vmuuid not in vapp_records]
+        if missing:
+            self.logger.debug("refresh_vms_status_bulk : vApps {} not found by the query service".format(missing))
+            for vmuuid in missing:
+                self.vm_morefs.pop(vmuuid, None)
+            vms_dict.update(self.refresh_vms_status_per_vapp(missing))
+        return vms_dict
+
+    def get_vms_details(self, vm_records):
+        """Get the disk size and network connections of the VMs of some query records, with a request per VM sent
+           concurrently (see perform_requests). They are kept up to 'vm_details_ttl' seconds, and fetched again
+           before if the status of the VM changes
+           Params: list of VM query records
+           Returns dict with the details (see vcd_xml.get_vm_details) of each VM href. VMs whose details can not
+           be obtained are not included
+        """
+        now = time.time()
+        for href, entry in list(self.vm_details.items()):
+            if entry[0] <= now:
+                del self.vm_details[href]
+
+        outdated = [record for record in vm_records
+                    if self.vm_details.get(record.get('href'), (None, None))[1] != record.get('status')]
+        headers = {'Accept':'application/*+xml;version=' + API_VERSION,
+                   'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
+        responses = self.perform_requests([('GET', record.get('href'), headers) for record in outdated])
+        for record, response in zip(outdated, responses):
+            if response.status_code != 200:
+                self.logger.error("get_vms_details : REST call {} failed reason : {} status code : {}"
+                                  .format(record.get('href'), response.content, response.status_code))
+                self.vm_details.pop(record.get('href'), None)
+                continue
+            self.vm_details[record.get('href')] = (now + self.vm_details_ttl, record.get('status'),
+                                                   vcd_xml.get_vm_details(response.content))
+        return {record.get('href'): self.vm_details[record.get('href')][2] for record in vm_records
+                if record.get('href') in self.vm_details}
+
+    def get_vms_pci_details(self, vapp_uuids):
+        """Get the host and PCI devices of the VM of several vApps, as get_vm_pci_details, with two vCenter
+           requests for all of them. The moref id of the VM of each vApp is obtained once, as it does not change
+           Params: list of vApp identifiers
+           Returns dict with the details of each vApp. Empty if vCenter is not configured or it can not be reached
+        """
+        if not vapp_uuids or not self.vcenter_ip:
+            return {}
+        pci_details = {}
+        try:
+            for vapp_uuid in vapp_uuids:
+                if vapp_uuid not in self.vm_morefs:
+                    vm_moref_id = self.get_vm_moref_id(vapp_uuid)
+                    if vm_moref_id:
+                        self.vm_morefs[vapp_uuid] = vm_moref_id
+            vapp_by_moref = {self.vm_morefs[vapp_uuid]: vapp_uuid for vapp_uuid in vapp_uuids
+                             if vapp_uuid in self.vm_morefs}
+            if not vapp_by_moref:
+                return pci_details
+
+            vcenter_conect, content = self.get_vcenter_content()
+            vms = self.get_vcenter_properties(
+                content, vim.VirtualMachine, ['runtime.host', 'config.hardware.device'],
+                [vim.VirtualMachine(vm_moref_id, vcenter_conect._stub) for vm_moref_id in vapp_by_moref])
+            hosts = {vm['runtime.host']._GetMoId(): vm['runtime.host'] for vm in vms.values()
+                     if vm.get('runtime.host')}
+            hosts = self.get_vcenter_properties(content, vim.HostSystem, ['name', 'config.network.vnic'],
+                                                hosts.values()) if hosts else {}
+
+            for vm_moref_id, vm in vms.items():
+                host = vm.get('runtime.host') and hosts.get(vm['runtime.host']._GetMoId())
+                if not host:
+                    continue
+                vnics = host.get('config.network.vnic')
+                vm_pci_devices_info = {"host_name": host.get('name'),
+                                       "host_ip": vnics[0].spec.ip.ipAddress if vnics else None}
+                for device in vm.get('config.hardware.device') or ():
+                    if type(device) == vim.vm.device.VirtualPCIPassthrough:
+                        vm_pci_devices_info[device.deviceInfo.label] = {'devide_id': device.backing.id,
+                                                                        'pciSlotNumber': device.slotInfo.pciSlotNumber}
+                pci_details[vapp_by_moref[vm_moref_id]] = vm_pci_devices_info
+        except Exception as exp:
+            self.logger.error("get_vms_pci_details : Failed to get PCI details from vCenter: {}".format(exp))
+        return pci_details
+
+    def get_vcenter_properties(self, content, obj_type, path_set, objects):
+        """Get some properties of several vCenter objects of a type with a single request
+           Returns dict with the properties (by name) of each object, by moref id
+        """
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[vmodl.query.PropertyCollector.ObjectSpec(obj=obj) for obj in objects],
+            propSet=[vmodl.query.PropertyCollector.PropertySpec(type=obj_type, pathSet=path_set, all=False)])
+        return {obj_content.obj._GetMoId(): {prop.name: prop.val for prop in obj_content.propSet}
+                for obj_content in content.propertyCollector.RetrieveContents([filter_spec])}
+
+    def query_records(self, query_type, filters):
+        """Get the records of the vCD query service that match any of the filters, following all the pages.
+           Filters are sent in chunks of QUERY_FILTER_CHUNK conditions.
+           Params: query_type: e.g. 'vm' or 'vApp'
+                   filters: list of conditions, e.g. ['container==<vApp href>', ...]
+           Returns the list of records (as Element objects)
+        """
+        headers = {'Accept':'application/*+xml;version=' + API_VERSION,
+                   'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
+        records = []
+        for index in range(0, len(filters), QUERY_FILTER_CHUNK):
+            url = "{}/api/query?{}".format(self.url.rstrip('/'), urllib.urlencode(
+                [('type', query_type), ('format', 'records'), ('pageSize', QUERY_PAGE_SIZE),
+                 ('filter', '(' + ','.join(filters[index:index + QUERY_FILTER_CHUNK]) + ')')]))
+            while url:
+                response = self.perform_request(req_type='GET', url=url, headers=headers)
+                if response.status_code != requests.codes.ok:
+                    raise vimconn.vimconnException("query_records : Failed to query {} records. Status code {}: {}"
+                                                   .format(query_type, response.status_code, response.content))
+                xmlroot = XmlElementTree.fromstring(response.content)
+                url = None
+                for child in xmlroot:
+                    if child.tag == vcd_xml.LINK:
+                        if child.get('rel') == 'nextPage':
+                            url = child.get('href')
+                    elif child.tag.endswith('Record'):
+                        records.append(child)
+        return records
+
+    def get_nsx_dhcp_leases(self):
+        """Get the DHCP leases of all the NSX edges
+           Returns dict with the IP address of each MAC address. Empty if they can not be obtained
+        """
+        dhcp_leases = {}
+        rheaders = {'Content-Type': 'application/xml'}
+        try:
+            nsx_edges = self.get_edge_details() or ()
+        except vimconn.vimconnException as exp:
+            self.logger.error("get_nsx_dhcp_leases: {}".format(exp))
+            return dhcp_leases
+
+        for edge in nsx_edges:
+            nsx_api_url = '/api/4.0/edges/'+ edge +'/dhcp/leaseInfo'
+            try:
+                resp = self.get_session(self.nsx_manager).get(self.nsx_manager + nsx_api_url,
+                                    auth = (self.nsx_user, self.nsx_password),
+                                    verify = False, headers = rheaders)
+                if resp.status_code != requests.codes.ok:
+                    self.logger.debug("get_nsx_dhcp_leases: "\
+                                      "Error occurred while getting DHCP lease info from NSX Manager: {}"
+                                      .format(resp.content))
+                    continue
+                dhcp_lease_info = XmlElementTree.fromstring(resp.text)
+                for lease_info in dhcp_lease_info.iter('leaseInfo'):
+                    mac_address = lease_info.findtext('macAddress')
+                    if mac_address is not None:
+                        dhcp_leases.setdefault(mac_address, lease_info.findtext('ipAddress'))
+            except (requests.exceptions.RequestException, XmlElementTree.ParseError) as exp:
+                self.logger.debug("get_nsx_dhcp_leases: Failed to get DHCP leases of edge {}: {}".format(edge, exp))
+        return dhcp_leases
+
     def get_edge_details(self):
         """Get the NSX edge list from NSX Manager
            Returns list of NSX edges
@@ -2833,7 +3202,7 @@ class vimconnector(vimconn.vimconnector):
         self.logger.debug("Get edge details from NSX Manager {} {}".format(self.nsx_manager, nsx_api_url))
 
         try:
-            resp = requests.get(self.nsx_manager + nsx_api_url,
+            resp = self.get_session(self.nsx_manager).get(self.nsx_manager + nsx_api_url,
                                 auth = (self.nsx_user, self.nsx_password),
                                 verify = False, headers = rheaders)
             if resp.status_code == requests.codes.ok:
@@ -2893,7 +3262,7 @@ class vimconnector(vimconn.vimconnector):
             for edge in nsx_edges:
                 nsx_api_url = '/api/4.0/edges/'+ edge +'/dhcp/leaseInfo'
 
-                resp = requests.get(self.nsx_manager + nsx_api_url,
+                resp = self.get_session(self.nsx_manager).get(self.nsx_manager + nsx_api_url,
                                     auth = (self.nsx_user, self.nsx_password),
                                     verify = False, headers = rheaders)
 
@@ -3139,9 +3508,6 @@ class vimconnector(vimconn.vimconnector):
                                      url=vm_list_rest_call,
                                            headers=headers)
 
-            if response.status_code == 403:
-                response = self.retry_rest('GET', vm_list_rest_call)
-
             if response.status_code == requests.codes.ok:
                 return response.content
 
@@ -3173,9 +3539,6 @@ class vimconnector(vimconn.vimconnector):
             response = self.perform_request(req_type='GET',
                                             url=vm_list_rest_call,
                                             headers=headers)
-            if response.status_code == 403:
-                response = self.retry_rest('GET', vm_list_rest_call)
-
             if response.status_code == requests.codes.ok:
                 return response.content
         return None
@@ -3194,11 +3557,13 @@ class vimconnector(vimconn.vimconnector):
                     "vdcs" - for vdc list under org
         """
 
-        org_dict = {}
-
         if org_uuid is None:
-            return org_dict
+            return {}
+
+        return deepcopy(self._cached(('org', org_uuid), lambda: self._get_org(org_uuid)))
 
+    def _get_org(self, org_uuid):
+        org_dict = {}
         content = self.get_org_action(org_uuid=org_uuid)
         try:
             vdc_list = {}
@@ -3419,10 +3784,6 @@ class vimconnector(vimconn.vimconnector):
             response = self.perform_request(req_type='GET',
                                             url=vm_list_rest_call,
                                             headers=headers)
-            #Retry login if session expired & retry sending request
-            if response.status_code == 403:
-                response = self.retry_rest('GET', vm_list_rest_call)
-
             if response.status_code == requests.codes.ok:
                 return response.content
 
@@ -4011,10 +4372,6 @@ class vimconnector(vimconn.vimconnector):
                                             url=get_vapp_restcall,
                                             headers=headers)
 
-            if response.status_code == 403:
-                if need_admin_access == False:
-                    response = self.retry_rest('GET', get_vapp_restcall)
-
             if response.status_code != requests.codes.ok:
                 self.logger.debug("REST API call {} failed. Return status code {}".format(get_vapp_restcall,
                                                                                           response.status_code))
@@ -4134,9 +4491,6 @@ class vimconnector(vimconn.vimconnector):
                                             url=console_rest_call,
                                             headers=headers)
 
-            if response.status_code == 403:
-                response = self.retry_rest('POST', console_rest_call)
-
             if response.status_code == requests.codes.ok:
                 return response.content
 
@@ -4202,9 +4556,6 @@ class vimconnector(vimconn.vimconnector):
                                                 url=disk_href,
                                                 headers=headers)
 
-        if response.status_code == 403:
-            response = self.retry_rest('GET', disk_href)
-
         if response.status_code != requests.codes.ok:
             self.logger.debug("GET REST API call {} failed. Return status code {}".format(disk_href,
                                                                             response.status_code))
@@ -4233,10 +4584,6 @@ class vimconnector(vimconn.vimconnector):
                                                 url=disk_href,
                                                 headers=headers,
                                                 data=data)
-            if response.status_code == 403:
-                add_headers = {'Content-Type': headers['Content-Type']}
-                response = self.retry_rest('PUT', disk_href, add_headers, data)
-
             if response.status_code != 202:
                 self.logger.debug("PUT REST API call {} failed. Return status code {}".format(disk_href,
                                                                             response.status_code))
@@ -4476,8 +4823,7 @@ class vimconnector(vimconn.vimconnector):
         """
         Waits and provides updates on a vSphere task
         """
-        while task.info.state == vim.TaskInfo.State.running:
-            time.sleep(2)
+        self.wait_for_vcenter_tasks([task])
 
         if task.info.state == vim.TaskInfo.State.success:
             if task.info.result is not None and not hideResult:
@@ -4494,6 +4840,58 @@ class vimconnector(vimconn.vimconnector):
 
         return task.info.result
 
+    def wait_for_vcenter_tasks(self, tasks, timeout=None):
+        """
+        Waits until a list of vSphere tasks finish, being notified of their state changes by the
+        property collector instead of polling each task
+
+            Args:
+                tasks - list of vSphere task objects
+                timeout - seconds to wait, by default vcenter_task_timeout of config (None waits forever)
+
+            Returns:
+                dict with the final state (success or error) of each task moref id
+        """
+        if timeout is None:
+            timeout = self.vcenter_task_timeout
+        deadline = time.time() + float(timeout) if timeout else None
+        pending = set(task._moId for task in tasks)
+        states = {}
+        if not pending:
+            return states
+
+        vcenter_conect, content = self.get_vcenter_content()
+        collector = content.propertyCollector
+        filter_spec = vmodl.query.PropertyCollector.FilterSpec(
+            objectSet=[vmodl.query.PropertyCollector.ObjectSpec(obj=task) for task in tasks],
+            propSet=[vmodl.query.PropertyCollector.PropertySpec(type=vim.Task, pathSet=['info.state'], all=False)])
+        task_filter = collector.CreateFilter(filter_spec, True)
+        try:
+            version = None
+            while pending:
+                max_wait = VCENTER_WAIT_SECONDS
+                if deadline:
+                    max_wait = int(min(max_wait, deadline - time.time()))
+                    if max_wait <= 0:
+                        raise vimconn.vimconnException("Timeout waiting for vCenter tasks {}".format(
+                                                       ", ".join(sorted(pending))))
+                # the first call returns the current state, next ones just the changes since version
+                update = collector.WaitForUpdatesEx(version,
+                                                    vmodl.query.PropertyCollector.WaitOptions(maxWaitSeconds=max_wait))
+                if update is None:
+                    continue
+                version = update.version
+                for filter_set in update.filterSet:
+                    for object_set in filter_set.objectSet:
+                        for change in object_set.changeSet:
+                            if change.name == 'info.state' and change.val in (vim.TaskInfo.State.success,
+                                                                              vim.TaskInfo.State.error):
+                                states[object_set.obj._moId] = change.val
+                                pending.discard(object_set.obj._moId)
+        finally:
+            task_filter.Destroy()
+        return states
+
     def add_pci_to_vm(self,host_object, vm_object, host_pci_dev):
         """
          Method to add pci device in given VM
@@ -4642,9 +5040,6 @@ class vimconnector(vimconn.vimconnector):
                                             url=url_rest_call,
                                             headers=headers)
 
-            if response.status_code == 403:
-                response = self.retry_rest('GET', url_rest_call)
-
             if response.status_code != 200:
                 self.logger.error("REST call {} failed reason : {}"\
                                   "status code : {}".format(url_rest_call,
@@ -4670,10 +5065,6 @@ class vimconnector(vimconn.vimconnector):
                                             headers=headers,
                                             data=newdata)
 
-            if response.status_code == 403:
-                add_headers = {'Content-Type': headers['Content-Type']}
-                response = self.retry_rest('PUT', url_rest_call, add_headers, newdata)
-
             if response.status_code != 202:
                 self.logger.error("REST call {} failed reason : {}"\
                                   "status code : {} ".format(url_rest_call,
@@ -4711,9 +5102,6 @@ class vimconnector(vimconn.vimconnector):
                                         url=url_rest_call,
                                         headers=headers)
 
-        if response.status_code == 403:
-            response = self.retry_rest('GET', url_rest_call)
-
         if response.status_code != 200:
             self.logger.error("REST call {} failed reason : {}"\
                               "status code : {}".format(url_rest_call,
@@ -4753,10 +5141,6 @@ class vimconnector(vimconn.vimconnector):
                                         headers=headers,
                                         data=newdata)
 
-        if response.status_code == 403:
-            add_headers = {'Content-Type': headers['Content-Type']}
-            response = self.retry_rest('PUT', url_rest_call, add_headers, newdata)
-
         if response.status_code != 202:
             self.logger.error("REST call {} failed reason : {}"\
                               "status code : {} ".format(url_rest_call,
@@ -4795,9 +5179,6 @@ class vimconnector(vimconn.vimconnector):
                                             url=url_rest_call,
                                             headers=headers)
 
-            if response.status_code == 403:
-                response = self.retry_rest('GET', url_rest_call)
-
             if response.status_code != 200:
                 self.logger.error("REST call {} failed reason : {}"\
                                   "status code : {}".format(url_rest_call,
@@ -4831,10 +5212,6 @@ class vimconnector(vimconn.vimconnector):
                                             headers=headers,
                                             data=newdata)
 
-            if response.status_code == 403:
-                add_headers = {'Content-Type': headers['Content-Type']}
-                response = self.retry_rest('PUT', url_rest_call, add_headers, newdata)
-
             if response.status_code != 202:
                 self.logger.error("REST call {} failed reason : {}"\
                                   "status code : {} ".format(url_rest_call,
@@ -4896,9 +5273,6 @@ class vimconnector(vimconn.vimconnector):
                                                     url=url_rest_call,
                                                     headers=headers)
 
-                    if response.status_code == 403:
-                        response = self.retry_rest('GET', url_rest_call)
-
                     if response.status_code != 200:
                         self.logger.error("REST call {} failed reason : {}"\
                                              "status code : {}".format(url_rest_call,
@@ -4954,10 +5328,6 @@ class vimconnector(vimconn.vimconnector):
                                                     headers=headers,
                                                     data=data)
 
-                    if response.status_code == 403:
-                        add_headers = {'Content-Type': headers['Content-Type']}
-                        response = self.retry_rest('PUT', url_rest_call, add_headers, data)
-
                     if response.status_code != 202:
                         self.logger.error("REST call {} failed reason : {}"\
                                             "status code : {} ".format(url_rest_call,
@@ -4986,9 +5356,6 @@ class vimconnector(vimconn.vimconnector):
                                                     url=url_rest_call,
                                                     headers=headers)
 
-                    if response.status_code == 403:
-                        response = self.retry_rest('GET', url_rest_call)
-
                     if response.status_code != 200:
                         self.logger.error("REST call {} failed reason : {}"\
                                             "status code : {}".format(url_rest_call,
@@ -5049,10 +5416,6 @@ class vimconnector(vimconn.vimconnector):
                                                     headers=headers,
                                                     data=data)
 
-                    if response.status_code == 403:
-                        add_headers = {'Content-Type': headers['Content-Type']}
-                        response = self.retry_rest('PUT', url_rest_call, add_headers, data)
-
                     if response.status_code != 202:
                         self.logger.error("REST call {} failed reason : {}"\
                                             "status code : {}".format(url_rest_call,
@@ -5331,9 +5694,6 @@ class vimconnector(vimconn.vimconnector):
                                             url=disk_href,
                                             headers=headers)
 
-        if response.status_code == 403:
-            response = self.retry_rest('GET', disk_href)
-
         if response.status_code != requests.codes.ok:
             self.logger.error("add_new_disk_rest: GET REST API call {} failed. Return status code {}"
                               .format(disk_href, response.status_code))
@@ -5380,10 +5740,6 @@ class vimconnector(vimconn.vimconnector):
                                             data=new_data,
                                             headers=headers)
 
-            if response.status_code == 403:
-                add_headers = {'Content-Type': headers['Content-Type']}
-                response = self.retry_rest('PUT', disk_href, add_headers, new_data)
-
             if response.status_code != 202:
                 self.logger.error("PUT REST API call {} failed. Return status code {}. Response Content:{}"
                                   .format(disk_href, response.status_code, response.content))
@@ -5556,8 +5912,17 @@ class vimconnector(vimconn.vimconnector):
 
     def get_vcenter_content(self):
         """
-         Get the vsphere content object
+         Get the vsphere content object. The service instance is reused while its session is alive
         """
+        if self.vcenter_service:
+            vcenter_conect, content = self.vcenter_service
+            try:
+                if content.sessionManager.currentSession:
+                    return vcenter_conect, content
+            except Exception as exp:
+                self.logger.debug("vCenter session is not valid anymore: {}".format(exp))
+            self.vcenter_service = None
+
         try:
             vm_vcenter_info = self.get_vm_vcenter_info()
         except Exception as exp:
@@ -5578,6 +5943,7 @@ class vimconnector(vimconn.vimconnector):
                 )
         atexit.register(Disconnect, vcenter_conect)
         content = vcenter_conect.RetrieveContent()
+        self.vcenter_service = vcenter_conect, content
         return vcenter_conect, content
 
 
@@ -6225,49 +6591,6 @@ class vimconnector(vimconn.vimconnector):
             raise vimconn.vimconnException(message=exp)
 
 
-    def retry_rest(self, method, url, add_headers=None, data=None):
-        """ Method to get Token & retry respective REST request
-            Args:
-                api - REST API - Can be one of 'GET' or 'PUT' or 'POST'
-                url - request url to be used
-                add_headers - Additional headers (optional)
-                data - Request payload data to be passed in request
-            Returns:
-                response - Response of request
-        """
-        response = None
-
-        #Get token
-        self.get_token()
-
-        if self.client._session:
-                headers = {'Accept':'application/*+xml;version=' + API_VERSION,
-                           'x-vcloud-authorization': self.client._session.headers['x-vcloud-authorization']}
-
-        if add_headers:
-            headers.update(add_headers)
-
-        if method == 'GET':
-            response = self.perform_request(req_type='GET',
-                                            url=url,
-                                            headers=headers)
-        elif method == 'PUT':
-            response = self.perform_request(req_type='PUT',
-                                            url=url,
-                                            headers=headers,
-                                            data=data)
-        elif method == 'POST':
-            response = self.perform_request(req_type='POST',
-                                            url=url,
-                                            headers=headers,
-                                            data=data)
-        elif method == 'DELETE':
-            response = self.perform_request(req_type='DELETE',
-                                            url=url,
-                                            headers=headers)
-        return response
-
-
     def get_token(self):
         """ Generate a new token if expired
 
@@ -6282,7 +6605,11 @@ class vimconnector(vimconn.vimconnector):
             client = Client(host, verify_ssl_certs=False)
             client.set_credentials(BasicLoginCredentials(self.user, self.org_name, self.passwd))
             # connection object
+            if self.client:
+                self.expired_token = self.client._session.headers.get('x-vcloud-authorization')
             self.client = client
+            # cached Org objects keep a reference to the old client
+            self.invalidate_cache('vdc')
 
         except:
             raise vimconn.vimconnConnectionException("Can't connect to a vCloud director org: "
@@ -6297,13 +6624,16 @@ class vimconnector(vimconn.vimconnector):
 
             Returns org and vdc object
         """
-        vdc = None
+        org, vdc = self.cache.get('vdc', (0, (None, None)))[1]
+        if vdc is not None and self.cache['vdc'][0] > time.time():
+            return org, vdc
         try:
             org = Org(self.client, resource=self.client.get_org())
             vdc = org.get_vdc(self.tenant_name)
         except Exception as e:
             # pyvcloud not giving a specific exception, Refresh nevertheless
             self.logger.debug("Received exception {}, refreshing token ".format(str(e)))
+            vdc = None
 
         #Retry once, if failed by refreshing token
         if vdc is None:
@@ -6311,38 +6641,95 @@ class vimconnector(vimconn.vimconnector):
             org = Org(self.client, resource=self.client.get_org())
             vdc = org.get_vdc(self.tenant_name)
 
+        if vdc is not None and self.cache_ttl > 0:
+            self.cache['vdc'] = (time.time() + self.cache_ttl, (org, vdc))
         return org, vdc
 
+    def _cached(self, key, load):
+        """Return the value cached for key if not expired, or call load to get (and cache) it.
+        Empty values (e.g. None when the element is not found) are not cached
+        """
+        if self.cache_ttl <= 0:
+            return load()
+        now = time.time()
+        entry = self.cache.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+        value = load()
+        if value:
+            self.cache[key] = (now + self.cache_ttl, value)
+        return value
+
+    def invalidate_cache(self, *keys):
+        """Remove the cached entries of the given keys or kind of keys ('org', 'vapp_name', 'vdc'). All of them
+        if no key is provided
+        """
+        if not keys:
+            self.cache.clear()
+            return
+        for key in list(self.cache):
+            if key in keys or (isinstance(key, tuple) and key[0] in keys):
+                self.cache.pop(key, None)
+
+
+    def get_session(self, url):
+        """Return the pooled session used for the requests to the host of the url (vCD, NSX manager, ...)"""
+        return get_session(url, **self.session_options)
+
+    def _uses_client_token(self, headers):
+        """Check if the request is authenticated with the token of the org user (and not e.g. the admin one), the
+        current one or the one just replaced by a concurrent request"""
+        token = (headers or {}).get('x-vcloud-authorization')
+        session = self.client and self.client._session
+        return bool(token and session and token in (session.headers.get('x-vcloud-authorization'),
+                                                    self.expired_token))
+
+    def _renew_token(self, rejected_token):
+        """Get a new token for the org user, unless other request has already replaced the rejected one. Returns
+        the new token"""
+        with self.token_lock:
+            if self.client._session.headers.get('x-vcloud-authorization') == rejected_token:
+                self.get_token()
+            return self.client._session.headers['x-vcloud-authorization']
 
     def perform_request(self, req_type, url, headers=None, data=None):
-        """Perform the POST/PUT/GET/DELETE request."""
+        """Perform the POST/PUT/GET/DELETE request.
+
+        Connections are kept alive at a pooled session per host. If the request is authenticated with the org user
+        token and it is rejected (403) because the token expired, a new one is obtained and the request is sent
+        again with it. Concurrent requests rejected with the same token share the renewal.
+        """
 
         #Log REST request details
         self.log_request(req_type, url=url, headers=headers, data=data)
         # perform request and return its result
-        if req_type == 'GET':
-            response = requests.get(url=url,
-                                headers=headers,
-                                verify=False)
-        elif req_type == 'PUT':
-            response = requests.put(url=url,
-                                headers=headers,
-                                data=data,
-                                verify=False)
-        elif req_type == 'POST':
-            response = requests.post(url=url,
-                                 headers=headers,
-                                 data=data,
-                                 verify=False)
-        elif req_type == 'DELETE':
-            response = requests.delete(url=url,
-                                 headers=headers,
-                                 verify=False)
+        response = self.get_session(url).request(req_type, url, headers=headers, data=data, verify=False)
+        if response.status_code == 403 and self._uses_client_token(headers):
+            self.logger.debug("Request {} {} forbidden. Retrying with a new token".format(req_type, url))
+            headers = dict(headers, **{'x-vcloud-authorization':
+                                       self._renew_token(headers['x-vcloud-authorization'])})
+            response = self.get_session(url).request(req_type, url, headers=headers, data=data, verify=False)
         #Log the REST response
         self.log_response(response)
 
         return response
 
+    def perform_requests(self, requests_list):
+        """Perform several requests, concurrently up to the 'rest_concurrency' config value (1 by default).
+        Args:
+            requests_list - list of (req_type, url, headers, data) tuples, headers and data are optional
+        Returns:
+            list of responses, in the same order
+        """
+        requests_list = [tuple(request) + (None,) * (4 - len(request)) for request in requests_list]
+        if self.rest_concurrency <= 1 or len(requests_list) <= 1:
+            return [self.perform_request(*request) for request in requests_list]
+        pool = ThreadPool(min(self.rest_concurrency, len(requests_list)))
+        try:
+            return pool.map(lambda request: self.perform_request(*request), requests_list)
+        finally:
+            pool.close()
+
 
     def log_request(self, req_type, url=None, headers=None, data=None):
         """Logs REST request details"""
@@ -46,6 +46,7 @@ in this file.
 import json
 import logging
 from contextlib import contextmanager
+from functools import partial
 from itertools import groupby
 from operator import itemgetter
 from sys import exc_info
@@ -68,12 +69,15 @@ class WimEngine(object):
     """Logic supporting the establishment of WAN links when NS spans across
     different datacenters.
     """
-    def __init__(self, persistence, logger=None, ovim=None):
+    def __init__(self, persistence, logger=None, ovim=None, worker_pool=None,
+                 lease_keeper=None):
         self.persist = persistence
         self.logger = logger or logging.getLogger('openmano.wim.engine')
         self.threads = {}
         self.connectors = {}
         self.ovim = ovim
+        self.worker_pool = worker_pool
+        self.lease_keeper = lease_keeper
 
     def create_wim(self, properties):
         """Create a new wim record according to the properties
@@ -459,20 +463,54 @@ class WimEngine(object):
                 The `wim` field is required to be set with a valid WIM record
                 inside the `wim_account` dict
 
+        When a ``worker_pool`` is set, the thread is spawned inside the
+        worker process responsible for the account and a proxy object is
+        returned instead.
+
+        When a ``lease_keeper`` is set, the thread is just spawned while this
+        RO replica owns the lease of the account, and a proxy object is
+        returned instead.
+
         Return:
             threading.Thread: Thread object
         """
         thread = None
         try:
-            thread = WimThread(self.persist, wim_account, ovim=self.ovim)
+            if self.lease_keeper:
+                thread = self.lease_keeper.add(
+                    'wim', wim_account['uuid'],
+                    partial(self._start_thread, wim_account))
+                thread.wim_account = wim_account
+            else:
+                thread = self._start_thread(wim_account)
             self.threads[wim_account['uuid']] = thread
-            thread.start()
         except:  # noqa
             self.logger.error('Error when spawning WIM thread for %s',
                               wim_account['uuid'], exc_info=True)
 
         return thread
 
+    def _start_thread(self, wim_account):
+        if self.worker_pool:
+            thread = self.worker_pool.start_thread(
+                'wim', wim_account['uuid'], wim_account)
+            thread.wim_account = wim_account
+        else:
+            thread = WimThread(self.persist, wim_account, ovim=self.ovim)
+            thread.start()
+        return thread
+
+    def discover_thread(self, wim_account_id):
+        """Spawn the thread of a WIM account created by other RO replica"""
+        accounts = self.persist.get_wim_accounts_by(uuid=wim_account_id,
+                                                    error_if_none=False)
+        if accounts:
+            self._spawn_thread(accounts[0])
+
+    def forget_thread(self, wim_account_id):
+        """Remove the thread of a WIM account deleted by other RO replica"""
+        self.threads.pop(wim_account_id, None)
+
     def start_threads(self):
         """Start the threads responsible for processing WIM Actions"""
         accounts = self.persist.get_wim_accounts(error_if_none=False)
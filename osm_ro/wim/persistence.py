@@ -41,6 +41,8 @@ No domain logic/architectural concern should be present in this file.
 import json
 import logging
 from contextlib import contextmanager
+from copy import deepcopy
+from functools import wraps
 from hashlib import sha1
 from itertools import groupby
 from operator import itemgetter
@@ -143,13 +145,114 @@ wan_switch_dpid and wan_switch_port should be unique (the same switch cannot
 be connected to two different places using the same port)
 """
 
+CACHE_TTL = 30  # seconds
+"""Maximum time a record read by the cached methods of ``WimPersistence``
+is reused (even if no invalidation happens)
+"""
+
+CACHE_MAX_ENTRIES = 1000
+
+_generations = {'wims': 0, 'datacenters': 0}
+"""Generation counters for the groups of cached records. They are shared by
+all the ``WimPersistence`` objects, so a change made through one of them (or
+reported via ``invalidate_cache``) invalidates the records cached by the
+others.
+"""
+
+
+def invalidate_cache(*groups):
+    """Invalidate the cached records for the given groups
+    (``wims`` and/or ``datacenters``), or all of them if none is given.
+
+    This function should be called when the related tables are changed
+    outside of ``WimPersistence`` (e.g. datacenters edited by ``nfvo``).
+    """
+    for group in groups or list(_generations.keys()):
+        _generations[group] += 1
+
+
+class ReadCache(object):
+    """Read-through cache for database records, with TTL and generation-based
+    invalidation (see ``invalidate_cache``).
+
+    Records are copied when stored and when retrieved, so callers are free
+    to modify them.
+
+    Attributes:
+        ttl (float): time in seconds a cached record is valid.
+            Zero or negative values disable the cache.
+        hits (int): number of reads served from the cache
+        misses (int): number of reads that reached the database
+    """
+    def __init__(self, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, group, key, load):
+        """Return the cached value for ``key`` or call ``load`` to obtain
+        (and store) a fresh one.
+        """
+        if self.ttl <= 0:
+            return load()
+
+        now = time()
+        generation = _generations[group]
+        # ^  Read the generation before loading: if the records are changed
+        #    meanwhile, the new entry will be considered stale
+
+        entry = self.entries.get(key)
+        if entry and entry[0] == generation and entry[1] > now:
+            self.hits += 1
+            return deepcopy(entry[2])
+
+        self.misses += 1
+        value = load()
+        if len(self.entries) >= self.max_entries:
+            self.clear()
+        self.entries[key] = (generation, now + self.ttl, deepcopy(value))
+
+        return value
+
+    def clear(self):
+        self.entries = {}
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self.entries)}
+
+
+def _cached(group):
+    """Decorator for ``WimPersistence`` methods, that makes the results to be
+    stored in the ``cache`` (using the arguments as key)
+    """
+    def _decorator(method):
+        @wraps(method)
+        def _wrapped(self, *args, **kwargs):
+            key = (method.__name__, _freeze(args), _freeze(kwargs))
+            return self.cache.get_or_load(
+                group, key, lambda: method(self, *args, **kwargs))
+
+        return _wrapped
+
+    return _decorator
+
 
 class WimPersistence(object):
-    """High level interactions with the WIM tables in the database"""
+    """High level interactions with the WIM tables in the database
 
-    def __init__(self, db, logger=None):
+    The most frequent reads (``get_wims``, ``get_wim_accounts_by`` and
+    ``get_datacenters_by``) are cached for ``cache_ttl`` seconds. Changes
+    performed via this class automatically invalidate the cache.
+    """
+
+    def __init__(self, db, logger=None, cache_ttl=CACHE_TTL):
         self.db = db
         self.logger = logger or logging.getLogger('openmano.wim.persistence')
+        self.cache = ReadCache(cache_ttl)
 
     def query(self,
               FROM=None,
@@ -243,6 +346,10 @@ class WimPersistence(object):
         records = self.query(*args, **kwargs)
         return records[0] if records else None
 
+    def invalidate_cache(self, *groups):
+        """See :obj:`~.invalidate_cache`"""
+        invalidate_cache(*groups)
+
     def get_by_uuid(self, table, uuid, **kwargs):
         """Retrieve one record from the database based on its uuid
 
@@ -274,6 +381,7 @@ class WimPersistence(object):
         key = 'uuid' if check_valid_uuid(uuid_or_name) else 'name'
         return self.query_one(table, WHERE={key: uuid_or_name}, **kwargs)
 
+    @_cached('wims')
     def get_wims(self, uuid_or_name=None, tenant=None, **kwargs):
         """Retrieve information about one or more WIMs stored in the database
 
@@ -309,8 +417,11 @@ class WimPersistence(object):
         if "config" in wim_descriptor:
             wim_descriptor["config"] = _serialize(wim_descriptor["config"])
 
-        return self.db.new_row(
+        wim_id = self.db.new_row(
             "wims", wim_descriptor, add_uuid=True, confidential_data=True)
+        invalidate_cache('wims')
+
+        return wim_id
 
     def update_wim(self, uuid_or_name, wim_descriptor):
         """Change an existing WIM record on the database"""
@@ -329,6 +440,7 @@ class WimPersistence(object):
             _serialize(config_dict) if config_dict else None)
 
         self.db.update_rows('wims', wim_descriptor, where)
+        invalidate_cache('wims')
 
         return wim_id
 
@@ -337,9 +449,11 @@ class WimPersistence(object):
         wim = self.get_by_name_or_uuid('wims', wim)
 
         self.db.delete_row_by_id('wims', wim['uuid'])
+        invalidate_cache('wims')
 
         return wim['uuid'] + ' ' + wim['name']
 
+    @_cached('wims')
     def get_wim_accounts_by(self, wim=None, tenant=None, uuid=None, **kwargs):
         """Retrieve WIM account information from the database together
         with the related records (wim, nfvo_tenant and wim_nfvo_tenant)
@@ -444,6 +558,7 @@ class WimPersistence(object):
 
         with self._associate(wim_id, tenant['uuid']):
             self.db.new_rows(transaction, used_uuids, confidential_data=True)
+        invalidate_cache('wims')
 
         return account_id
 
@@ -473,6 +588,7 @@ class WimPersistence(object):
 
         num_changes = self.db.update_rows('wim_accounts', UPDATE=updates,
                                           WHERE={'uuid': wim_account['uuid']})
+        invalidate_cache('wims')
 
         if num_changes is None:
             raise UnexpectedDatabaseError('Impossible to update wim_account '
@@ -485,8 +601,11 @@ class WimPersistence(object):
         # Since we have foreign keys configured with ON CASCADE, we can rely
         # on the database engine to guarantee consistency, deleting the
         # dependant records
-        return self.db.delete_row_by_id('wim_accounts', uuid)
+        result = self.db.delete_row_by_id('wim_accounts', uuid)
+        invalidate_cache('wims')
+        return result
 
+    @_cached('datacenters')
     def get_datacenters_by(self, datacenter=None, tenant=None, **kwargs):
         """Retrieve datacenter information from the database together
         with the related records (nfvo_tenant)
@@ -1002,6 +1121,18 @@ def _compose_where_from_uuids_or_names(**conditions):
     }
 
 
+def _freeze(value):
+    """Convert (nested) dicts and lists into tuples, so they can be used as
+    part of a dict key
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+
+    return value
+
+
 def _str2id(text):
     """Create an ID (following the UUID format) from a piece of arbitrary
     text.
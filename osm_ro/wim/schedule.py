@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+##
+# Copyright 2018 University of Bristol - High Performance Networks Research
+# Group
+# All Rights Reserved.
+#
+# Contributors: Anderson Bravalheri, Dimitrios Gkounis, Abubakar Siddique
+# Muqaddas, Navdeep Uniyal, Reza Nejabati and Dimitra Simeonidou
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact with: <highperformance-networks@bristol.ac.uk>
+#
+# Neither the name of the University of Bristol nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# This work has been performed in the context of DCMS UK 5G Testbeds
+# & Trials Programme and in the framework of the Metro-Haul project -
+# funded by the European Commission under Grant number 761727 through the
+# Horizon 2020 and 5G-PPP programmes.
+##
+
+"""Time ordered collection of tasks, used by the threads to decide what
+should be processed next.
+"""
+from heapq import heappop, heappush
+from itertools import count
+from time import time
+
+
+class TaskSchedule(object):
+    """Collection of tasks ordered by ``process_at``, backed by a binary heap.
+
+    Inserting a task and popping the next due task are ``O(log n)``
+    operations. Tasks scheduled for the same moment are popped in the same
+    order they were inserted.
+
+    Superseded tasks are not removed from the heap when they are marked
+    (which is just an ``O(1)`` status change), instead they are popped as any
+    other task when they become due, and the caller is free to discard them.
+    """
+    __slots__ = ('_heap', '_counter')
+
+    def __init__(self, tasks=()):
+        self._heap = []
+        self._counter = count()
+        for task in tasks:
+            self.push(task, task.process_at)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __nonzero__(self):
+        return bool(self._heap)
+
+    __bool__ = __nonzero__
+
+    def __iter__(self):
+        """Iterate over the tasks in time order (without removing them).
+
+        Note:
+            This operation is ``O(n log n)``, and is intended for inspection
+            and debugging purposes.
+        """
+        return (task for _, _, task in sorted(self._heap))
+
+    def push(self, task, when=None):
+        """Schedule a task to be processed at ``when`` (unix time in seconds,
+        as a float number). If ``when`` is not given, the task is scheduled
+        for the current moment.
+        """
+        when = when or time()
+        task.process_at = when
+        heappush(self._heap, (when, next(self._counter), task))
+        return task
+
+    def peek(self):
+        """Return the next task to be processed, or None if empty"""
+        return self._heap[0][-1] if self._heap else None
+
+    def pop_due(self, now=None):
+        """Lazily pop the tasks scheduled up to ``now``, in time order.
+
+        The tasks are only removed from the schedule as the returned
+        generator is consumed, so the caller can stop at any moment
+        (e.g. when a batch limit is reached).
+        """
+        now = now or time()
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            yield heappop(heap)[-1]
+
+    def clear(self):
+        del self._heap[:]
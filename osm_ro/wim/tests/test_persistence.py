@@ -36,10 +36,13 @@ from __future__ import unicode_literals
 
 import unittest
 from itertools import chain
+from time import time
 from types import StringType
 
 from six.moves import range
 
+from mock import MagicMock, patch
+
 from . import fixtures as eg
 from ...tests.db_helpers import (
     TestCaseWithDatabasePerTest,
@@ -49,6 +52,7 @@ from ...tests.db_helpers import (
 from ..persistence import (
     WimPersistence,
     hide_confidential_fields,
+    invalidate_cache,
     serialize_fields,
     unserialize_fields
 )
@@ -261,5 +265,71 @@ class TestWimPersistence(TestCaseWithDatabasePerTest):
         self.assertEqual(result['number_failed'], 1)
 
 
+class TestWimPersistenceCache(unittest.TestCase):
+    def setUp(self):
+        super(TestWimPersistenceCache, self).setUp()
+        self.db = MagicMock()
+        self.db.get_rows.side_effect = lambda **_: [eg.wim_account(0, 0)]
+        self.persist = WimPersistence(self.db)
+
+    def test_repeated_reads_are_cached(self):
+        # Given a WIM account was already retrieved
+        uuid_ = uuid('wim-account00')
+        self.persist.get_wim_account_by(uuid=uuid_)
+        # When it is retrieved again, with the same arguments
+        account = self.persist.get_wim_account_by(uuid=uuid_)
+        # Then the database should be reached just once
+        self.assertEqual(account['uuid'], uuid_)
+        self.assertEqual(self.db.get_rows.call_count, 1)
+        self.assertEqual(self.persist.cache.hits, 1)
+        self.assertEqual(self.persist.cache.misses, 1)
+
+    def test_cached_records_are_copies(self):
+        # Given a record was read and then modified by the caller
+        account = self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        account.pop('name')
+        # When the same record is read again,
+        # then the modification should not be visible
+        account = self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        self.assertEqual(account['name'], 'wim-account00')
+
+    def test_changes_invalidate_the_cache(self):
+        # Given a record was cached
+        self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        # When the records are changed
+        self.persist.delete_wim_account(uuid('wim-account00'))
+        # Then the next read should reach the database
+        self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        self.assertEqual(self.db.get_rows.call_count, 2)
+        # But changes in unrelated records should not invalidate the cache
+        invalidate_cache('datacenters')
+        self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        self.assertEqual(self.db.get_rows.call_count, 2)
+
+    def test_reads_during_an_insert_are_not_kept(self):
+        # Given a record is read while a new WIM is being inserted
+        def new_row(*_, **__):
+            self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+            return uuid('wim0')
+
+        self.db.new_row.side_effect = new_row
+        self.persist.create_wim({'name': 'wim0', 'wim_url': 'http://wim0'})
+        reads = self.db.get_rows.call_count
+        # When it is read after the insert,
+        # then the database should be reached again
+        self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        self.assertEqual(self.db.get_rows.call_count, reads + 1)
+
+    def test_cache_expires(self):
+        # Given a record was cached
+        self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        # When the TTL is over
+        later = MagicMock(return_value=time() + self.persist.cache.ttl + 1)
+        with patch('osm_ro.wim.persistence.time', later):
+            self.persist.get_wim_account_by(uuid=uuid('wim-account00'))
+        # Then the record should be read again from the database
+        self.assertEqual(self.db.get_rows.call_count, 2)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+##
+# Copyright 2018 University of Bristol - High Performance Networks Research
+# Group
+# All Rights Reserved.
+#
+# Contributors: Anderson Bravalheri, Dimitrios Gkounis, Abubakar Siddique
+# Muqaddas, Navdeep Uniyal, Reza Nejabati and Dimitra Simeonidou
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# For those usages not covered by the Apache License, Version 2.0 please
+# contact with: <highperformance-networks@bristol.ac.uk>
+#
+# Neither the name of the University of Bristol nor the names of its
+# contributors may be used to endorse or promote products derived from
+# this software without specific prior written permission.
+#
+# This work has been performed in the context of DCMS UK 5G Testbeds
+# & Trials Programme and in the framework of the Metro-Haul project -
+# funded by the European Commission under Grant number 761727 through the
+# Horizon 2020 and 5G-PPP programmes.
+##
+
+from __future__ import unicode_literals
+
+import logging
+import unittest
+from time import time
+
+from mock import MagicMock, patch
+
+from . import fixtures as eg
+from ...tests.db_helpers import uuid
+from ..schedule import TaskSchedule
+from ..wim_thread import WimThread
+
+
+class _Task(object):
+    def __init__(self, name):
+        self.name = name
+        self.process_at = None
+
+
+class TestTaskSchedule(unittest.TestCase):
+    def test_pop_due__time_order(self):
+        # Given tasks scheduled in a random order
+        schedule = TaskSchedule()
+        now = time()
+        for name, delay in (('c', 3), ('a', 1), ('d', 100), ('b', 2)):
+            schedule.push(_Task(name), now + delay)
+
+        # When we pop the due tasks
+        due = [t.name for t in schedule.pop_due(now + 10)]
+
+        # Then they should come in time order, leaving the future ones
+        self.assertEqual(due, ['a', 'b', 'c'])
+        self.assertEqual(len(schedule), 1)
+        self.assertEqual(schedule.peek().name, 'd')
+
+    def test_pop_due__insertion_order_for_same_time(self):
+        # Given tasks scheduled for the same moment
+        schedule = TaskSchedule()
+        now = time()
+        for name in 'abcde':
+            schedule.push(_Task(name), now)
+
+        # They should be iterated and popped in the insertion order
+        self.assertEqual([t.name for t in schedule], list('abcde'))
+        self.assertEqual([t.name for t in schedule.pop_due(now)],
+                         list('abcde'))
+        self.assertFalse(schedule)
+
+    def test_pop_due__lazy(self):
+        # Given 10 due tasks
+        schedule = TaskSchedule()
+        for i in range(10):
+            schedule.push(_Task(i))
+
+        # When we consume just part of the generator
+        due = schedule.pop_due()
+        for _ in range(3):
+            next(due)
+
+        # Then just the consumed tasks should be removed
+        self.assertEqual(len(schedule), 7)
+
+
+class _Persistence(object):
+    """Minimal persistence layer, to exercise just the scheduling"""
+    def update_wan_link(self, *_, **__):
+        pass
+
+    def update_action(self, *_, **__):
+        pass
+
+
+class _Connector(object):
+    def __init__(self):
+        self.calls = 0
+
+    def get_connectivity_service_status(self, *_, **__):
+        self.calls += 1
+        return {'wim_status': 'ACTIVE'}
+
+
+@patch('osm_ro.wim.wim_thread.CONNECTORS', MagicMock())
+class TestWimThreadManyLinks(unittest.TestCase):
+    NUM_LINKS = 50000
+
+    def setUp(self):
+        super(TestWimThreadManyLinks, self).setUp()
+        wim = eg.wim(0)
+        account = eg.wim_account(0, 0)
+        account['wim'] = wim
+        self.thread = WimThread(_Persistence(), account,
+                                logger=logging.getLogger('benchmark'))
+        self.thread.logger.setLevel(logging.INFO)
+        self.thread.connector = _Connector()
+
+    def test_refresh_50k_wan_links(self):
+        # Given we have 50k WAN links waiting for refresh
+        actions = eg.wim_actions('FIND', 'DONE', action_id=uuid('action0'),
+                                 num_links=self.NUM_LINKS)
+        scheduled_at = time()
+        self.thread.insert_pending_tasks(actions)
+        self.assertEqual(len(self.thread.refresh_tasks), self.NUM_LINKS)
+
+        # When all of them are processed in batches
+        rounds = 0
+        processed = 0
+        while processed < self.NUM_LINKS:
+            processed += self.thread.process_list('refresh')
+            rounds += 1
+
+        # Then each link should be refreshed exactly once and rescheduled
+        # for the future
+        self.assertEqual(self.thread.connector.calls, self.NUM_LINKS)
+        self.assertEqual(rounds, self.NUM_LINKS // WimThread.BATCH)
+        self.assertEqual(len(self.thread.refresh_tasks), self.NUM_LINKS)
+        self.assertGreater(self.thread.refresh_tasks.peek().process_at,
+                           scheduled_at)
+
+
+if __name__ == '__main__':
+    unittest.main()
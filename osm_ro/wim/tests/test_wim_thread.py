@@ -52,6 +52,7 @@ from ...tests.db_helpers import (
 from ..engine import WimEngine
 from ..persistence import WimPersistence
 from ..wim_thread import WimThread
+from ..wimconn import WimConnectorError
 
 
 ignore_connector = patch('osm_ro.wim.wim_thread.CONNECTORS', MagicMock())
@@ -186,7 +187,7 @@ class TestWimThreadWithDb(TestCaseWithDatabasePerTest):
         # When we reload the tasks
         self.thread.reload_actions()
         # No pending task should be found
-        self.assertEqual(self.thread.pending_tasks, [])
+        self.assertEqual(list(self.thread.pending_tasks), [])
 
     def test_reload_actions__batch(self):
         # Given the group_limit is 10, and we have 24
@@ -249,7 +250,6 @@ class TestWimThreadWithDb(TestCaseWithDatabasePerTest):
     def test_delete_superseed_create(self):
         # Given we insert a scheduled CREATE task
         instance_action = eg.instance_action(num_tasks=1)
-        self.thread.pending_tasks = []
         engine = WimEngine(persistence=self.persist)
         self.addCleanup(engine.stop_threads)
         wan_links = eg.instance_wim_nets()
@@ -263,14 +263,14 @@ class TestWimThreadWithDb(TestCaseWithDatabasePerTest):
 
         self.thread.insert_pending_tasks(create_actions)
 
-        assert self.thread.pending_tasks[0].is_scheduled
+        assert self.thread.pending_tasks.peek().is_scheduled
 
         # When we insert the equivalent DELETE task
         self.thread.insert_pending_tasks(delete_actions)
 
         # Then the CREATE task should be superseded
-        self.assertEqual(self.thread.pending_tasks[0].action, 'CREATE')
-        assert self.thread.pending_tasks[0].is_superseded
+        self.assertEqual(self.thread.pending_tasks.peek().action, 'CREATE')
+        assert self.thread.pending_tasks.peek().is_superseded
 
         self.thread.process_list('pending')
         self.thread.process_list('refresh')
@@ -306,7 +306,7 @@ class TestWimThread(unittest.TestCase):
         kwargs = {'action_id': uuid('action0')}
         actions = eg.wim_actions('FIND', 'DONE', num_links=30, **kwargs)
         self.thread.insert_pending_tasks(actions)
-        for task in self.thread.refresh_tasks[0:30:2]:
+        for task in list(self.thread.refresh_tasks)[0:30:2]:
             task.status = 'SUPERSEDED'
 
         now = time()
@@ -314,18 +314,60 @@ class TestWimThread(unittest.TestCase):
         # When we call the refresh_elements
         processed = self.thread.process_list('refresh')
 
-        # Then we should have 25 updates (since SUPERSEDED updates are cheap,
-        # they are not counted for the limits)
-        self.assertEqual(processed, 25)
+        # Then we should have 20 updates (since SUPERSEDED updates are cheap,
+        # they are not counted for the limits): the due tasks are popped in
+        # order until 10 non-superseded tasks are processed
+        self.assertEqual(processed, 20)
 
-        # The SUPERSEDED tasks should be removed, 5 tasks should be untouched,
-        # and 10 tasks should be rescheduled
-        refresh_tasks = self.thread.refresh_tasks
+        # The 10 popped SUPERSEDED tasks should be removed, 10 tasks should be
+        # untouched, and 10 tasks should be rescheduled
+        refresh_tasks = list(self.thread.refresh_tasks)
         old = [t for t in refresh_tasks if t.process_at <= now]
         new = [t for t in refresh_tasks if t.process_at > now]
-        self.assertEqual(len(old), 5)
+        self.assertEqual(len(old), 10)
         self.assertEqual(len(new), 10)
-        self.assertEqual(len(self.thread.refresh_tasks), 15)
+        self.assertEqual(len([t for t in old if t.is_superseded]), 5)
+        self.assertEqual(len(self.thread.refresh_tasks), 20)
+
+        # When the list is processed again, after the rescheduled tasks
+        # are due
+        with patch('osm_ro.wim.wim_thread.time',
+                   MagicMock(return_value=now + 2 * WimThread.REFRESH_ACTIVE)):
+            processed = self.thread.process_list('refresh')
+
+        # Then the remaining SUPERSEDED tasks should be discarded as well
+        self.assertFalse(any(t.is_superseded
+                             for t in self.thread.refresh_tasks))
+
+    def test_process_refresh__wim_unreachable(self):
+        # Given we have 30 tasks in the refresh queue
+        kwargs = {'action_id': uuid('action0')}
+        actions = eg.wim_actions('FIND', 'DONE', num_links=30, **kwargs)
+        self.thread.insert_pending_tasks(actions)
+        # and the WIM timing out
+        error = WimConnectorError('Gateway Timeout', http_code=504)
+        self.thread.connector.get_connectivity_service_status.side_effect = \
+            error
+
+        # When the list is processed
+        self.thread.process_list('refresh')
+
+        # Then the circuit breaker should open, and the WIM should not be
+        # called for the rest of the batch
+        self.assertEqual(self.thread.breaker.state, 'OPEN')
+        self.assertEqual(self.thread.connector
+                         .get_connectivity_service_status.call_count,
+                         self.thread.breaker.failure_threshold)
+
+        # And the tasks should be kept in the list without calling the WIM
+        self.thread.connector.reset_mock()
+        with patch('osm_ro.wim.wim_thread.time',
+                   MagicMock(return_value=time() + 2 * WimThread.REFRESH_ACTIVE)):
+            processed = self.thread.process_list('refresh')
+        self.assertEqual(processed, 0)
+        self.assertEqual(len(self.thread.refresh_tasks), 30)
+        self.thread.connector.\
+            get_connectivity_service_status.assert_not_called()
 
 
 if __name__ == '__main__':
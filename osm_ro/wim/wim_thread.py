@@ -43,16 +43,15 @@ import logging
 import threading
 from contextlib import contextmanager
 from functools import partial
-from itertools import islice, chain, takewhile
-from operator import itemgetter, attrgetter
 from sys import exc_info
 from time import time, sleep
 
 from six import reraise
 from six.moves import queue
 
-from . import wan_link_actions, wimconn_odl, wimconn_dynpac, wimconn_dpb_experimental # wimconn_tapi
-from ..utils import ensure, partition, pipe
+from . import wan_link_actions, wimconn_odl, wimconn_dynpac, wimconn_dpb # wimconn_tapi
+from ..circuit_breaker import CircuitBreaker
+from ..utils import ensure
 from .actions import IGNORE, PENDING, REFRESH
 from .errors import (
     DbBaseException,
@@ -61,6 +60,7 @@ from .errors import (
     UndefinedAction,
 )
 from .failing_connector import FailingConnector
+from .schedule import TaskSchedule
 from .wimconn import WimConnectorError
 
 ACTIONS = {
@@ -72,10 +72,17 @@ CONNECTORS = {
     # "tapi": wimconn_tapi
     # Add extra connectors here
     "dynpac": wimconn_dynpac.DynpacConnector,
-    "dpb": wimconn_dpb_experimental.DpbConnector
+    "dpb": wimconn_dpb.DpbConnector
 }
 
 
+def is_wim_unreachable(exception):
+    """Connector exceptions that count as failures for the circuit breaker
+    of the thread: the WIM (or its gateway) is unavailable or timed out
+    """
+    return getattr(exception, 'http_code', None) in (503, 504)
+
+
 class WimThread(threading.Thread):
     """Specialized task queue implementation that runs in an isolated thread.
 
@@ -121,11 +128,15 @@ class WimThread(threading.Thread):
 
         self.task_queue = queue.Queue(self.QUEUE_SIZE)
 
-        self.refresh_tasks = []
-        """Time ordered task list for refreshing the status of WIM nets"""
+        self.breaker = CircuitBreaker('wim.' + self.name, is_wim_unreachable,
+                                      logger=self.logger)
+        """Opened when the WIM is unreachable. Then tasks are deferred"""
+
+        self.refresh_tasks = TaskSchedule()
+        """Time ordered tasks for refreshing the status of WIM nets"""
 
-        self.pending_tasks = []
-        """Time ordered task list for creation, deletion of WIM nets"""
+        self.pending_tasks = TaskSchedule()
+        """Time ordered tasks for creation, deletion of WIM nets"""
 
         self.grouped_tasks = {}
         """ It contains all the creation/deletion pending tasks grouped by
@@ -205,8 +216,8 @@ class WimThread(threading.Thread):
         """
 
         # First we clean the cache to let the garbage collector work
-        self.refresh_tasks = []
-        self.pending_tasks = []
+        self.refresh_tasks = TaskSchedule()
+        self.pending_tasks = TaskSchedule()
         self.grouped_tasks = {}
 
         offset = 0
@@ -251,9 +262,9 @@ class WimThread(threading.Thread):
                               task.id, task.status, task.action, task.item)
 
     def schedule(self, task, when=None, list_name='pending'):
-        """Insert a task in the correct list, respecting the schedule.
-        The refreshing list is ordered by threshold_time (task.process_at)
-        It is assumed that this is called inside this thread
+        """Insert a task in the correct schedule (ordered by
+        ``task.process_at``). It is assumed that this is called inside this
+        thread
 
         Arguments:
             task (Action): object representing the task.
@@ -265,45 +276,47 @@ class WimThread(threading.Thread):
         processing_list = {'refresh': self.refresh_tasks,
                            'pending': self.pending_tasks}[list_name]
 
-        when = when or time()
-        task.process_at = when
-
-        schedule = (t.process_at for t in processing_list)
-        index = len(list(takewhile(lambda moment: moment <= when, schedule)))
-
-        processing_list.insert(index, task)
-        self.logger.debug(
-            'Schedule of %s in "%s" - waiting position: %d (%f)',
-            task.id, list_name, index, task.process_at)
+        processing_list.push(task, when)
+        self.logger.debug('Schedule of %s in "%s" (%f)',
+                          task.id, list_name, task.process_at)
 
         return task
 
     def process_list(self, list_name='pending'):
-        """Process actions in batches and reschedule them if necessary"""
+        """Process actions in batches and reschedule them if necessary.
+
+        Superseded tasks that become due are just saved and discarded,
+        without counting for the ``BATCH`` limit.
+
+        While the circuit breaker is open (the WIM is unreachable) the tasks
+        are kept in the list, to be processed when the WIM is tried again.
+        """
         task_list, handler = {
             'refresh': (self.refresh_tasks, self._refresh_single),
             'pending': (self.pending_tasks, self._process_single)}[list_name]
 
-        now = time()
-        waiting = ((i, task) for i, task in enumerate(task_list)
-                   if task.process_at is None or task.process_at <= now)
-
-        is_superseded = pipe(itemgetter(1), attrgetter('is_superseded'))
-        superseded, active = partition(is_superseded, waiting)
-        superseded = [(i, t.save(self.persist)) for i, t in superseded]
-
-        batch = islice(active, self.BATCH)
-        refreshed = [(i, handler(t)) for i, t in batch]
+        processed = active = 0
+        for task in task_list.pop_due(time()):
+            if task.is_superseded:
+                task.save(self.persist)
+            elif not self.breaker.allow():
+                task_list.push(task, task.process_at)
+                break
+            else:
+                handler(task)
+                active += 1
+            processed += 1
+            if active >= self.BATCH:
+                break
 
-        # Since pop changes the indexes in the list, we need to do it backwards
-        remove = sorted([i for i, _ in chain(refreshed, superseded)])
-        return len([task_list.pop(i) for i in reversed(remove)])
+        return processed
 
     def _refresh_single(self, task):
         """Refresh just a single task, and reschedule it if necessary"""
         now = time()
 
-        result = task.refresh(self.connector, self.persist)
+        result = task.refresh(self.breaker.guard(self.connector),
+                              self.persist)
         self.logger.debug('Refreshing WIM task: %s (%s): %s %s => %r',
                           task.id, task.status, task.action, task.item, result)
 
@@ -316,7 +329,8 @@ class WimThread(threading.Thread):
         """Process just a single task, and reschedule it if necessary"""
         now = time()
 
-        result = task.process(self.connector, self.persist, self.ovim)
+        result = task.process(self.breaker.guard(self.connector),
+                              self.persist, self.ovim)
         self.logger.debug('Executing WIM task: %s (%s): %s %s => %r',
                           task.id, task.status, task.action, task.item, result)
 
@@ -37,13 +37,13 @@ import logging
 import random
 import sys #FIXME: Used to print loggers to stdout
 import operator
-import requests
 from enum import Enum
 try:
     import paramiko
 except:
     exit("Install Paramiko [pip install paramiko]")
 from wimconn import WimConnector, WimConnectorError
+from ..http_tools.session import get_session, session_options
 
 # TODO: List
 #  - Add correct HTTP error codes
@@ -161,17 +161,20 @@ class DpbRestInterface():
     __LOGGER_NAME_EXT = ".rest"
     __FUNCTION_MAP_POS = 0
 
-    def __init__(self, wim_account, wim_url, wim_port, network, logger_name):
+    def __init__(self, wim_account, wim_url, wim_port, network, logger_name,
+                 session_config=None):
         self.logger = logging.getLogger(logger_name + self.__LOGGER_NAME_EXT)
         self.__account = wim_account
         self.__base_url = "http://{}:{}/network/{}".format(wim_url, str(wim_port), network)
+        self.__session = get_session(self.__base_url,
+                                     **session_options(session_config))
         self.logger.info("REST OK")
 
     def post(self, function, url_params="", data=None, get_response=True):
         url = self.__base_url + url_params + "/" + function[self.__FUNCTION_MAP_POS]
         try:
             self.logger.info(data)
-            response = requests.post(url, json=data)
+            response = self.__session.post(url, json=data)
             '''if response.status_code != 200:
                 raise WimConnectorError("REST request failed (non-200 status code)")'''
             if get_response:
@@ -182,7 +185,7 @@ class DpbRestInterface():
     def get(self, function, url_params=""):
         url = self.__base_url + url_params + function[self.__FUNCTION_MAP_POS]
         try:
-            return requests.get(url + url_ext)
+            return self.__session.get(url + url_ext)
         except:
             raise WimConnectorError("REST request failed", 500)
 
@@ -240,7 +243,8 @@ class DpbConnector(WimConnector):
                                          self.__url,
                                          self.__port,
                                          self.__network,
-                                         self.__LOGGER_NAME)
+                                         self.__LOGGER_NAME,
+                                         self.__cli_config)
         else:
             raise WimConnectorError("Connection type not supported", 400)
             exit(1)
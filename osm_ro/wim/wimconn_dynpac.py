@@ -27,6 +27,7 @@ import logging
 from enum import Enum
 
 from wimconn import WimConnector, WimConnectorError
+from ..http_tools.session import get_session, session_options
 
 
 class WimError(Enum):
@@ -79,6 +80,8 @@ class DynpacConnector(WimConnector):
         self.__wim_url = self.__wim.get("wim_url")
         self.__user = wim_account.get("user")
         self.__passwd = wim_account.get("passwd")
+        self.__session = get_session(self.__wim_url,
+                                     **session_options(self.__config))
         self.logger.info("Initialized.")
 
     def create_connectivity_service(self,
@@ -93,7 +96,8 @@ class DynpacConnector(WimConnector):
         endpoint = "{}/service/create".format(self.__wim_url)
 
         try:
-            response = requests.post(endpoint, data=body, headers=headers)
+            response = self.__session.post(endpoint, data=body,
+                                           headers=headers)
         except requests.exceptions.RequestException as e:
             self.__exception(e.message, http_code=503)
 
@@ -115,7 +119,7 @@ class DynpacConnector(WimConnector):
     def get_connectivity_service_status(self, service_uuid):
         endpoint = "{}/service/status/{}".format(self.__wim_url, service_uuid)
         try:
-            response = requests.get(endpoint)
+            response = self.__session.get(endpoint)
         except requests.exceptions.RequestException as e:
             self.__exception(e.message, http_code=503)
 
@@ -128,7 +132,7 @@ class DynpacConnector(WimConnector):
     def delete_connectivity_service(self, service_uuid, conn_info):
         endpoint = "{}/service/delete/{}".format(self.__wim_url, service_uuid)
         try:
-            response = requests.delete(endpoint)
+            response = self.__session.delete(endpoint)
         except requests.exceptions.RequestException as e:
             self.__exception(e.message, http_code=503)
         if response.status_code != 200:
@@ -139,7 +143,7 @@ class DynpacConnector(WimConnector):
     def clear_all_connectivity_services(self):
         endpoint = "{}/service/clearAll".format(self.__wim_url)
         try:
-            response = requests.delete(endpoint)
+            response = self.__session.delete(endpoint)
             http_code = response.status_code
         except requests.exceptions.RequestException as e:
             self.__exception(e.message, http_code=503)
@@ -153,7 +157,7 @@ class DynpacConnector(WimConnector):
         endpoint = "{}/checkConnectivity".format(self.__wim_url)
 
         try:
-            response = requests.get(endpoint)
+            response = self.__session.get(endpoint)
             http_code = response.status_code
         except requests.exceptions.RequestException as e:
             self.__exception(e.message, http_code=503)
@@ -167,7 +171,7 @@ class DynpacConnector(WimConnector):
         auth = (self.__user, self.__passwd)
 
         try:
-            response = requests.get(endpoint, auth=auth)
+            response = self.__session.get(endpoint, auth=auth)
             http_code = response.status_code
         except requests.exceptions.RequestException as e:
             self.__exception(e.message, http_code=503)
@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+
+"""Distribution of the VIM/WIM threads across several worker processes.
+
+By default, every VIM account (``datacenter_tenant_id``) and WIM account
+(``wim_account_id``) is served by a thread running inside the main openmanod
+process, which means all of them compete for the same GIL. When the option
+``vim_workers`` is set to a positive number in ``openmanod.cfg``, the threads
+are instead spawned inside a pool of worker processes.
+
+Accounts are assigned to the workers using consistent hashing, so adding or
+removing workers only moves a small fraction of the accounts. Tasks are
+delivered to the threads via a :class:`multiprocessing.Queue` per worker.
+
+A supervisor thread watches the workers and restarts the ones that die,
+re-spawning all the threads assigned to them. Since the threads reload the
+pending actions from the database when they start, no task is lost.
+
+Services that must run just once, at the main process (e.g. the ovim library,
+with its openflow and DHCP threads), are registered with
+:meth:`WorkerPool.serve`. The threads of the workers use them through a
+:class:`RemoteService` proxy, that sends each method call to the main process
+and waits for its result. Workers also report periodically the metrics of
+their threads (e.g. circuit breakers), see :meth:`WorkerPool.get_metrics`.
+"""
+
+import cPickle
+import logging
+import multiprocessing
+import threading
+from bisect import bisect
+from hashlib import md5
+from itertools import count
+from multiprocessing.pool import ThreadPool
+from Queue import Empty
+from time import sleep
+
+DEFAULT_REPLICAS = 100
+DEFAULT_CHECK_INTERVAL = 5  # seconds
+SERVICE_THREADS = 4  # calls of the workers to the services run at once at the main process
+SERVICE_TIMEOUT = 300  # seconds a worker waits for the result of a call to a service
+
+
+class WorkerPoolException(Exception):
+    """Common Exception for the worker pool"""
+
+
+def _hash(key):
+    return int(md5(str(key).encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """Consistent hash ring, mapping keys (e.g. account ids) into nodes.
+
+    Each node is placed ``replicas`` times in the ring (virtual nodes), so the
+    keys are evenly distributed.
+    """
+
+    def __init__(self, nodes=(), replicas=DEFAULT_REPLICAS):
+        self.replicas = replicas
+        self._points = []
+        self._nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(set(self._nodes.values()))
+
+    def add(self, node):
+        for i in range(self.replicas):
+            point = _hash('{}#{}'.format(node, i))
+            self._nodes[point] = node
+        self._points = sorted(self._nodes)
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            self._nodes.pop(_hash('{}#{}'.format(node, i)), None)
+        self._points = sorted(self._nodes)
+
+    def get(self, key):
+        """Return the node responsible for the key"""
+        if not self._points:
+            raise WorkerPoolException("Empty hash ring")
+        index = bisect(self._points, _hash(key)) % len(self._points)
+        return self._nodes[self._points[index]]
+
+
+class RemoteService(object):
+    """Proxy, at a worker process, of a service of the main process (see
+    :meth:`WorkerPool.serve`). Method calls are done at the main process, and
+    their exceptions raised at the worker.
+    """
+
+    def __init__(self, parent, name):
+        self._parent = parent
+        self._name = name
+
+    def __getattr__(self, method):
+        if method.startswith('__'):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self._parent.call(self._name, method, args, kwargs)
+
+        return call
+
+
+class _Parent(object):
+    """Channel of a worker process with the main process: sends the calls to
+    the services and the metrics, and receives the results of the calls
+    """
+
+    def __init__(self, call_queue, timeout=SERVICE_TIMEOUT):
+        self.call_queue = call_queue
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.ids = count()
+        self.waiting = {}  # call id -> [Event, (ok, result)]
+
+    def service(self, name):
+        return RemoteService(self, name)
+
+    def call(self, service, method, args, kwargs):
+        with self.lock:
+            call_id = next(self.ids)
+            waiter = self.waiting[call_id] = [threading.Event(), None]
+        try:
+            self.call_queue.put(('call', call_id, service, method, args, kwargs))
+            if not waiter[0].wait(self.timeout):
+                raise WorkerPoolException("Timeout calling {}.{} at the main process".format(service, method))
+        finally:
+            with self.lock:
+                del self.waiting[call_id]
+        ok, result = waiter[1]
+        if not ok:
+            raise result
+        return result
+
+    def answer(self, call_id, ok, result):
+        with self.lock:
+            waiter = self.waiting.get(call_id)
+        if waiter:  # else, it has timed out
+            waiter[1] = (ok, result)
+            waiter[0].set()
+
+    def report_metrics(self, metrics, interval, logger):
+        while True:
+            try:
+                self.call_queue.put(('metrics', metrics()))
+            except Exception as e:
+                logger.error("Cannot report metrics: {}".format(e))
+            sleep(interval)
+
+
+def _worker_main(index, task_queue, call_queue, bootstrap, metrics=None, metrics_interval=DEFAULT_CHECK_INTERVAL):
+    """Main loop of a worker process.
+
+    ``bootstrap`` is called once inside the new process, with the channel to
+    the main process (whose ``service`` method returns the
+    :class:`RemoteService` of a service), and must return a dict mapping each
+    kind of thread (e.g. ``vim`` or ``wim``) to a callable that builds a not
+    started thread from the arguments given to :meth:`WorkerPool.start_thread`.
+    Threads must implement ``insert_task``, that is called at the main loop,
+    which also receives the results of the services, so services cannot be
+    called from it. ``metrics``, if given, is called
+    every ``metrics_interval`` seconds and its result sent to the main process.
+    """
+    worker_logger = logging.getLogger('openmano.workers.{}'.format(index))
+    parent = _Parent(call_queue)
+    try:
+        factories = bootstrap(parent)
+    except Exception as e:
+        worker_logger.critical("Cannot bootstrap worker: {}".format(e), exc_info=True)
+        return
+    if metrics:
+        reporter = threading.Thread(target=parent.report_metrics, args=(metrics, metrics_interval, worker_logger),
+                                    name="metrics")
+        reporter.daemon = True
+        reporter.start()
+    threads = {}
+    worker_logger.debug("Starting")
+    while True:
+        message = task_queue.get()
+        try:
+            if message[0] == 'exit':
+                for thread in threads.values():
+                    thread.insert_task('exit')
+                break
+            if message[0] == 'answer':
+                parent.answer(*message[1:])
+                continue
+            _, kind, key = message[:3]
+            if message[0] == 'start':
+                args, kwargs = message[3:]
+                old_thread = threads.pop((kind, key), None)
+                if old_thread:
+                    old_thread.insert_task('exit')
+                thread = factories[kind](*args, **kwargs)
+                thread.daemon = True
+                thread.start()
+                threads[(kind, key)] = thread
+            elif message[0] == 'task':
+                task = message[3]
+                thread = threads.get((kind, key))
+                if not thread:
+                    worker_logger.error("Task for not running {} thread '{}' discarded".format(kind, key))
+                    continue
+                thread.insert_task(task)
+                if task == 'exit':
+                    del threads[(kind, key)]
+        except Exception as e:
+            worker_logger.error("Cannot process message '{}': {}".format(message[:3], e), exc_info=True)
+    worker_logger.debug("Finishing")
+
+
+class RemoteThread(object):
+    """Proxy for a thread running inside a worker process.
+
+    It exposes the same interface used by ``nfvo`` and ``WimEngine`` to talk
+    to the local threads, so both can be used interchangeably.
+    """
+
+    def __init__(self, pool, kind, key, name=None):
+        self.pool = pool
+        self.kind = kind
+        self.key = key
+        self.name = name or key
+
+    def insert_task(self, task):
+        self.pool.insert_task(self.kind, self.key, task)
+
+    def reload(self):
+        self.insert_task('reload')
+
+    def exit(self):
+        self.insert_task('exit')
+
+    def is_alive(self):
+        return self.pool.is_running(self.kind, self.key)
+
+
+class WorkerPool(object):
+    """Pool of processes running the VIM/WIM threads.
+
+    Arguments:
+        size (int): number of worker processes
+        bootstrap (callable): function called inside each new worker process,
+            see :func:`_worker_main`
+        check_interval (float): seconds between checks of the workers health,
+            and between the reports of their metrics
+        metrics (callable): function called periodically inside each worker
+            process, returning the metrics of its threads
+    """
+
+    def __init__(self, size, bootstrap, check_interval=DEFAULT_CHECK_INTERVAL, logger_name='openmano.workers',
+                 metrics=None):
+        if size < 1:
+            raise WorkerPoolException("Invalid number of workers '{}'".format(size))
+        self.size = size
+        self.bootstrap = bootstrap
+        self.check_interval = check_interval
+        self.metrics = metrics
+        self.logger = logging.getLogger(logger_name)
+        self.ring = HashRing(range(size))
+        self.assignments = {}  # (kind, key) -> (args, kwargs)
+        self.restarts = 0
+        self.services = {}  # name -> object, see serve
+        self._workers = [None] * size  # (process, task queue, call queue)
+        self._metrics = {}  # worker index -> last metrics reported
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._supervisor = None
+        self._service_pool = None
+
+    def start(self):
+        self._stopping.clear()
+        self._service_pool = ThreadPool(SERVICE_THREADS)
+        with self._lock:
+            for index in range(self.size):
+                self._spawn(index)
+        self._supervisor = threading.Thread(target=self._supervise, name="workers-supervisor")
+        self._supervisor.daemon = True
+        self._supervisor.start()
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        with self._lock:
+            workers = [w for w in self._workers if w]
+            self._workers = [None] * self.size
+            self.assignments.clear()
+            self._metrics.clear()
+        for _, task_queue, _ in workers:
+            task_queue.put(('exit',))
+        for process, _, _ in workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        if self._service_pool:
+            self._service_pool.close()
+            self._service_pool = None
+
+    def serve(self, name, service):
+        """Make an object of this process available to the threads of the
+        workers, that get its :class:`RemoteService` from the channel given
+        to ``bootstrap``
+        """
+        self.services[name] = service
+
+    def get_metrics(self):
+        """Last metrics reported by each running worker, by worker index"""
+        with self._lock:
+            return {index: metrics for index, metrics in self._metrics.items()
+                    if self._workers[index] and self._workers[index][0].is_alive()}
+
+    def worker_for(self, key):
+        """Return the index of the worker responsible for an account"""
+        return self.ring.get(key)
+
+    def start_thread(self, kind, key, *args, **kwargs):
+        """Start a thread of the given kind for the account ``key`` in the
+        corresponding worker, returning a :class:`RemoteThread` proxy.
+        """
+        with self._lock:
+            self.assignments[(kind, key)] = (args, kwargs)
+            self._send(self.worker_for(key), ('start', kind, key, args, kwargs))
+        return RemoteThread(self, kind, key)
+
+    def insert_task(self, kind, key, task):
+        with self._lock:
+            if (kind, key) not in self.assignments:
+                raise WorkerPoolException("No {} thread running for '{}'".format(kind, key))
+            if task == 'exit':
+                del self.assignments[(kind, key)]
+            self._send(self.worker_for(key), ('task', kind, key, task))
+
+    def is_running(self, kind, key):
+        with self._lock:
+            if (kind, key) not in self.assignments:
+                return False
+            worker = self._workers[self.worker_for(key)]
+            return bool(worker and worker[0].is_alive())
+
+    def _spawn(self, index):
+        # each worker has its own call queue, so a killed worker cannot leave locked the queue of others
+        task_queue = multiprocessing.Queue()
+        call_queue = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_worker_main,
+                                          args=(index, task_queue, call_queue, self.bootstrap, self.metrics,
+                                                self.check_interval),
+                                          name="ro-worker-{}".format(index))
+        process.daemon = True
+        process.start()
+        self._workers[index] = (process, task_queue, call_queue)
+        receiver = threading.Thread(target=self._receive, args=(index, process, task_queue, call_queue),
+                                    name="ro-worker-{}-calls".format(index))
+        receiver.daemon = True
+        receiver.start()
+        self.logger.debug("Worker {} started with pid {}".format(index, process.pid))
+
+    def _receive(self, index, process, task_queue, call_queue):
+        """Receive the messages of a worker process until it finishes"""
+        while process.is_alive() and not self._stopping.is_set():
+            try:
+                message = call_queue.get(timeout=1)
+            except Empty:
+                continue
+            if message[0] == 'metrics':
+                with self._lock:
+                    if self._workers[index] and self._workers[index][0] is process:
+                        self._metrics[index] = message[1]
+            elif message[0] == 'call':
+                self._service_pool.apply_async(self._answer, (task_queue,) + tuple(message[1:]))
+
+    def _answer(self, task_queue, call_id, service, method, args, kwargs):
+        """Run a call of a worker to a service, and send back the result or the exception"""
+        try:
+            answer = ('answer', call_id, True, getattr(self.services[service], method)(*args, **kwargs))
+        except Exception as e:
+            answer = ('answer', call_id, False, e)
+        try:
+            cPickle.dumps(answer, cPickle.HIGHEST_PROTOCOL)
+        except Exception as e:  # the queue would just log the error, and the worker wait until the timeout
+            self.logger.error("Cannot send the result of {}.{} to the worker: {}".format(service, method, e))
+            answer = ('answer', call_id, False, WorkerPoolException("Cannot send the result of {}.{}: {}".format(
+                service, method, e)))
+        task_queue.put(answer)
+
+    def _send(self, index, message):
+        worker = self._workers[index]
+        if not worker:
+            raise WorkerPoolException("Worker pool is not running")
+        worker[1].put(message)
+
+    def check_workers(self):
+        """Restart the dead workers, re-spawning the threads assigned to them.
+        Return the number of restarted workers"""
+        restarted = 0
+        with self._lock:
+            if self._stopping.is_set():
+                return 0
+            for index, worker in enumerate(self._workers):
+                if not worker or worker[0].is_alive():
+                    continue
+                self.logger.error("Worker {} (pid {}) died with exit code {}. Restarting".format(
+                    index, worker[0].pid, worker[0].exitcode))
+                self._spawn(index)
+                for (kind, key), (args, kwargs) in self.assignments.items():
+                    if self.worker_for(key) == index:
+                        self._send(index, ('start', kind, key, args, kwargs))
+                restarted += 1
+        self.restarts += restarted
+        return restarted
+
+    def _supervise(self):
+        while not self._stopping.wait(self.check_interval):
+            try:
+                self.check_workers()
+            except Exception as e:
+                self.logger.critical("Unexpected exception supervising workers: {}".format(e), exc_info=True)